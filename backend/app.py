@@ -40,6 +40,10 @@ from routes.candles import candles_bp
 from routes.market import market_bp
 from routes.news import news_bp
 from routes.volume import volume_bp
+from routes.prices import prices_bp
+from routes.health import health_bp
+from routes.encoding import compress_response
+from routes.caching import conditional_response
 
 def create_app():
     app = Flask(__name__)
@@ -64,6 +68,14 @@ def create_app():
     app.register_blueprint(market_bp, url_prefix="/api")
     app.register_blueprint(news_bp, url_prefix="/api")
     app.register_blueprint(volume_bp, url_prefix="/api")
+    app.register_blueprint(prices_bp, url_prefix="/api")
+    app.register_blueprint(health_bp, url_prefix="/api")
+
+    # gzip / brotli for large JSON bodies (see routes/encoding.py)
+    app.after_request(compress_response)
+    # ETag / Cache-Control / 304s (see routes/caching.py).  after_request
+    # hooks run in reverse order: this one sees the uncompressed body
+    app.after_request(conditional_response)
 
     _startup_checks()
 
@@ -94,9 +106,8 @@ def _startup_checks():
     redis_url = os.getenv("REDIS_URL")
     if redis_url:
         try:
-            import redis as redis_lib
-            r = redis_lib.from_url(redis_url, socket_connect_timeout=5)
-            r.ping()
+            from db import get_redis
+            get_redis().ping()
             logger.info("Startup: Redis reachable")
         except Exception as e:
             logger.warning(f"Startup: Redis unreachable ({e}) — cache will be unavailable")
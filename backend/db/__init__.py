@@ -0,0 +1,15 @@
+# Shared Postgres and Redis access, the in-process caches and single-flight
+# cache fills for the backend services (see pool.py, redis_client.py,
+# lru.py, invalidation.py and singleflight.py)
+from .invalidation import CoherentCache
+from .lru import LRUCache
+from .pool import PoolTimeout, Statement, get_pool
+from .redis_client import RedisUnavailable, get_redis, mget_json, setex_json_many
+from .singleflight import SingleFlight
+
+__all__ = [
+    "CoherentCache", "LRUCache",
+    "PoolTimeout", "Statement", "get_pool",
+    "RedisUnavailable", "get_redis", "mget_json", "setex_json_many",
+    "SingleFlight",
+]
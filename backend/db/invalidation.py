@@ -0,0 +1,181 @@
+"""
+Redis-invalidated in-process cache
+===================================
+CoherentCache is an LRUCache in front of Redis keys that every writer of
+those keys announces on a pub/sub channel, so a value cached in a
+worker is dropped as soon as Redis changes and freshness is the same as
+reading Redis every time:
+
+  - writers (rating/writers/redis_writer.py, collectors/market,
+    collectors/news and the backend's own write-throughs) PUBLISH the
+    key they just wrote to CACHE_INVALIDATE_CHANNEL, in the same
+    pipeline as the SETEX.  A message ending in "*" (a bulk reseed)
+    drops every key under that prefix
+  - each worker process runs one listener thread, subscribed to the
+    channel, that pops the named keys from the registered caches
+  - while the listener is not subscribed (starting up, or Redis down)
+    the caches are bypassed, and on every (re)subscribe they are
+    cleared: messages published meanwhile were missed
+  - a value read from Redis is only cached if no invalidation arrived
+    between the read and the set (a per-cache generation counter),
+    so a read racing a write cannot cache the old value
+  - CACHE_L1_TTL_S bounds an entry's life regardless, e.g. after its
+    Redis key expires
+
+    cache = CoherentCache("rating", prefix="crypto:rating:")
+    value = cache.get(coin_id)            # None on a miss
+    gen = cache.generation
+    value = read_redis(coin_id)
+    cache.set(coin_id, value, gen)
+
+Values are shared between threads: callers copy before mutating.
+
+Environment:
+    CACHE_INVALIDATE_CHANNEL   pub/sub channel (default "cache:invalidate")
+    CACHE_L1_MAX               entries per cache (default 2048; 0 disables)
+    CACHE_L1_TTL_S             safety-net TTL (default 300)
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Hashable, Optional
+
+from .lru import LRUCache
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = os.getenv("CACHE_INVALIDATE_CHANNEL", "cache:invalidate")
+L1_MAX = int(os.getenv("CACHE_L1_MAX", "2048"))
+L1_TTL_S = float(os.getenv("CACHE_L1_TTL_S", "300"))
+
+_caches: list["CoherentCache"] = []
+_subscribed = threading.Event()
+_listener_pid: Optional[int] = None
+_listener_lock = threading.Lock()
+
+# Stats
+_messages = 0
+_subscribes = 0
+
+
+class CoherentCache:
+    """LRUCache of Redis values under *prefix*, invalidated over pub/sub (see module docstring)."""
+
+    def __init__(self, name: str, prefix: str, max_entries: int = L1_MAX, ttl_s: float = L1_TTL_S):
+        self.prefix = prefix
+        self.enabled = max_entries > 0
+        self.generation = 0
+        self.invalidations = 0
+        self.bypassed = 0
+        self._lru = LRUCache(name, max_entries, ttl_s)
+        # Orders set() against invalidate() (the listener thread)
+        self._lock = threading.Lock()
+        _caches.append(self)
+
+    def get(self, key: Hashable) -> Any:
+        if not self.enabled:
+            return None
+        if not listening():
+            self.bypassed += 1
+            return None
+        return self._lru.get(key)
+
+    def set(self, key: Hashable, value: Any, generation: int) -> None:
+        """Cache *value*, read from Redis when self.generation was *generation*."""
+        if not self.enabled or not _subscribed.is_set():
+            return
+        with self._lock:
+            if generation == self.generation:
+                self._lru.set(key, value)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop *key*, or everything if None."""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            if key is None:
+                self._lru.clear()
+            else:
+                self._lru.pop(key)
+
+    @property
+    def stats(self) -> dict:
+        return self._lru.stats | {
+            "enabled": self.enabled,
+            "listening": _subscribed.is_set(),
+            "invalidations": self.invalidations,
+            "bypassed": self.bypassed,
+        }
+
+
+def _dispatch(key: str) -> None:
+    global _messages
+    _messages += 1
+    for cache in _caches:
+        if key.endswith("*") and key[:-1].startswith(cache.prefix):
+            cache.invalidate()
+        elif key.startswith(cache.prefix):
+            cache.invalidate(key[len(cache.prefix):])
+
+
+def _listen() -> None:
+    """Listener thread: (re)subscribe with backoff; dispatch invalidations."""
+    global _subscribes
+    backoff = 1.0
+    while True:
+        pubsub = None
+        try:
+            get_redis().ping()  # honours the fail-fast window; raises if disabled
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=False)
+            pubsub.subscribe(CHANNEL)
+            while True:
+                message = pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                if message["type"] == "subscribe":
+                    for cache in _caches:
+                        cache.invalidate()
+                    _subscribes += 1
+                    _subscribed.set()
+                    backoff = 1.0
+                    logger.info(f"[invalidation] Subscribed to {CHANNEL}")
+                elif message["type"] == "message":
+                    _dispatch(message["data"])
+        except Exception as exc:
+            if _subscribed.is_set():
+                logger.warning(f"[invalidation] Listener lost ({exc}); in-process caches bypassed")
+            _subscribed.clear()
+        finally:
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 30.0)
+
+
+def listening() -> bool:
+    """True once this process's listener is subscribed (starts it on first call)."""
+    global _listener_pid
+    if _listener_pid != os.getpid():
+        with _listener_lock:
+            if _listener_pid != os.getpid():
+                # After a fork the parent's thread is gone and its state is stale
+                _subscribed.clear()
+                threading.Thread(target=_listen, name="cache-invalidation", daemon=True).start()
+                _listener_pid = os.getpid()
+    return _subscribed.is_set()
+
+
+def stats() -> dict:
+    return {
+        "channel": CHANNEL,
+        "listening": _subscribed.is_set(),
+        "messages": _messages,
+        "subscribes": _subscribes,
+        "caches": [cache.stats for cache in _caches],
+    }
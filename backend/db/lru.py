@@ -0,0 +1,83 @@
+"""
+In-process LRU cache
+=====================
+Bounded, thread-safe, with a per-entry TTL: the tier in front of Redis and
+Postgres for values that many request threads ask for over and over.
+
+    cache = LRUCache("candles", max_entries=512, ttl_s=300)
+    value = cache.get(key)        # None on a miss or an expired entry
+    cache.set(key, value)
+
+Values are shared between threads, so callers must not mutate what they
+get back.  Each gunicorn worker has its own cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """Least-recently-used eviction above *max_entries*; entries expire after *ttl_s*."""
+
+    def __init__(self, name: str, max_entries: int, ttl_s: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        # key -> (expires_at, value), least recently used first
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl_s: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl_s if ttl_s is None else ttl_s)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
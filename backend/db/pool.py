@@ -0,0 +1,366 @@
+"""
+Shared Postgres pool
+=====================
+One thread-safe pool per process, shared by every service's SQL source
+(candles, market, news, rating).  Before it, each source kept one
+module-global connection, so gunicorn's 4 request threads serialized on
+it, and every call paid a `SELECT 1` round trip to check it first.
+
+  - per-thread checkout: a request thread takes a connection for the
+    duration of a `with connection()` block and returns it afterwards.
+    Nested blocks on the same thread reuse it, so a thread never holds two
+  - bounded: at most DB_POOL_MAX connections.  When all are checked out a
+    thread waits up to DB_POOL_TIMEOUT_S, then gets PoolTimeout
+  - check-on-error, not check-on-borrow: a connection is handed out with
+    no probe.  If a query fails with a connection-level error, that
+    connection and every idle one are discarded (they usually died
+    together: server restart, failover, idle cut-off) and the read helpers
+    retry once on a fresh connection
+  - connections run in autocommit with statement_timeout =
+    DB_STATEMENT_TIMEOUT_MS, so a returned connection is never idle in a
+    transaction and a runaway query cannot pin it
+  - Statement objects are PREPAREd once per connection and then EXECUTEd,
+    skipping the parse/plan for the hot per-coin queries.  Set
+    DB_PREPARED_STATEMENTS=false behind a transaction-mode pgbouncer,
+    which cannot keep session-level prepared statements
+
+Pool.stats reports size, use and saturation (checkouts that had to wait,
+wait times, timeouts); routes/health.py serves it at /api/health/db.
+
+Environment:
+    DATABASE_URL              primary DSN
+    DATABASE_URL_IPV4         fallback DSN if the primary is unreachable
+    DB_POOL_MAX               connections per process (default 4 = gunicorn threads)
+    DB_POOL_TIMEOUT_S         max wait for a free connection (default 5)
+    DB_STATEMENT_TIMEOUT_MS   per-statement limit (default 5000)
+    DB_PREPARED_STATEMENTS    "true" (default) / "false"
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+
+logger = logging.getLogger(__name__)
+
+POOL_MAX = int(os.getenv("DB_POOL_MAX", "4"))
+POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "5"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() in ("1", "true", "yes")
+
+# Errors that may mean the connection itself is gone (see _broken)
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers which Statements it has PREPAREd."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: set[str] = set()
+
+
+class Statement:
+    """
+    A query run as a server-side prepared statement.
+
+    *sql* uses %s placeholders like any psycopg2 query; *name* must be a
+    unique SQL identifier.  Falls back to a plain execute when prepared
+    statements are disabled.
+    """
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        n = sql.count("%s")
+        counter = iter(range(1, n + 1))
+        self.prepare_sql = f"PREPARE {name} AS " + re.sub(r"%s", lambda _: f"${next(counter)}", sql)
+        self.execute_sql = f"EXECUTE {name}" + (f" ({', '.join(['%s'] * n)})" if n else "")
+
+    def __repr__(self) -> str:
+        return f"Statement({self.name!r})"
+
+
+def execute(cur, query, params=None) -> None:
+    """cur.execute() that runs a Statement prepared (PREPAREs it on first use per connection)."""
+    if not isinstance(query, Statement):
+        cur.execute(query, params)
+        return
+    if not PREPARED_STATEMENTS:
+        cur.execute(query.sql, params)
+        return
+    conn = cur.connection
+    if query.name not in conn.prepared:
+        cur.execute(query.prepare_sql)
+        conn.prepared.add(query.name)
+    cur.execute(query.execute_sql, params)
+
+
+def _broken(conn) -> bool:
+    """
+    True if *conn* is unusable.  Statement timeouts and deadlocks are
+    OperationalErrors too, but leave the connection healthy.
+    """
+    if conn.closed:
+        return True
+    try:
+        return conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN
+    except Exception:
+        return True
+
+
+def _pg_connect() -> PooledConnection:
+    primary = os.getenv("DATABASE_URL")
+    fallback = os.getenv("DATABASE_URL_IPV4")
+    kwargs = dict(
+        connect_timeout=5,
+        # UTC sessions: DATE buckets (price_candles_1d) compare to timestamptz at UTC midnight
+        options=f"-c statement_timeout={STATEMENT_TIMEOUT_MS} -c timezone=UTC",
+        connection_factory=PooledConnection,
+    )
+    try:
+        conn = psycopg2.connect(primary, **kwargs)
+    except psycopg2.OperationalError as exc:
+        if not fallback or fallback == primary:
+            raise
+        logger.warning(f"[db] Primary unreachable ({exc}), trying IPv4 fallback")
+        conn = psycopg2.connect(fallback, **kwargs)
+    conn.autocommit = True
+    return conn
+
+
+class Pool:
+    """Bounded LIFO pool of Postgres connections with per-thread checkout."""
+
+    def __init__(self, max_size: int = POOL_MAX, timeout_s: float = POOL_TIMEOUT_S,
+                 connect: Callable[[], PooledConnection] = _pg_connect):
+        self.max_size = max_size
+        self.timeout_s = timeout_s
+        self._connect = connect
+        self._cond = threading.Condition()
+        # Most recently returned last: the warmest connection is reused first
+        self._idle: list = []
+        self._open = 0
+        self._waiting = 0
+        self._local = threading.local()
+
+        # Stats
+        self.checkouts = 0
+        self.waited = 0
+        self.wait_s_total = 0.0
+        self.wait_s_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.discarded = 0
+
+    # ------------------------------------------------------------------
+    # Checkout
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        """Check out a connection for this thread (re-entrant)."""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        self._local.broken = False
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        except CONNECTION_ERRORS:
+            self._local.conn = None
+            if _broken(conn):
+                self._local.broken = True
+                self._discard(conn, all_idle=True)
+            else:
+                self._release(conn)
+            raise
+        except BaseException:
+            self._local.conn = None
+            self._release(conn)
+            raise
+        else:
+            self._local.conn = None
+            self._release(conn)
+
+    def _acquire(self) -> PooledConnection:
+        with self._cond:
+            self.checkouts += 1
+            started = None
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    conn = None
+                    break
+                now = time.monotonic()
+                if started is None:
+                    started = now
+                    self.waited += 1
+                remaining = started + self.timeout_s - now
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"no free connection within {self.timeout_s}s "
+                                      f"({self.max_size} in use)")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            if started is not None:
+                waited = time.monotonic() - started
+                self.wait_s_total += waited
+                self.wait_s_max = max(self.wait_s_max, waited)
+
+        if conn is not None:
+            return conn
+        try:
+            conn = self._connect()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.connects += 1
+        return conn
+
+    def _release(self, conn) -> None:
+        if _broken(conn):
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn, all_idle: bool = False) -> None:
+        """Close *conn* (and, after a connection error, every idle one) and free their slots."""
+        with self._cond:
+            dropped = [conn]
+            if all_idle:
+                dropped += self._idle
+                self._idle = []
+            self._open -= len(dropped)
+            self.discarded += len(dropped)
+            self._cond.notify(len(dropped))
+        for c in dropped:
+            try:
+                c.close()
+            except Exception:
+                pass
+        if all_idle:
+            logger.warning(f"[db] Connection lost — discarded it and {len(dropped) - 1} idle connection(s)")
+
+    def close(self) -> None:
+        """Close every idle connection (checked-out ones close on return)."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for c in idle:
+            c.close()
+
+    # ------------------------------------------------------------------
+    # Query helpers (retry once on a connection error)
+    # ------------------------------------------------------------------
+
+    def _run(self, fn: Callable):
+        try:
+            with self.connection() as conn:
+                return fn(conn)
+        except CONNECTION_ERRORS as exc:
+            # Statement errors, and errors nested inside an outer checkout
+            # (which handles them), are not retried
+            if getattr(self._local, "conn", None) is not None or not self._local.broken:
+                raise
+            logger.warning(f"[db] Connection error ({exc}); retrying on a fresh connection")
+            with self.connection() as conn:
+                return fn(conn)
+
+    def fetchone(self, query, params=None) -> Optional[dict]:
+        """First row of *query* as a dict, or None."""
+        def run(conn):
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                execute(cur, query, params)
+                return cur.fetchone()
+        return self._run(run)
+
+    def fetchall(self, query, params=None) -> list[dict]:
+        """All rows of *query* as dicts."""
+        def run(conn):
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                execute(cur, query, params)
+                return cur.fetchall()
+        return self._run(run)
+
+    def fetchrows(self, query, params=None) -> list[tuple]:
+        """All rows of *query* as tuples (no per-row dict), for bulk reads."""
+        def run(conn):
+            with conn.cursor() as cur:
+                execute(cur, query, params)
+                return cur.fetchall()
+        return self._run(run)
+
+    def execute(self, query, params=None) -> int:
+        """Run a write (autocommitted); returns the row count.  Not retried."""
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                execute(cur, query, params)
+                return cur.rowcount
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+
+    @property
+    def stats(self) -> dict:
+        with self._cond:
+            in_use = self._open - len(self._idle)
+            return {
+                "max_size": self.max_size,
+                "open": self._open,
+                "in_use": in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "saturation": round(in_use / self.max_size, 3) if self.max_size else 0.0,
+                "checkouts": self.checkouts,
+                "waited": self.waited,
+                "wait_ms_avg": round(1000 * self.wait_s_total / self.waited, 2) if self.waited else 0.0,
+                "wait_ms_max": round(1000 * self.wait_s_max, 2),
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "discarded": self.discarded,
+                "prepared_statements": PREPARED_STATEMENTS,
+                "statement_timeout_ms": STATEMENT_TIMEOUT_MS,
+            }
+
+
+_pool: Optional[Pool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Pool:
+    """The process-wide pool (created on first use, and again after a fork)."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = Pool()
+                _pool_pid = os.getpid()
+    return _pool
@@ -0,0 +1,193 @@
+"""
+Shared Redis client
+====================
+One process-wide client for every backend service (market, news, rating,
+volume).  Before it, the market and news sources and the rating
+write-through built a new client — a new TCP connection and handshake
+(TLS on Upstash) — for every get and set.
+
+  - one BlockingConnectionPool per process (REDIS_POOL_MAX connections);
+    a thread that finds them all busy waits up to REDIS_POOL_TIMEOUT_S
+    instead of opening another
+  - per-command timeout (REDIS_COMMAND_TIMEOUT_MS) on top of the 2 s
+    connect timeout, so a stalled Redis cannot hold a request thread
+  - health-aware reconnection: a connection idle for longer than
+    REDIS_HEALTH_CHECK_S is PINGed before reuse, and a command that fails
+    on a dead connection is retried once on a fresh one.  After a
+    connection error, commands fail fast for REDIS_DOWN_S instead of each
+    waiting out the connect timeout — callers treat that like a miss
+  - mget_json / setex_json_many batch multi-key reads and writes into one
+    round trip (MGET, and a non-transactional pipeline for SETEX, plus
+    the cache-invalidation PUBLISH for each key if asked)
+
+get_redis().pipeline() is health-aware too.  REDIS_URL set but empty
+disables Redis (every command raises RedisUnavailable).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Iterable, Optional
+
+import redis
+from redis.backoff import ExponentialBackoff
+from redis.client import Pipeline
+from redis.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+POOL_MAX = int(os.getenv("REDIS_POOL_MAX", "16"))
+POOL_TIMEOUT_S = float(os.getenv("REDIS_POOL_TIMEOUT_S", "2"))
+COMMAND_TIMEOUT_MS = int(os.getenv("REDIS_COMMAND_TIMEOUT_MS", "1000"))
+HEALTH_CHECK_S = int(os.getenv("REDIS_HEALTH_CHECK_S", "30"))
+DOWN_S = float(os.getenv("REDIS_DOWN_S", "5"))
+
+
+class RedisUnavailable(redis.ConnectionError):
+    """Redis is disabled, or marked down after a recent connection error."""
+
+
+class _Health:
+    """Connection-error tracking behind the fail-fast window."""
+
+    def __init__(self):
+        self.down_until = 0.0
+        self.commands = 0
+        self.errors = 0
+        self.failed_fast = 0
+
+    def check(self) -> None:
+        if self.down_until and time.monotonic() < self.down_until:
+            self.failed_fast += 1
+            raise RedisUnavailable("Redis disabled, or down after a recent connection error")
+
+    def failed(self, exc: Exception) -> None:
+        self.errors += 1
+        if isinstance(exc, redis.ConnectionError) and not isinstance(exc, RedisUnavailable):
+            if not self.down_until:
+                logger.warning(f"[redis] Connection error ({exc}) — failing fast for {DOWN_S:.0f}s")
+            self.down_until = time.monotonic() + DOWN_S
+
+    def ok(self) -> None:
+        self.commands += 1
+        if self.down_until:
+            logger.info("[redis] Reachable again")
+            self.down_until = 0.0
+
+
+class HealthAwarePipeline(Pipeline):
+    """Pipeline whose execute() shares the client's fail-fast state."""
+
+    def execute(self, raise_on_error: bool = True):
+        self._health.check()
+        try:
+            result = super().execute(raise_on_error)
+        except (redis.ConnectionError, redis.TimeoutError) as exc:
+            self._health.failed(exc)
+            raise
+        self._health.ok()
+        return result
+
+
+class SharedRedis(redis.Redis):
+    """redis.Redis that fails fast while Redis is marked down."""
+
+    def __init__(self, *args, health: _Health, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health = health
+
+    def execute_command(self, *args, **options):
+        self.health.check()
+        try:
+            result = super().execute_command(*args, **options)
+        except (redis.ConnectionError, redis.TimeoutError) as exc:
+            self.health.failed(exc)
+            raise
+        self.health.ok()
+        return result
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> HealthAwarePipeline:
+        pipe = HealthAwarePipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+        pipe._health = self.health
+        return pipe
+
+    @property
+    def stats(self) -> dict:
+        pool = self.connection_pool
+        return {
+            "max_connections": pool.max_connections,
+            # Connections opened and still held by the pool
+            "connections": len(getattr(pool, "_connections", ())),
+            "commands": self.health.commands,
+            "errors": self.health.errors,
+            "failed_fast": self.health.failed_fast,
+            "down": bool(self.health.down_until) and time.monotonic() < self.health.down_until,
+        }
+
+
+_client: Optional[SharedRedis] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def _create() -> SharedRedis:
+    url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    health = _Health()
+    if not url:
+        health.down_until = float("inf")        # disabled: every command fails fast
+        url = "redis://localhost:6379/0"
+    pool = redis.BlockingConnectionPool.from_url(
+        url,
+        max_connections=POOL_MAX,
+        timeout=POOL_TIMEOUT_S,
+        decode_responses=True,
+        socket_connect_timeout=2,
+        socket_timeout=COMMAND_TIMEOUT_MS / 1000,
+        health_check_interval=HEALTH_CHECK_S,
+        retry=Retry(ExponentialBackoff(cap=0.2, base=0.01), 1),
+        retry_on_error=[redis.ConnectionError],
+    )
+    return SharedRedis(connection_pool=pool, health=health)
+
+
+def get_redis() -> SharedRedis:
+    """The process-wide client (created on first use, and again after a fork)."""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = _create()
+                _client_pid = os.getpid()
+    return _client
+
+
+# ── Multi-key helpers (one round trip each) ────────────────────────────────
+
+def mget_json(keys: list[str]) -> list[Optional[Any]]:
+    """JSON values of *keys*, in order; None for missing keys or unparseable values."""
+    if not keys:
+        return []
+    out = []
+    for raw in get_redis().mget(keys):
+        try:
+            out.append(json.loads(raw) if raw is not None else None)
+        except json.JSONDecodeError:
+            out.append(None)
+    return out
+
+
+def setex_json_many(items: Iterable[tuple[str, Any]], ttl_s: int, default=None,
+                    publish: Optional[str] = None) -> None:
+    """
+    SETEX every (key, value) as JSON with *ttl_s*, pipelined (not atomic).
+    With *publish*, also PUBLISH each key to that channel (see invalidation.py).
+    """
+    pipe = get_redis().pipeline(transaction=False)
+    for key, value in items:
+        pipe.setex(key, ttl_s, json.dumps(value, default=default))
+        if publish:
+            pipe.publish(publish, key)
+    if len(pipe):
+        pipe.execute()
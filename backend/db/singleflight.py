@@ -0,0 +1,272 @@
+"""
+Single-flight cache fills
+==========================
+When a cached value is missing, every request that notices goes to the
+upstream (CoinGecko, Google News) at once: a cold key under load turns
+into a burst of identical fetches that burns rate limits and stacks
+latency.  SingleFlight lets one caller per key do the fetch:
+
+  - in-process: the first thread to miss a key runs the loader; threads
+    that miss the same key meanwhile wait for, and share, its result
+  - across workers: that thread first takes a short Redis lock
+    (SET NX PX).  A worker that finds the lock held runs no loader; it
+    polls the cache (the caller's *reread*) until the holder has written
+    the value, the lock is released, or SINGLEFLIGHT_WAIT_S passes.  With
+    Redis down, the lock is skipped (single-flight per process only)
+  - negative caching: a loader that fails (returns None or raises) marks
+    the key for SINGLEFLIGHT_NEGATIVE_TTL_S, in-process and in Redis, and
+    calls meanwhile return None without going upstream
+  - stale-while-revalidate: refresh() runs the same single-flight load on
+    a background thread (at most SINGLEFLIGHT_WORKERS per process) and
+    returns at once, so a caller holding a stale value can serve it
+
+    flight = SingleFlight("market")
+    data = flight.do(coin_id, lambda: fetch(coin_id), reread=lambda: cached(coin_id))
+    flight.refresh(coin_id, lambda: fetch(coin_id))    # fire and forget
+
+The loader is expected to write its result to the cache itself, before
+returning.  SingleFlight(name, distributed=False, negative_ttl_s=0) is
+the in-process part alone, for loaders that only read Redis.
+
+Environment:
+    SINGLEFLIGHT_LOCK_TTL_S       Redis lock lifetime (default 15; > the upstream timeouts)
+    SINGLEFLIGHT_WAIT_S           longest a caller waits for another's load (default 12)
+    SINGLEFLIGHT_NEGATIVE_TTL_S   how long a failed load is remembered (default 60)
+    SINGLEFLIGHT_WORKERS          background refresh threads per process (default 4)
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Optional
+
+from .lru import LRUCache
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+LOCK_TTL_S = float(os.getenv("SINGLEFLIGHT_LOCK_TTL_S", "15"))
+WAIT_S = float(os.getenv("SINGLEFLIGHT_WAIT_S", "12"))
+NEGATIVE_TTL_S = int(os.getenv("SINGLEFLIGHT_NEGATIVE_TTL_S", "60"))
+WORKERS = int(os.getenv("SINGLEFLIGHT_WORKERS", "4"))
+POLL_S = 0.05
+
+KEY_PREFIX = "sf:"
+
+# Delete the lock only if this caller still holds it (it may have expired
+# and been taken by another worker)
+_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def _background() -> ThreadPoolExecutor:
+    """The process-wide refresh pool (created on first use, and again after a fork)."""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="singleflight")
+                _executor_pid = os.getpid()
+    return _executor
+
+
+class _Call:
+    """A load in progress; waiters block on *done*."""
+
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class SingleFlight:
+    """One loader run per key at a time, per process and (via Redis) across workers."""
+
+    def __init__(self, name: str, lock_ttl_s: float = LOCK_TTL_S, wait_s: float = WAIT_S,
+                 negative_ttl_s: int = NEGATIVE_TTL_S, distributed: bool = True):
+        self.name = name
+        self.distributed = distributed
+        self.lock_ttl_s = lock_ttl_s
+        self.wait_s = wait_s
+        self.negative_ttl_s = negative_ttl_s
+        self._calls: dict[Hashable, _Call] = {}
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        self._negative = LRUCache(f"{name}:negative", max_entries=10_000, ttl_s=negative_ttl_s or 1)
+
+        # Stats
+        self.loads = 0
+        self.failures = 0
+        self.coalesced = 0
+        self.remote_waits = 0
+        self.negative_hits = 0
+        self.refreshes = 0
+
+    def _key(self, kind: str, key: Hashable) -> str:
+        return f"{KEY_PREFIX}{self.name}:{kind}:{key}"
+
+    # ------------------------------------------------------------------
+    # Negative cache
+    # ------------------------------------------------------------------
+
+    def is_negative(self, key: Hashable) -> bool:
+        """True if a load for *key* failed within the negative TTL (in any worker)."""
+        if not self.negative_ttl_s:
+            return False
+        if self._negative.get(key):
+            return True
+        try:
+            return bool(get_redis().exists(self._key("neg", key)))
+        except Exception:
+            return False
+
+    def _mark_negative(self, key: Hashable) -> None:
+        if not self.negative_ttl_s:
+            return
+        self._negative.set(key, True)
+        try:
+            get_redis().setex(self._key("neg", key), self.negative_ttl_s, "1")
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def do(self, key: Hashable, load: Callable[[], Any],
+           reread: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        load() for *key*, run once among concurrent callers; its result,
+        or None if it failed or *key* is negative-cached.  *reread* reads
+        the cache: the loading caller checks it again first (another may
+        have just filled it), and callers in other workers poll it.
+        """
+        return self._do(key, load, reread, wait_remote=True)
+
+    def _do(self, key: Hashable, load: Callable[[], Any], reread: Optional[Callable[[], Any]],
+            wait_remote: bool) -> Any:
+        if self.is_negative(key):
+            self.negative_hits += 1
+            return None
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait(self.wait_s)
+            return call.result
+
+        try:
+            call.result = self._lead(key, load, reread, wait_remote)
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def _lead(self, key: Hashable, load: Callable[[], Any], reread: Optional[Callable[[], Any]],
+              wait_remote: bool) -> Any:
+        lock_key = self._key("lock", key)
+        token = uuid.uuid4().hex
+        locked = None  # not distributed, or Redis down: single-flight per process only
+        if self.distributed:
+            try:
+                locked = bool(get_redis().set(lock_key, token, nx=True, px=int(self.lock_ttl_s * 1000)))
+            except Exception:
+                pass
+        if locked is False:
+            return self._wait_remote(lock_key, reread) if wait_remote else None
+
+        try:
+            # Filled by a load that finished between our miss and now?
+            value = reread() if reread is not None else None
+            if value is not None:
+                return value
+            self.loads += 1
+            try:
+                result = load()
+            except Exception as exc:
+                logger.warning(f"[singleflight] {self.name} load for {key} failed: {exc}")
+                result = None
+        finally:
+            if locked:
+                try:
+                    get_redis().eval(_RELEASE, 1, lock_key, token)
+                except Exception:
+                    pass  # expires on its own
+        if result is None:
+            self.failures += 1
+            self._mark_negative(key)
+        return result
+
+    def _wait_remote(self, lock_key: str, reread: Optional[Callable[[], Any]]) -> Any:
+        """Another worker holds the lock: wait for the value it writes."""
+        self.remote_waits += 1
+        if reread is None:
+            return None
+        deadline = time.monotonic() + self.wait_s
+        while time.monotonic() < deadline:
+            time.sleep(POLL_S)
+            value = reread()
+            if value is not None:
+                return value
+            try:
+                if not get_redis().exists(lock_key):
+                    # Released without a value: it failed (negative-cached) or
+                    # wrote nothing we can read
+                    return reread()
+            except Exception:
+                return reread()
+        return None
+
+    def refresh(self, key: Hashable, load: Callable[[], Any],
+                reread: Optional[Callable[[], Any]] = None) -> None:
+        """
+        do(key, load, reread) on a background thread, unless a load for
+        *key* is already under way here or in another worker.
+        """
+        if self._negative.get(key):
+            return
+        with self._lock:
+            if key in self._calls or key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self.refreshes += 1
+
+        def run():
+            try:
+                self._do(key, load, reread, wait_remote=False)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        _background().submit(run)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "in_flight": len(self._calls),
+            "loads": self.loads,
+            "failures": self.failures,
+            "coalesced": self.coalesced,
+            "remote_waits": self.remote_waits,
+            "negative_hits": self.negative_hits,
+            "refreshes": self.refreshes,
+        }
@@ -0,0 +1,49 @@
+"""
+Batch (multi-coin) requests
+============================
+GET /api/rating?ids=bitcoin,ethereum (and /market, /news, /volume) serve
+many coins in one request — a list page makes one call instead of one per
+coin, and the service resolves them with one Redis round trip and at most
+one SQL query.
+
+ids are comma-separated, case-insensitive and deduplicated; more than
+BATCH_MAX_IDS of them is a 400.  Results are partial: coins with no data
+are listed under "missing" instead of failing the request.
+
+Response shape (200):
+{
+    "count":   2,
+    "results": { "bitcoin": { ... }, "ethereum": { ... } },   // request order
+    "missing": ["not-a-coin"]
+}
+
+Environment:
+    BATCH_MAX_IDS   most coins per request (default 100)
+"""
+
+import os
+from typing import Callable, Optional
+
+from routes.encoding import json_response
+
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "100"))
+
+
+def parse_ids(raw: Optional[str]) -> tuple[list[str], Optional[str]]:
+    """(coin ids, None), or ([], error message) if *raw* is empty or too long."""
+    ids = list(dict.fromkeys(c.strip().lower() for c in (raw or "").split(",") if c.strip()))
+    if not ids:
+        return [], "ids is required: a comma-separated list of coin ids"
+    if len(ids) > BATCH_MAX_IDS:
+        return [], f"Too many ids ({len(ids)}); at most {BATCH_MAX_IDS} per request"
+    return ids, None
+
+
+def batch_response(ids: list[str], found: dict, shape: Optional[Callable] = None):
+    """The batch response for *ids* given the service's {coin_id: data} (see module docstring)."""
+    results = {c: shape(c, found[c]) if shape else found[c] for c in ids if c in found}
+    return json_response({
+        "count":   len(results),
+        "results": results,
+        "missing": [c for c in ids if c not in found],
+    })
@@ -0,0 +1,111 @@
+"""
+HTTP caching
+=============
+Validators and Cache-Control on every /api response, so browsers and CDNs
+reuse what they have while the data can't have changed, and revalidate
+(a bodiless 304) instead of refetching it afterwards.
+
+conditional_response() is an after_request hook (registered in app.py,
+after compress_response so that it runs first, on the uncompressed body):
+
+  - ETag: the route's own if it set one (/prices: the ingestor's publish
+    sequence), otherwise a hash of the body.  Weak (W/"..."): gzip and
+    br change the bytes, not the content
+  - Last-Modified: set by routes that know when their data was produced
+    (market: last_fetched_at, rating: last_computed_at)
+  - If-None-Match / If-Modified-Since that still match → 304, with no
+    body and nothing for compress_response to do
+  - Cache-Control: the view's @cache_policy; "no-cache" (always
+    revalidate) for views without one; "no-store" for errors
+
+    @rating_bp.route("/rating/<coin_id>")
+    @cache_policy(max_age=3600, swr=86_400)
+    def rating_route(coin_id): ...
+
+A policy may also be a function of the request returning a CachePolicy
+(candles: by resolution and range).
+
+Environment:
+    HTTP_CACHE_MAX_AGE_SCALE   multiplies every max-age and
+                               stale-while-revalidate (default 1; 0 turns
+                               them all into "no-cache")
+"""
+
+import hashlib
+import os
+from datetime import datetime
+from typing import Callable, NamedTuple, Optional, Union
+
+from flask import Response, current_app, request
+
+MAX_AGE_SCALE = float(os.getenv("HTTP_CACHE_MAX_AGE_SCALE", "1"))
+
+NO_CACHE = "no-cache"
+NO_STORE = "no-store"
+
+
+class CachePolicy(NamedTuple):
+    max_age: int
+    swr: int = 0  # stale-while-revalidate
+
+    @property
+    def header(self) -> str:
+        max_age, swr = int(self.max_age * MAX_AGE_SCALE), int(self.swr * MAX_AGE_SCALE)
+        if max_age <= 0 and swr <= 0:
+            return NO_CACHE
+        value = f"public, max-age={max(max_age, 0)}"
+        return f"{value}, stale-while-revalidate={swr}" if swr > 0 else value
+
+
+def cache_policy(policy: Union[CachePolicy, Callable[[], CachePolicy], None] = None,
+                 max_age: int = 0, swr: int = 0):
+    """View decorator: the Cache-Control of the view's successful responses."""
+    if policy is None:
+        policy = CachePolicy(max_age, swr)
+
+    def decorate(view):
+        view.cache_policy = policy
+        return view
+    return decorate
+
+
+def last_modified(response: Response, iso: Optional[str]) -> Response:
+    """Set Last-Modified from an ISO-8601 timestamp (last_fetched_at, ...), if it parses."""
+    if iso:
+        try:
+            response.last_modified = datetime.fromisoformat(iso)
+        except (TypeError, ValueError):
+            pass
+    return response
+
+
+def content_etag(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+def _cache_control(response: Response) -> str:
+    if response.status_code not in (200, 304):
+        return NO_STORE
+    view = current_app.view_functions.get(request.endpoint)
+    policy = getattr(view, "cache_policy", None)
+    if policy is None:
+        return NO_CACHE
+    if callable(policy):
+        policy = policy()
+    return policy.header
+
+
+def conditional_response(response: Response) -> Response:
+    """after_request hook: ETag, Cache-Control, and 304 for matching conditional GETs."""
+    if request.method not in ("GET", "HEAD") or response.direct_passthrough:
+        return response
+    if "Cache-Control" not in response.headers:
+        response.headers["Cache-Control"] = _cache_control(response)
+    if response.status_code != 200:
+        return response
+
+    if "ETag" not in response.headers:
+        response.set_etag(content_etag(response.get_data()), weak=True)
+    # A 304 must carry the Vary the full response would have
+    response.vary.add("Accept-Encoding")
+    return response.make_conditional(request)
@@ -1,18 +1,110 @@
 import logging
+import time
 from flask import Blueprint, jsonify, request
-from services.candles.main import get_candles, VALID_RESOLUTIONS
+from services.candles.main import (
+    get_candles, get_candle_range, to_columns, bucket_start, VALID_RESOLUTIONS, LIVE_RESOLUTIONS,
+)
+from routes.caching import CachePolicy, cache_policy
+from routes.encoding import json_response
 
 logger     = logging.getLogger(__name__)
 candles_bp = Blueprint('candles', __name__)
 
+# Query parameters that switch to a range request (see get_candle_range)
+RANGE_PARAMS = ('from', 'to', 'before', 'max_points')
+# format=rows (default): [{time, open, ...}, ...]
+# format=columnar:       {t: [...], o: [...], h: [...], l: [...], c: [...], v: [...]}
+FORMATS = ('rows', 'columnar')
+
+# Cache-Control (see routes/caching.py) by what the response can hold:
+CLOSED_RANGE  = CachePolicy(86_400, swr=86_400)  # final buckets only (rewritten by backfills at most)
+LIVE_CANDLE   = CachePolicy(10, swr=30)          # the forming 1h+ bucket moves with every ingestor flush
+BACKFILL_ONLY = CachePolicy(300, swr=300)        # latest 1m/5m: nothing writes them live, only backfill runs
+
+# How long after a bucket ends its row is final:
+#   1h      the CandleWriter writes an hour once the first tick of the next
+#           one is flushed (every BATCH_INTERVAL_MS, 10s)
+#   1d+     the candle-aggregator rolls 1h → 1d → 1w → 1month every
+#           RUN_INTERVAL_MINUTES (60), after that last hour is written;
+#           the rest covers the run itself
+#   1m/5m   only backfills write them: as final as any history once closed
+HOUR_SETTLE_S   = 60
+ROLLUP_SETTLE_S = HOUR_SETTLE_S + 3600 + 600
+SETTLE_S = {'1m': 0, '5m': 0, '1h': HOUR_SETTLE_S,
+            '1d': ROLLUP_SETTLE_S, '1w': ROLLUP_SETTLE_S, '1month': ROLLUP_SETTLE_S}
+
+
+def _cache_policy():
+    resolution = request.args.get('resolution', '1h')
+    if resolution not in VALID_RESOLUTIONS:
+        return CachePolicy(0)
+    # Buckets that started before this one are final
+    settled = bucket_start(resolution, time.time() - SETTLE_S[resolution])
+    to, before = request.args.get('to', type=int), request.args.get('before', type=int)
+    # The newest bucket time the range can hold (to is inclusive, before exclusive)
+    ends = [e for e in (to, before - 1 if before is not None else None) if e is not None]
+    if ends and min(ends) < settled:
+        return CLOSED_RANGE
+    return LIVE_CANDLE if resolution in LIVE_RESOLUTIONS else BACKFILL_ONLY
+
+
 @candles_bp.route('/candles/<coin_id>', methods=['GET'])
+@cache_policy(_cache_policy)
 def candles_route(coin_id):
     resolution = request.args.get('resolution', '1h')
-    limit      = int(request.args.get('limit', 200))
-    logger.info(f'GET /candles/{coin_id} res={resolution} limit={limit}')
+    limit      = request.args.get('limit', 200, type=int)  # capped at MAX_LIMIT by the service
+    fmt        = request.args.get('format', 'rows')
+    if fmt not in FORMATS:
+        return jsonify({'error': f'Invalid format. Use: {list(FORMATS)}'}), 400
+    if any(p in request.args for p in RANGE_PARAMS):
+        return _range(coin_id, resolution, limit, fmt)
+    logger.info(f'GET /candles/{coin_id} res={resolution} limit={limit} format={fmt}')
     candles = get_candles(coin_id, resolution, limit)
     if candles is None:
         return jsonify({'error': 'Invalid resolution. Use: ' + str(list(VALID_RESOLUTIONS.keys()))}), 400
     if not candles:
         return jsonify({'error': f'No candle data for {coin_id} at {resolution}'}), 404
-    return jsonify({'coin_id': coin_id, 'resolution': resolution, 'count': len(candles), 'candles': candles})
+    return json_response({
+        'coin_id':    coin_id,
+        'resolution': resolution,
+        'count':      len(candles),
+        'format':     fmt,
+        'candles':    to_columns(candles) if fmt == 'columnar' else candles,
+    })
+
+
+def _range(coin_id, resolution, limit, fmt):
+    """from / to / before (Unix seconds) and max_points: a keyset page or a downsampled range."""
+    params = {}
+    for name in RANGE_PARAMS:
+        raw = request.args.get(name)
+        if raw is None:
+            continue
+        try:
+            params[name] = int(raw)
+        except ValueError:
+            return jsonify({'error': f'{name} must be an integer (Unix seconds for from/to/before)'}), 400
+    if 'from' in params and 'to' in params and params['from'] > params['to']:
+        return jsonify({'error': 'from must not be after to'}), 400
+    if resolution not in VALID_RESOLUTIONS:
+        return jsonify({'error': 'Invalid resolution. Use: ' + str(list(VALID_RESOLUTIONS.keys()))}), 400
+
+    logger.info(f'GET /candles/{coin_id} res={resolution} limit={limit} {params}')
+    result = get_candle_range(
+        coin_id, resolution, limit,
+        start=params.get('from'), end=params.get('to'),
+        before=params.get('before'), max_points=params.get('max_points'),
+        columnar=fmt == 'columnar',
+    )
+    if result is None:
+        return jsonify({'error': 'Candle data temporarily unavailable', 'coin_id': coin_id}), 503
+    candles = result['candles']
+    return json_response({
+        'coin_id':        coin_id,
+        'resolution':     resolution,
+        'count':          len(candles['t']) if fmt == 'columnar' else len(candles),
+        'format':         fmt,
+        'bucket_seconds': result['bucket_seconds'],
+        'next_before':    result['next_before'],
+        'candles':        candles,
+    })
@@ -0,0 +1,32 @@
+from flask import Blueprint, jsonify
+from db import get_pool, get_redis
+from db.invalidation import stats as invalidation_stats
+from services.candles.main import cache_stats as candles_cache_stats
+from services.market.main import flight_stats as market_flight_stats
+from services.news.main import flight_stats as news_flight_stats
+from services.prices.main import cache_stats as prices_cache_stats
+
+health_bp = Blueprint("health", __name__)
+
+
+@health_bp.route("/health/db", methods=["GET"])
+def db_health():
+    """Postgres pool size and saturation for this worker process (see db/pool.py)."""
+    return jsonify(get_pool().stats)
+
+
+@health_bp.route("/health/redis", methods=["GET"])
+def redis_health():
+    """Shared Redis client pool and fail-fast state for this worker process (see db/redis_client.py)."""
+    return jsonify(get_redis().stats)
+
+
+@health_bp.route("/health/cache", methods=["GET"])
+def cache_health():
+    """In-process cache sizes and hit rates, and upstream single-flight counts, for this worker process."""
+    return jsonify({
+        "candles": candles_cache_stats(),
+        "prices": prices_cache_stats(),
+        "redis_l1": invalidation_stats(),
+        "singleflight": {"market": market_flight_stats(), "news": news_flight_stats()},
+    })
@@ -1,19 +1,41 @@
-from flask import Blueprint, jsonify
-from services.market.main import get_market
+from flask import Blueprint, jsonify, request
+from services.market.main import get_market, get_markets
+from routes.batch import batch_response, parse_ids
+from routes.caching import cache_policy, last_modified
 
 market_bp = Blueprint("market", __name__)
 
+# Market cap and supply are refetched every 24h (MARKET_TTL)
+MAX_AGE_S = 3600
+SWR_S     = 86_400
 
-@market_bp.route("/market/<coin_id>", methods=["GET"])
-def market(coin_id: str):
-    data = get_market(coin_id.lower())
-    if data is None:
-        return jsonify({"error": "Market data unavailable", "coin_id": coin_id}), 404
 
-    return jsonify({
+def _public(coin_id: str, data: dict) -> dict:
+    return {
         "coin_id":            data.get("coin_id", coin_id),
         "market_cap_usd":     data.get("market_cap_usd"),
         "circulating_supply": data.get("circulating_supply"),
         "last_fetched_at":    data.get("last_fetched_at"),
         "_source":            data.get("_source"),
-    })
+    }
+
+
+@market_bp.route("/market/<coin_id>", methods=["GET"])
+@cache_policy(max_age=MAX_AGE_S, swr=SWR_S)
+def market(coin_id: str):
+    data = get_market(coin_id.lower())
+    if data is None:
+        return jsonify({"error": "Market data unavailable", "coin_id": coin_id}), 404
+
+    return last_modified(jsonify(_public(coin_id, data)), data.get("last_fetched_at"))
+
+
+@market_bp.route("/market", methods=["GET"])
+@cache_policy(max_age=MAX_AGE_S, swr=SWR_S)
+def markets():
+    # Batch: cached data only — "missing" coins can be fetched one by one
+    ids, error = parse_ids(request.args.get("ids"))
+    if error:
+        return jsonify({"error": error}), 400
+
+    return batch_response(ids, get_markets(ids), _public)
@@ -1,10 +1,17 @@
-from flask import Blueprint, jsonify
-from services.news.main import get_news
+from flask import Blueprint, jsonify, request
+from services.news.main import get_news, get_news_many
+from routes.batch import batch_response, parse_ids
+from routes.caching import cache_policy
 
 news_bp = Blueprint("news", __name__)
 
+# Articles are refetched hourly (NEWS_STALE_S)
+MAX_AGE_S = 300
+SWR_S     = 3600
+
 
 @news_bp.route("/news/<coin_id>", methods=["GET"])
+@cache_policy(max_age=MAX_AGE_S, swr=SWR_S)
 def news(coin_id: str):
     articles = get_news(coin_id.lower())
     if not articles:
@@ -14,3 +21,17 @@ def news(coin_id: str):
         "coin_id":  coin_id,
         "articles": articles,
     })
+
+
+@news_bp.route("/news", methods=["GET"])
+@cache_policy(max_age=MAX_AGE_S, swr=SWR_S)
+def news_many():
+    # Batch: cached articles only — "missing" coins can be fetched one by one
+    ids, error = parse_ids(request.args.get("ids"))
+    if error:
+        return jsonify({"error": error}), 400
+
+    return batch_response(ids, get_news_many(ids), lambda coin_id, articles: {
+        "coin_id":  coin_id,
+        "articles": articles,
+    })
@@ -0,0 +1,39 @@
+from flask import Blueprint, Response, jsonify, request
+from services.prices.main import get_all_prices, get_prices
+from routes.batch import parse_ids
+from routes.caching import cache_policy
+
+prices_bp = Blueprint("prices", __name__)
+
+# The micro-cache's lifetime; the ingestor flushes every 10s
+MAX_AGE_S = 1
+SWR_S     = 10
+
+
+def _respond(prices):
+    if prices is None:
+        return jsonify({"error": "Live prices temporarily unavailable"}), 503
+
+    resp = Response(prices.body, mimetype="application/json")
+    # Changes with every ingestor flush; the count covers entries that
+    # expired since (a stopped ingestor bumps nothing).  routes/caching.py
+    # answers a matching If-None-Match with a 304
+    if prices.seq is not None:
+        resp.set_etag(f"{prices.seq}-{prices.count}", weak=True)
+    return resp
+
+
+@prices_bp.route("/prices", methods=["GET"])
+@cache_policy(max_age=MAX_AGE_S, swr=SWR_S)
+def prices():
+    ids, error = parse_ids(request.args.get("ids"))
+    if error:
+        return jsonify({"error": error}), 400
+
+    return _respond(get_prices(ids))
+
+
+@prices_bp.route("/prices/all", methods=["GET"])
+@cache_policy(max_age=MAX_AGE_S, swr=SWR_S)
+def all_prices():
+    return _respond(get_all_prices())
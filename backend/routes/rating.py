@@ -2,6 +2,7 @@
 Rating route
 =============
 GET /api/rating/<coin_id>
+GET /api/rating?ids=a,b,c   (batch, see routes/batch.py)
 
 Returns the pre-computed CCS score for a coin.
 Data is written by the rating/score-orchestrator and stored in Redis
@@ -26,14 +27,21 @@ Response shape (200):
 """
 
 import logging
-from flask import Blueprint, jsonify
-from services.rating.main import get_rating
+from flask import Blueprint, jsonify, request
+from services.rating.main import get_rating, get_ratings
+from routes.batch import batch_response, parse_ids
+from routes.caching import cache_policy, last_modified
 
 logger    = logging.getLogger(__name__)
 rating_bp = Blueprint("rating", __name__)
 
+# Scores are recomputed daily; an hour's delay after a run is fine
+MAX_AGE_S = 3600
+SWR_S     = 86_400
+
 
 @rating_bp.route("/rating/<coin_id>", methods=["GET"])
+@cache_policy(max_age=MAX_AGE_S, swr=SWR_S)
 def rating_route(coin_id: str):
     """
     GET /api/rating/<coin_id>
@@ -51,4 +59,20 @@ def rating_route(coin_id: str):
                 "and the score-orchestrator has completed at least one run."
             ),
         }), 404
-    return jsonify(data), 200
+    return last_modified(jsonify(data), data.get("last_computed_at")), 200
+
+
+@rating_bp.route("/rating", methods=["GET"])
+@cache_policy(max_age=MAX_AGE_S, swr=SWR_S)
+def ratings_route():
+    """
+    GET /api/rating?ids=bitcoin,ethereum
+
+    Rating snapshots for up to BATCH_MAX_IDS coins: one Redis MGET, one
+    SQL query for the misses.  Coins with no rating are listed in "missing".
+    """
+    ids, error = parse_ids(request.args.get("ids"))
+    if error:
+        return jsonify({"error": error}), 400
+    logger.info(f"GET /rating ids={len(ids)}")
+    return batch_response(ids, get_ratings(ids))
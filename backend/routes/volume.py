@@ -1,20 +1,42 @@
 from flask import Blueprint, jsonify, request
-from services.volume.main import get_volume
+from services.volume.main import get_volume, get_volumes
 from services.volume.sources.redis_source import WINDOWS
+from routes.batch import batch_response, parse_ids
+from routes.caching import cache_policy
+from routes.encoding import json_response
 
 volume_bp = Blueprint("volume", __name__)
 
+# Per-minute buckets: the current one fills as trades arrive
+MAX_AGE_S = 30
+SWR_S     = 60
 
-@volume_bp.route("/volume/<coin_id>", methods=["GET"])
-def volume(coin_id: str):
+
+def _params():
+    """(window, format, None) or (None, None, 400 response)."""
     window = request.args.get("window", "1h").lower()
+    # format=columnar adds the per-minute buy/sell series as parallel arrays
+    fmt = request.args.get("format", "summary")
 
     if window not in WINDOWS:
-        return jsonify({
+        return None, None, (jsonify({
             "error": f"Unsupported window '{window}'. Valid: {', '.join(WINDOWS)}"
-        }), 400
+        }), 400)
 
-    data = get_volume(coin_id.lower(), window)
+    if fmt not in ("summary", "columnar"):
+        return None, None, (jsonify({"error": "Invalid format. Use: ['summary', 'columnar']"}), 400)
+
+    return window, fmt, None
+
+
+@volume_bp.route("/volume/<coin_id>", methods=["GET"])
+@cache_policy(max_age=MAX_AGE_S, swr=SWR_S)
+def volume(coin_id: str):
+    window, fmt, error = _params()
+    if error:
+        return error
+
+    data = get_volume(coin_id.lower(), window, series=fmt == "columnar")
 
     if data is None:
         return jsonify({
@@ -22,4 +44,22 @@ def volume(coin_id: str):
             "coin_id": coin_id,
         }), 503
 
-    return jsonify(data)
+    return json_response(data)
+
+
+@volume_bp.route("/volume", methods=["GET"])
+@cache_policy(max_age=MAX_AGE_S, swr=SWR_S)
+def volumes():
+    window, fmt, error = _params()
+    if error:
+        return error
+    ids, message = parse_ids(request.args.get("ids"))
+    if message:
+        return jsonify({"error": message}), 400
+
+    found = get_volumes(ids, window, series=fmt == "columnar")
+
+    if found is None:
+        return jsonify({"error": "Volume data temporarily unavailable"}), 503
+
+    return batch_response(ids, found)
@@ -1,9 +1,42 @@
 """
 Candles service — main
 =======================
-Thin orchestration layer between the route and the SQL source.
-Candle data is read-only from Postgres; there is no Redis cache for candles
-(they are time-series and too large to cache per-coin).
+Orchestration between the route, a tiered cache and the SQL source.
+
+Closed candles never change, and chart traffic asks for the same few
+coins at the same few limits, so ranges are cached:
+
+  1. in-process LRU (CANDLES_L1_MAX entries, CANDLES_L1_TTL_S)
+  2. Redis (sources/redis_source.py, CANDLES_REDIS_TTL_S), shared by
+     every worker
+  3. Postgres (sources/sql.py)
+
+A range is keyed by (coin, resolution, limit tier, anchor, version):
+
+  - limit tier: the limit rounded up to one of _LIMIT_TIERS, so nearby
+    limits share one range; the response is sliced back to *limit*
+  - anchor: the start of the bucket forming now, so every range rolls over
+    at the resolution boundary
+  - version: candles:ver:<resolution>, INCRed by the writers after they
+    commit buckets — the CandleWriter when hours close, the
+    candle-aggregator after each roll-up.  Backfills that rewrite history
+    are picked up at the next anchor or TTL
+
+The still-forming bucket is stitched in at read time from the
+live-price-ingestor's hourly window (rt:candle:1h:<coin>), fetched with
+the version in one MGET — the only Redis call on an L1 hit.  For 1h it is
+the forming candle itself; for 1d/1w/1month it is merged into the
+aggregator's in-progress row (or opens it).  The forming bucket's volume
+covers closed hours only.  1m and 5m have no live window.
+
+If Redis is unreachable the L1 still serves, with its TTL as the bound on
+staleness.
+
+get_candle_range() serves history beyond the latest page: keyset ranges
+on (coin_id, bucket) via from / to / before, optionally downsampled in
+SQL to max_points OHLC-preserving candles.  It is not cached; each page is
+one index range scan.  A database error returns None rather than an empty
+page, which the route would serve (and let clients cache) as history.
 
 Usage:
     from services.candles.main import get_candles, VALID_RESOLUTIONS
@@ -15,12 +48,101 @@ Usage:
 """
 
 import logging
+import math
+import os
+import time
+from datetime import datetime, timezone
 from typing import Optional
 
-from .sources.sql import get, VALID_RESOLUTIONS
+from db import LRUCache
+
+from .sources import redis_source as redis_src
+from .sources import sql
+from .sources.sql import COLUMNS, FIELDS, VALID_RESOLUTIONS
 
 logger = logging.getLogger(__name__)
 
+MAX_LIMIT = int(os.getenv("CANDLES_MAX_LIMIT", "1000"))
+# Requested limits round up to one of these, so nearby limits share a cached range
+_LIMIT_TIERS = tuple(t for t in (100, 200, 500) if t < MAX_LIMIT) + (MAX_LIMIT,)
+# Resolutions whose forming bucket is stitched from the live 1h window
+LIVE_RESOLUTIONS = ("1h", "1d", "1w", "1month")
+
+_l1 = LRUCache(
+    "candles",
+    max_entries=int(os.getenv("CANDLES_L1_MAX", "512")),
+    ttl_s=float(os.getenv("CANDLES_L1_TTL_S", "300")),
+)
+
+_STEP_S = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86_400}
+_WEEK_S = 7 * 86_400
+_WEEK_OFFSET_S = 4 * 86_400  # 1970-01-01 was a Thursday; weeks start on Monday
+
+
+def bucket_start(resolution: str, ts: float) -> int:
+    """Unix start of the *resolution* bucket containing *ts* (UTC, as date_trunc)."""
+    step = _STEP_S.get(resolution)
+    if step:
+        return int(ts // step) * step
+    if resolution == "1w":
+        return int((ts - _WEEK_OFFSET_S) // _WEEK_S) * _WEEK_S + _WEEK_OFFSET_S
+    d = datetime.fromtimestamp(ts, tz=timezone.utc)
+    return int(datetime(d.year, d.month, 1, tzinfo=timezone.utc).timestamp())
+
+
+def _forming(last: Optional[dict], resolution: str, live: Optional[dict],
+             now: float) -> Optional[tuple[dict, bool]]:
+    """
+    The forming candle from the live 1h window, and whether it replaces
+    *last* (the aggregator's in-progress row) rather than following it.
+    """
+    if live is None or resolution not in LIVE_RESOLUTIONS:
+        return None
+    if live.get("bucket") != bucket_start("1h", now):
+        return None  # the window's hour has closed; the writer persists it
+    start = bucket_start(resolution, now)
+    if last is not None and last["time"] > start:
+        return None
+    if last is not None and last["time"] == start:
+        return {
+            **last,
+            "high":  max(last["high"], live["high"]),
+            "low":   min(last["low"], live["low"]),
+            "close": live["close"],
+        }, True
+    return {
+        "time":   start,
+        "open":   live["open"],
+        "high":   live["high"],
+        "low":    live["low"],
+        "close":  live["close"],
+        "volume": 0.0,
+    }, False
+
+
+def _stitch(candles: list[dict], resolution: str, live: Optional[dict], now: float) -> list[dict]:
+    """*candles* with the forming bucket updated from (or opened by) the live 1h window."""
+    forming = _forming(candles[-1] if candles else None, resolution, live, now)
+    if forming is None:
+        return candles
+    candle, replace = forming
+    return (candles[:-1] if replace else candles) + [candle]
+
+
+def _stitch_columns(cols: dict, resolution: str, live: Optional[dict], now: float) -> dict:
+    """_stitch() for the columnar shape."""
+    last = {f: cols[c][-1] for f, c in zip(FIELDS, COLUMNS)} if cols["t"] else None
+    forming = _forming(last, resolution, live, now)
+    if forming is None:
+        return cols
+    candle, replace = forming
+    return {c: (cols[c][:-1] if replace else cols[c]) + [candle[f]] for f, c in zip(FIELDS, COLUMNS)}
+
+
+def to_columns(candles: list[dict]) -> dict:
+    """Candle dicts → the columnar shape (parallel t/o/h/l/c/v arrays)."""
+    return {c: [candle[f] for candle in candles] for f, c in zip(FIELDS, COLUMNS)}
+
 
 def get_candles(coin_id: str, resolution: str, limit: int) -> Optional[list[dict]]:
     """
@@ -29,7 +151,7 @@ def get_candles(coin_id: str, resolution: str, limit: int) -> Optional[list[dict
     Args:
         coin_id:    CoinGecko canonical id (e.g. "bitcoin")
         resolution: one of VALID_RESOLUTIONS keys ("1m","5m","1h","1d","1w","1month")
-        limit:      max number of candles to return (capped at 1000)
+        limit:      max number of candles to return (capped at MAX_LIMIT)
 
     Returns:
         None  — resolution is not valid
@@ -37,8 +159,125 @@ def get_candles(coin_id: str, resolution: str, limit: int) -> Optional[list[dict
         list  — candles in chronological order (oldest first)
     """
     coin_id    = coin_id.lower().strip()
-    limit      = min(max(1, limit), 1000)
-    return get(coin_id, resolution, limit)
+    limit      = min(max(1, limit), MAX_LIMIT)
+    if resolution not in VALID_RESOLUTIONS:
+        return None
+
+    now = time.time()
+    tier = next(t for t in _LIMIT_TIERS if t >= limit)
+    version, live = redis_src.get_state(coin_id, resolution)
+    key = f"{coin_id}:{resolution}:{tier}:{bucket_start(resolution, now)}:{version}"
+
+    candles = _l1.get(key)
+    if candles is None:
+        candles = redis_src.get_range(key) if version is not None else None
+        if candles is None:
+            try:
+                candles = sql.fetch(coin_id, resolution, tier)
+            except Exception as exc:
+                logger.error(f"[candles] SQL error for {coin_id}/{resolution}: {exc}")
+                return []
+            if version is not None:
+                redis_src.set_range(key, candles)
+        _l1.set(key, candles)
+
+    return _stitch(candles, resolution, live, now)[-limit:]
+
+
+def get_candle_range(
+    coin_id: str,
+    resolution: str,
+    limit: int,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    before: Optional[int] = None,
+    max_points: Optional[int] = None,
+    columnar: bool = False,
+) -> Optional[dict]:
+    """
+    Candles for *coin_id* in a time range, for scrolling back and for
+    long-range charts.
+
+    Args:
+        start:      first bucket time to include (Unix seconds); default: open
+        end:        last bucket time to include; default: now
+        before:     keyset cursor — only buckets strictly older than this
+                    (pass the previous page's next_before)
+        limit:      max candles per page (capped at MAX_LIMIT); the latest
+                    *limit* of the range are returned
+        max_points: if set, merge the range into at most this many
+                    OHLC-preserving candles instead of paging.  Needs
+                    *start*, or covers the *limit* buckets before the end
+        columnar:   return candles as parallel arrays (see to_columns),
+                    built straight from the cursor rows
+
+    Returns:
+        None  — resolution is not valid, or the database query failed
+        {"candles": [...] or {t, o, h, l, c, v}, "bucket_seconds": int,
+         "next_before": int | None}
+        candles is empty if the range has none; next_before is set when
+        older candles may remain in the range.
+    """
+    coin_id = coin_id.lower().strip()
+    limit   = min(max(1, limit), MAX_LIMIT)
+    if resolution not in VALID_RESOLUTIONS:
+        return None
+
+    now  = time.time()
+    step = _approx_step_s(resolution)
+    hi = bucket_start(resolution, now) + step   # includes the forming bucket
+    if end is not None:
+        hi = min(hi, end + 1)
+    if before is not None:
+        hi = min(hi, before)
+    lo = start if start is not None else 0
+
+    if max_points is not None:
+        max_points = min(max(1, max_points), MAX_LIMIT)
+        if start is None:
+            lo = hi - limit * step
+        group = max(1, math.ceil((hi - lo) / step / max_points))
+        if group > 1:
+            width = group * step
+            # Runs are aligned to multiples of width, so the span can touch one extra
+            try:
+                candles = sql.fetch_downsampled(coin_id, resolution, lo, hi, width, max_points + 1, columnar)
+            except Exception as exc:
+                logger.error(f"[candles] SQL error for {coin_id}/{resolution} downsample: {exc}")
+                return None
+            return {"candles": _tail(candles, max_points), "bucket_seconds": width, "next_before": None}
+        limit = max_points
+
+    try:
+        candles = sql.fetch_range(coin_id, resolution, lo, hi, limit, columnar)
+    except Exception as exc:
+        logger.error(f"[candles] SQL error for {coin_id}/{resolution} range: {exc}")
+        return None
+    if end is None and before is None and max_points is None:
+        version, live = redis_src.get_state(coin_id, resolution)
+        stitch = _stitch_columns if columnar else _stitch
+        candles = _tail(stitch(candles, resolution, live, now), limit)
+    times = candles["t"] if columnar else [c["time"] for c in candles]
+    next_before = times[0] if len(times) >= limit and max_points is None else None
+    return {"candles": candles, "bucket_seconds": step, "next_before": next_before}
+
+
+def _tail(candles, n: int):
+    """The last *n* candles of either shape."""
+    if isinstance(candles, dict):
+        return {c: col[-n:] for c, col in candles.items()}
+    return candles[-n:]
+
+
+def _approx_step_s(resolution: str) -> int:
+    """Bucket width in seconds (30 days for 1month)."""
+    return _STEP_S.get(resolution) or {"1w": _WEEK_S, "1month": 30 * 86_400}[resolution]
+
+
+def cache_stats() -> dict:
+    """In-process cache stats for this worker (served at /api/health/cache)."""
+    return _l1.stats
 
 
-__all__ = ["get_candles", "VALID_RESOLUTIONS"]
+__all__ = ["get_candles", "get_candle_range", "to_columns", "bucket_start",
+           "VALID_RESOLUTIONS", "LIVE_RESOLUTIONS", "MAX_LIMIT", "cache_stats"]
@@ -0,0 +1,67 @@
+"""
+Candles service — Redis source
+================================
+The shared tier of the candles cache (see main.py), plus the two small
+keys every request reads in one MGET:
+
+  candles:ver:<resolution>          version counter, INCRed by the writers
+                                    after they commit buckets (the
+                                    live-price-ingestor's CandleWriter for
+                                    1h, the candle-aggregator for 1d/1w/1month)
+  rt:candle:1h:<coin_id>            the still-forming hourly window, written
+                                    by the live-price-ingestor on every flush:
+                                    {bucket, open, high, low, close, tick_count}
+  candles:range:<coin>:<res>:<limit>:<anchor>:<version>
+                                    a cached candle range (JSON list)
+
+Every function is non-fatal: on a Redis error it logs and returns None,
+and the caller falls back to Postgres.
+"""
+
+import json
+import logging
+import os
+from typing import Optional
+
+from db import get_redis
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "candles:ver:"
+LIVE_KEY = "rt:candle:1h:"
+RANGE_KEY = "candles:range:"
+RANGE_TTL = int(os.getenv("CANDLES_REDIS_TTL_S", "3600"))
+
+
+def get_state(coin_id: str, resolution: str) -> tuple[Optional[int], Optional[dict]]:
+    """(version of *resolution*, forming 1h window of *coin_id*); None for either if unknown."""
+    try:
+        version, live = get_redis().mget([f"{VERSION_KEY}{resolution}", f"{LIVE_KEY}{coin_id}"])
+    except Exception as exc:
+        logger.warning(f"[candles/redis] State read failed for {coin_id}/{resolution}: {exc}")
+        return None, None
+    try:
+        version = int(version) if version is not None else 0
+    except ValueError:
+        version = None
+    try:
+        live = json.loads(live) if live else None
+    except json.JSONDecodeError:
+        live = None
+    return version, live
+
+
+def get_range(key: str) -> Optional[list]:
+    try:
+        raw = get_redis().get(f"{RANGE_KEY}{key}")
+        return json.loads(raw) if raw else None
+    except Exception as exc:
+        logger.warning(f"[candles/redis] Read failed for {key}: {exc}")
+        return None
+
+
+def set_range(key: str, candles: list) -> None:
+    try:
+        get_redis().setex(f"{RANGE_KEY}{key}", RANGE_TTL, json.dumps(candles, separators=(",", ":")))
+    except Exception as exc:
+        logger.warning(f"[candles/redis] Write failed for {key}: {exc}")
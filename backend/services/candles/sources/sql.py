@@ -13,14 +13,21 @@ Returned list item shape:
     close:  float,
     volume: float,
 }
+
+or, with columnar=True, parallel arrays (see COLUMNS):
+{
+    t: [int, ...], o: [float, ...], h: [...], l: [...], c: [...], v: [...]
+}
+
+The queries cast in SQL (epoch seconds as bigint, prices as float8) and
+rows are read as tuples, so building either shape is one pass with no
+per-field Decimal or datetime conversion.
 """
 
 import logging
-import os
 from typing import Optional
 
-import psycopg2
-import psycopg2.extras
+from db import Statement, get_pool
 
 logger = logging.getLogger(__name__)
 
@@ -33,34 +40,113 @@ VALID_RESOLUTIONS = {
     "1month": "price_candles_1month",
 }
 
-_conn = None
+# Row order of every query, and the keys of the two output shapes
+FIELDS = ("time", "open", "high", "low", "close", "volume")
+COLUMNS = ("t", "o", "h", "l", "c", "v")
 
+_SELECT = """
+    SELECT extract(epoch FROM bucket)::bigint, open::float8, high::float8,
+           low::float8, close::float8, volume::float8
+"""
+
+# One prepared statement per resolution table (the /candles hot path)
+_QUERIES = {
+    resolution: Statement(
+        f"candles_{resolution}",
+        f"""
+        {_SELECT}
+        FROM {table}
+        WHERE coin_id = %s
+        ORDER BY bucket DESC
+        LIMIT %s
+        """,
+    )
+    for resolution, table in VALID_RESOLUTIONS.items()
+}
+
+# Keyset range: the latest *limit* rows with lo <= bucket < hi, walking
+# the (coin_id, bucket) index backwards from hi
+_RANGE_QUERIES = {
+    resolution: Statement(
+        f"candles_range_{resolution}",
+        f"""
+        {_SELECT}
+        FROM {table}
+        WHERE coin_id = %s
+          AND bucket >= to_timestamp(%s::float8)
+          AND bucket <  to_timestamp(%s::float8)
+        ORDER BY bucket DESC
+        LIMIT %s
+        """,
+    )
+    for resolution, table in VALID_RESOLUTIONS.items()
+}
+
+# OHLC-preserving downsample: rows in [lo, hi) grouped into runs of
+# width_s seconds (open of the first, max high, min low, close of the
+# last, summed volume), labelled with their first bucket.  Same roll-up
+# as the candle-aggregator.
+_DOWNSAMPLE_QUERIES = {
+    resolution: Statement(
+        f"candles_downsample_{resolution}",
+        f"""
+        SELECT extract(epoch FROM min(bucket))::bigint,
+               ((array_agg(open  ORDER BY bucket ASC))[1])::float8,
+               max(high)::float8,
+               min(low)::float8,
+               ((array_agg(close ORDER BY bucket DESC))[1])::float8,
+               sum(volume)::float8
+        FROM {table}
+        WHERE coin_id = %s
+          AND bucket >= to_timestamp(%s::float8)
+          AND bucket <  to_timestamp(%s::float8)
+        GROUP BY floor(extract(epoch FROM bucket)::float8 / %s::float8)
+        ORDER BY 1 DESC
+        LIMIT %s
+        """,
+    )
+    for resolution, table in VALID_RESOLUTIONS.items()
+}
+
+
+def _to_candles(rows: list) -> list[dict]:
+    """Rows newest first → candle dicts oldest first (what chart libraries expect)."""
+    return [dict(zip(FIELDS, row)) for row in reversed(rows)]
 
-def _pg_connect():
-    primary  = os.getenv("DATABASE_URL")
-    fallback = os.getenv("DATABASE_URL_IPV4")
-    try:
-        conn = psycopg2.connect(primary, connect_timeout=5)
-        logger.info("[CandlesDB] Connected (primary)")
-        return conn
-    except psycopg2.OperationalError as exc:
-        if fallback and fallback != primary:
-            logger.warning(f"[CandlesDB] Primary unreachable ({exc}), trying IPv4 fallback")
-            conn = psycopg2.connect(fallback, connect_timeout=5)
-            logger.info("[CandlesDB] Connected (IPv4 fallback)")
-            return conn
-        raise
-
-
-def _get_conn():
-    global _conn
-    try:
-        if _conn is None or _conn.closed:
-            raise psycopg2.OperationalError("no connection")
-        _conn.cursor().execute("SELECT 1")
-    except Exception:
-        _conn = _pg_connect()
-    return _conn
+
+def _to_columns(rows: list) -> dict:
+    """Rows newest first → parallel arrays oldest first."""
+    if not rows:
+        return {k: [] for k in COLUMNS}
+    return {k: list(col) for k, col in zip(COLUMNS, zip(*reversed(rows)))}
+
+
+def _shape(rows: list, columnar: bool):
+    return _to_columns(rows) if columnar else _to_candles(rows)
+
+
+def fetch(coin_id: str, resolution: str, limit: int) -> list[dict]:
+    """
+    The latest *limit* candles for *coin_id* at a valid *resolution*,
+    oldest first.  Raises on database errors (get() logs them instead).
+    """
+    return _to_candles(get_pool().fetchrows(_QUERIES[resolution], (coin_id, limit)))
+
+
+def fetch_range(coin_id: str, resolution: str, lo: float, hi: float, limit: int,
+                columnar: bool = False):
+    """The latest *limit* candles with lo <= time < hi, oldest first.  Raises on errors."""
+    return _shape(get_pool().fetchrows(_RANGE_QUERIES[resolution], (coin_id, lo, hi, limit)), columnar)
+
+
+def fetch_downsampled(coin_id: str, resolution: str, lo: float, hi: float,
+                      width_s: int, max_points: int, columnar: bool = False):
+    """
+    Candles with lo <= time < hi merged into *width_s*-second groups
+    (the latest *max_points* of them), oldest first.  Raises on errors.
+    """
+    return _shape(get_pool().fetchrows(
+        _DOWNSAMPLE_QUERIES[resolution], (coin_id, lo, hi, width_s, max_points)), columnar)
 
 
 def get(coin_id: str, resolution: str, limit: int) -> Optional[list[dict]]:
@@ -71,52 +157,11 @@ def get(coin_id: str, resolution: str, limit: int) -> Optional[list[dict]]:
     Returns an empty list if no rows exist yet.
     Returns the list in chronological order (oldest first).
     """
-    table = VALID_RESOLUTIONS.get(resolution)
-    if table is None:
+    if resolution not in _QUERIES:
         return None
 
     try:
-        conn = _get_conn()
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(
-                f"""
-                SELECT bucket, open, high, low, close, volume
-                FROM {table}
-                WHERE coin_id = %s
-                ORDER BY bucket DESC
-                LIMIT %s
-                """,
-                (coin_id, limit),
-            )
-            rows = cur.fetchall()
+        return fetch(coin_id, resolution, limit)
     except Exception as exc:
         logger.error(f"[CandlesDB] Error for {coin_id}/{resolution}: {exc}")
-        global _conn
-        try:
-            if _conn:
-                _conn.close()
-        except Exception:
-            pass
-        _conn = None
         return []
-
-    # Reverse so result is oldest → newest (what chart libraries expect)
-    candles = []
-    for row in reversed(rows):
-        bucket = row["bucket"]
-        ts = (
-            int(bucket.timestamp())
-            if hasattr(bucket, "timestamp")
-            else int(__import__("datetime").datetime.combine(
-                bucket, __import__("datetime").time()
-            ).timestamp())
-        )
-        candles.append({
-            "time":   ts,
-            "open":   float(row["open"]),
-            "high":   float(row["high"]),
-            "low":    float(row["low"]),
-            "close":  float(row["close"]),
-            "volume": float(row["volume"]),
-        })
-    return candles
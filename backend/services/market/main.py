@@ -7,38 +7,91 @@ Resolution order:
   3. CoinGecko live fetch → cache result in Redis + Postgres
 
 Returns a dict or None.
+
+The CoinGecko fetch is single-flight (db/singleflight.py): concurrent
+misses for a coin, in any worker, share one upstream call, and a failed
+fetch is not retried for SINGLEFLIGHT_NEGATIVE_TTL_S.  A Postgres row
+older than MARKET_STALE_S is served as-is while one background fetch
+refreshes it (stale-while-revalidate).
+
+get_markets() batches steps 1 and 2 for several coins (one MGET, one
+SQL query for the Redis misses, one pipelined write-back of the fresh
+rows; stale ones are refreshed as in get_market()).  It skips the
+CoinGecko step: coins in neither cache are left out, and a per-coin
+request fetches them.
 """
 
 import logging
+import os
 from datetime import datetime, timezone
 
+from db import SingleFlight
+
 from .sources import redis_source, sql, coingecko
 
 logger = logging.getLogger(__name__)
 
+# Postgres rows older than this are refreshed from CoinGecko in the background
+MARKET_STALE_S = int(os.getenv("MARKET_STALE_S", str(redis_source.MARKET_TTL)))
 
-def get_market(coin_id: str) -> dict | None:
-    # 1 — Redis
+_flight = SingleFlight("market")
+
+
+def _cache_entry(data: dict) -> dict:
+    """The fields cached in Redis for an SQL row."""
+    return {
+        "coin_id":            data["coin_id"],
+        "market_cap_usd":     data["market_cap_usd"],
+        "circulating_supply": data["circulating_supply"],
+        "last_fetched_at":    data["last_fetched_at"],
+    }
+
+
+def _from_redis(coin_id: str) -> dict | None:
     data = redis_source.get_from_redis(coin_id)
     if data:
         data["_source"] = "redis"
+        return data
+    return None
+
+
+def _is_stale(data: dict) -> bool:
+    fetched_at = data.get("last_fetched_at")
+    if not fetched_at:
+        return True
+    age = datetime.now(timezone.utc) - datetime.fromisoformat(fetched_at)
+    return age.total_seconds() > MARKET_STALE_S
+
+
+def _refresh(coin_id: str) -> None:
+    _flight.refresh(coin_id, lambda: _fetch_live(coin_id), reread=lambda: _from_redis(coin_id))
+
+
+def get_market(coin_id: str) -> dict | None:
+    # 1 — Redis
+    data = _from_redis(coin_id)
+    if data:
         logger.info("[market] %s served from Redis", coin_id)
         return data
 
     # 2 — Postgres
     data = sql.get(coin_id)
     if data:
+        if _is_stale(data):
+            logger.info("[market] %s served stale from SQL, refreshing", coin_id)
+            _refresh(coin_id)
+            return data
         logger.info("[market] %s served from SQL", coin_id)
         # Warm Redis so the next request is faster
-        redis_source.set_in_redis(coin_id, {
-            "coin_id":            data["coin_id"],
-            "market_cap_usd":     data["market_cap_usd"],
-            "circulating_supply": data["circulating_supply"],
-            "last_fetched_at":    data["last_fetched_at"],
-        })
+        redis_source.set_in_redis(coin_id, _cache_entry(data))
         return data
 
-    # 3 — CoinGecko live fetch
+    # 3 — CoinGecko live fetch (one per coin at a time)
+    return _flight.do(coin_id, lambda: _fetch_live(coin_id), reread=lambda: _from_redis(coin_id))
+
+
+def _fetch_live(coin_id: str) -> dict | None:
+    """CoinGecko fetch, written through to Redis and Postgres."""
     logger.info("[market] %s not cached, fetching from CoinGecko", coin_id)
     fresh = coingecko.fetch(coin_id)
     if not fresh:
@@ -60,3 +113,31 @@ def get_market(coin_id: str) -> dict | None:
         sql.upsert(coin_id, fresh["market_cap_usd"], fresh.get("circulating_supply"))
 
     return result
+
+
+def flight_stats() -> dict:
+    return _flight.stats
+
+
+def get_markets(coin_ids: list[str]) -> dict[str, dict]:
+    """Cached market data for several coins, keyed by coin_id (see module docstring)."""
+    found = redis_source.get_many(coin_ids)
+    for data in found.values():
+        data["_source"] = "redis"
+
+    misses = [c for c in coin_ids if c not in found]
+    if misses:
+        from_sql = sql.get_many(misses)
+        fresh = {}
+        for coin_id, data in from_sql.items():
+            if _is_stale(data):
+                # No write-back: a fresh TTL would hide the row from the refresh
+                _refresh(coin_id)
+            else:
+                fresh[coin_id] = _cache_entry(data)
+        if fresh:
+            redis_source.set_many(fresh)
+        found.update(from_sql)
+    logger.info("[market] batch of %d: %d cached, %d missing",
+                len(coin_ids), len(found), len(coin_ids) - len(found))
+    return found
@@ -2,39 +2,80 @@
 Read market data from Redis.
 Key: crypto:market:{coin_id}
 Written by an external collector or by the service itself after a CoinGecko fetch.
+
+Reads go through an in-process CoherentCache (db/invalidation.py); every
+writer publishes the keys it writes, so the cache never serves a value
+Redis has replaced.
 """
 
 import json
 import logging
-import os
+
+from db import CoherentCache, get_redis, mget_json, setex_json_many
+from db.invalidation import CHANNEL
 
 logger = logging.getLogger(__name__)
 
 REDIS_KEY_PREFIX = "crypto:market:"
 MARKET_TTL = 86_400  # 24 hours
 
-
-def _client():
-    import redis
-
-    url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-    return redis.from_url(url, decode_responses=True, socket_connect_timeout=2)
+_l1 = CoherentCache("market", prefix=REDIS_KEY_PREFIX)
 
 
 def get_from_redis(coin_id: str) -> dict | None:
+    cached = _l1.get(coin_id)
+    if cached is not None:
+        return dict(cached)
+    generation = _l1.generation
     try:
-        r = _client()
+        r = get_redis()
         raw = r.get(f"{REDIS_KEY_PREFIX}{coin_id}")
         if raw:
-            return json.loads(raw)
+            data = json.loads(raw)
+            _l1.set(coin_id, data, generation)
+            return dict(data)
     except Exception as exc:
         logger.warning("Redis market read failed for %s: %s", coin_id, exc)
     return None
 
 
 def set_in_redis(coin_id: str, data: dict) -> None:
+    set_many({coin_id: data})
+
+
+def get_many(coin_ids: list[str]) -> dict[str, dict]:
+    """Cached market data for several coins with one MGET; misses are absent."""
+    found = {}
+    misses = []
+    for c in coin_ids:
+        cached = _l1.get(c)
+        if cached is not None:
+            found[c] = dict(cached)
+        else:
+            misses.append(c)
+    if not misses:
+        return found
+
+    generation = _l1.generation
     try:
-        r = _client()
-        r.setex(f"{REDIS_KEY_PREFIX}{coin_id}", MARKET_TTL, json.dumps(data))
+        values = mget_json([f"{REDIS_KEY_PREFIX}{c}" for c in misses])
     except Exception as exc:
-        logger.warning("Redis market write failed for %s: %s", coin_id, exc)
+        logger.warning("Redis market read failed for %d coins: %s", len(misses), exc)
+        return found
+    for c, v in zip(misses, values):
+        if v:
+            _l1.set(c, v, generation)
+            found[c] = dict(v)
+    return found
+
+
+def set_many(items: dict[str, dict]) -> None:
+    """SETEX several coins in one pipeline, announced to every worker's cache."""
+    try:
+        setex_json_many(((f"{REDIS_KEY_PREFIX}{c}", d) for c, d in items.items()), MARKET_TTL, publish=CHANNEL)
+    except Exception as exc:
+        logger.warning("Redis market write failed for %d coins: %s", len(items), exc)
+
+
+def cache_stats() -> dict:
+    return _l1.stats
@@ -7,14 +7,43 @@ Resolution order:
   3. Google News RSS live fetch → cache in Redis + Postgres
 
 Returns a list of article dicts or None.
+
+The RSS fetch is single-flight (db/singleflight.py): concurrent misses
+for a coin, in any worker, share one upstream call, and a failed fetch is
+not retried for SINGLEFLIGHT_NEGATIVE_TTL_S.  A Postgres entry older than
+NEWS_STALE_S is served as-is while one background fetch refreshes it
+(stale-while-revalidate).
+
+get_news_many() batches steps 1 and 2 for several coins (one MGET, one
+SQL query for the Redis misses, one pipelined write-back of the fresh
+entries; stale ones are refreshed as in get_news()).  It skips the RSS
+step, which is one upstream fetch per coin: coins in neither cache are
+left out, and a per-coin request fetches them.
 """
 
 import logging
+import os
+from datetime import datetime, timezone
+
+from db import SingleFlight
 
 from .sources import redis_source, sql, google_rss
 
 logger = logging.getLogger(__name__)
 
+# Postgres entries older than this are refreshed from Google News in the background
+NEWS_STALE_S = int(os.getenv("NEWS_STALE_S", "3600"))
+
+_flight = SingleFlight("news")
+
+
+def _is_stale(fetched_at: datetime) -> bool:
+    return (datetime.now(timezone.utc) - fetched_at).total_seconds() > NEWS_STALE_S
+
+
+def _refresh(coin_id: str) -> None:
+    _flight.refresh(coin_id, lambda: _fetch_live(coin_id), reread=lambda: redis_source.get(coin_id))
+
 
 def get_news(coin_id: str) -> list | None:
     # 1 — Redis
@@ -24,13 +53,23 @@ def get_news(coin_id: str) -> list | None:
         return articles
 
     # 2 — Postgres
-    articles = sql.get(coin_id)
-    if articles:
+    entry = sql.get(coin_id)
+    if entry and entry[0]:
+        articles, fetched_at = entry
+        if _is_stale(fetched_at):
+            logger.info("[news] %s served stale from SQL, refreshing", coin_id)
+            _refresh(coin_id)
+            return articles
         logger.info("[news] %s served from SQL", coin_id)
         redis_source.set(coin_id, articles)
         return articles
 
-    # 3 — Google News RSS
+    # 3 — Google News RSS (one per coin at a time)
+    return _flight.do(coin_id, lambda: _fetch_live(coin_id), reread=lambda: redis_source.get(coin_id))
+
+
+def _fetch_live(coin_id: str) -> list | None:
+    """Google News fetch, written through to Redis and Postgres."""
     logger.info("[news] %s not cached, fetching from Google News", coin_id)
     articles = google_rss.fetch(coin_id)
     if not articles:
@@ -41,3 +80,28 @@ def get_news(coin_id: str) -> list | None:
     sql.upsert(coin_id, articles)
 
     return articles
+
+
+def flight_stats() -> dict:
+    return _flight.stats
+
+
+def get_news_many(coin_ids: list[str]) -> dict[str, list]:
+    """Cached articles for several coins, keyed by coin_id (see module docstring)."""
+    found = redis_source.get_many(coin_ids)
+
+    misses = [c for c in coin_ids if c not in found]
+    if misses:
+        fresh = {}
+        for coin_id, (articles, fetched_at) in sql.get_many(misses).items():
+            found[coin_id] = articles
+            if _is_stale(fetched_at):
+                # No write-back: a fresh TTL would hide the entry from the refresh
+                _refresh(coin_id)
+            else:
+                fresh[coin_id] = articles
+        if fresh:
+            redis_source.set_many(fresh)
+    logger.info("[news] batch of %d: %d cached, %d missing",
+                len(coin_ids), len(found), len(coin_ids) - len(found))
+    return found
@@ -16,6 +16,7 @@ import requests
 
 logger = logging.getLogger(__name__)
 
+_BASE = "https://news.google.com/rss/search"
 _TIMEOUT = 10
 _MAX_ARTICLES = 4
 
@@ -32,7 +33,7 @@ def fetch(coin_id: str) -> list | None:
     or None on failure.
     """
     query = quote_plus(f"{_coin_name(coin_id)} crypto")
-    url   = f"https://news.google.com/rss/search?q={query}&hl=en-US&gl=US&ceid=US:en"
+    url   = f"{_BASE}?q={query}&hl=en-US&gl=US&ceid=US:en"
 
     try:
         resp = requests.get(url, timeout=_TIMEOUT, headers={"User-Agent": "Mozilla/5.0"})
@@ -2,38 +2,80 @@
 News service — Redis source
 Key:  crypto:news:{coin_id}
 TTL:  1 hour (news refreshes frequently)
+
+Reads go through an in-process CoherentCache (db/invalidation.py); every
+writer publishes the keys it writes.  Article lists are shared between
+request threads and must not be mutated.
 """
 
 import json
 import logging
-import os
+
+from db import CoherentCache, get_redis, mget_json, setex_json_many
+from db.invalidation import CHANNEL
 
 logger = logging.getLogger(__name__)
 
 _PREFIX = "crypto:news:"
 _TTL    = 3_600  # 1 hour
 
-
-def _client():
-    import redis
-    url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-    return redis.from_url(url, decode_responses=True, socket_connect_timeout=2)
+_l1 = CoherentCache("news", prefix=_PREFIX)
 
 
 def get(coin_id: str) -> list | None:
+    cached = _l1.get(coin_id)
+    if cached is not None:
+        return cached
+    generation = _l1.generation
     try:
-        r = _client()
+        r = get_redis()
         raw = r.get(f"{_PREFIX}{coin_id}")
         if raw:
-            return json.loads(raw)
+            articles = json.loads(raw)
+            _l1.set(coin_id, articles, generation)
+            return articles
     except Exception as exc:
         logger.warning("[news/redis] Read failed for %s: %s", coin_id, exc)
     return None
 
 
 def set(coin_id: str, articles: list) -> None:
+    set_many({coin_id: articles})
+
+
+def get_many(coin_ids: list[str]) -> dict[str, list]:
+    """Cached articles for several coins with one MGET; misses are absent."""
+    found = {}
+    misses = []
+    for c in coin_ids:
+        cached = _l1.get(c)
+        if cached is not None:
+            found[c] = cached
+        else:
+            misses.append(c)
+    if not misses:
+        return found
+
+    generation = _l1.generation
     try:
-        r = _client()
-        r.setex(f"{_PREFIX}{coin_id}", _TTL, json.dumps(articles))
+        values = mget_json([f"{_PREFIX}{c}" for c in misses])
     except Exception as exc:
-        logger.warning("[news/redis] Write failed for %s: %s", coin_id, exc)
+        logger.warning("[news/redis] Read failed for %d coins: %s", len(misses), exc)
+        return found
+    for c, v in zip(misses, values):
+        if v:
+            _l1.set(c, v, generation)
+            found[c] = v
+    return found
+
+
+def set_many(items: dict[str, list]) -> None:
+    """set() for several coins in one pipeline, announced to every worker's cache."""
+    try:
+        setex_json_many(((f"{_PREFIX}{c}", a) for c, a in items.items()), _TTL, publish=CHANNEL)
+    except Exception as exc:
+        logger.warning("[news/redis] Write failed for %d coins: %s", len(items), exc)
+
+
+def cache_stats() -> dict:
+    return _l1.stats
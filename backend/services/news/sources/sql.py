@@ -8,78 +8,66 @@ Table: news_cache
 
 import json
 import logging
-import os
-from datetime import timezone
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Iterable, Optional
 
-import psycopg2
-import psycopg2.extras
+from db import Statement, get_pool
 
 logger = logging.getLogger(__name__)
 
-_conn = None
+_GET = Statement("news_by_coin", "SELECT articles, fetched_at FROM news_cache WHERE coin_id = %s")
+_GET_MANY = Statement("news_by_coins", "SELECT coin_id, articles, fetched_at FROM news_cache WHERE coin_id = ANY(%s)")
 
 
-def _pg_connect():
-    primary  = os.getenv("DATABASE_URL")
-    fallback = os.getenv("DATABASE_URL_IPV4")
-    try:
-        return psycopg2.connect(primary, connect_timeout=5)
-    except psycopg2.OperationalError as exc:
-        if fallback and fallback != primary:
-            logger.warning("[news/sql] Primary unreachable (%s), trying IPv4 fallback", exc)
-            return psycopg2.connect(fallback, connect_timeout=5)
-        raise
+def _articles(row) -> Optional[list]:
+    articles = row["articles"]
+    if isinstance(articles, str):
+        articles = json.loads(articles)
+    return articles or None
 
 
-def _get_conn():
-    global _conn
-    try:
-        if _conn is None or _conn.closed:
-            raise psycopg2.OperationalError("no connection")
-        _conn.cursor().execute("SELECT 1")
-    except Exception:
-        _conn = _pg_connect()
-    return _conn
+def _fetched_at(row) -> datetime:
+    fetched_at = row["fetched_at"]
+    return fetched_at if fetched_at.tzinfo else fetched_at.replace(tzinfo=timezone.utc)
 
 
-def get(coin_id: str) -> Optional[list]:
+def get(coin_id: str) -> Optional[tuple[list, datetime]]:
+    """(articles, fetched_at) for *coin_id*, or None."""
     try:
-        conn = _get_conn()
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(
-                "SELECT articles FROM news_cache WHERE coin_id = %s",
-                (coin_id,),
-            )
-            row = cur.fetchone()
+        row = get_pool().fetchone(_GET, (coin_id,))
         if row and row["articles"]:
-            articles = row["articles"]
-            if isinstance(articles, str):
-                articles = json.loads(articles)
-            return articles
+            return _articles(row), _fetched_at(row)
     except Exception as exc:
         logger.warning("[news/sql] Read failed for %s: %s", coin_id, exc)
     return None
 
 
+def get_many(coin_ids: Iterable[str]) -> dict[str, tuple[list, datetime]]:
+    """(articles, fetched_at) for several coins in one query, keyed by coin_id ({} on error)."""
+    ids = list(coin_ids)
+    if not ids:
+        return {}
+    try:
+        rows = get_pool().fetchall(_GET_MANY, (ids,))
+        found = {row["coin_id"]: (_articles(row), _fetched_at(row)) for row in rows}
+    except Exception as exc:
+        logger.warning("[news/sql] Read failed for %d coins: %s", len(ids), exc)
+        return {}
+    return {c: entry for c, entry in found.items() if entry[0]}
+
+
 def upsert(coin_id: str, articles: list) -> None:
     try:
-        conn = _get_conn()
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO news_cache (coin_id, articles, fetched_at)
-                VALUES (%s, %s::jsonb, NOW())
-                ON CONFLICT (coin_id) DO UPDATE
-                    SET articles   = EXCLUDED.articles,
-                        fetched_at = EXCLUDED.fetched_at
-                """,
-                (coin_id, json.dumps(articles)),
-            )
-        conn.commit()
+        # Autocommitted by the pool
+        get_pool().execute(
+            """
+            INSERT INTO news_cache (coin_id, articles, fetched_at)
+            VALUES (%s, %s::jsonb, NOW())
+            ON CONFLICT (coin_id) DO UPDATE
+                SET articles   = EXCLUDED.articles,
+                    fetched_at = EXCLUDED.fetched_at
+            """,
+            (coin_id, json.dumps(articles)),
+        )
     except Exception as exc:
         logger.warning("[news/sql] Upsert failed for %s: %s", coin_id, exc)
-        try:
-            _conn.rollback()
-        except Exception:
-            pass
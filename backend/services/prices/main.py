@@ -0,0 +1,109 @@
+"""
+Live price service
+==================
+Latest aggregated price per coin, for consumers that don't hold a
+websocket (SEO pages, server-side rendering, cron jobs).
+
+Resolution order:
+  1. in-process micro-cache (PRICES_CACHE_MS), keyed by the request
+  2. Redis  (rt:coin:{coin_id} keys written by live-price-ingestor)
+  (No SQL fallback — live prices are ephemeral by design.)
+
+The ingestor rewrites the keys every BATCH_INTERVAL_MS (10s), so a
+response up to PRICES_CACHE_MS old is as good as a fresh one: the same
+request repeated by many threads costs one Redis round trip per
+PRICES_CACHE_MS per worker.  Concurrent misses share that round trip
+(SingleFlight, in-process only), and the response body is serialized
+once per fill, not per request.
+
+Returns Prices(seq, count, body) or None when Redis is down.  *seq* is
+the ingestor's publish sequence (rt:seq:prices) at the time of the read,
+or None if it has never run; the route's ETag.  *body* is the JSON
+response:
+{
+    "seq":     1234,
+    "count":   2,
+    "results": { "bitcoin": { "avg_price": ..., "highest": {...}, ... }, ... },
+    "missing": ["not-a-coin"]
+}
+
+Environment:
+    PRICES_CACHE_MS    micro-cache lifetime (default 1000; 0 disables)
+    PRICES_CACHE_MAX   distinct requests cached per worker (default 256)
+"""
+
+import logging
+import os
+from typing import NamedTuple, Optional
+
+import orjson
+
+from db import LRUCache, SingleFlight
+
+from .sources import redis_source
+
+logger = logging.getLogger(__name__)
+
+PRICES_CACHE_MS = int(os.getenv("PRICES_CACHE_MS", "1000"))
+PRICES_CACHE_MAX = int(os.getenv("PRICES_CACHE_MAX", "256"))
+
+_cache = LRUCache("prices", max_entries=PRICES_CACHE_MAX, ttl_s=PRICES_CACHE_MS / 1000)
+_flight = SingleFlight("prices", negative_ttl_s=0, distributed=False)
+
+
+class Prices(NamedTuple):
+    seq: Optional[int]
+    count: int
+    body: bytes
+
+
+def _build(coin_ids: Optional[list[str]], read) -> Optional[Prices]:
+    if read is None:
+        return None
+    seq, found = read
+    ids = coin_ids if coin_ids is not None else list(found)
+    results = {c: found[c] for c in ids if c in found}
+    body = orjson.dumps({
+        "seq":     seq,
+        "count":   len(results),
+        "results": results,
+        "missing": [c for c in ids if c not in found],
+    })
+    return Prices(seq, len(results), body)
+
+
+def _cached(key: tuple, load) -> Optional[Prices]:
+    if PRICES_CACHE_MS <= 0:
+        return load()
+    prices = _cache.get(key)
+    if prices is not None:
+        return prices
+
+    def fill():
+        prices = load()
+        if prices is not None:
+            _cache.set(key, prices)
+        return prices
+
+    return _flight.do(key, fill, reread=lambda: _cache.get(key))
+
+
+def get_prices(coin_ids: list[str]) -> Optional[Prices]:
+    """The latest entries for *coin_ids*, in that order; coins with none are "missing"."""
+    prices = _cached(("ids", *coin_ids),
+                     lambda: _build(coin_ids, redis_source.get_prices(coin_ids)))
+    if prices is None:
+        logger.warning(f"[prices] Redis unavailable for a batch of {len(coin_ids)}")
+    return prices
+
+
+def get_all_prices() -> Optional[Prices]:
+    """The latest entry of every coin the ingestor is tracking, sorted by coin_id."""
+    prices = _cached(("all",), lambda: _build(None, redis_source.get_all_prices()))
+    if prices is None:
+        logger.warning("[prices] Redis unavailable for all prices")
+    return prices
+
+
+def cache_stats() -> dict:
+    return {"micro_cache": _cache.stats, "singleflight": _flight.stats}
@@ -0,0 +1,77 @@
+"""
+Live price Redis source
+=======================
+Reads the per-coin aggregates written by the live-price-ingestor.
+
+Redis key schema (written by live-price-ingestor, storage/redis_writer.py):
+  rt:coin:{coin_id}  — JSON {coin_id, avg_price, highest{...}, lowest{...},
+                       exchange_count, exchanges, timestamp}, RT_PRICE_TTL
+  rt:coins           — SET of the coin_ids with an entry (may name expired ones)
+  rt:seq:prices      — counter bumped by every flush, after its entries
+
+Every read returns (seq, {coin_id: entry}).  The sequence number is read
+before the entries, so they are at least as new as it says.
+"""
+
+import json
+import logging
+from typing import Optional
+
+from db import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "rt:coin:"
+INDEX_KEY = "rt:coins"
+SEQ_KEY = "rt:seq:prices"
+
+
+def _parse(coin_ids: list[str], raws: list) -> dict[str, dict]:
+    out = {}
+    for coin_id, raw in zip(coin_ids, raws):
+        if raw is None:
+            continue
+        try:
+            out[coin_id] = json.loads(raw)
+        except ValueError:
+            logger.warning(f"[prices/redis] Bad JSON in {KEY_PREFIX}{coin_id}")
+    return out
+
+
+def _seq(raw) -> Optional[int]:
+    return int(raw) if raw is not None else None
+
+
+def get_prices(coin_ids: list[str]) -> Optional[tuple[Optional[int], dict[str, dict]]]:
+    """
+    The entries for *coin_ids* (GET of the sequence + one MGET, pipelined).
+    Coins with no entry are absent.  None on Redis error.
+    """
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.get(SEQ_KEY)
+        pipe.mget([f"{KEY_PREFIX}{c}" for c in coin_ids])
+        seq, raws = pipe.execute()
+    except Exception as exc:
+        logger.error(f"[prices/redis] Redis error for a batch of {len(coin_ids)}: {exc}")
+        return None
+    return _seq(seq), _parse(coin_ids, raws)
+
+
+def get_all_prices() -> Optional[tuple[Optional[int], dict[str, dict]]]:
+    """
+    Every coin's entry, sorted by coin_id: the sequence and the rt:coins
+    index in one round trip, then one MGET.  None on Redis error.
+    """
+    try:
+        r = get_redis()
+        pipe = r.pipeline(transaction=False)
+        pipe.get(SEQ_KEY)
+        pipe.smembers(INDEX_KEY)
+        seq, members = pipe.execute()
+        coin_ids = sorted(members)
+        raws = r.mget([f"{KEY_PREFIX}{c}" for c in coin_ids]) if coin_ids else []
+    except Exception as exc:
+        logger.error(f"[prices/redis] Redis error reading all prices: {exc}")
+        return None
+    return _seq(seq), _parse(coin_ids, raws)
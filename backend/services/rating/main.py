@@ -7,10 +7,11 @@ or Redis is unavailable (e.g. cold-start before the orchestrator has run).
 Usage (from a route):
     from services.rating.main import get_rating
     data = get_rating("bitcoin")   # dict | None
+    found = get_ratings(["bitcoin", "ethereum"])   # {coin_id: dict}
 """
 
 import logging
-from typing import Optional
+from typing import Iterable, Optional
 
 from .sources import redis as redis_src
 from .sources import sql as sql_src
@@ -44,17 +45,37 @@ def get_rating(coin_id: str) -> Optional[dict]:
     if data is not None:
         logger.info(f"[rating] SQL hit for {coin_id} — populating Redis cache")
         # Write-through: cache in Redis so next request is instant
-        try:
-            import json
-            from decimal import Decimal
-            import redis as redis_lib
-            _r = redis_lib.from_url(__import__('os').getenv('REDIS_URL', ''), decode_responses=True)
-            _r.setex(f"crypto:rating:{coin_id}", 86_400 * 7,
-                     json.dumps(data, default=lambda o: float(o) if isinstance(o, Decimal) else str(o)))
-        except Exception as cache_exc:
-            logger.warning(f"[rating] Redis write-through failed (non-fatal): {cache_exc}")
+        redis_src.set(coin_id, data)
         data["_source"] = "sql"
         return data
 
     logger.warning(f"[rating] No data found for {coin_id} in Redis or SQL")
     return None
+
+
+def get_ratings(coin_ids: Iterable[str]) -> dict[str, dict]:
+    """
+    CCS rating snapshots for several coins, keyed by coin_id.
+
+    Same resolution order as get_rating, batched: one Redis MGET for all
+    of them, one SQL query for the Redis misses, and one pipelined
+    write-through of the SQL hits.  Coins neither source has are absent
+    from the result.
+    """
+    ids = list(dict.fromkeys(c.lower().strip() for c in coin_ids))
+
+    found = redis_src.get_many(ids)
+    for data in found.values():
+        data["_source"] = "redis"
+
+    misses = [c for c in ids if c not in found]
+    if misses:
+        logger.info(f"[rating] {len(misses)}/{len(ids)} Redis misses — falling back to SQL")
+        from_sql = sql_src.get_many(misses)
+        if from_sql:
+            redis_src.set_many(from_sql)
+            for data in from_sql.values():
+                data["_source"] = "sql"
+            found.update(from_sql)
+
+    return found
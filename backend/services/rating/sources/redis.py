@@ -1,7 +1,9 @@
 """
 Rating service — Redis source
 ==============================
-Reads the pre-computed CCS score from Redis.
+Reads the pre-computed CCS score from Redis, through an in-process
+CoherentCache (db/invalidation.py) that the writers keep in sync by
+publishing every key they write.
 
 Key pattern:  crypto:rating:{coin_id}
 Written by:   rating/writers/redis_writer.py  (score-orchestrator layer)
@@ -9,24 +11,21 @@ Written by:   rating/writers/redis_writer.py  (score-orchestrator layer)
 
 import json
 import logging
-import os
-from typing import Optional
+from decimal import Decimal
+from typing import Iterable, Optional
 
-import redis as redis_lib
+from db import CoherentCache, get_redis, mget_json, setex_json_many
+from db.invalidation import CHANNEL
 
 logger     = logging.getLogger(__name__)
-_client: redis_lib.Redis | None = None
 KEY_PREFIX = "crypto:rating"
+TTL        = 86_400 * 7  # write-through entries (see set)
 
+_l1 = CoherentCache("rating", prefix=f"{KEY_PREFIX}:")
 
-def _get_client() -> redis_lib.Redis:
-    global _client
-    if _client is None:
-        url = os.getenv("REDIS_URL")
-        if not url:
-            raise RuntimeError("REDIS_URL not set")
-        _client = redis_lib.from_url(url, decode_responses=True)
-    return _client
+
+def _default(obj):
+    return float(obj) if isinstance(obj, Decimal) else str(obj)
 
 
 def get(coin_id: str) -> Optional[dict]:
@@ -34,13 +33,68 @@ def get(coin_id: str) -> Optional[dict]:
     Fetch the rating snapshot for *coin_id* from Redis.
     Returns None if the key is missing or Redis is unreachable.
     """
-    key = f"{KEY_PREFIX}:{coin_id.lower()}"
+    coin_id = coin_id.lower()
+    cached = _l1.get(coin_id)
+    if cached is not None:
+        return dict(cached)
+
+    key = f"{KEY_PREFIX}:{coin_id}"
+    generation = _l1.generation
     try:
-        raw = _get_client().get(key)
+        raw = get_redis().get(key)
         if raw is None:
             logger.debug(f"[rating/redis] Cache miss: {key}")
             return None
-        return json.loads(raw)
+        data = json.loads(raw)
     except Exception as exc:
         logger.warning(f"[rating/redis] Error reading {key}: {exc}")
         return None
+    _l1.set(coin_id, data, generation)
+    return dict(data)
+
+
+def set(coin_id: str, data: dict) -> None:
+    """Write-through after an SQL hit, so the next request is served from Redis."""
+    set_many({coin_id: data})
+
+
+def get_many(coin_ids: Iterable[str]) -> dict[str, dict]:
+    """
+    Rating snapshots for several coins with one MGET, keyed by coin_id.
+    Misses are absent; returns {} if Redis is unreachable.
+    """
+    found = {}
+    misses = []
+    for c in (c.lower() for c in coin_ids):
+        cached = _l1.get(c)
+        if cached is not None:
+            found[c] = dict(cached)
+        else:
+            misses.append(c)
+    if not misses:
+        return found
+
+    generation = _l1.generation
+    try:
+        values = mget_json([f"{KEY_PREFIX}:{c}" for c in misses])
+    except Exception as exc:
+        logger.warning(f"[rating/redis] Error reading {len(misses)} keys: {exc}")
+        return found
+    for c, v in zip(misses, values):
+        if v is not None:
+            _l1.set(c, v, generation)
+            found[c] = dict(v)
+    return found
+
+
+def set_many(ratings: dict[str, dict]) -> None:
+    """Write-through of several SQL hits in one pipeline, announced to every worker's cache."""
+    try:
+        setex_json_many(((f"{KEY_PREFIX}:{c.lower()}", d) for c, d in ratings.items()), TTL,
+                        default=_default, publish=CHANNEL)
+    except Exception as exc:
+        logger.warning(f"[rating/redis] Write-through of {len(ratings)} keys failed (non-fatal): {exc}")
+
+
+def cache_stats() -> dict:
+    return _l1.stats
@@ -9,38 +9,61 @@ Table:  rating_scores  (see sql/rating_snapshots.sql)
 
 import json
 import logging
-import os
-from typing import Optional
+from typing import Iterable, Optional
 
-import psycopg2
-import psycopg2.extras
+from db import Statement, get_pool
 
 logger = logging.getLogger(__name__)
 
-_conn = None
+_COLUMNS = """
+        coin_id,
+        coin_symbol,
+        overall_score,
+        automated_score,
+        manual_validation,
+        risk_level,
+        security_transparency,
+        tokenomics_utility,
+        community_dev_activity,
+        public_discourse,
+        last_computed_at,
+        review_status
+"""
 
+_QUERY = Statement(
+    "rating_by_coin",
+    f"""
+    SELECT {_COLUMNS}
+    FROM rating_scores
+    WHERE coin_id = %s
+    LIMIT 1
+    """,
+)
 
-def _pg_connect():
-    primary  = os.getenv("DATABASE_URL")
-    fallback = os.getenv("DATABASE_URL_IPV4")
-    try:
-        return psycopg2.connect(primary, connect_timeout=5)
-    except psycopg2.OperationalError as exc:
-        if fallback and fallback != primary:
-            logger.warning(f"[rating/sql] Primary unreachable ({exc}), trying IPv4 fallback")
-            return psycopg2.connect(fallback, connect_timeout=5)
-        raise
+_QUERY_MANY = Statement(
+    "ratings_by_coins",
+    f"""
+    SELECT {_COLUMNS}
+    FROM rating_scores
+    WHERE coin_id = ANY(%s)
+    """,
+)
 
 
-def _get_conn():
-    global _conn
-    try:
-        if _conn is None or _conn.closed:
-            raise psycopg2.OperationalError("no connection")
-        _conn.cursor().execute("SELECT 1")
-    except Exception:
-        _conn = _pg_connect()
-    return _conn
+def _to_dict(row) -> dict:
+    """RealDictRow → plain dict with parsed JSONB columns and ISO timestamps."""
+    result = dict(row)
+    # psycopg2 may return JSONB columns as strings — parse them
+    for jsonb_col in ("security_transparency", "tokenomics_utility", "community_dev_activity", "public_discourse"):
+        val = result.get(jsonb_col)
+        if isinstance(val, str):
+            try:
+                result[jsonb_col] = json.loads(val)
+            except Exception:
+                pass
+    if result.get("last_computed_at"):
+        result["last_computed_at"] = result["last_computed_at"].isoformat()
+    return result
 
 
 def get(coin_id: str) -> Optional[dict]:
@@ -49,53 +72,27 @@ def get(coin_id: str) -> Optional[dict]:
     Returns None if no row exists or DB is unreachable.
     """
     try:
-        conn = _get_conn()
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(
-                """
-                SELECT
-                    coin_id,
-                    coin_symbol,
-                    overall_score,
-                    automated_score,
-                    manual_validation,
-                    risk_level,
-                    security_transparency,
-                    tokenomics_utility,
-                    community_dev_activity,
-                    public_discourse,
-                    last_computed_at,
-                    review_status
-                FROM rating_scores
-                WHERE coin_id = %s
-                LIMIT 1
-                """,
-                (coin_id.lower(),),
-            )
-            row = cur.fetchone()
+        row = get_pool().fetchone(_QUERY, (coin_id.lower(),))
         if row is None:
             logger.debug(f"[rating/sql] No row for {coin_id}")
             return None
-        # Convert RealDictRow to plain dict and serialize timestamps
-        result = dict(row)
-        # psycopg2 may return JSONB columns as strings — parse them
-        for jsonb_col in ("security_transparency", "tokenomics_utility", "community_dev_activity", "public_discourse"):
-            val = result.get(jsonb_col)
-            if isinstance(val, str):
-                try:
-                    result[jsonb_col] = json.loads(val)
-                except Exception:
-                    pass
-        if result.get("last_computed_at"):
-            result["last_computed_at"] = result["last_computed_at"].isoformat()
-        return result
+        return _to_dict(row)
     except Exception as exc:
         logger.error(f"[rating/sql] Error fetching {coin_id}: {exc}")
-        global _conn
-        try:
-            if _conn:
-                _conn.close()
-        except Exception:
-            pass
-        _conn = None
         return None
+
+
+def get_many(coin_ids: Iterable[str]) -> dict[str, dict]:
+    """
+    Rating snapshots for several coins in one query, keyed by coin_id.
+    Coins without a row are absent; returns {} if the DB is unreachable.
+    """
+    ids = [c.lower() for c in coin_ids]
+    if not ids:
+        return {}
+    try:
+        rows = get_pool().fetchall(_QUERY_MANY, (ids,))
+    except Exception as exc:
+        logger.error(f"[rating/sql] Error fetching {len(ids)} coins: {exc}")
+        return {}
+    return {row["coin_id"]: _to_dict(row) for row in rows}
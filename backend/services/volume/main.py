@@ -18,13 +18,14 @@ from .sources.redis_source import WINDOWS
 logger = logging.getLogger(__name__)
 
 
-def get_volume(coin_id: str, window: str) -> dict | None:
+def get_volume(coin_id: str, window: str, series: bool = False) -> dict | None:
     """
     Fetch aggregated buy/sell volume for *coin_id* over *window*.
 
     Args:
         coin_id: Canonical coin ID (e.g. "bitcoin").
         window:  Time window string. Must be one of: 5m, 30m, 1h, 4h, 6h, 24h.
+        series:  Also return the per-minute buckets, columnar (t/b/s arrays).
 
     Returns:
         Dict with buy_volume, sell_volume, total_volume, buy_pct, sell_pct,
@@ -34,7 +35,23 @@ def get_volume(coin_id: str, window: str) -> dict | None:
         logger.warning(f"[volume] Unsupported window '{window}'")
         return None
 
-    data = redis_source.get_volume(coin_id, window)
+    data = redis_source.get_volume(coin_id, window, series)
     if data is None:
         logger.warning(f"[volume] Redis unavailable for {coin_id}/{window}")
     return data
+
+
+def get_volumes(coin_ids: list[str], window: str, series: bool = False) -> dict[str, dict] | None:
+    """
+    get_volume() for several coins in one Redis round trip, keyed by
+    coin_id.  Coins the volume-aggregator has no data for are absent.
+    None if window is invalid or Redis is down.
+    """
+    if window not in WINDOWS:
+        logger.warning(f"[volume] Unsupported window '{window}'")
+        return None
+
+    data = redis_source.get_volumes(coin_ids, window, series)
+    if data is None:
+        logger.warning(f"[volume] Redis unavailable for a batch of {len(coin_ids)}/{window}")
+    return data
@@ -11,10 +11,9 @@ Redis key schema (written by volume-aggregator):
 
 import json
 import logging
-import os
 import time
 
-import redis
+from db import get_redis
 
 logger = logging.getLogger(__name__)
 
@@ -28,49 +27,76 @@ WINDOWS: dict[str, int] = {
     "24h": 24 * 60 * 60,
 }
 
-_client: redis.Redis | None = None
-
-
-def _get_client() -> redis.Redis:
-    global _client
-    if _client is None:
-        url = os.getenv("REDIS_URL", "redis://redis:6379")
-        _client = redis.from_url(url, decode_responses=True, socket_connect_timeout=5)
-    return _client
-
-
-def get_volume(coin_id: str, window: str) -> dict | None:
+def get_volume(coin_id: str, window: str, series: bool = False) -> dict | None:
     """
     Return aggregated buy/sell volume for *coin_id* over *window*.
 
     Returns None on Redis error.
     Returns a dict with zeroed values if the key exists but has no
     buckets in the requested window (e.g. service just started).
+    With *series*, also the per-minute buckets as parallel arrays:
+    "series": {"t": [minute, ...], "b": [buy, ...], "s": [sell, ...]}.
     """
     window_seconds = WINDOWS.get(window)
     if window_seconds is None:
         return None  # caller validates window before calling
 
     try:
-        r = _get_client()
+        r = get_redis()
         raw = r.hgetall(f"vol:{coin_id}")
     except Exception as exc:
         logger.error(f"[volume/redis] Redis error for {coin_id}: {exc}")
         return None
 
-    cutoff = int(time.time()) - window_seconds
+    return _summarize(coin_id, window, raw, series)
+
+
+def get_volumes(coin_ids: list[str], window: str, series: bool = False) -> dict[str, dict] | None:
+    """
+    get_volume() for several coins, with their HGETALLs in one pipeline.
+
+    Keyed by coin_id; coins with no vol: hash at all are absent.
+    Returns None on Redis error.
+    """
+    if window not in WINDOWS:
+        return None
+
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for coin_id in coin_ids:
+            pipe.hgetall(f"vol:{coin_id}")
+        hashes = pipe.execute()
+    except Exception as exc:
+        logger.error(f"[volume/redis] Redis error for {len(coin_ids)} coins: {exc}")
+        return None
+
+    return {
+        coin_id: _summarize(coin_id, window, raw, series)
+        for coin_id, raw in zip(coin_ids, hashes)
+        if raw
+    }
+
+
+def _summarize(coin_id: str, window: str, raw: dict | None, series: bool) -> dict:
+    """Totals (and optionally the series) of the vol: hash *raw* within *window*."""
+    cutoff = int(time.time()) - WINDOWS[window]
     buy_total = 0.0
     sell_total = 0.0
     bucket_count = 0
     all_exchanges: set[str] = set()
+    points: list[tuple[int, float, float]] = []
 
     for minute_ts_str, value_str in (raw or {}).items():
         try:
             if int(minute_ts_str) < cutoff:
                 continue
             bucket = json.loads(value_str)
-            buy_total  += float(bucket.get("b", 0))
-            sell_total += float(bucket.get("s", 0))
+            buy  = float(bucket.get("b", 0))
+            sell = float(bucket.get("s", 0))
+            buy_total  += buy
+            sell_total += sell
+            if series:
+                points.append((int(minute_ts_str), buy, sell))
             # "ex" is stored as a list of exchange names by the volume-aggregator
             ex = bucket.get("ex", [])
             if isinstance(ex, list):
@@ -82,7 +108,7 @@ def get_volume(coin_id: str, window: str) -> dict | None:
     total = buy_total + sell_total
     buy_pct = round(buy_total / total * 100, 1) if total > 0 else 50.0
 
-    return {
+    result = {
         "coin_id":           coin_id,
         "window":            window,
         "buy_volume_coins":  round(buy_total, 6),
@@ -95,3 +121,11 @@ def get_volume(coin_id: str, window: str) -> dict | None:
         "exchanges":         sorted(all_exchanges),
         "_source":           "redis",
     }
+    if series:
+        points.sort()
+        result["series"] = {
+            "t": [p[0] for p in points],
+            "b": [p[1] for p in points],
+            "s": [p[2] for p in points],
+        }
+    return result
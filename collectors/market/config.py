@@ -22,4 +22,7 @@ REQUEST_DELAY   = float(os.getenv("MARKET_REQUEST_DELAY", "1.5"))      # seconds
 # Batch size for CoinGecko /coins/markets endpoint (max 250)
 BATCH_SIZE      = int(os.getenv("MARKET_BATCH_SIZE", "50"))
 
+# Pub/sub channel announcing written keys to the backend's in-process caches
+INVALIDATE_CHANNEL = os.getenv("CACHE_INVALIDATE_CHANNEL", "cache:invalidate")
+
 LOG_LEVEL       = os.getenv("LOG_LEVEL", "INFO")
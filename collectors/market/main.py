@@ -188,11 +188,12 @@ def write_redis(coin_id: str, data: dict) -> bool:
             "volume_24h":         data.get("volume_24h"),
             "last_fetched_at":    datetime.now(timezone.utc).isoformat(),
         }
-        rdb.setex(
-            f"crypto:market:{coin_id}",
-            config.REDIS_TTL,
-            json.dumps(payload, default=_default),
-        )
+        key = f"crypto:market:{coin_id}"
+        pipe = rdb.pipeline(transaction=False)
+        pipe.setex(key, config.REDIS_TTL, json.dumps(payload, default=_default))
+        # Drop the backend's in-process copy
+        pipe.publish(config.INVALIDATE_CHANNEL, key)
+        pipe.execute()
         return True
     except Exception as exc:
         logger.warning("[Redis] write failed for %s: %s", coin_id, exc)
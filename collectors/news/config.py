@@ -21,4 +21,7 @@ REQUEST_DELAY = float(os.getenv("NEWS_REQUEST_DELAY", "2.0"))
 # Max articles stored per coin
 MAX_ARTICLES  = int(os.getenv("NEWS_MAX_ARTICLES", "4"))
 
+# Pub/sub channel announcing written keys to the backend's in-process caches
+INVALIDATE_CHANNEL = os.getenv("CACHE_INVALIDATE_CHANNEL", "cache:invalidate")
+
 LOG_LEVEL     = os.getenv("LOG_LEVEL", "INFO")
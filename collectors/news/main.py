@@ -145,11 +145,12 @@ def upsert_sql(coin_id: str, articles: list) -> bool:
 
 def write_redis(coin_id: str, articles: list) -> bool:
     try:
-        _get_redis().setex(
-            f"crypto:news:{coin_id}",
-            config.REDIS_TTL,
-            json.dumps(articles),
-        )
+        key = f"crypto:news:{coin_id}"
+        pipe = _get_redis().pipeline(transaction=False)
+        pipe.setex(key, config.REDIS_TTL, json.dumps(articles))
+        # Drop the backend's in-process copy
+        pipe.publish(config.INVALIDATE_CHANNEL, key)
+        pipe.execute()
         return True
     except Exception as exc:
         logger.warning("[Redis] write news failed for %s: %s", coin_id, exc)
@@ -6,10 +6,15 @@ at low latency without hitting Postgres on every request.
 
 Key pattern:  crypto:rating:{coin_id}
 TTL:          Passed in at call time (should match the orchestrator's schedule)
+
+Every write also PUBLISHes the key on CACHE_INVALIDATE_CHANNEL, in the
+same pipeline, so the backend drops it from its in-process caches
+(backend/db/invalidation.py).
 """
 
 import json
 import logging
+import os
 from decimal import Decimal
 
 import redis as redis_lib
@@ -17,6 +22,7 @@ import redis as redis_lib
 logger = logging.getLogger(__name__)
 
 KEY_PREFIX = "crypto:rating"
+INVALIDATE_CHANNEL = os.getenv("CACHE_INVALIDATE_CHANNEL", "cache:invalidate")
 
 _redis: redis_lib.Redis | None = None
 
@@ -55,8 +61,10 @@ def write_score(score_row: dict, ttl_seconds: int) -> bool:
         logger.error("[Redis] write_score: missing coin_id")
         return False
     try:
-        r = _get_redis()
-        r.setex(_key(coin_id), ttl_seconds, _dumps(score_row))
+        pipe = _get_redis().pipeline(transaction=False)
+        pipe.setex(_key(coin_id), ttl_seconds, _dumps(score_row))
+        pipe.publish(INVALIDATE_CHANNEL, _key(coin_id))
+        pipe.execute()
         logger.debug(f"[Redis] Wrote {_key(coin_id)} TTL={ttl_seconds}s")
         return True
     except Exception as exc:
@@ -77,6 +85,8 @@ def seed_from_sql(rows: list[dict], ttl_seconds: int) -> None:
             coin_id = row.get("coin_id", "")
             if coin_id:
                 pipe.setex(_key(coin_id), ttl_seconds, _dumps(row))
+        # One message for the lot: drops every cached rating
+        pipe.publish(INVALIDATE_CHANNEL, f"{KEY_PREFIX}:*")
         pipe.execute()
         logger.info(f"[Redis] Cold-start seeded {len(rows)} rating keys")
     except Exception as exc:
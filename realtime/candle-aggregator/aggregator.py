@@ -13,6 +13,9 @@ Roll-up logic:
 
 All upserts use ON CONFLICT DO UPDATE so re-runs are fully idempotent.
 The service can crash and restart at any time without losing or corrupting data.
+
+After each committed roll-up, candles:ver:<resolution> is INCRed in Redis
+(if REDIS_URL is set) so the backend's candle cache re-reads the table.
 """
 
 import logging
@@ -21,6 +24,7 @@ from typing import Optional
 
 import psycopg2
 import psycopg2.extras
+import redis
 
 logger = logging.getLogger(__name__)
 
@@ -47,9 +51,10 @@ class CandleAggregator:
     No state is held between runs — everything is computed from the DB.
     """
 
-    def __init__(self, db_url: str) -> None:
+    def __init__(self, db_url: str, redis_url: Optional[str] = None) -> None:
         self._db_url = db_url
         self._conn: Optional[psycopg2.extensions.connection] = None
+        self._redis = redis.from_url(redis_url, socket_connect_timeout=5) if redis_url else None
 
     # ── Connection management ─────────────────────────────────────────────────
 
@@ -187,6 +192,7 @@ class CandleAggregator:
                 f"[{source_table} → {dest_table}] "
                 f"upserted {rows_affected} rows in {elapsed:.2f}s"
             )
+            self._bump_version(dest_resolution)
         except Exception as e:
             logger.error(
                 f"[{source_table} → {dest_table}] aggregation failed: {e}"
@@ -196,3 +202,14 @@ class CandleAggregator:
                 self._conn.rollback()
             except Exception:
                 self._conn = None
+
+    # ── Cache invalidation ────────────────────────────────────────────────────
+
+    def _bump_version(self, resolution: str) -> None:
+        """INCR candles:ver:<resolution> so the backend drops its cached ranges."""
+        if self._redis is None:
+            return
+        try:
+            self._redis.incr(f"candles:ver:{resolution}")
+        except Exception as e:
+            logger.warning(f"Could not bump candles:ver:{resolution}: {e}")
@@ -12,10 +12,24 @@ load_dotenv()
 DATABASE_URL      = os.getenv("DATABASE_URL")
 DATABASE_URL_IPV4 = os.getenv("DATABASE_URL_IPV4")
 
+# ── Redis (optional) ──────────────────────────────────────────────────────────
+# Where to bump candles:ver:<resolution> after each roll-up, so the backend's
+# candle cache picks up the new rows.  Unset: the cache expires on its own.
+REDIS_URL = os.getenv("REDIS_URL")
+
 # ── Schedule ──────────────────────────────────────────────────────────────────
 # How often to run all roll-ups (in minutes).
 # 60 = once per hour. Lower for faster testing (e.g. 5).
 RUN_INTERVAL_MINUTES = int(os.getenv("RUN_INTERVAL_MINUTES", "60"))
 
+# ── Partition maintenance (price_candles_1m / price_candles_5m) ─────────────────
+# How often to pre-create upcoming partitions and drop expired ones (hours).
+PARTITION_MAINTENANCE_HOURS = int(os.getenv("PARTITION_MAINTENANCE_HOURS", "6"))
+# How many future periods (weeks for 1m, months for 5m) to keep pre-created.
+PARTITION_PREMAKE = int(os.getenv("PARTITION_PREMAKE", "4"))
+# Retention windows — partitions wholly older than this are detached + dropped.
+RETENTION_1M_DAYS = int(os.getenv("RETENTION_1M_DAYS", "90"))
+RETENTION_5M_DAYS = int(os.getenv("RETENTION_5M_DAYS", "365"))
+
 # ── Logging ───────────────────────────────────────────────────────────────────
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
@@ -13,6 +13,8 @@ Schedule:
   - Every hour  : roll 1h → 1d  (captures today's in-progress daily candle)
   - Every hour  : roll 1d → 1w  (captures this week's in-progress weekly candle)
   - Every hour  : roll 1w → 1m  (captures this month's in-progress monthly candle)
+  - Every 6 h   : partition maintenance for price_candles_1m / price_candles_5m
+                  (pre-create upcoming partitions, drop expired ones)
 
 All writes are idempotent (ON CONFLICT DO UPDATE) so re-runs are safe.
 If this service crashes and restarts, it simply re-aggregates — no data loss.
@@ -34,6 +36,7 @@ from dotenv import load_dotenv
 
 import config
 from aggregator import CandleAggregator
+from partitions import PartitionManager
 
 # ── Load env ──────────────────────────────────────────────────────────────────
 load_dotenv()
@@ -78,6 +81,13 @@ def run_all_aggregations(agg: CandleAggregator) -> None:
     logger.info("─── Aggregation run complete ─────────────────────────────")
 
 
+def run_partition_maintenance(pm: PartitionManager) -> None:
+    """Keep the 1m/5m partition sets ahead of time and within retention."""
+    logger.info("─── Starting partition maintenance ──────────────────────")
+    pm.run_maintenance()
+    logger.info("─── Partition maintenance complete ───────────────────────")
+
+
 # ── Entry point ───────────────────────────────────────────────────────────────
 def main() -> None:
     db_url = config.DATABASE_URL
@@ -89,15 +99,21 @@ def main() -> None:
     logger.info("  Candle Aggregator")
     logger.info("  Rolls up 1h → 1d → 1w → 1month")
     logger.info(f"  Schedule: every {config.RUN_INTERVAL_MINUTES} minutes")
+    logger.info(f"  Partitions: every {config.PARTITION_MAINTENANCE_HOURS} hours")
     logger.info("=" * 60)
 
-    agg = CandleAggregator(db_url)
+    agg = CandleAggregator(db_url, config.REDIS_URL)
+    pm = PartitionManager(db_url)
+
+    # ── Partitions first, so inserts into 1m/5m never miss a range ──
+    run_partition_maintenance(pm)
 
     # ── Run immediately on startup so gaps are filled right away ──
     run_all_aggregations(agg)
 
     # ── Then run on schedule ──
     schedule.every(config.RUN_INTERVAL_MINUTES).minutes.do(run_all_aggregations, agg)
+    schedule.every(config.PARTITION_MAINTENANCE_HOURS).hours.do(run_partition_maintenance, pm)
 
     logger.info(f"Scheduler running — next run in {config.RUN_INTERVAL_MINUTES} min")
     while True:
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+One-off migration: convert price_candles_1m / price_candles_5m from plain
+tables to range-partitioned tables — online, in batches.
+
+Steps (per table):
+  1. Create <table>_part with the partitioned layout from sql/price_candles.sql
+     (PRIMARY KEY (coin_id, bucket), PARTITION BY RANGE (bucket)).
+  2. Create every partition needed to hold the existing rows, plus the
+     usual PARTITION_PREMAKE periods ahead.
+  3. Copy rows in bucket-ordered batches of --batch-hours, committing after
+     each one.  Readers and writers keep using the old table meanwhile.
+  4. Cut over in one short transaction: lock the old table against writes,
+     copy whatever arrived since the copy started, then swap names.
+     The old table is kept as <table>_legacy until you pass --drop-legacy.
+
+Rows older than the retention window are not copied — the partition
+manager would drop them on its next run anyway.
+
+Upserts that *modify* an already-copied bucket during step 3 are not
+re-copied; pause backfill jobs that rewrite history (populate_candle_db)
+while the migration runs.
+
+Usage:
+    DATABASE_URL=... python migrate_partitions.py
+    DATABASE_URL=... python migrate_partitions.py --tables price_candles_1m --batch-hours 6
+    DATABASE_URL=... python migrate_partitions.py --drop-legacy
+"""
+
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+
+import config
+from partitions import PARTITIONED_TABLES, PartitionManager, next_period, period_start
+
+logging.basicConfig(
+    level=getattr(logging, config.LOG_LEVEL.upper(), logging.INFO),
+    format="%(asctime)s │ %(levelname)-7s │ %(name)-20s │ %(message)s",
+    datefmt="%H:%M:%S",
+)
+logger = logging.getLogger("migrate-partitions")
+
+_COLUMNS = "id, coin_id, bucket, open, high, low, close, volume, exchange_count, tick_count, created_at"
+
+
+def _is_partitioned(cur, table: str) -> bool:
+    cur.execute(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = %s",
+        (table,),
+    )
+    return cur.fetchone() is not None
+
+
+def _create_shadow(cur, table: str) -> str:
+    """Create the empty partitioned shadow table; returns its name."""
+    shadow = f"{table}_part"
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {shadow} (
+            id              BIGINT      NOT NULL,
+            coin_id         TEXT        NOT NULL,
+            bucket          TIMESTAMPTZ NOT NULL,
+            open            NUMERIC(24, 8) NOT NULL,
+            high            NUMERIC(24, 8) NOT NULL,
+            low             NUMERIC(24, 8) NOT NULL,
+            close           NUMERIC(24, 8) NOT NULL,
+            volume          NUMERIC(24, 8) NOT NULL DEFAULT 0,
+            exchange_count  SMALLINT    NOT NULL DEFAULT 0,
+            tick_count      INT         NOT NULL DEFAULT 0,
+            created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            CONSTRAINT {shadow}_pkey PRIMARY KEY (coin_id, bucket)
+        ) PARTITION BY RANGE (bucket)
+        """
+    )
+    cur.execute(f"CREATE INDEX IF NOT EXISTS {shadow}_bucket_idx ON {shadow} (bucket DESC)")
+    return shadow
+
+
+def _copy_batch(cur, src: str, dst: str, lo: datetime, hi: datetime) -> int:
+    cur.execute(
+        f"""
+        INSERT INTO {dst} ({_COLUMNS})
+        SELECT {_COLUMNS} FROM {src}
+        WHERE bucket >= %s AND bucket < %s
+        ON CONFLICT (coin_id, bucket) DO NOTHING
+        """,
+        (lo, hi),
+    )
+    return cur.rowcount
+
+
+def migrate_table(conn, pm: PartitionManager, table: str, batch_hours: int, pause_s: float) -> None:
+    cfg = PARTITIONED_TABLES[table]
+    interval = cfg["interval"]
+    cutoff = datetime.now(timezone.utc) - timedelta(days=cfg["retention_days"])
+
+    with conn.cursor() as cur:
+        if _is_partitioned(cur, table):
+            logger.info(f"[{table}] already partitioned — nothing to do")
+            return
+
+        cur.execute(f"SELECT MIN(bucket), MAX(bucket), COUNT(*) FROM {table} WHERE bucket >= %s", (cutoff,))
+        lo, hi, total = cur.fetchone()
+        shadow = _create_shadow(cur, table)
+    conn.commit()
+
+    if total == 0:
+        lo = hi = datetime.now(timezone.utc)
+    logger.info(f"[{table}] {total} rows in retention window ({lo} → {hi})")
+
+    # Partitions for the historical range, then the regular forward window
+    pm.ensure_range(shadow, interval, lo, next_period(period_start(hi, interval), interval))
+    pm.ensure_partitions(shadow, interval, cfg["retention_days"])
+
+    # ── Batched copy ──
+    copy_started = datetime.now(timezone.utc)
+    copied = 0
+    step = timedelta(hours=batch_hours)
+    cursor_ts = lo
+    t0 = time.time()
+    while total and cursor_ts <= hi:
+        upper = cursor_ts + step
+        with conn.cursor() as cur:
+            copied += _copy_batch(cur, table, shadow, cursor_ts, upper)
+        conn.commit()
+        logger.info(f"[{table}] copied {copied}/{total} (through {upper:%Y-%m-%d %H:%M})")
+        cursor_ts = upper
+        if pause_s:
+            time.sleep(pause_s)
+    logger.info(f"[{table}] bulk copy done: {copied} rows in {time.time() - t0:.1f}s")
+
+    # ── Cut-over (writers blocked only for the delta copy + renames) ──
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL lock_timeout = '10s'")
+        cur.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute(
+            f"""
+            INSERT INTO {shadow} ({_COLUMNS})
+            SELECT {_COLUMNS} FROM {table}
+            WHERE bucket >= %s AND (bucket > %s OR created_at >= %s)
+            ON CONFLICT (coin_id, bucket) DO UPDATE SET
+                open           = EXCLUDED.open,
+                high           = EXCLUDED.high,
+                low            = EXCLUDED.low,
+                close          = EXCLUDED.close,
+                volume         = EXCLUDED.volume,
+                exchange_count = EXCLUDED.exchange_count,
+                tick_count     = EXCLUDED.tick_count
+            """,
+            (cutoff, hi, copy_started),
+        )
+        delta = cur.rowcount
+
+        # Carry the id sequence over so new rows keep getting ids
+        cur.execute("SELECT pg_get_serial_sequence(%s, 'id')", (table,))
+        seq = cur.fetchone()[0]
+
+        # Old indexes keep their names through a table rename — move them aside
+        cur.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s", (table,))
+        for (idx,) in cur.fetchall():
+            cur.execute(f"ALTER INDEX {idx} RENAME TO {idx}_legacy")
+
+        short = table.replace("price_candles_", "candles_")
+        cur.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+        cur.execute(f"ALTER TABLE {shadow} RENAME TO {table}")
+        cur.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {shadow}_pkey TO {table}_pkey")
+        cur.execute(f"ALTER INDEX {shadow}_bucket_idx RENAME TO idx_{short}_bucket")
+        if seq:
+            cur.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{seq}')")
+            cur.execute(f"ALTER SEQUENCE {seq} OWNED BY {table}.id")
+
+        # Partitions were created with the shadow prefix — give them canonical names
+        cur.execute(
+            """
+            SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+            """,
+            (table,),
+        )
+        for (child,) in cur.fetchall():
+            cur.execute(f"ALTER TABLE {child} RENAME TO {child.replace(shadow, table, 1)}")
+    conn.commit()
+    logger.info(f"[{table}] cut-over complete ({delta} delta rows); old data kept in {table}_legacy")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert 1m/5m candle tables to partitioned tables.")
+    parser.add_argument("--tables", nargs="+", default=list(PARTITIONED_TABLES), choices=list(PARTITIONED_TABLES))
+    parser.add_argument("--batch-hours", type=int, default=24, help="Bucket range copied per transaction. Default: 24")
+    parser.add_argument("--pause", type=float, default=0.2, help="Seconds to sleep between batches. Default: 0.2")
+    parser.add_argument("--drop-legacy", action="store_true", help="Drop <table>_legacy after a successful cut-over.")
+    args = parser.parse_args()
+
+    if not config.DATABASE_URL:
+        logger.error("DATABASE_URL is not set — cannot connect to Postgres.")
+        sys.exit(1)
+
+    conn = psycopg2.connect(config.DATABASE_URL)
+    pm = PartitionManager(config.DATABASE_URL)
+
+    for table in args.tables:
+        migrate_table(conn, pm, table, args.batch_hours, args.pause)
+        if args.drop_legacy:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {table}_legacy")
+            conn.commit()
+            logger.info(f"[{table}] dropped {table}_legacy")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
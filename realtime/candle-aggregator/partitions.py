@@ -0,0 +1,228 @@
+"""
+Partition maintenance for the high-resolution candle tables.
+
+price_candles_1m and price_candles_5m are declaratively range-partitioned on
+``bucket`` (see sql/price_candles.sql).  PartitionManager keeps them healthy:
+
+  - pre-creates every partition from the retention cutoff up to
+    PARTITION_PREMAKE periods in the future, so inserts never hit a
+    "no partition of relation found for row" error
+  - detaches (CONCURRENTLY, so readers/writers are not blocked) and drops
+    partitions whose whole range is older than the retention window
+
+Dropping a partition is a metadata operation — no row-by-row DELETE, no dead
+tuples for autovacuum to chase, and the disk space comes back immediately.
+
+Partition naming:
+  weekly   price_candles_1m_w20260105   (Monday the range starts on)
+  monthly  price_candles_5m_m202601     (first day of the month)
+
+All operations are idempotent; the job can run as often as you like.
+"""
+
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import psycopg2
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+# table → partition granularity + retention window
+PARTITIONED_TABLES = {
+    "price_candles_1m": {"interval": "week",  "retention_days": config.RETENTION_1M_DAYS},
+    "price_candles_5m": {"interval": "month", "retention_days": config.RETENTION_5M_DAYS},
+}
+
+# Matches the upper bound in pg_get_expr(relpartbound), e.g.
+#   FOR VALUES FROM ('2026-01-05 00:00:00+00') TO ('2026-01-12 00:00:00+00')
+_UPPER_BOUND_RE = re.compile(r"TO \('([^']+)'\)")
+
+
+# ── Period helpers ────────────────────────────────────────────────────────────
+
+def period_start(dt: datetime, interval: str) -> datetime:
+    """Round *dt* (UTC) down to the start of its week (Monday) or month."""
+    dt = dt.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == "week":
+        return dt - timedelta(days=dt.weekday())
+    if interval == "month":
+        return dt.replace(day=1)
+    raise ValueError(f"Unknown partition interval '{interval}'")
+
+
+def next_period(start: datetime, interval: str) -> datetime:
+    """Return the start of the period following *start*."""
+    if interval == "week":
+        return start + timedelta(days=7)
+    if interval == "month":
+        if start.month == 12:
+            return start.replace(year=start.year + 1, month=1)
+        return start.replace(month=start.month + 1)
+    raise ValueError(f"Unknown partition interval '{interval}'")
+
+
+def partition_name(table: str, start: datetime, interval: str) -> str:
+    if interval == "week":
+        return f"{table}_w{start:%Y%m%d}"
+    return f"{table}_m{start:%Y%m}"
+
+
+class PartitionManager:
+    """
+    Creates upcoming partitions and drops expired ones.
+
+    Uses its own autocommit connection: DETACH PARTITION … CONCURRENTLY
+    cannot run inside a transaction block, and partition DDL should never
+    be held open alongside the aggregator's long roll-up statements.
+    """
+
+    def __init__(self, db_url: str, premake: Optional[int] = None) -> None:
+        self._db_url = db_url
+        self._premake = premake if premake is not None else config.PARTITION_PREMAKE
+        self._conn: Optional[psycopg2.extensions.connection] = None
+
+    # ── Connection management ─────────────────────────────────────────────────
+
+    def _get_conn(self) -> psycopg2.extensions.connection:
+        """Return a live autocommit DB connection, reconnecting if needed."""
+        if self._conn is None or self._conn.closed:
+            logger.info("[partitions] Connecting to Postgres…")
+            try:
+                self._conn = psycopg2.connect(self._db_url)
+            except psycopg2.OperationalError as e:
+                fallback = config.DATABASE_URL_IPV4
+                if fallback and fallback != self._db_url:
+                    logger.warning(f"[partitions] Primary DB failed ({e}), trying IPv4 fallback…")
+                    self._conn = psycopg2.connect(fallback)
+                else:
+                    raise
+            self._conn.autocommit = True
+        return self._conn
+
+    def _is_partitioned(self, cur, table: str) -> bool:
+        cur.execute(
+            """
+            SELECT 1
+            FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = %s
+            """,
+            (table,),
+        )
+        return cur.fetchone() is not None
+
+    # ── Creation ──────────────────────────────────────────────────────────────
+
+    def ensure_range(self, table: str, interval: str, start: datetime, end: datetime) -> int:
+        """
+        Create every missing partition of *table* covering [start, end).
+        Returns the number of partitions created.
+        """
+        created = 0
+        conn = self._get_conn()
+        with conn.cursor() as cur:
+            p = period_start(start, interval)
+            while p < end:
+                nxt = next_period(p, interval)
+                name = partition_name(table, p, interval)
+                cur.execute("SELECT to_regclass(%s)", (name,))
+                if cur.fetchone()[0] is None:
+                    cur.execute(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                        f"FOR VALUES FROM (%s) TO (%s)",
+                        (p, nxt),
+                    )
+                    created += 1
+                    logger.info(f"[partitions] created {name} [{p:%Y-%m-%d} → {nxt:%Y-%m-%d})")
+                p = nxt
+        return created
+
+    def ensure_partitions(self, table: str, interval: str, retention_days: int) -> int:
+        """Cover [retention cutoff, now + PARTITION_PREMAKE periods)."""
+        now = datetime.now(timezone.utc)
+        start = now - timedelta(days=retention_days)
+        end = period_start(now, interval)
+        for _ in range(self._premake + 1):
+            end = next_period(end, interval)
+        return self.ensure_range(table, interval, start, end)
+
+    # ── Retention ─────────────────────────────────────────────────────────────
+
+    def drop_expired(self, table: str, retention_days: int) -> int:
+        """
+        Detach and drop partitions whose upper bound is older than the cutoff.
+        A partition is only dropped once *all* of its rows are expired.
+        Returns the number of partitions dropped.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        dropped = 0
+        conn = self._get_conn()
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = %s::regclass
+                ORDER BY c.relname
+                """,
+                (table,),
+            )
+            children = cur.fetchall()
+
+            for name, bound in children:
+                m = _UPPER_BOUND_RE.search(bound or "")
+                if not m:
+                    continue  # DEFAULT partition or unexpected bound — leave it alone
+                upper = datetime.fromisoformat(m.group(1).replace(" ", "T"))
+                if upper.tzinfo is None:
+                    upper = upper.replace(tzinfo=timezone.utc)
+                if upper > cutoff:
+                    continue
+
+                t0 = time.time()
+                try:
+                    cur.execute(f"ALTER TABLE {table} DETACH PARTITION {name} CONCURRENTLY")
+                except psycopg2.errors.ObjectNotInPrerequisiteState:
+                    # A previous concurrent detach was interrupted — finish it
+                    cur.execute(f"ALTER TABLE {table} DETACH PARTITION {name} FINALIZE")
+                cur.execute(f"DROP TABLE IF EXISTS {name}")
+                dropped += 1
+                logger.info(
+                    f"[partitions] dropped {name} (ended {upper:%Y-%m-%d}) "
+                    f"in {time.time() - t0:.2f}s"
+                )
+        return dropped
+
+    # ── Scheduled entry point ─────────────────────────────────────────────────
+
+    def run_maintenance(self) -> None:
+        """Pre-create and expire partitions for every PARTITIONED_TABLES entry."""
+        for table, cfg in PARTITIONED_TABLES.items():
+            try:
+                with self._get_conn().cursor() as cur:
+                    if not self._is_partitioned(cur, table):
+                        logger.warning(
+                            f"[partitions] {table} is not partitioned — "
+                            f"run migrate_partitions.py first; skipping"
+                        )
+                        continue
+                created = self.ensure_partitions(table, cfg["interval"], cfg["retention_days"])
+                dropped = self.drop_expired(table, cfg["retention_days"])
+                logger.info(
+                    f"[partitions] {table}: {created} created, {dropped} dropped "
+                    f"(retention {cfg['retention_days']}d, {cfg['interval']}ly)"
+                )
+            except Exception as e:
+                logger.error(f"[partitions] maintenance failed for {table}: {e}")
+                try:
+                    self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
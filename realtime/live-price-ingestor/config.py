@@ -39,11 +39,31 @@ BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "100"))   # kept for stats; no
 BATCH_INTERVAL_MS = int(os.getenv("BATCH_INTERVAL_MS", "10000"))  # 10s default; tune via env (7000–15000)
 RT_PRICE_TTL = int(os.getenv("RT_PRICE_TTL", "300"))
 
+# Where price updates are published:
+#   per_coin  rt:stream:prices:<coin_id> only (ws instances subscribe by interest)
+#   shared    rt:stream:prices only (pre-interest ws instances)
+#   both      both, for rolling upgrades — switch to per_coin once every ws
+#             instance runs with REDIS_PUBSUB_MODE=per_coin
+PRICE_CHANNEL_MODE = os.getenv("PRICE_CHANNEL_MODE", "both").lower()
+
+# Also append every published aggregate to the capped stream rt:log:prices,
+# for ws instances running REDIS_PUBSUB_MODE=stream (resumable feeds).
+# Trimmed approximately to PRICE_STREAM_MAXLEN entries.
+PRICE_STREAM_ENABLED = os.getenv("PRICE_STREAM_ENABLED", "false").lower() in ("1", "true", "yes")
+PRICE_STREAM_MAXLEN = int(os.getenv("PRICE_STREAM_MAXLEN", "100000"))
+
 # ---------------------------------------------------------------------------
 # PostgreSQL (for candle persistence)
 # ---------------------------------------------------------------------------
 DATABASE_URL      = os.getenv("DATABASE_URL")
 DATABASE_URL_IPV4 = os.getenv("DATABASE_URL_IPV4")
+CANDLE_PG_POOL_SIZE = int(os.getenv("CANDLE_PG_POOL_SIZE", "4"))
+CANDLE_PG_COMMAND_TIMEOUT_S = float(os.getenv("CANDLE_PG_COMMAND_TIMEOUT_S", "30"))
+# Bounded retries for a failed candle batch (backoff doubles each attempt)
+CANDLE_WRITE_RETRIES = int(os.getenv("CANDLE_WRITE_RETRIES", "3"))
+CANDLE_WRITE_BACKOFF_S = float(os.getenv("CANDLE_WRITE_BACKOFF_S", "0.5"))
+# Candles that still fail after all retries are appended here as JSON lines
+CANDLE_DEADLETTER_PATH = os.getenv("CANDLE_DEADLETTER_PATH", "candle_deadletter.jsonl")
 
 # ---------------------------------------------------------------------------
 # Logging & Health
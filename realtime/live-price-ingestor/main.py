@@ -178,7 +178,7 @@ async def _stats_loop():
 # Main
 # ---------------------------------------------------------------------------
 async def main():
-    global _consumer, _writer, _start_time
+    global _consumer, _writer, _candle_writer, _start_time
 
     _start_time = time.time()
 
@@ -248,6 +248,11 @@ async def main():
     for t in pending:
         t.cancel()
 
+    # The last ticks go to the candle windows on the RedisWriter's flush,
+    # and the candle writer's final flush reads vol: hashes over the
+    # RedisWriter's connection: flush, close the candle writer, then it
+    await _writer.flush()
+    await _candle_writer.close()
     await _writer.close()
     await redis_client.aclose()
 
@@ -10,11 +10,24 @@ For each coin, we keep an in-memory ``_Window`` — the running open/high/low/
 close for the current hour.  When a tick arrives whose hour bucket is
 *different* from the window's bucket, the window has just closed.  We then:
 
-  1. Look up the matching hour's traded volume from Redis (``vol:<coin_id>``
-     hash — written by the volume-aggregator, keys are minute timestamps).
-  2. Insert the completed candle into ``price_candles_1h`` in Postgres via an
-     ``ON CONFLICT DO UPDATE`` upsert so re-runs are idempotent.
-  3. Start a fresh window for the new hour.
+  1. Queue the closed window and start a fresh window for the new hour.
+  2. Once per event-loop pass, drain the queue as ONE batch: look up every
+     coin's traded volume from Redis in a single pipeline (``vol:<coin_id>``
+     hashes — written by the volume-aggregator, keys are minute timestamps).
+  3. ``COPY`` the whole batch into a temp staging table and merge it into
+     ``price_candles_1h`` with a single ``INSERT … ON CONFLICT DO UPDATE``,
+     so re-runs stay idempotent.
+
+At an hour boundary every coin closes at once; batching turns hundreds of
+serialized per-coin upserts into one COPY + one merge on a pooled asyncpg
+connection, without blocking the event loop or a thread executor.
+
+Failure handling
+================
+A failed batch is retried ``CANDLE_WRITE_RETRIES`` times with exponential
+backoff.  If it still fails, the candles are appended as JSON lines to
+``CANDLE_DEADLETTER_PATH`` so they can be replayed by hand (or patched by
+the backfill tool) instead of being silently lost.
 
 Volume lookup
 =============
@@ -23,6 +36,14 @@ The ``vol:<coin_id>`` Redis hash contains one entry per minute bucket
 for a completed hour we sum all minute buckets whose timestamp falls within
 [hour_start, hour_start + 3600).
 
+Cache invalidation
+==================
+The backend caches closed candle ranges (backend/services/candles).  After
+every merged batch the writer INCRs ``candles:ver:1h`` so those ranges are
+re-read, and the RedisWriter publishes each coin's still-forming window
+(``live_window``) to ``rt:candle:1h:<coin_id>`` for the backend to stitch
+onto them.
+
 Crash safety
 ============
 In-memory windows are lost on crash.  This means at most ONE incomplete hour
@@ -33,24 +54,64 @@ be used to patch any gaps.
 Usage
 =====
 Instantiate once in main.py, call ``update()`` on every normalized tick,
-and call ``connect()`` after the Redis client is available.
+call ``connect()`` after the Redis client is available, and ``close()`` on
+shutdown.
 """
 
 import asyncio
 import json
 import logging
 import time
-from dataclasses import dataclass, field
-from typing import Dict, Optional
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
 
-import psycopg2
-import psycopg2.extras
+import asyncpg
 import redis.asyncio as aioredis
 
 import config
 
 logger = logging.getLogger(__name__)
 
+# Staging table lives per pooled connection; ON COMMIT DELETE ROWS empties it
+# after every merge so it never needs truncating.
+_STAGE_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS candle_stage_1h (
+        coin_id     TEXT,
+        bucket      TIMESTAMPTZ,
+        open        DOUBLE PRECISION,
+        high        DOUBLE PRECISION,
+        low         DOUBLE PRECISION,
+        close       DOUBLE PRECISION,
+        volume      DOUBLE PRECISION,
+        tick_count  INT
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Bumped after each merged batch; the backend keys its candle cache on it
+VERSION_KEY = "candles:ver:1h"
+
+_STAGE_COLUMNS = ["coin_id", "bucket", "open", "high", "low", "close", "volume", "tick_count"]
+
+# DISTINCT ON guards against the same (coin, hour) appearing twice in one
+# batch, which ON CONFLICT DO UPDATE would reject.
+_MERGE_SQL = """
+    INSERT INTO price_candles_1h
+        (coin_id, bucket, open, high, low, close, volume, tick_count)
+    SELECT DISTINCT ON (coin_id, bucket)
+        coin_id, bucket, open, high, low, close, volume, tick_count
+    FROM candle_stage_1h
+    ORDER BY coin_id, bucket, tick_count DESC
+    ON CONFLICT (coin_id, bucket)
+    DO UPDATE SET
+        open       = EXCLUDED.open,
+        high       = EXCLUDED.high,
+        low        = EXCLUDED.low,
+        close      = EXCLUDED.close,
+        volume     = EXCLUDED.volume,
+        tick_count = EXCLUDED.tick_count
+"""
+
 
 # ── Helpers ────────────────────────────────────────────────────────────────────
 
@@ -59,6 +120,24 @@ def _hour_bucket(ts: float) -> int:
     return int(ts // 3600) * 3600
 
 
+def _sum_hour_volume(raw: dict, hour_bucket: int) -> float:
+    """Sum the per-minute buy/sell buckets of a vol:<coin_id> hash for one hour."""
+    total = 0.0
+    hour_end = hour_bucket + 3600
+
+    for ts_str, val_json in (raw or {}).items():
+        try:
+            minute_ts = int(ts_str)
+            if hour_bucket <= minute_ts < hour_end:
+                data = json.loads(val_json)
+                total += float(data.get("buy",  0))
+                total += float(data.get("sell", 0))
+        except (ValueError, KeyError, json.JSONDecodeError):
+            continue
+
+    return round(total, 8)
+
+
 # ── In-memory window ───────────────────────────────────────────────────────────
 
 @dataclass
@@ -90,13 +169,23 @@ class _Window:
             tick_count=1,
         )
 
+    def to_dict(self) -> dict:
+        return {
+            "bucket":     self.bucket,
+            "open":       self.open,
+            "high":       self.high,
+            "low":        self.low,
+            "close":      self.close,
+            "tick_count": self.tick_count,
+        }
+
 
 # ── Main class ─────────────────────────────────────────────────────────────────
 
 class CandleWriter:
     """
     Receives price ticks, accumulates hourly OHLCV windows, and flushes
-    completed candles to Postgres.
+    completed candles to Postgres in batches.
 
     Thread / async safety: all methods are called from the same asyncio
     event loop as RedisWriter, so no locking is needed.
@@ -105,47 +194,56 @@ class CandleWriter:
     def __init__(self) -> None:
         self._windows:    Dict[str, _Window]   = {}
         self._redis:      Optional[aioredis.Redis] = None
-        self._pg_conn:    Optional[psycopg2.extensions.connection] = None
+        self._pool:       Optional[asyncpg.Pool] = None
+        self._closing:    List[_Window] = []
+        self._flush_task: Optional[asyncio.Task] = None
         self._write_count: int = 0
+        self._batch_count: int = 0
+        self._dead_count:  int = 0
 
     # ── Lifecycle ──────────────────────────────────────────────────────────────
 
     async def connect(self, redis_client: aioredis.Redis) -> None:
-        """Store the shared Redis client and open the Postgres connection."""
+        """Store the shared Redis client and open the Postgres pool."""
         self._redis = redis_client
-        self._pg_conn = self._pg_connect()
+        self._pool = await self._pg_connect()
         logger.info("[CandleWriter] Ready")
 
-    def _pg_connect(self) -> psycopg2.extensions.connection:
-        """Connect to Postgres, trying IPv4 fallback if primary fails."""
+    async def _pg_connect(self) -> asyncpg.Pool:
+        """Open the asyncpg pool, trying IPv4 fallback if primary fails."""
         db_url = config.DATABASE_URL
         if not db_url:
             raise ValueError("DATABASE_URL is not set — CandleWriter cannot persist candles.")
+        pool_args = dict(
+            min_size=1,
+            max_size=config.CANDLE_PG_POOL_SIZE,
+            command_timeout=config.CANDLE_PG_COMMAND_TIMEOUT_S,
+            # Supabase / pgbouncer transaction pooling can't keep prepared statements
+            statement_cache_size=0,
+        )
         try:
-            conn = psycopg2.connect(db_url)
+            pool = await asyncpg.create_pool(db_url, **pool_args)
             logger.info("[CandleWriter] Connected to Postgres (primary URL)")
-            return conn
-        except psycopg2.OperationalError as e:
+            return pool
+        except (OSError, asyncpg.PostgresError) as e:
             fallback = config.DATABASE_URL_IPV4
             if fallback:
                 logger.warning(
                     f"[CandleWriter] Primary DB connection failed ({e}), "
                     "trying IPv4 fallback…"
                 )
-                conn = psycopg2.connect(fallback)
+                pool = await asyncpg.create_pool(fallback, **pool_args)
                 logger.info("[CandleWriter] Connected to Postgres (IPv4 fallback)")
-                return conn
+                return pool
             raise
 
-    def _ensure_pg(self) -> psycopg2.extensions.connection:
-        """Return a live Postgres connection, reconnecting if needed."""
-        try:
-            if self._pg_conn is None or self._pg_conn.closed:
-                raise psycopg2.OperationalError("no connection")
-            self._pg_conn.cursor().execute("SELECT 1")
-        except Exception:
-            self._pg_conn = self._pg_connect()
-        return self._pg_conn
+    async def close(self) -> None:
+        """Wait for any in-flight batch, then close the pool."""
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
 
     # ── Price tick ingestion ───────────────────────────────────────────────────
 
@@ -153,7 +251,7 @@ class CandleWriter:
         """
         Called for every normalized price tick.
         If the tick's hour differs from the current window, the window is
-        closed and flushed asynchronously.
+        queued for the next batched flush.
         """
         if price <= 0:
             return
@@ -171,112 +269,140 @@ class CandleWriter:
             # Same hour — just update OHLC
             window.update(price)
         else:
-            # Hour boundary crossed — close this window and open a new one
-            # Schedule the async flush without blocking the hot path
-            asyncio.ensure_future(self._close_window(window))
+            # Hour boundary crossed — queue this window and open a new one.
+            # One flush task drains everything that closes in this loop pass.
+            self._closing.append(window)
             self._windows[coin_id] = _Window.new(coin_id, bucket, price)
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.ensure_future(self._flush_closed())
 
-    # ── Window close & persist ─────────────────────────────────────────────────
+    def live_window(self, coin_id: str) -> Optional[dict]:
+        """The still-forming hourly window of *coin_id*, or None."""
+        window = self._windows.get(coin_id)
+        return window.to_dict() if window is not None else None
 
-    async def _close_window(self, window: _Window) -> None:
-        """Fetch volume from Redis and upsert the completed candle to Postgres."""
-        try:
-            volume = await self._get_hour_volume(window.coin_id, window.bucket)
-            await asyncio.get_event_loop().run_in_executor(
-                None, self._upsert_candle, window, volume
-            )
-        except Exception as e:
-            logger.error(
-                f"[CandleWriter] Failed to close window "
-                f"{window.coin_id}@{window.bucket}: {e}"
-            )
+    # ── Window close & persist ─────────────────────────────────────────────────
 
-    async def _get_hour_volume(self, coin_id: str, hour_bucket: int) -> float:
+    async def _flush_closed(self) -> None:
+        """Drain the closed-window queue in batches until it is empty."""
+        while self._closing:
+            batch, self._closing = self._closing, []
+            try:
+                volumes = await self._get_hour_volumes(batch)
+                rows = [
+                    (
+                        w.coin_id,
+                        datetime.fromtimestamp(w.bucket, tz=timezone.utc),
+                        w.open, w.high, w.low, w.close,
+                        volumes.get(w.coin_id, 0.0),
+                        w.tick_count,
+                    )
+                    for w in batch
+                ]
+                await self._write_with_retry(rows)
+            except Exception as e:
+                logger.error(f"[CandleWriter] Failed to close {len(batch)} windows: {e}")
+
+    async def _get_hour_volumes(self, windows: List[_Window]) -> Dict[str, float]:
         """
-        Sum all per-minute volume buckets that fall within the closed hour.
+        Sum the closed hour's per-minute volume buckets for every window,
+        fetching all ``vol:<coin_id>`` hashes in one Redis pipeline.
 
         The volume-aggregator stores vol:<coin_id> as a Redis hash where
         each field is a minute-timestamp string and the value is a JSON
         object with ``buy`` and ``sell`` keys.
         """
-        if self._redis is None:
-            return 0.0
+        if self._redis is None or not windows:
+            return {}
 
-        key = f"vol:{coin_id}"
         try:
-            raw = await self._redis.hgetall(key)
+            pipe = self._redis.pipeline(transaction=False)
+            for w in windows:
+                pipe.hgetall(f"vol:{w.coin_id}")
+            results = await pipe.execute()
         except Exception as e:
-            logger.warning(f"[CandleWriter] Redis volume lookup failed for {coin_id}: {e}")
-            return 0.0
+            logger.warning(f"[CandleWriter] Redis volume lookup failed for {len(windows)} coins: {e}")
+            return {}
 
-        total = 0.0
-        hour_end = hour_bucket + 3600
+        return {
+            w.coin_id: _sum_hour_volume(raw, w.bucket)
+            for w, raw in zip(windows, results)
+        }
 
-        for ts_str, val_json in raw.items():
+    async def _write_with_retry(self, rows: list) -> None:
+        """Write a batch with bounded retries; dead-letter it if all attempts fail."""
+        if self._pool is None:
+            logger.debug(f"[CandleWriter] No Postgres pool — dropping {len(rows)} candles")
+            return
+
+        attempts = config.CANDLE_WRITE_RETRIES + 1
+        for attempt in range(1, attempts + 1):
             try:
-                minute_ts = int(ts_str)
-                if hour_bucket <= minute_ts < hour_end:
-                    data = json.loads(val_json)
-                    total += float(data.get("buy",  0))
-                    total += float(data.get("sell", 0))
-            except (ValueError, KeyError, json.JSONDecodeError):
-                continue
-
-        return round(total, 8)
-
-    def _upsert_candle(self, window: _Window, volume: float) -> None:
-        """Write a completed 1h candle to Postgres (called in thread executor)."""
-        sql = """
-            INSERT INTO price_candles_1h
-                (coin_id, bucket, open, high, low, close, volume, tick_count)
-            VALUES
-                (%s,
-                 to_timestamp(%s) AT TIME ZONE 'UTC',
-                 %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (coin_id, bucket)
-            DO UPDATE SET
-                open       = EXCLUDED.open,
-                high       = EXCLUDED.high,
-                low        = EXCLUDED.low,
-                close      = EXCLUDED.close,
-                volume     = EXCLUDED.volume,
-                tick_count = EXCLUDED.tick_count
-        """
-        params = (
-            window.coin_id,
-            window.bucket,
-            window.open,
-            window.high,
-            window.low,
-            window.close,
-            volume,
-            window.tick_count,
-        )
+                t0 = time.time()
+                await self._write_batch(rows)
+                self._write_count += len(rows)
+                self._batch_count += 1
+                logger.info(
+                    f"[CandleWriter] ✓ {len(rows)} candles merged "
+                    f"in {(time.time() - t0) * 1000:.0f}ms"
+                )
+                await self._bump_version()
+                return
+            except Exception as e:
+                if attempt == attempts:
+                    logger.error(
+                        f"[CandleWriter] Batch of {len(rows)} failed after "
+                        f"{attempts} attempts: {e} — dead-lettering"
+                    )
+                    self._dead_letter(rows, str(e))
+                    return
+                delay = config.CANDLE_WRITE_BACKOFF_S * (2 ** (attempt - 1))
+                logger.warning(
+                    f"[CandleWriter] Batch write failed (attempt {attempt}/{attempts}): "
+                    f"{e} — retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
 
+    async def _bump_version(self) -> None:
+        """Tell the backend's candle cache that new buckets were committed."""
+        if self._redis is None:
+            return
         try:
-            conn = self._ensure_pg()
-            with conn.cursor() as cur:
-                cur.execute(sql, params)
-            conn.commit()
-            self._write_count += 1
-            logger.info(
-                f"[CandleWriter] ✓ {window.coin_id} "
-                f"bucket={window.bucket} "
-                f"O={window.open} H={window.high} L={window.low} C={window.close} "
-                f"vol={volume} ticks={window.tick_count}"
-            )
+            await self._redis.incr(VERSION_KEY)
         except Exception as e:
-            logger.error(f"[CandleWriter] Postgres upsert failed: {e}")
-            try:
-                self._pg_conn.rollback()
-            except Exception:
-                self._pg_conn = None
+            logger.warning(f"[CandleWriter] Could not bump {VERSION_KEY}: {e}")
+
+    async def _write_batch(self, rows: list) -> None:
+        """COPY rows into the temp staging table and merge them in one statement."""
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(_STAGE_DDL)
+                await conn.copy_records_to_table(
+                    "candle_stage_1h", records=rows, columns=_STAGE_COLUMNS
+                )
+                await conn.execute(_MERGE_SQL)
+
+    def _dead_letter(self, rows: list, error: str) -> None:
+        """Append undeliverable candles as JSON lines for later replay."""
+        try:
+            with open(config.CANDLE_DEADLETTER_PATH, "a", encoding="utf-8") as f:
+                for row in rows:
+                    record = dict(zip(_STAGE_COLUMNS, row))
+                    record["bucket"] = record["bucket"].isoformat()
+                    record["error"] = error
+                    f.write(json.dumps(record) + "\n")
+            self._dead_count += len(rows)
+        except OSError as e:
+            logger.error(f"[CandleWriter] Could not write dead-letter file: {e}")
 
     # ── Stats ──────────────────────────────────────────────────────────────────
 
     @property
     def stats(self) -> dict:
         return {
-            "open_windows":  len(self._windows),
+            "open_windows":    len(self._windows),
+            "pending_windows": len(self._closing),
             "candles_written": self._write_count,
+            "batches_written": self._batch_count,
+            "dead_lettered":   self._dead_count,
         }
@@ -6,9 +6,26 @@ to Redis using pipelining for maximum efficiency.
 
 Redis key schema (production):
   rt:coin:<coin_id>                 → consolidated JSON cache entry per coin
-
-Pub/sub channel:
-  rt:stream:prices                  → aggregate updates for WebSocket service
+  rt:candle:1h:<coin_id>            → the coin's still-forming hourly candle
+                                      (with a CandleWriter wired in); the
+                                      backend stitches it onto cached ranges
+  rt:coins                          → SET of the coin_ids with an rt:coin
+                                      entry (may name expired ones); lists
+                                      them for the backend's /prices/all
+  rt:seq:prices                     → counter bumped by every flush that
+                                      wrote rt:coin entries, after them; the
+                                      backend's /prices ETag
+
+Pub/sub channels (see config.PRICE_CHANNEL_MODE):
+  rt:stream:prices:<coin_id>        → aggregate updates for one coin; ws
+                                      instances subscribe only to coins
+                                      their clients watch
+  rt:stream:prices                  → every coin's updates (legacy)
+
+Stream (config.PRICE_STREAM_ENABLED):
+  rt:log:prices                     → capped log of the same aggregates
+                                      ({"data": <json>}); read with XREAD
+                                      by ws instances in stream mode
 """
 
 import asyncio
@@ -39,6 +56,21 @@ _MIN_PRICE_CHANGE_PCT = float(getattr(config, "MIN_PRICE_CHANGE_PCT", "0.0001"))
 # Last published avg_price per coin — used for dedup
 _last_published: dict[str, float] = {}
 
+PRICE_CHANNEL = "rt:stream:prices"
+PRICE_STREAM = "rt:log:prices"
+COIN_INDEX = "rt:coins"
+PRICE_SEQ = "rt:seq:prices"
+
+
+def _price_channels(coin_id: str) -> tuple:
+    """Pub/sub channels an update for *coin_id* goes to."""
+    mode = config.PRICE_CHANNEL_MODE
+    if mode == "shared":
+        return (PRICE_CHANNEL,)
+    if mode == "per_coin":
+        return (f"{PRICE_CHANNEL}:{coin_id}",)
+    return (f"{PRICE_CHANNEL}:{coin_id}", PRICE_CHANNEL)
+
 
 class RedisWriter:
     """
@@ -113,10 +145,12 @@ class RedisWriter:
                 for tick in batch:
                     tick_data = json.dumps(tick.to_dict())
                     pipe.setex(f"rt:price:{tick.coin_id}", ttl, tick_data)
-                    pipe.publish("rt:stream:prices", tick_data)
+                    for channel in _price_channels(tick.coin_id):
+                        pipe.publish(channel, tick_data)
                     pipe.setex(f"rt:ticker:{tick.exchange}:{tick.coin_id}", ttl, tick_data)
 
             # ── Production: aggregates (one JSON key per coin) ──
+            written = []
             for coin_id in updated_coins:
                 agg = self._aggregator.get_aggregates(coin_id)
                 if not agg:
@@ -149,6 +183,12 @@ class RedisWriter:
                     "timestamp": now,
                 })
                 pipe.setex(f"rt:coin:{coin_id}", ttl, coin_data)
+                written.append(coin_id)
+
+                if self._candle_writer is not None:
+                    window = self._candle_writer.live_window(coin_id)
+                    if window is not None:
+                        pipe.setex(f"rt:candle:1h:{coin_id}", ttl, json.dumps(window))
 
                 # Only publish to pub/sub if price moved enough (saves Upstash bandwidth)
                 last_price = _last_published.get(coin_id)
@@ -168,7 +208,18 @@ class RedisWriter:
                         "timestamp": now,
                         "published_at": int(time.time() * 1000),
                     })
-                    pipe.publish("rt:stream:prices", agg_msg)
+                    for channel in _price_channels(coin_id):
+                        pipe.publish(channel, agg_msg)
+                    if config.PRICE_STREAM_ENABLED:
+                        pipe.xadd(PRICE_STREAM, {"data": agg_msg},
+                                  maxlen=config.PRICE_STREAM_MAXLEN, approximate=True)
+
+            # Queued after the entries, so a reader that sees the new
+            # sequence number also sees what it stands for
+            if written:
+                pipe.sadd(COIN_INDEX, *written)
+                pipe.expire(COIN_INDEX, ttl)
+                pipe.incr(PRICE_SEQ)
 
             await pipe.execute()
 
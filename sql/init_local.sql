@@ -207,7 +207,7 @@ CREATE TABLE IF NOT EXISTS news_cache (
 
 -- ── 6. Price candles (one table per resolution) ─────────────────────────────
 CREATE TABLE IF NOT EXISTS price_candles_1m (
-    id             BIGSERIAL PRIMARY KEY,
+    id             BIGSERIAL,
     coin_id        TEXT NOT NULL,
     bucket         TIMESTAMPTZ NOT NULL,
     open           NUMERIC(24, 8) NOT NULL,
@@ -217,13 +217,13 @@ CREATE TABLE IF NOT EXISTS price_candles_1m (
     volume         NUMERIC(24, 8) NOT NULL DEFAULT 0,
     exchange_count SMALLINT NOT NULL DEFAULT 0,
     tick_count     INT NOT NULL DEFAULT 0,
-    created_at     TIMESTAMPTZ NOT NULL DEFAULT NOW()
-);
-CREATE UNIQUE INDEX IF NOT EXISTS uidx_candles_1m_coin_bucket ON price_candles_1m (coin_id, bucket);
+    created_at     TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (coin_id, bucket)
+) PARTITION BY RANGE (bucket);  -- partitions managed by candle-aggregator
 CREATE INDEX IF NOT EXISTS idx_candles_1m_bucket ON price_candles_1m (bucket DESC);
 
 CREATE TABLE IF NOT EXISTS price_candles_5m (
-    id             BIGSERIAL PRIMARY KEY,
+    id             BIGSERIAL,
     coin_id        TEXT NOT NULL,
     bucket         TIMESTAMPTZ NOT NULL,
     open           NUMERIC(24, 8) NOT NULL,
@@ -233,9 +233,9 @@ CREATE TABLE IF NOT EXISTS price_candles_5m (
     volume         NUMERIC(24, 8) NOT NULL DEFAULT 0,
     exchange_count SMALLINT NOT NULL DEFAULT 0,
     tick_count     INT NOT NULL DEFAULT 0,
-    created_at     TIMESTAMPTZ NOT NULL DEFAULT NOW()
-);
-CREATE UNIQUE INDEX IF NOT EXISTS uidx_candles_5m_coin_bucket ON price_candles_5m (coin_id, bucket);
+    created_at     TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (coin_id, bucket)
+) PARTITION BY RANGE (bucket);  -- partitions managed by candle-aggregator
 CREATE INDEX IF NOT EXISTS idx_candles_5m_bucket ON price_candles_5m (bucket DESC);
 
 CREATE TABLE IF NOT EXISTS price_candles_1h (
@@ -14,13 +14,25 @@
 --   price_candles_5m  — keep 1 year   (~5.3M rows)
 --   price_candles_1h  — keep 5 years  (~2.2M rows)
 --   price_candles_1d  — keep forever  (~90K rows/year)
+--
+-- Partitioning:
+--   price_candles_1m and price_candles_5m are range-partitioned on bucket
+--   (1m → weekly partitions, 5m → monthly partitions).  Retention is enforced
+--   by the candle-aggregator's PartitionManager, which pre-creates upcoming
+--   partitions and detaches + drops expired ones — no bulk DELETEs, no bloat.
+--   Partitioned tables need the partition key in every unique constraint, so
+--   (coin_id, bucket) is the primary key and `id` is a plain surrogate column.
+--
+--   Existing unpartitioned databases: run
+--     realtime/candle-aggregator/migrate_partitions.py
+--   to convert in place (batched copy + short cut-over lock).
 -- =============================================================================
 
 -- ---------------------------------------------------------------------------
 -- 1-minute candles
 -- ---------------------------------------------------------------------------
 CREATE TABLE IF NOT EXISTS price_candles_1m (
-    id          BIGSERIAL   PRIMARY KEY,
+    id          BIGSERIAL,
     coin_id     TEXT        NOT NULL,               -- e.g. "bitcoin"
     bucket      TIMESTAMPTZ NOT NULL,               -- start of the 1-min window (truncated)
     open        NUMERIC(24, 8) NOT NULL,
@@ -30,20 +42,23 @@ CREATE TABLE IF NOT EXISTS price_candles_1m (
     volume      NUMERIC(24, 8) NOT NULL DEFAULT 0,  -- trade volume in base coin units
     exchange_count  SMALLINT NOT NULL DEFAULT 0,    -- how many exchanges contributed
     tick_count  INT         NOT NULL DEFAULT 0,     -- raw price ticks aggregated
-    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
-);
-
-CREATE UNIQUE INDEX IF NOT EXISTS uidx_candles_1m_coin_bucket
-    ON price_candles_1m (coin_id, bucket);
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (coin_id, bucket)
+) PARTITION BY RANGE (bucket);
 
 CREATE INDEX IF NOT EXISTS idx_candles_1m_bucket
     ON price_candles_1m (bucket DESC);
 
+-- Partitions (weekly) are created by the candle-aggregator's PartitionManager
+-- on startup and every maintenance run.  There is deliberately no DEFAULT
+-- partition: it would block DETACH … CONCURRENTLY and silently collect rows
+-- that fall outside the retention window.
+
 -- ---------------------------------------------------------------------------
 -- 5-minute candles
 -- ---------------------------------------------------------------------------
 CREATE TABLE IF NOT EXISTS price_candles_5m (
-    id          BIGSERIAL   PRIMARY KEY,
+    id          BIGSERIAL,
     coin_id     TEXT        NOT NULL,
     bucket      TIMESTAMPTZ NOT NULL,
     open        NUMERIC(24, 8) NOT NULL,
@@ -53,15 +68,18 @@ CREATE TABLE IF NOT EXISTS price_candles_5m (
     volume      NUMERIC(24, 8) NOT NULL DEFAULT 0,
     exchange_count  SMALLINT NOT NULL DEFAULT 0,
     tick_count  INT         NOT NULL DEFAULT 0,
-    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
-);
-
-CREATE UNIQUE INDEX IF NOT EXISTS uidx_candles_5m_coin_bucket
-    ON price_candles_5m (coin_id, bucket);
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (coin_id, bucket)
+) PARTITION BY RANGE (bucket);
 
 CREATE INDEX IF NOT EXISTS idx_candles_5m_bucket
     ON price_candles_5m (bucket DESC);
 
+-- Partitions (monthly) are created by the candle-aggregator's PartitionManager
+-- on startup and every maintenance run.  There is deliberately no DEFAULT
+-- partition: it would block DETACH … CONCURRENTLY and silently collect rows
+-- that fall outside the retention window.
+
 -- ---------------------------------------------------------------------------
 -- 1-hour candles
 -- ---------------------------------------------------------------------------
@@ -172,10 +190,10 @@ UNION ALL
 SELECT 'price_candles_1month', COUNT(*) FROM price_candles_1month;
 
 -- ---------------------------------------------------------------------------
--- Retention cleanup queries (run via cron or a scheduled task)
--- Adjust intervals to match your retention policy above.
+-- Retention cleanup
+-- 1m / 5m: handled automatically by dropping whole partitions (see
+--          realtime/candle-aggregator/partitions.py, RETENTION_*_DAYS).
+-- 1h:      still unpartitioned — run via cron or a scheduled task.
 -- ---------------------------------------------------------------------------
--- DELETE FROM price_candles_1m WHERE bucket < NOW() - INTERVAL '90 days';
--- DELETE FROM price_candles_5m WHERE bucket < NOW() - INTERVAL '1 year';
 -- DELETE FROM price_candles_1h WHERE bucket < NOW() - INTERVAL '5 years';
 -- (1d candles — keep forever, no cleanup needed)
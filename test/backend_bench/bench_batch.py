@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+A list page of --ids coins: one request per coin vs. one batch request.
+
+Seeds --ids synthetic coins (bench-coin-N) into rating_scores,
+market_data and news_cache, plus a vol:bench-coin-N hash each, then for
+each resource (rating, market, news, volume) fetches all of them through
+the Flask app --reps times per pattern:
+
+  single     GET /api/<resource>/<coin> for each coin, in sequence (what
+             the frontend did for a list page)
+  batch      GET /api/<resource>?ids=<all of them>
+
+with Redis warm (every key cached) and, for rating/market/news, cold
+(their Redis keys deleted before each rep, so misses fall back to SQL and
+are written back).  Reports, per pattern, the time to fetch the whole
+list, and the Redis commands and SQL queries it took.
+
+--rtt-ms routes Redis and Postgres through local proxies that add that
+round-trip time (hosted Redis and Postgres), where the per-coin round
+trips dominate.
+
+Usage (local Postgres and Redis only — inserts and deletes bench-coin-*):
+    docker compose -f docker-compose.db.yml up -d
+    docker run --rm -p 6379:6379 redis:7
+    python test/backend_bench/bench_batch.py
+    python test/backend_bench/bench_batch.py --ids 100 --rtt-ms 5
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import time
+
+import harness  # also puts backend/ on sys.path
+
+import psycopg2
+import psycopg2.extras
+import redis
+
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+COIN_PREFIX = "bench-coin-"
+
+# resource → Redis key prefix of its cache (volume has no SQL behind it)
+CACHE_KEYS = {
+    "rating": "crypto:rating:",
+    "market": "crypto:market:",
+    "news":   "crypto:news:",
+    "volume": None,
+}
+
+
+def seed(database_url: str, r: redis.Redis, coins: list[str]) -> None:
+    conn = psycopg2.connect(database_url)
+    with conn, conn.cursor() as cur:
+        cleanup(cur, r, coins)
+        psycopg2.extras.execute_values(
+            cur,
+            "INSERT INTO rating_scores (coin_id, coin_symbol, overall_score, automated_score, risk_level) VALUES %s",
+            [(c, f"B{i}", 60.0, 40.0, "Moderate") for i, c in enumerate(coins)],
+        )
+        psycopg2.extras.execute_values(
+            cur,
+            "INSERT INTO market_data (coin_id, price_usd, market_cap, circulating_supply) VALUES %s",
+            [(c, random.uniform(1, 1000), random.uniform(1e6, 1e9), random.uniform(1e6, 1e8)) for c in coins],
+        )
+        articles = json.dumps([{"title": f"Headline {n}", "url": f"https://example.com/{n}",
+                                "source": "Example", "published_at": "2026-01-01T00:00:00Z"}
+                               for n in range(4)])
+        psycopg2.extras.execute_values(
+            cur,
+            "INSERT INTO news_cache (coin_id, articles) VALUES %s",
+            [(c, articles) for c in coins],
+        )
+    conn.close()
+
+    minute = int(time.time()) // 60 * 60
+    pipe = r.pipeline(transaction=False)
+    for c in coins:
+        pipe.hset(f"vol:{c}", mapping={
+            str(minute - 60 * m): json.dumps({"b": random.uniform(0, 10), "s": random.uniform(0, 10),
+                                              "ex": ["binance", "coinbase"]})
+            for m in range(60)
+        })
+    pipe.execute()
+
+
+def cleanup(cur, r: redis.Redis, coins: list[str]) -> None:
+    for table in ("rating_scores", "market_data", "news_cache"):
+        cur.execute(f"DELETE FROM {table} WHERE coin_id LIKE %s", (COIN_PREFIX + "%",))
+    r.delete(*[f"{prefix or 'vol:'}{c}" for prefix in CACHE_KEYS.values() for c in coins])
+
+
+def count_sql() -> list:
+    """Count the fetchone/fetchall calls that reach the shared pool."""
+    from db import get_pool
+    pool = get_pool()
+    calls = [0]
+    for name in ("fetchone", "fetchall"):
+        fn = getattr(pool, name)
+
+        def counted(*a, _fn=fn, **kw):
+            calls[0] += 1
+            return _fn(*a, **kw)
+        setattr(pool, name, counted)
+    return calls
+
+
+def commands_processed(r: redis.Redis) -> int:
+    return int(r.info("stats")["total_commands_processed"])
+
+
+def fetch_list(client, resource: str, coins: list[str], batch: bool) -> None:
+    if batch:
+        resp = client.get(f"/api/{resource}?ids={','.join(coins)}")
+        if resp.status_code != 200 or resp.get_json()["missing"]:
+            raise RuntimeError(f"{resource} batch: {resp.status_code} {resp.get_json()}")
+        return
+    for c in coins:
+        resp = client.get(f"/api/{resource}/{c}")
+        if resp.status_code != 200:
+            raise RuntimeError(f"{resource}/{c}: {resp.status_code}")
+
+
+def run(client, admin: redis.Redis, sql_calls: list, resource: str, coins: list[str],
+        batch: bool, cold: bool, reps: int) -> None:
+    prefix = CACHE_KEYS[resource]
+    times, commands, queries = [], 0, 0
+    for _ in range(reps):
+        if cold:
+            admin.delete(*[f"{prefix}{c}" for c in coins])
+        before_cmds, before_sql = commands_processed(admin), sql_calls[0]
+        t0 = time.perf_counter()
+        fetch_list(client, resource, coins, batch)
+        times.append((time.perf_counter() - t0) * 1000)
+        # Minus the INFO call itself
+        commands += commands_processed(admin) - before_cmds - 1
+        queries += sql_calls[0] - before_sql
+    label = f"{'batch' if batch else 'single'} ({'cold' if cold else 'warm'})"
+    p = harness.percentiles(times)
+    print(f"  {label:<15} p50={p['p50']:8.2f}ms  max={p['max']:8.2f}ms  "
+          f"{commands / reps:6.0f} Redis commands  {queries / reps:5.0f} SQL queries  (per list)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="A list page: one request per coin vs. one batch request.")
+    parser.add_argument("--ids", type=int, default=100, help="Coins per list (at most BATCH_MAX_IDS)")
+    parser.add_argument("--reps", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Added Redis and Postgres round-trip time")
+    parser.add_argument("--resources", default="rating,market,news,volume")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows and keys")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL", harness.DEFAULT_DATABASE_URL)
+    redis_url = os.getenv("REDIS_URL") or DEFAULT_REDIS_URL
+    admin = redis.from_url(redis_url, decode_responses=True)
+    coins = [f"{COIN_PREFIX}{i}" for i in range(args.ids)]
+    print(f"Seeding {len(coins)} coins...")
+    seed(database_url, admin, coins)
+
+    if args.rtt_ms:
+        os.environ["DATABASE_URL"] = harness.proxied_url(database_url, args.rtt_ms)
+        os.environ["REDIS_URL"] = harness.proxied_url(redis_url, args.rtt_ms, default_port=6379)
+    else:
+        os.environ["DATABASE_URL"] = database_url
+        os.environ["REDIS_URL"] = redis_url
+    client = harness.make_app(redis=True).test_client()
+    logging.disable(logging.WARNING)
+    sql_calls = count_sql()
+
+    try:
+        for resource in args.resources.split(","):
+            print(f"\n── {resource}: {len(coins)} coins, rtt +{args.rtt_ms}ms, {args.reps} lists per pattern")
+            # One unmeasured pass warms Redis (write-back) and the pools
+            fetch_list(client, resource, coins, batch=True)
+            for batch in (False, True):
+                run(client, admin, sql_calls, resource, coins, batch, cold=False, reps=args.reps)
+            if CACHE_KEYS[resource]:
+                for batch in (False, True):
+                    run(client, admin, sql_calls, resource, coins, batch, cold=True, reps=args.reps)
+    finally:
+        if not args.keep:
+            conn = psycopg2.connect(database_url)
+            with conn, conn.cursor() as cur:
+                cleanup(cur, admin, coins)
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
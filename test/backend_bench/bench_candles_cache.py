@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+/api/candles under a chart-like request mix: uncached vs. the tiered cache.
+
+Seeds --coins synthetic coins (bench-coin-N) into price_candles_1h, _1d
+and _1w, then for each --threads count runs this mix through the Flask app
+for --duration seconds:
+
+  - coins drawn Zipf(--zipf-s): a few popular coins take most requests
+  - resolution 1h 60%, 1d 30%, 1w 10%
+  - limit 200 (the frontend default) 70%, otherwise 50..1000
+
+once per variant:
+
+  nocache     the pre-cache path: every request runs the SQL query
+  l1          the in-process LRU only (Redis disabled: REDIS_URL="")
+  l1+redis    LRU + Redis tier + version/live-window MGET (needs a local
+              Redis; skipped if none answers)
+
+and reports requests/s, latency percentiles, how many requests reached
+Postgres and the L1 hit rate.  --bump-hz INCRs candles:ver:1h that often
+(what the CandleWriter does after each batch) to show the cost of
+invalidation in l1+redis.
+
+Usage (local Postgres only — inserts and deletes bench-coin-* rows):
+    docker compose -f docker-compose.db.yml up -d
+    python test/backend_bench/bench_candles_cache.py
+    python test/backend_bench/bench_candles_cache.py --threads 4,16 --rtt-ms 20
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+import harness  # also puts backend/ on sys.path
+
+import psycopg2
+import psycopg2.extras
+
+COIN_PREFIX = "bench-coin-"
+TABLES = {"1h": ("price_candles_1h", 3600), "1d": ("price_candles_1d", 86_400), "1w": ("price_candles_1w", 7 * 86_400)}
+RESOLUTION_MIX = (("1h", 0.6), ("1d", 0.3), ("1w", 0.1))
+
+
+# ── Seed data ───────────────────────────────────────────────────────────────
+
+def seed(database_url: str, coins: int, rows_per_table: int) -> None:
+    import services.candles.main as candles
+    conn = psycopg2.connect(database_url)
+    now = time.time()
+    with conn, conn.cursor() as cur:
+        cleanup(cur)
+        for i in range(coins):
+            coin = f"{COIN_PREFIX}{i}"
+            for resolution, (table, step) in TABLES.items():
+                # Closed buckets only, ending just before the forming one
+                end = candles.bucket_start(resolution, now)
+                price = random.uniform(1, 1000)
+                rows = []
+                for n in range(rows_per_table, 0, -1):
+                    price *= 1 + random.uniform(-0.01, 0.01)
+                    bucket = datetime.fromtimestamp(end - n * step, tz=timezone.utc)
+                    rows.append((coin, bucket, price, price * 1.01, price * 0.99, price, 1000.0))
+                psycopg2.extras.execute_values(
+                    cur,
+                    f"INSERT INTO {table} (coin_id, bucket, open, high, low, close, volume) VALUES %s "
+                    f"ON CONFLICT DO NOTHING",
+                    rows,
+                )
+    conn.close()
+
+
+def cleanup(cur) -> None:
+    for table, _ in TABLES.values():
+        cur.execute(f"DELETE FROM {table} WHERE coin_id LIKE %s", (COIN_PREFIX + "%",))
+
+
+def zipf_cum_weights(n: int, s: float) -> list:
+    return list(itertools.accumulate(1 / (k ** s) for k in range(1, n + 1)))
+
+
+# ── Variants ────────────────────────────────────────────────────────────────
+
+def install(variant: str, redis_url: str) -> bool:
+    """Point /api/candles at *variant*; False if it cannot run here."""
+    import db.redis_client
+    import routes.candles
+    import services.candles.main as candles
+    from services.candles.sources import sql
+
+    candles._l1.clear()
+    candles._l1.hits = candles._l1.misses = candles._l1.evictions = 0
+    os.environ["REDIS_URL"] = redis_url if variant == "l1+redis" else ""
+    db.redis_client._client = None
+
+    if variant == "nocache":
+        routes.candles.get_candles = lambda c, r, limit: sql.get(
+            c.lower().strip(), r, min(max(1, limit), candles.MAX_LIMIT))
+        return True
+    routes.candles.get_candles = candles.get_candles
+    if variant == "l1+redis":
+        try:
+            db.redis_client.get_redis().ping()
+        except Exception as exc:
+            print(f"\n  {variant:<9} skipped: no Redis at {redis_url} ({exc})")
+            return False
+    return True
+
+
+def count_sql() -> list:
+    """Wrap sql.fetch (which sql.get also calls) to count the requests that reach Postgres."""
+    from services.candles.sources import sql
+    fn = getattr(sql.fetch, "__wrapped__", sql.fetch)
+    calls = [0]
+
+    def counted(*a, **kw):
+        calls[0] += 1
+        return fn(*a, **kw)
+    counted.__wrapped__ = fn
+    sql.fetch = counted
+    return calls
+
+
+def bump_loop(redis_url: str, hz: float, stop: threading.Event) -> None:
+    import redis
+    r = redis.from_url(redis_url)
+    while not stop.wait(1 / hz):
+        r.incr("candles:ver:1h")
+
+
+# ── Driver ──────────────────────────────────────────────────────────────────
+
+def run_variant(app, variant: str, args, threads: int, redis_url: str) -> None:
+    import services.candles.main as candles
+    if not install(variant, redis_url):
+        return
+    sql_calls = count_sql()
+    cum_weights = zipf_cum_weights(args.coins, args.zipf_s)
+    coins = [f"{COIN_PREFIX}{i}" for i in range(args.coins)]
+    resolutions, res_weights = zip(*RESOLUTION_MIX)
+
+    def request(rnd: random.Random) -> str:
+        coin = rnd.choices(coins, cum_weights=cum_weights)[0]
+        resolution = rnd.choices(resolutions, res_weights)[0]
+        limit = 200 if rnd.random() < 0.7 else rnd.randrange(50, 1001)
+        resp = app.test_client().get(f"/api/candles/{coin}?resolution={resolution}&limit={limit}")
+        if resp.status_code != 200:
+            raise RuntimeError(f"{resp.status_code}")
+        return resolution
+
+    stop = threading.Event()
+    if variant == "l1+redis" and args.bump_hz:
+        threading.Thread(target=bump_loop, args=(redis_url, args.bump_hz, stop), daemon=True).start()
+    result = harness.run_threads(request, threads, args.duration)
+    stop.set()
+
+    all_samples = [x for samples in result["latency_ms"].values() for x in samples]
+    print(f"\n  {variant:<9} {threads:>3} threads: {result['rps']:8.0f} req/s  "
+          f"({result['errors']} errors), {sql_calls[0]} SQL queries "
+          f"({sql_calls[0] / max(result['requests'], 1):.1%} of requests)")
+    print(harness.fmt_pct("all", all_samples))
+    for label, samples in sorted(result["latency_ms"].items()):
+        print(harness.fmt_pct(label, samples))
+    if variant != "nocache":
+        s = candles.cache_stats()
+        print(f"  l1: {s['entries']} entries, hit rate {s['hit_rate']:.1%}, {s['evictions']} evictions")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="/api/candles: uncached vs. tiered cache.")
+    parser.add_argument("--threads", default="4,16")
+    parser.add_argument("--coins", type=int, default=300)
+    parser.add_argument("--zipf-s", type=float, default=1.1)
+    parser.add_argument("--rows", type=int, default=1000, help="Candles per coin per table")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Added database round-trip time")
+    parser.add_argument("--bump-hz", type=float, default=0.0, help="candles:ver:1h INCRs per second")
+    parser.add_argument("--variants", default="nocache,l1,l1+redis")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL", harness.DEFAULT_DATABASE_URL)
+    redis_url = os.getenv("REDIS_URL") or "redis://localhost:6379/0"
+    print(f"Seeding {args.coins} coins × {args.rows} candles × {len(TABLES)} resolutions...")
+    seed(database_url, args.coins, args.rows)
+    if args.rtt_ms:
+        os.environ["DATABASE_URL"] = harness.proxied_url(database_url, args.rtt_ms)
+    app = harness.make_app()
+    logging.disable(logging.WARNING)
+
+    try:
+        for threads in (int(t) for t in args.threads.split(",")):
+            print(f"\n── {threads} threads, rtt +{args.rtt_ms}ms, zipf s={args.zipf_s}")
+            for variant in args.variants.split(","):
+                run_variant(app, variant, args, threads, redis_url)
+    finally:
+        if not args.keep:
+            conn = psycopg2.connect(database_url)
+            with conn, conn.cursor() as cur:
+                cleanup(cur)
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
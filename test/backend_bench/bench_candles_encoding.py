@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Candle response encoding: build + serialize time and wire size.
+
+For each --sizes candle count, builds a synthetic cursor result and
+times, per variant, the work between the cursor and the response body:
+
+  legacy          dict rows (RealDictCursor, Decimal prices, datetime
+                  buckets) → per-field float()/timestamp() → stdlib json
+                  as Flask's jsonify runs it (sorted keys, compact)
+  rows/orjson     float8/bigint tuple rows (the cast queries) →
+                  [{time, open, ...}] → orjson
+  columnar/orjson tuple rows → {t, o, h, l, c, v} arrays → orjson
+
+then reports the body size raw, gzipped (--gzip-level) and, if the
+brotli package is installed, brotli'd (--brotli-quality), with
+compression time.  The defaults match backend/routes/encoding.py.
+No database needed.
+
+Usage:
+    python test/backend_bench/bench_candles_encoding.py
+    python test/backend_bench/bench_candles_encoding.py --sizes 1000,10000 --reps 50
+"""
+
+import argparse
+import gzip
+import json
+import random
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import harness  # also puts backend/ on sys.path
+
+import orjson
+
+from services.candles.sources.sql import _to_candles, _to_columns
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def synthetic_rows(n: int) -> tuple[list, list]:
+    """(legacy dict rows, tuple rows), newest first like the queries."""
+    start = int(time.time() // 3600) * 3600 - n * 3600
+    price = 30_000.0
+    legacy, rows = [], []
+    for i in range(n):
+        price *= 1 + random.uniform(-0.01, 0.01)
+        # 8 decimals, as stored (numeric columns)
+        o, h, l, c, v = (round(x, 8) for x in (price, price * 1.004, price * 0.996, price * 1.001,
+                                                random.uniform(10, 5000)))
+        ts = start + i * 3600
+        rows.append((ts, o, h, l, c, v))
+        legacy.append({
+            "bucket": datetime.fromtimestamp(ts, tz=timezone.utc),
+            "open": Decimal(f"{o:.8f}"), "high": Decimal(f"{h:.8f}"), "low": Decimal(f"{l:.8f}"),
+            "close": Decimal(f"{c:.8f}"), "volume": Decimal(f"{v:.8f}"),
+        })
+    return legacy[::-1], rows[::-1]
+
+
+def legacy_body(legacy_rows: list) -> bytes:
+    candles = [{
+        "time":   int(row["bucket"].timestamp()),
+        "open":   float(row["open"]),
+        "high":   float(row["high"]),
+        "low":    float(row["low"]),
+        "close":  float(row["close"]),
+        "volume": float(row["volume"]),
+    } for row in reversed(legacy_rows)]
+    payload = {"coin_id": "bench", "resolution": "1h", "count": len(candles), "candles": candles}
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+
+
+def rows_body(rows: list) -> bytes:
+    candles = _to_candles(rows)
+    return orjson.dumps({"coin_id": "bench", "resolution": "1h", "count": len(candles),
+                         "format": "rows", "candles": candles})
+
+
+def columnar_body(rows: list) -> bytes:
+    cols = _to_columns(rows)
+    return orjson.dumps({"coin_id": "bench", "resolution": "1h", "count": len(cols["t"]),
+                         "format": "columnar", "candles": cols})
+
+
+def timed(fn, arg, reps: int) -> tuple[bytes, float]:
+    best = float("inf")
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        out = fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return out, best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Candle response build/serialize time and wire size.")
+    parser.add_argument("--sizes", default="1000,5000,10000")
+    parser.add_argument("--reps", type=int, default=20, help="Best of N timings")
+    parser.add_argument("--gzip-level", type=int, default=1)
+    parser.add_argument("--brotli-quality", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"best of {args.reps}; gzip level {args.gzip_level}"
+          + (f", brotli quality {args.brotli_quality}" if brotli else " (brotli not installed)"))
+    for n in (int(s) for s in args.sizes.split(",")):
+        legacy, rows = synthetic_rows(n)
+        print(f"\n── {n} candles")
+        print(f"  {'variant':<16} {'build+json':>11} {'raw':>10} {'gzip':>10} {'gzip ms':>8}"
+              + (f" {'br':>10} {'br ms':>7}" if brotli else ""))
+        for label, fn, arg in (("legacy", legacy_body, legacy),
+                               ("rows/orjson", rows_body, rows),
+                               ("columnar/orjson", columnar_body, rows)):
+            body, ms = timed(fn, arg, args.reps)
+            gz, gz_ms = timed(lambda b: gzip.compress(b, compresslevel=args.gzip_level, mtime=0), body, args.reps)
+            line = f"  {label:<16} {ms:9.2f}ms {len(body):>10,} {len(gz):>10,} {gz_ms:7.2f}"
+            if brotli:
+                br, br_ms = timed(lambda b: brotli.compress(b, quality=args.brotli_quality), body, args.reps)
+                line += f" {len(br):>10,} {br_ms:6.2f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Multi-year candle history: payload size and latency per access pattern.
+
+Seeds --coins synthetic coins with --years of 1h candles in
+price_candles_1h, then fetches each coin's whole history through the
+Flask app (or, for the legacy pattern, the SQL source directly) --reps
+times per pattern:
+
+  grow-limit     the old way to scroll back: re-request the latest N with
+                 N growing by --page each time (the route now caps limit,
+                 so this calls sql.fetch() and serializes the result)
+  keyset         pages of --page candles following next_before
+  downsampled    one request from the first bucket with max_points
+                 (each of --max-points)
+
+and reports, per pattern, the total JSON bytes transferred, the number of
+requests, total time, and per-request latency percentiles.
+
+Usage (local Postgres only — inserts and deletes bench-coin-* rows):
+    docker compose -f docker-compose.db.yml up -d
+    python test/backend_bench/bench_candles_range.py
+    python test/backend_bench/bench_candles_range.py --years 5 --max-points 500,1000
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timezone
+
+import harness  # also puts backend/ on sys.path
+
+import psycopg2
+import psycopg2.extras
+
+COIN_PREFIX = "bench-coin-"
+
+
+def seed(database_url: str, coins: int, years: float) -> int:
+    """Insert the candles; returns the first bucket's Unix time."""
+    hours = int(years * 365 * 24)
+    end = int(time.time() // 3600) * 3600
+    first = end - hours * 3600
+    conn = psycopg2.connect(database_url)
+    with conn, conn.cursor() as cur:
+        cleanup(cur)
+        for i in range(coins):
+            price = random.uniform(1, 1000)
+            rows = []
+            for h in range(hours):
+                price *= 1 + random.uniform(-0.01, 0.01)
+                bucket = datetime.fromtimestamp(first + h * 3600, tz=timezone.utc)
+                rows.append((f"{COIN_PREFIX}{i}", bucket, price, price * 1.01, price * 0.99, price, 1000.0))
+            psycopg2.extras.execute_values(
+                cur,
+                "INSERT INTO price_candles_1h (coin_id, bucket, open, high, low, close, volume) VALUES %s",
+                rows,
+                page_size=5000,
+            )
+    conn.close()
+    return first
+
+
+def cleanup(cur) -> None:
+    cur.execute("DELETE FROM price_candles_1h WHERE coin_id LIKE %s", (COIN_PREFIX + "%",))
+
+
+# ── Access patterns (each returns [(bytes, seconds) per request]) ───────────
+
+def grow_limit(client, coin: str, total: int, page: int) -> list:
+    from services.candles.sources import sql
+    out = []
+    for n in range(page, total + page, page):
+        t0 = time.perf_counter()
+        candles = sql.fetch(coin, "1h", n)
+        body = json.dumps({"coin_id": coin, "resolution": "1h", "count": len(candles), "candles": candles})
+        out.append((len(body), time.perf_counter() - t0))
+        if len(candles) < n:
+            break
+    return out
+
+
+def keyset(client, coin: str, page: int) -> list:
+    out, before = [], None
+    while True:
+        url = f"/api/candles/{coin}?resolution=1h&limit={page}&from=0"
+        if before is not None:
+            url += f"&before={before}"
+        t0 = time.perf_counter()
+        resp = client.get(url)
+        out.append((len(resp.data), time.perf_counter() - t0))
+        before = resp.get_json()["next_before"]
+        if before is None:
+            return out
+
+
+def downsampled(client, coin: str, first: int, max_points: int) -> list:
+    t0 = time.perf_counter()
+    resp = client.get(f"/api/candles/{coin}?resolution=1h&from={first}&max_points={max_points}")
+    if resp.status_code != 200:
+        raise RuntimeError(resp.status_code)
+    return [(len(resp.data), time.perf_counter() - t0)]
+
+
+def report(label: str, runs: list) -> None:
+    """*runs*: one [(bytes, seconds), ...] list per history fetched."""
+    requests = [r for run in runs for r in run]
+    per_history_bytes = sum(b for b, _ in requests) / len(runs)
+    per_history_s = sum(s for _, s in requests) / len(runs)
+    print(f"\n  {label:<22} {len(requests) / len(runs):6.0f} requests  "
+          f"{per_history_bytes / 1e6:8.2f} MB  {per_history_s * 1000:9.1f} ms  (per history)")
+    print(harness.fmt_pct("per request", [s * 1000 for _, s in requests]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Multi-year candle history: grow-limit vs keyset vs downsampled.")
+    parser.add_argument("--coins", type=int, default=2)
+    parser.add_argument("--years", type=float, default=3.0)
+    parser.add_argument("--page", type=int, default=1000, help="Candles per page")
+    parser.add_argument("--max-points", default="500,1000")
+    parser.add_argument("--reps", type=int, default=3)
+    parser.add_argument("--skip-grow", action="store_true", help="Skip the (slow) grow-limit pattern")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL", harness.DEFAULT_DATABASE_URL)
+    total = int(args.years * 365 * 24)
+    print(f"Seeding {args.coins} coins × {total} 1h candles ({args.years} years)...")
+    first = seed(database_url, args.coins, args.years)
+    app = harness.make_app()
+    client = app.test_client()
+    logging.disable(logging.WARNING)
+
+    coins = [f"{COIN_PREFIX}{i}" for i in range(args.coins)]
+    histories = [c for c in coins for _ in range(args.reps)]
+    try:
+        if not args.skip_grow:
+            report(f"grow-limit +{args.page}", [grow_limit(client, c, total, args.page) for c in histories])
+        report(f"keyset pages of {args.page}", [keyset(client, c, args.page) for c in histories])
+        for max_points in (int(p) for p in args.max_points.split(",")):
+            report(f"max_points={max_points}", [downsampled(client, c, first, max_points) for c in histories])
+    finally:
+        if not args.keep:
+            conn = psycopg2.connect(database_url)
+            with conn, conn.cursor() as cur:
+                cleanup(cur)
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
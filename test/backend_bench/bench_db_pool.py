@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Threaded load on /api/candles and /api/rating: one shared connection vs. the db pool.
+
+Seeds --coins synthetic coins (bench-coin-N) into price_candles_1h and
+rating_scores, then for each --threads count runs a request mix (70%
+/api/candles/<coin>?resolution=1h&limit=200, 30% /api/rating/<coin>,
+Redis disabled so both hit Postgres) through the Flask app for --duration
+seconds, once per variant:
+
+  legacy        the old sources: one module-global connection per service,
+                shared by every thread, with a SELECT 1 probe before each
+                query (copied here from the pre-pool code)
+  pool          backend/db pool, DB_POOL_MAX connections, prepared statements
+  pool-noprep   the same pool with prepared statements off
+
+and reports requests/s, per-endpoint latency percentiles and the pool's
+saturation stats (checkouts that waited, max wait).
+
+--rtt-ms routes the database connection through a local proxy that adds
+that round-trip time, to approximate a hosted database: the SELECT 1
+probe and the serialization on one connection both cost a round trip.
+
+Usage (local Postgres only — inserts and deletes bench-coin-* rows):
+    docker compose -f docker-compose.db.yml up -d
+    python test/backend_bench/bench_db_pool.py
+    python test/backend_bench/bench_db_pool.py --threads 4,16 --rtt-ms 20 --pool-max 8
+"""
+
+import argparse
+import logging
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+import harness  # also puts backend/ on sys.path
+
+import psycopg2
+import psycopg2.extras
+
+COIN_PREFIX = "bench-coin-"
+
+
+# ── Seed data ───────────────────────────────────────────────────────────────
+
+def seed(database_url: str, coins: int, hours: int) -> None:
+    conn = psycopg2.connect(database_url)
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours)
+    with conn, conn.cursor() as cur:
+        cleanup(cur)
+        for i in range(coins):
+            coin = f"{COIN_PREFIX}{i}"
+            price = random.uniform(1, 1000)
+            rows = []
+            for h in range(hours):
+                price *= 1 + random.uniform(-0.01, 0.01)
+                rows.append((coin, start + timedelta(hours=h), price, price * 1.01, price * 0.99, price, 1000.0))
+            psycopg2.extras.execute_values(
+                cur,
+                "INSERT INTO price_candles_1h (coin_id, bucket, open, high, low, close, volume) VALUES %s",
+                rows,
+            )
+            cur.execute(
+                """
+                INSERT INTO rating_scores (coin_id, coin_symbol, overall_score, automated_score, risk_level)
+                VALUES (%s, %s, %s, %s, 'Moderate')
+                """,
+                (coin, f"B{i}", 60.0, 40.0),
+            )
+    conn.close()
+
+
+def cleanup(cur) -> None:
+    cur.execute("DELETE FROM price_candles_1h WHERE coin_id LIKE %s", (COIN_PREFIX + "%",))
+    cur.execute("DELETE FROM rating_scores WHERE coin_id LIKE %s", (COIN_PREFIX + "%",))
+
+
+# ── The pre-pool sources, for comparison ────────────────────────────────────
+
+class LegacySource:
+    """One module-global connection, SELECT 1 before every use (the old _get_conn)."""
+
+    def __init__(self):
+        self._conn = None
+
+    def _get_conn(self):
+        try:
+            if self._conn is None or self._conn.closed:
+                raise psycopg2.OperationalError("no connection")
+            self._conn.cursor().execute("SELECT 1")
+        except Exception:
+            self._conn = psycopg2.connect(os.getenv("DATABASE_URL"), connect_timeout=5)
+        return self._conn
+
+    def fetch(self, sql: str, params: tuple, one: bool = False, dicts: bool = True):
+        conn = self._get_conn()
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor if dicts else None) as cur:
+            cur.execute(sql, params)
+            return cur.fetchone() if one else cur.fetchall()
+
+
+class _LegacyPool:
+    """Stands in for get_pool() inside a source module, backed by a LegacySource."""
+
+    def __init__(self, source: LegacySource):
+        self._source = source
+
+    def fetchall(self, query, params=None):
+        return self._source.fetch(query.sql, params)
+
+    def fetchone(self, query, params=None):
+        return self._source.fetch(query.sql, params, one=True)
+
+    def fetchrows(self, query, params=None):
+        return self._source.fetch(query.sql, params, dicts=False)
+
+
+def install_legacy() -> None:
+    """Point the candles and rating sources at one LegacySource each."""
+    import services.candles.sources.sql as candles_sql
+    import services.rating.sources.sql as rating_sql
+
+    candles = _LegacyPool(LegacySource())
+    rating = _LegacyPool(LegacySource())
+    candles_sql.get_pool = lambda: candles
+    rating_sql.get_pool = lambda: rating
+
+
+def install_pool(max_size: int, prepared: bool):
+    """A fresh process pool with these settings, used by both sources."""
+    import db.pool
+    import services.candles.sources.sql as candles_sql
+    import services.rating.sources.sql as rating_sql
+
+    db.pool.PREPARED_STATEMENTS = prepared
+    pool = db.pool.Pool(max_size=max_size)
+    db.pool._pool, db.pool._pool_pid = pool, os.getpid()
+    candles_sql.get_pool = rating_sql.get_pool = db.pool.get_pool
+    return pool
+
+
+# ── Driver ──────────────────────────────────────────────────────────────────
+
+def run_variant(app, variant: str, args, threads: int) -> None:
+    pool = None
+    if variant == "legacy":
+        install_legacy()
+    else:
+        pool = install_pool(args.pool_max, prepared=variant == "pool")
+
+    def request(rnd: random.Random) -> str:
+        coin = f"{COIN_PREFIX}{rnd.randrange(args.coins)}"
+        client = app.test_client()
+        if rnd.random() < 0.7:
+            resp = client.get(f"/api/candles/{coin}?resolution=1h&limit=200")
+            label = "candles"
+        else:
+            resp = client.get(f"/api/rating/{coin}")
+            label = "rating"
+        if resp.status_code != 200:
+            raise RuntimeError(f"{label} {resp.status_code}")
+        return label
+
+    result = harness.run_threads(request, threads, args.duration)
+    print(f"\n  {variant:<12} {threads:>3} threads: {result['rps']:8.0f} req/s  "
+          f"({result['errors']} errors)")
+    for label, samples in sorted(result["latency_ms"].items()):
+        print(harness.fmt_pct(label, samples))
+    if pool is not None:
+        s = pool.stats
+        print(f"  pool: {s['open']}/{s['max_size']} open, {s['checkouts']} checkouts, "
+              f"{s['waited']} waited (avg {s['wait_ms_avg']}ms, max {s['wait_ms_max']}ms), "
+              f"{s['timeouts']} timeouts")
+        pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Threaded candles/rating load: shared connection vs. pool.")
+    parser.add_argument("--threads", default="4,16")
+    parser.add_argument("--coins", type=int, default=200)
+    parser.add_argument("--hours", type=int, default=500, help="1h candles per coin")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--pool-max", type=int, default=4)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Added database round-trip time")
+    parser.add_argument("--variants", default="legacy,pool,pool-noprep")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL", harness.DEFAULT_DATABASE_URL)
+    print(f"Seeding {args.coins} coins × {args.hours} 1h candles...")
+    seed(database_url, args.coins, args.hours)
+    if args.rtt_ms:
+        os.environ["DATABASE_URL"] = harness.proxied_url(database_url, args.rtt_ms)
+    app = harness.make_app()
+    logging.disable(logging.WARNING)
+
+    try:
+        for threads in (int(t) for t in args.threads.split(",")):
+            print(f"\n── {threads} threads, rtt +{args.rtt_ms}ms")
+            for variant in args.variants.split(","):
+                run_variant(app, variant, args, threads)
+    finally:
+        if not args.keep:
+            conn = psycopg2.connect(database_url)
+            with conn, conn.cursor() as cur:
+                cleanup(cur)
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
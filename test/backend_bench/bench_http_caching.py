@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Bytes served under a replayed traffic mix: with and without HTTP caching
+(backend/routes/caching.py).
+
+Seeds --coins synthetic coins (bench-coin-N): rating, market and news rows,
+volume hashes and 1h/1d/1w candles (the seeds of bench_batch.py and
+bench_candles_cache.py), and rt:coin entries (bench_prices.py).  The log
+is either --log FILE (every "GET /api/..." in it, spread evenly over
+--span-s) or, by default, a synthetic one: --requests requests from
+--clients clients over --span-s seconds, coins Zipf-distributed, mixed
+
+    rating 30%, market 20%, news 15%, candles 15%, volume 10%, prices 10%
+
+Every client is a browser (or a CDN edge) with its own HTTP cache, and
+accepts gzip.  Per variant:
+
+  none         no validators or Cache-Control (the hook removed): every
+               request is a 200 with the full body
+  revalidate   clients always ask, with If-None-Match / If-Modified-Since
+               from their cache: unchanged data costs a 304
+  max-age      clients also honour Cache-Control on the log's clock: a
+               fresh cached response costs no request at all
+
+While the log replays, a writer rewrites --writes-per-s random rating /
+market / news keys (SETEX + PUBLISH, as the collectors do) and the
+prices stand-in flushes every --flush-ms, so revalidations see changes.
+
+Reports, per variant: requests that reached the server, the 200/304
+split, bytes served (body + headers) in total and per resource, and the
+replay's wall time.
+
+Usage (local Postgres and Redis only — inserts and deletes bench-coin-*):
+    docker compose -f docker-compose.db.yml up -d
+    docker run --rm -p 6379:6379 redis:7
+    python test/backend_bench/bench_http_caching.py
+    python test/backend_bench/bench_http_caching.py --clients 500 --span-s 7200
+    python test/backend_bench/bench_http_caching.py --log access.log
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import harness  # also puts backend/ on sys.path
+
+import psycopg2
+import redis
+
+import bench_batch
+import bench_candles_cache
+import bench_prices
+
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+COIN_PREFIX = "bench-coin-"
+CHANNEL = os.getenv("CACHE_INVALIDATE_CHANNEL", "cache:invalidate")
+MIX = (("rating", 0.30), ("market", 0.20), ("news", 0.15), ("candles", 0.15), ("volume", 0.10), ("prices", 0.10))
+PRICE_IDS = 20
+LOG_LINE = re.compile(r"GET (/api/\S+)")
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+# ── Request log ─────────────────────────────────────────────────────────────
+
+def path_for(resource: str, coin: str, coins: int) -> str:
+    if resource == "candles":
+        return f"/api/candles/{coin}?resolution=1h"
+    if resource == "prices":
+        return f"/api/prices?ids={','.join(f'{COIN_PREFIX}{i}' for i in range(min(PRICE_IDS, coins)))}"
+    return f"/api/{resource}/{coin}"
+
+
+def synthetic_log(requests: int, clients: int, coins: int, span_s: float, seed: int = 0) -> list:
+    """[(t, client, path), ...] in time order."""
+    rnd = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(coins)]  # Zipf, s=1
+    names = [f"{COIN_PREFIX}{i}" for i in range(coins)]
+    resources = rnd.choices([r for r, _ in MIX], weights=[w for _, w in MIX], k=requests)
+    picked = rnd.choices(names, weights=weights, k=requests)
+    times = sorted(rnd.uniform(0, span_s) for _ in range(requests))
+    return [(t, rnd.randrange(clients), path_for(r, c, coins)) for t, r, c in zip(times, resources, picked)]
+
+
+def read_log(path: str, clients: int, span_s: float) -> list:
+    with open(path) as f:
+        paths = [m[1] for m in map(LOG_LINE.search, f) if m]
+    step = span_s / max(len(paths), 1)
+    return [(i * step, i % clients, p) for i, p in enumerate(paths)]
+
+
+def resource_of(path: str) -> str:
+    return path.split("?")[0].split("/")[2]
+
+
+# ── Writers ─────────────────────────────────────────────────────────────────
+
+class Writer:
+    """Rewrites random rating/market/news keys (SETEX + PUBLISH), as the collectors do."""
+
+    PREFIXES = ("crypto:rating:", "crypto:market:", "crypto:news:")
+
+    def __init__(self, r: redis.Redis, coins: list[str], per_s: float):
+        self._r = r
+        self._coins = coins
+        self._per_s = per_s
+        self._stop = threading.Event()
+
+    def write(self, rnd: random.Random) -> None:
+        prefix, coin = rnd.choice(self.PREFIXES), rnd.choice(self._coins)
+        key = f"{prefix}{coin}"
+        raw = self._r.get(key)
+        if raw is None:
+            return  # not cached yet; the next read fills it from Postgres
+        value = json.loads(raw)
+        if isinstance(value, dict) and "last_fetched_at" in value:
+            value["last_fetched_at"] = datetime.now(timezone.utc).isoformat()  # market
+        elif isinstance(value, dict):
+            value["bench_version"] = value.get("bench_version", 0) + 1
+        else:
+            value = value[1:] + value[:1]  # news: rotate the articles
+        pipe = self._r.pipeline(transaction=False)
+        pipe.setex(key, 3600, json.dumps(value))
+        pipe.publish(CHANNEL, key)
+        pipe.execute()
+
+    def run(self) -> None:
+        rnd = random.Random(1)
+        while not self._stop.wait(1 / self._per_s):
+            self.write(rnd)
+
+    def start(self) -> None:
+        self._stop.clear()
+        if self._per_s > 0:
+            threading.Thread(target=self.run, daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+# ── Replay ──────────────────────────────────────────────────────────────────
+
+def header_bytes(resp) -> int:
+    return sum(len(k) + len(v) + 4 for k, v in resp.headers.items()) + len(f"HTTP/1.1 {resp.status}\r\n\r\n")
+
+
+def replay(client, log: list, variant: str) -> dict:
+    caches: dict = {}  # (client, path) -> {"etag", "last_modified", "fresh_until"}
+    statuses, avoided = Counter(), 0
+    served = Counter()  # resource -> bytes
+    t0 = time.perf_counter()
+    for t, who, path in log:
+        entry = caches.get((who, path))
+        if variant == "max-age" and entry and t < entry["fresh_until"]:
+            avoided += 1
+            continue
+        headers = {"Accept-Encoding": "gzip"}
+        if variant != "none" and entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        resp = client.get(path, headers=headers)
+        statuses[resp.status_code] += 1
+        served[resource_of(path)] += len(resp.data) + header_bytes(resp)
+        if resp.status_code not in (200, 304):
+            continue
+        cc = resp.headers.get("Cache-Control", "")
+        max_age = MAX_AGE.search(cc)
+        fresh_until = t + int(max_age[1]) if max_age and "no-cache" not in cc else t
+        if resp.status_code == 200:
+            caches[(who, path)] = {"etag": resp.headers.get("ETag"),
+                                   "last_modified": resp.headers.get("Last-Modified"),
+                                   "fresh_until": fresh_until}
+        elif entry:
+            entry["fresh_until"] = fresh_until
+    return {"statuses": statuses, "avoided": avoided, "served": served, "elapsed": time.perf_counter() - t0}
+
+
+def fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bytes served under a replayed mix, with and without HTTP caching.")
+    parser.add_argument("--log", help="Access log to replay (default: synthetic)")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--coins", type=int, default=100)
+    parser.add_argument("--span-s", type=float, default=3600.0, help="Log duration (the clients' clock)")
+    parser.add_argument("--writes-per-s", type=float, default=5.0)
+    parser.add_argument("--flush-ms", type=float, default=2000.0, help="Prices stand-in flush interval")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL", harness.DEFAULT_DATABASE_URL)
+    redis_url = os.getenv("REDIS_URL") or DEFAULT_REDIS_URL
+    admin = redis.from_url(redis_url, decode_responses=True)
+    coins = [f"{COIN_PREFIX}{i}" for i in range(args.coins)]
+
+    print(f"Seeding {len(coins)} coins...")
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["REDIS_URL"] = redis_url
+    app = harness.make_app(redis=True)
+    bench_batch.seed(database_url, admin, coins)
+    bench_candles_cache.seed(database_url, args.coins, 300)
+    ingestor = bench_prices.Ingestor(admin, coins, args.flush_ms / 1000)
+    ingestor.flush()
+    writer = Writer(admin, coins, args.writes_per_s)
+    logging.disable(logging.WARNING)
+
+    log = (read_log(args.log, args.clients, args.span_s) if args.log
+           else synthetic_log(args.requests, args.clients, args.coins, args.span_s))
+    print(f"{len(log)} requests from {args.clients} clients over {args.span_s:.0f}s "
+          f"({', '.join(f'{r} {n}' for r, n in Counter(resource_of(p) for _, _, p in log).most_common())})")
+
+    from routes.caching import conditional_response
+    hooks = app.after_request_funcs[None]
+    client = app.test_client()
+    client.get(path_for("rating", coins[0], args.coins))  # warm the pools
+
+    baseline = None
+    ingestor.start()
+    try:
+        for variant in ("none", "revalidate", "max-age"):
+            if variant == "none":
+                hooks.remove(conditional_response)
+            elif conditional_response not in hooks:
+                hooks.append(conditional_response)
+            writer.start()
+            result = replay(client, log, variant)
+            writer.stop()
+            total = sum(result["served"].values())
+            baseline = baseline or total
+            sent = sum(result["statuses"].values())
+            print(f"\n── {variant}: {sent} requests served ({result['avoided']} answered by client caches), "
+                  f"200={result['statuses'][200]} 304={result['statuses'][304]} "
+                  f"other={sent - result['statuses'][200] - result['statuses'][304]}, "
+                  f"{result['elapsed']:.1f}s")
+            print(f"  {fmt_bytes(total)} served ({total / baseline:.1%} of none), "
+                  f"{fmt_bytes(total / max(len(log), 1))} per logged request")
+            for resource, n in result["served"].most_common():
+                print(f"    {resource:<8} {fmt_bytes(n):>10}")
+    finally:
+        ingestor.stop()
+        writer.stop()
+        bench_prices.cleanup(admin, coins)
+        conn = psycopg2.connect(database_url)
+        with conn, conn.cursor() as cur:
+            bench_batch.cleanup(cur, admin, coins)
+            bench_candles_cache.cleanup(cur)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
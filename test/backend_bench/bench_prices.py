@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Live-price REST throughput: /api/prices with and without the micro-cache.
+
+Seeds --coins rt:coin:bench-coin-N entries the way the live-price-ingestor
+does (plus the rt:coins index and the rt:seq:prices sequence), and keeps
+rewriting them every --flush-ms from a writer thread, bumping the
+sequence, as the ingestor's flush does.  Then, for each --threads count,
+hammers each endpoint for --duration seconds:
+
+  ids        GET /api/prices?ids=<the --ids most popular coins> (every
+             thread asks for the same list, e.g. a server-rendered page)
+  all        GET /api/prices/all
+
+once per variant:
+
+  redis        PRICES_CACHE_MS=0: every request reads Redis
+  micro-cache  PRICES_CACHE_MS (default 1000): one read per interval per
+               worker, shared by concurrent misses
+
+and once per client pattern:
+
+  plain        no validators: every response is a 200 with the body
+  conditional  each thread sends back the last ETag it got
+               (If-None-Match): a 304 until the next flush
+
+Reports requests/s, latency percentiles, the 200/304 split and Redis
+commands per request.
+
+--rtt-ms routes Redis through a local proxy that adds that round-trip
+time (a hosted Redis such as Upstash).
+
+Usage (local Redis only — writes and deletes rt:coin:bench-coin-*, adds
+them to rt:coins and bumps rt:seq:prices):
+    docker run --rm -p 6379:6379 redis:7
+    python test/backend_bench/bench_prices.py
+    python test/backend_bench/bench_prices.py --threads 8,64 --rtt-ms 2 --coins 1000
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+import harness  # also puts backend/ on sys.path
+
+import redis
+
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+COIN_PREFIX = "bench-coin-"
+INDEX_KEY = "rt:coins"
+SEQ_KEY = "rt:seq:prices"
+TTL_S = 300
+
+
+def entry(coin: str, price: float) -> str:
+    """An rt:coin:<coin_id> value shaped like RedisWriter's."""
+    now = int(time.time() * 1000)
+    side = {"exchange": "binance", "price": price, "bid": price * 0.999, "ask": price * 1.001, "timestamp": now}
+    return json.dumps({
+        "coin_id": coin, "avg_price": price, "highest": side, "lowest": side | {"exchange": "kraken"},
+        "exchange_count": 2, "exchanges": ["binance", "kraken"], "timestamp": now,
+    })
+
+
+class Ingestor:
+    """Rewrites every coin's entry, then bumps the sequence, every *flush_s*."""
+
+    def __init__(self, r: redis.Redis, coins: list[str], flush_s: float):
+        self._r = r
+        self._coins = coins
+        self._flush_s = flush_s
+        self._stop = threading.Event()
+        self.flushes = 0
+
+    def flush(self) -> None:
+        pipe = self._r.pipeline(transaction=False)
+        for coin in self._coins:
+            pipe.setex(f"rt:coin:{coin}", TTL_S, entry(coin, random.uniform(1, 1000)))
+        pipe.sadd(INDEX_KEY, *self._coins)
+        pipe.expire(INDEX_KEY, TTL_S)
+        pipe.incr(SEQ_KEY)
+        pipe.execute()
+        self.flushes += 1
+
+    def run(self) -> None:
+        while not self._stop.wait(self._flush_s):
+            self.flush()
+
+    def start(self) -> None:
+        self._stop.clear()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def cleanup(r: redis.Redis, coins: list[str]) -> None:
+    for start in range(0, len(coins), 500):
+        chunk = coins[start:start + 500]
+        r.delete(*[f"rt:coin:{c}" for c in chunk])
+        r.srem(INDEX_KEY, *chunk)
+
+
+def commands_processed(r: redis.Redis) -> int:
+    return int(r.info("stats")["total_commands_processed"])
+
+
+def run(client, admin: redis.Redis, path: str, conditional: bool, threads: int, duration_s: float) -> None:
+    statuses = Counter()
+    lock = threading.Lock()
+    etags = threading.local()
+
+    def request(rnd) -> str:
+        headers = {}
+        if conditional and getattr(etags, "last", None):
+            headers["If-None-Match"] = etags.last
+        resp = client.get(path, headers=headers)
+        if resp.status_code not in (200, 304):
+            raise RuntimeError(f"{path}: {resp.status_code}")
+        etags.last = resp.headers.get("ETag") or getattr(etags, "last", None)
+        with lock:
+            statuses[resp.status_code] += 1
+        return "request"
+
+    before = commands_processed(admin)
+    result = harness.run_threads(request, threads, duration_s)
+    commands = commands_processed(admin) - before - 1  # minus the INFO call
+    label = "conditional" if conditional else "plain"
+    print(f"  {label:<12} {threads:>3} threads  {result['rps']:9.0f} req/s  {result['errors']} errors  "
+          f"200={statuses[200]} 304={statuses[304]}  "
+          f"{commands / max(result['requests'], 1):.3f} Redis commands per request")
+    print(harness.fmt_pct("latency", result["latency_ms"].get("request", [])))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Live-price REST throughput with and without the micro-cache.")
+    parser.add_argument("--coins", type=int, default=500)
+    parser.add_argument("--ids", type=int, default=50, help="Coins per ?ids= request (at most BATCH_MAX_IDS)")
+    parser.add_argument("--threads", default="8,32", help="Comma-separated thread counts")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per run")
+    parser.add_argument("--flush-ms", type=float, default=2000.0, help="Writer interval (the ingestor: 10000)")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Added Redis round-trip time")
+    args = parser.parse_args()
+
+    coins = [f"{COIN_PREFIX}{i}" for i in range(args.coins)]
+    redis_url = os.getenv("REDIS_URL") or DEFAULT_REDIS_URL
+    admin = redis.from_url(redis_url, decode_responses=True)
+    ingestor = Ingestor(admin, coins, args.flush_ms / 1000)
+    ingestor.flush()
+
+    os.environ["REDIS_URL"] = (harness.proxied_url(redis_url, args.rtt_ms, default_port=6379)
+                               if args.rtt_ms else redis_url)
+    client = harness.make_app(redis=True).test_client()
+    logging.disable(logging.WARNING)
+
+    from services.prices import main as prices
+    cache_ms = prices.PRICES_CACHE_MS or 1000
+    paths = {"ids": f"/api/prices?ids={','.join(coins[:args.ids])}", "all": "/api/prices/all"}
+
+    ingestor.start()
+    try:
+        for variant, ms in (("redis", 0), ("micro-cache", cache_ms)):
+            prices.PRICES_CACHE_MS = ms
+            prices._cache.ttl_s = ms / 1000
+            for name, path in paths.items():
+                print(f"\n── {variant} ({ms}ms), {name}: {args.coins} coins, rtt +{args.rtt_ms}ms, "
+                      f"flush every {args.flush_ms:.0f}ms")
+                for threads in (int(t) for t in args.threads.split(",")):
+                    for conditional in (False, True):
+                        prices._cache.clear()
+                        run(client, admin, path, conditional, threads, args.duration)
+    finally:
+        ingestor.stop()
+        cleanup(admin, coins)
+
+
+if __name__ == "__main__":
+    main()
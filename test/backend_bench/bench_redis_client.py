@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Threaded Redis cache reads: a client per call vs. the shared pooled client.
+
+Seeds --coins market entries (crypto:market:bench-coin-N) and, for each
+--threads count, calls the market source's get_from_redis() in a loop for
+--duration seconds, once per variant:
+
+  per-call    the old market/news sources: redis.from_url() inside every
+              get, so every read opens (and later drops) a TCP connection
+  shared      backend/db/redis_client.py: one BlockingConnectionPool per
+              process, REDIS_POOL_MAX connections
+  mget        the shared client reading --batch coins per call with
+              mget_json() (latency per call, throughput in keys/s)
+
+and reports reads/s, latency percentiles and the connections Redis
+accepted during the run (INFO stats total_connections_received) — the
+churn the shared pool removes.
+
+--rtt-ms routes the connection through a local proxy that adds that
+round-trip time (a hosted Redis such as Upstash); a fresh connection pays
+it for the handshake as well as for the command.
+
+Usage (local Redis only — writes and deletes crypto:market:bench-coin-*):
+    docker run --rm -p 6379:6379 redis:7
+    python test/backend_bench/bench_redis_client.py
+    python test/backend_bench/bench_redis_client.py --threads 4,16 --rtt-ms 10
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+
+import harness  # also puts backend/ on sys.path
+
+import redis
+
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+COIN_PREFIX = "bench-coin-"
+
+
+def connections_received(r: redis.Redis) -> int:
+    return int(r.info("stats")["total_connections_received"])
+
+
+def seed(r: redis.Redis, coins: int) -> None:
+    pipe = r.pipeline(transaction=False)
+    for i in range(coins):
+        data = {"id": f"{COIN_PREFIX}{i}", "current_price": random.uniform(1, 1000),
+                "market_cap": random.uniform(1e6, 1e9), "price_change_percentage_24h": 0.5}
+        pipe.setex(f"crypto:market:{COIN_PREFIX}{i}", 3600, json.dumps(data))
+    pipe.execute()
+
+
+def cleanup(r: redis.Redis, coins: int) -> None:
+    keys = [f"crypto:market:{COIN_PREFIX}{i}" for i in range(coins)]
+    for start in range(0, len(keys), 500):
+        r.delete(*keys[start:start + 500])
+
+
+def per_call_get(coin_id: str):
+    """The pre-pool market source read (a new client every call)."""
+    url = os.getenv("REDIS_URL")
+    r = redis.from_url(url, decode_responses=True, socket_connect_timeout=2)
+    raw = r.get(f"crypto:market:{coin_id}")
+    return json.loads(raw) if raw else None
+
+
+def run_variant(variant: str, args, threads: int, admin: redis.Redis) -> None:
+    import db.redis_client
+    from db import mget_json
+    from services.market.sources import redis_source
+    from services.market.sources.redis_source import get_from_redis
+
+    # Every read goes to Redis (bench_redis_l1.py measures the in-process cache)
+    redis_source._l1.enabled = False
+
+    # A fresh shared client per run, so its connections count in this run
+    db.redis_client._client = None
+
+    def request(rnd: random.Random) -> str:
+        if variant == "mget":
+            coins = [f"crypto:market:{COIN_PREFIX}{rnd.randrange(args.coins)}" for _ in range(args.batch)]
+            if None in mget_json(coins):
+                raise RuntimeError("miss")
+            return f"mget x{args.batch}"
+        coin = f"{COIN_PREFIX}{rnd.randrange(args.coins)}"
+        data = per_call_get(coin) if variant == "per-call" else get_from_redis(coin)
+        if data is None:
+            raise RuntimeError("miss")
+        return "get"
+
+    before = connections_received(admin)
+    result = harness.run_threads(request, threads, args.duration)
+    accepted = connections_received(admin) - before
+    keys_per_call = args.batch if variant == "mget" else 1
+    print(f"\n  {variant:<9} {threads:>3} threads: {result['rps']:8.0f} calls/s "
+          f"({result['rps'] * keys_per_call:8.0f} keys/s, {result['errors']} errors), "
+          f"{accepted} connections accepted")
+    for label, samples in sorted(result["latency_ms"].items()):
+        print(harness.fmt_pct(label, samples))
+    if variant != "per-call":
+        print(f"  client: {db.redis_client.get_redis().stats}")
+    db.redis_client.get_redis().connection_pool.disconnect()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Threaded Redis reads: client per call vs. shared pool.")
+    parser.add_argument("--threads", default="4,16")
+    parser.add_argument("--coins", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=20, help="Keys per mget_json call")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Added Redis round-trip time")
+    parser.add_argument("--variants", default="per-call,shared,mget")
+    args = parser.parse_args()
+
+    redis_url = os.getenv("REDIS_URL") or DEFAULT_REDIS_URL
+    admin = redis.from_url(redis_url, decode_responses=True)
+    seed(admin, args.coins)
+    if args.rtt_ms:
+        redis_url = harness.proxied_url(redis_url, args.rtt_ms, default_port=6379)
+    os.environ["REDIS_URL"] = redis_url
+    logging.disable(logging.WARNING)
+
+    try:
+        for threads in (int(t) for t in args.threads.split(",")):
+            print(f"\n── {threads} threads, rtt +{args.rtt_ms}ms")
+            for variant in args.variants.split(","):
+                run_variant(variant, args, threads, admin)
+    finally:
+        cleanup(admin, args.coins)
+
+
+if __name__ == "__main__":
+    main()
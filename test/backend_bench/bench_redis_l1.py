@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Replayed request log: rating/market/news reads with and without the
+in-process cache in front of Redis (backend/db/invalidation.py).
+
+The log is either --log FILE (any access log; every
+"GET /api/{rating,market,news}/<coin>" in it is replayed in order) or,
+by default, a synthetic one shaped like production: --requests requests,
+coins Zipf-distributed over --coins (a few majors take most of the
+traffic), 50% rating / 30% market / 20% news.
+
+Every coin's three keys are seeded in Redis, and while the log replays
+from --threads threads through the Flask app, a writer thread rewrites
+--writes-per-s random keys the way the collectors and the rating
+orchestrator do (SETEX + PUBLISH to the invalidation channel), bumping a
+version stamped into each value.  Per variant:
+
+  redis   the in-process caches disabled: every read is a Redis GET
+  l1      CoherentCache in front of Redis, invalidated over pub/sub
+
+reports requests/s, latency percentiles, the L1 hit rate, Redis commands
+processed, and stale reads: responses older than a write that finished
+more than --grace-ms before the request started (pub/sub delivery time).
+Expect none for either variant.
+
+--rtt-ms routes Redis through a local proxy that adds that round-trip
+time (a hosted Redis such as Upstash).
+
+Usage (local Redis only — writes and deletes crypto:*:bench-coin-*; a
+--log's coins are replayed as bench-coin-<coin>):
+    docker run --rm -p 6379:6379 redis:7
+    python test/backend_bench/bench_redis_l1.py
+    python test/backend_bench/bench_redis_l1.py --threads 8 --rtt-ms 2 --writes-per-s 20
+    python test/backend_bench/bench_redis_l1.py --log access.log
+"""
+
+import argparse
+import bisect
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+import harness  # also puts backend/ on sys.path
+
+import redis
+
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+COIN_PREFIX = "bench-coin-"
+CHANNEL = os.getenv("CACHE_INVALIDATE_CHANNEL", "cache:invalidate")
+RESOURCES = {"rating": "crypto:rating:", "market": "crypto:market:", "news": "crypto:news:"}
+MIX = (("rating", 0.5), ("market", 0.3), ("news", 0.2))
+LOG_LINE = re.compile(r"GET /api/(rating|market|news)/([\w.-]+)")
+
+
+# ── Request log ─────────────────────────────────────────────────────────────
+
+def synthetic_log(requests: int, coins: int, seed: int = 0) -> list[tuple[str, str]]:
+    rnd = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(coins)]  # Zipf, s=1
+    names = [f"{COIN_PREFIX}{i}" for i in range(coins)]
+    resources = rnd.choices([r for r, _ in MIX], weights=[w for _, w in MIX], k=requests)
+    return list(zip(resources, rnd.choices(names, weights=weights, k=requests)))
+
+
+def read_log(path: str) -> list[tuple[str, str]]:
+    """The log's requests, with coins renamed bench-coin-<coin> (never touches real keys)."""
+    with open(path) as f:
+        return [(m[1], f"{COIN_PREFIX}{m[2].lower()}") for m in map(LOG_LINE.search, f) if m]
+
+
+# ── Versioned values ────────────────────────────────────────────────────────
+
+def value(resource: str, coin: str, version: int):
+    if resource == "rating":
+        return {"coin_id": coin, "overall_score": 60.0, "risk_level": "Moderate", "v": version}
+    if resource == "market":
+        return {"coin_id": coin, "market_cap_usd": 1e9, "circulating_supply": 1e7,
+                "last_fetched_at": str(version)}
+    return [{"title": str(version), "url": "https://example.com", "source": "Example",
+             "published_at": "Mon, 19 Oct 2026 00:00:00 GMT"}] * 4
+
+
+def version_of(resource: str, body: dict) -> int:
+    if resource == "rating":
+        return body["v"]
+    if resource == "market":
+        return int(body["last_fetched_at"])
+    return int(body["articles"][0]["title"])
+
+
+class Writer:
+    """Rewrites random keys (SETEX + PUBLISH) and remembers when each version landed."""
+
+    def __init__(self, r: redis.Redis, keys: list[tuple[str, str]]):
+        self._r = r
+        self._keys = keys
+        self._version = 0
+        # (resource, coin) -> ([finished_at, ...], [version, ...]), ascending
+        self.history: dict = {k: ([0.0], [0]) for k in keys}
+        self._stop = threading.Event()
+
+    def write(self, resource: str, coin: str) -> None:
+        self._version += 1
+        key = f"{RESOURCES[resource]}{coin}"
+        pipe = self._r.pipeline(transaction=False)
+        pipe.setex(key, 3600, json.dumps(value(resource, coin, self._version)))
+        pipe.publish(CHANNEL, key)
+        pipe.execute()
+        times, versions = self.history[(resource, coin)]
+        # versions first: readers index versions by a position in times
+        versions.append(self._version)
+        times.append(time.monotonic())
+
+    def latest_before(self, resource: str, coin: str, t: float) -> int:
+        """The newest version of the key whose write had finished by *t*."""
+        times, versions = self.history[(resource, coin)]
+        return versions[bisect.bisect_right(times, t) - 1]
+
+    def run(self, per_s: float) -> None:
+        rnd = random.Random(1)
+        while not self._stop.wait(1 / per_s):
+            self.write(*rnd.choice(self._keys))
+
+    def start(self, per_s: float) -> None:
+        self._stop.clear()
+        if per_s > 0:
+            threading.Thread(target=self.run, args=(per_s,), daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+# ── Replay ──────────────────────────────────────────────────────────────────
+
+def replay(client, log: list, threads: int, writer: Writer, grace_s: float) -> dict:
+    latencies, stale, errors = [], [0], [0]
+    lock = threading.Lock()
+    chunks = [log[i::threads] for i in range(threads)]
+
+    def worker(chunk):
+        local = []
+        for resource, coin in chunk:
+            t0 = time.monotonic()
+            resp = client.get(f"/api/{resource}/{coin}")
+            ms = (time.monotonic() - t0) * 1000
+            if resp.status_code != 200:
+                with lock:
+                    errors[0] += 1
+                continue
+            local.append(ms)
+            if version_of(resource, resp.get_json()) < writer.latest_before(resource, coin, t0 - grace_s):
+                with lock:
+                    stale[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=worker, args=(c,)) for c in chunks]
+    t0 = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    return {"latency_ms": latencies, "stale": stale[0], "errors": errors[0], "rps": len(latencies) / elapsed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replayed rating/market/news reads: Redis only vs. in-process L1.")
+    parser.add_argument("--log", help="Access log to replay (default: synthetic)")
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--coins", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--writes-per-s", type=float, default=10.0)
+    parser.add_argument("--grace-ms", type=float, default=50.0, help="Allowed invalidation delivery time")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Added Redis round-trip time")
+    args = parser.parse_args()
+
+    log = read_log(args.log) if args.log else synthetic_log(args.requests, args.coins)
+    keys = sorted(set(log))
+    print(f"{len(log)} requests over {len(keys)} keys")
+
+    redis_url = os.getenv("REDIS_URL") or DEFAULT_REDIS_URL
+    admin = redis.from_url(redis_url, decode_responses=True)
+    writer = Writer(admin, keys)
+    for resource, coin in keys:
+        writer.write(resource, coin)
+
+    os.environ["REDIS_URL"] = (harness.proxied_url(redis_url, args.rtt_ms, default_port=6379)
+                               if args.rtt_ms else redis_url)
+    client = harness.make_app(redis=True).test_client()
+    logging.disable(logging.WARNING)
+
+    from db import invalidation
+    from services.market.sources import redis_source as market_redis
+    from services.news.sources import redis_source as news_redis
+    from services.rating.sources import redis as rating_redis
+    caches = [rating_redis._l1, market_redis._l1, news_redis._l1]
+
+    # Start the listener and wait for it to subscribe
+    deadline = time.monotonic() + 5
+    while not invalidation.listening() and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    try:
+        for variant in ("redis", "l1"):
+            for cache in caches:
+                cache.enabled = variant == "l1"
+                cache.invalidate()
+                cache._lru.hits = cache._lru.misses = 0
+            before = int(admin.info("stats")["total_commands_processed"])
+            writer.start(args.writes_per_s)
+            result = replay(client, log, args.threads, writer, args.grace_ms / 1000)
+            writer.stop()
+            commands = int(admin.info("stats")["total_commands_processed"]) - before
+            hits = sum(c._lru.hits for c in caches)
+            lookups = hits + sum(c._lru.misses for c in caches)
+            print(f"\n── {variant}: {result['rps']:8.0f} req/s, {result['errors']} errors, "
+                  f"{result['stale']} stale reads")
+            print(harness.fmt_pct("latency", result["latency_ms"]))
+            print(f"  L1 hit rate {hits / lookups if lookups else 0:.1%}, "
+                  f"{commands / max(len(log), 1):.2f} Redis commands per request")
+    finally:
+        admin.delete(*[f"{RESOURCES[r]}{c}" for r, c in keys])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Cache-miss stampede: --requests concurrent requests for one cold coin.
+
+Starts a local HTTP stand-in for CoinGecko (/coins/markets) and Google
+News (/rss/search) that answers after --upstream-ms and counts its calls,
+points the market and news sources at it, and forks --workers processes
+(gunicorn workers) that fire --requests requests between them, released
+together by a barrier, at /api/market/<coin> or /api/news/<coin>.
+Scenarios, each on a fresh coin:
+
+  cold       not in Redis or Postgres: every request misses and needs the
+             upstream.  Expect one upstream call, every request 200
+  failing    the same, with the stand-in answering 500.  Expect one call,
+             every request 404; then a second wave (fresh workers) within
+             the negative TTL: expect no call at all
+  stale      an old Postgres row, nothing in Redis: every request is
+             served the stale row at once (200) and one background
+             refresh calls the upstream
+  stale, batch  the same through the batch endpoint (/api/<resource>?ids=):
+             the stale row is served without being written back to Redis,
+             and one background refresh calls the upstream
+
+and reports, per scenario, the statuses, the upstream calls and the
+request latency.  Each scenario prints PASS or FAIL against its expected
+upstream call count.
+
+Usage (local Postgres and Redis only — inserts and deletes bench-stampede-*):
+    docker compose -f docker-compose.db.yml up -d
+    docker run --rm -p 6379:6379 redis:7
+    python test/backend_bench/bench_stampede.py
+    python test/backend_bench/bench_stampede.py --requests 500 --workers 4 --upstream-ms 500
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import harness  # also puts backend/ on sys.path
+
+import psycopg2
+import redis
+
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+COIN_PREFIX = "bench-stampede-"
+
+_RSS = """<?xml version="1.0"?><rss><channel>{}</channel></rss>"""
+_ITEM = ("<item><title>Headline {n}</title><link>https://example.com/{n}</link>"
+         "<pubDate>Mon, 19 Oct 2026 00:00:00 GMT</pubDate><source>Example</source></item>")
+
+
+# ── Upstream stand-in ───────────────────────────────────────────────────────
+
+class Upstream:
+    """CoinGecko / Google News stand-in on 127.0.0.1 that counts its calls."""
+
+    def __init__(self, delay_s: float):
+        self.delay_s = delay_s
+        self.fail = False
+        self.calls = Counter()
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                upstream.calls[path] += 1
+                time.sleep(upstream.delay_s)
+                if upstream.fail:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                if path == "/coins/markets":
+                    body = json.dumps([{"market_cap": 1.5e9, "circulating_supply": 2.1e7}]).encode()
+                    ctype = "application/json"
+                else:
+                    body = _RSS.format("".join(_ITEM.format(n=n) for n in range(4))).encode()
+                    ctype = "application/rss+xml"
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def reset(self, fail: bool = False) -> None:
+        self.calls.clear()
+        self.fail = fail
+
+
+# ── Seed data ───────────────────────────────────────────────────────────────
+
+def seed_stale(database_url: str, resource: str, coin: str) -> None:
+    conn = psycopg2.connect(database_url)
+    with conn, conn.cursor() as cur:
+        if resource == "market":
+            cur.execute(
+                "INSERT INTO market_data (coin_id, market_cap, circulating_supply, updated_at) VALUES (%s, %s, %s, %s)",
+                (coin, 1e9, 1e7, datetime.now(timezone.utc) - timedelta(days=2)),
+            )
+        else:
+            articles = [{"title": "Old", "url": "https://example.com/old", "source": "Example", "published_at": ""}]
+            cur.execute(
+                "INSERT INTO news_cache (coin_id, articles, fetched_at) VALUES (%s, %s::jsonb, %s)",
+                (coin, json.dumps(articles), datetime.now(timezone.utc) - timedelta(days=2)),
+            )
+    conn.close()
+
+
+def cleanup(database_url: str, r: redis.Redis) -> None:
+    conn = psycopg2.connect(database_url)
+    with conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM market_data WHERE coin_id LIKE %s", (COIN_PREFIX + "%",))
+        cur.execute("DELETE FROM news_cache WHERE coin_id LIKE %s", (COIN_PREFIX + "%",))
+    conn.close()
+    for pattern in (f"crypto:market:{COIN_PREFIX}*", f"crypto:news:{COIN_PREFIX}*", f"sf:*:{COIN_PREFIX}*"):
+        keys = list(r.scan_iter(pattern))
+        if keys:
+            r.delete(*keys)
+
+
+# ── Workers ─────────────────────────────────────────────────────────────────
+
+def worker(app, path: str, threads: int, barrier, results) -> None:
+    """One forked 'gunicorn worker': *threads* concurrent requests for *path*."""
+    client = app.test_client()
+    out = []
+    lock = threading.Lock()
+
+    def one():
+        barrier.wait()
+        t0 = time.perf_counter()
+        resp = client.get(path)
+        ms = (time.perf_counter() - t0) * 1000
+        with lock:
+            out.append((resp.status_code, ms))
+
+    pool = [threading.Thread(target=one) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    # Let background (stale-while-revalidate) refreshes finish before exiting
+    from db import singleflight
+    singleflight._background().shutdown(wait=True)
+    results.put(out)
+
+
+def wave(app, path: str, requests: int, workers: int) -> list:
+    ctx = multiprocessing.get_context("fork")
+    barrier = ctx.Barrier(requests)
+    results = ctx.Queue()
+    shares = [requests // workers + (1 if i < requests % workers else 0) for i in range(workers)]
+    procs = [ctx.Process(target=worker, args=(app, path, n, barrier, results)) for n in shares if n]
+    for p in procs:
+        p.start()
+    out = [r for _ in procs for r in results.get()]
+    for p in procs:
+        p.join()
+    return out
+
+
+def report(label: str, out: list, upstream: Upstream, expected_calls: int) -> bool:
+    statuses = Counter(status for status, _ in out)
+    calls = sum(upstream.calls.values())
+    ok = calls == expected_calls
+    print(f"\n  {label:<22} {len(out)} requests  statuses={dict(statuses)}  "
+          f"upstream calls={calls} (expected {expected_calls})  {'PASS' if ok else 'FAIL'}")
+    print(harness.fmt_pct("latency", [ms for _, ms in out]))
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent misses for one cold coin: upstream calls made.")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=2, help="Forked worker processes")
+    parser.add_argument("--upstream-ms", type=float, default=300.0, help="Stand-in response time")
+    parser.add_argument("--resources", default="market,news")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL", harness.DEFAULT_DATABASE_URL)
+    redis_url = os.getenv("REDIS_URL") or DEFAULT_REDIS_URL
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["REDIS_URL"] = redis_url
+    admin = redis.from_url(redis_url, decode_responses=True)
+    cleanup(database_url, admin)
+
+    upstream = Upstream(args.upstream_ms / 1000)
+    app = harness.make_app(redis=True)
+    from services.market.sources import coingecko
+    from services.news.sources import google_rss
+    coingecko._BASE = upstream.url
+    google_rss._BASE = f"{upstream.url}/rss/search"
+    logging.disable(logging.WARNING)
+
+    run_id = int(time.time())
+    passed = True
+    try:
+        for resource in args.resources.split(","):
+            print(f"\n── {resource}: {args.requests} requests over {args.workers} workers, "
+                  f"upstream {args.upstream_ms:.0f}ms")
+
+            coin = f"{COIN_PREFIX}{resource}-cold-{run_id}"
+            upstream.reset()
+            passed &= report("cold", wave(app, f"/api/{resource}/{coin}", args.requests, args.workers),
+                             upstream, 1)
+
+            coin = f"{COIN_PREFIX}{resource}-failing-{run_id}"
+            upstream.reset(fail=True)
+            passed &= report("failing", wave(app, f"/api/{resource}/{coin}", args.requests, args.workers),
+                             upstream, 1)
+            upstream.reset(fail=True)
+            passed &= report("failing, second wave",
+                             wave(app, f"/api/{resource}/{coin}", args.requests, args.workers), upstream, 0)
+
+            coin = f"{COIN_PREFIX}{resource}-stale-{run_id}"
+            seed_stale(database_url, resource, coin)
+            upstream.reset()
+            passed &= report("stale", wave(app, f"/api/{resource}/{coin}", args.requests, args.workers),
+                             upstream, 1)
+
+            coin = f"{COIN_PREFIX}{resource}-stale-batch-{run_id}"
+            seed_stale(database_url, resource, coin)
+            upstream.reset()
+            passed &= report("stale, batch", wave(app, f"/api/{resource}?ids={coin}", args.requests, args.workers),
+                             upstream, 1)
+    finally:
+        cleanup(database_url, admin)
+
+    print(f"\n{'PASS' if passed else 'FAIL'}: exactly one upstream call per cold or stale coin")
+    raise SystemExit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Conditional GET and Cache-Control (backend/routes/caching.py).
+
+Builds a small Flask app with the backend's after_request hooks, in the
+order app.py registers them (compress_response, then
+conditional_response), and views shaped like the real routes, and
+checks the validators, the 304s and the Cache-Control they produce.  Also
+checks the candles route's per-request policy, and that a range query's
+database error is a 503 no client caches.  No Postgres or Redis needed.
+
+Usage (with the backend's requirements installed):
+    python test/backend_bench/test_http_caching.py
+"""
+
+import sys
+
+import harness  # noqa: F401  (puts backend/ on sys.path)
+
+try:
+    import flask
+except ImportError:
+    flask = None
+    __test__ = False  # pytest: nothing to run without the backend's requirements
+
+if flask is not None:
+    from flask import Flask, Response, jsonify
+
+    from routes.caching import CachePolicy, cache_policy, last_modified
+    from routes.encoding import compress_response
+    from routes.caching import conditional_response
+
+BIG = [{"time": t, "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5} for t in range(500)]
+FETCHED_AT = "2026-10-19T08:00:00+00:00"
+
+
+def make_app():
+    app = Flask(__name__)
+    state = {"value": 1}
+
+    @app.route("/data")
+    @cache_policy(max_age=60, swr=120)
+    def data():
+        return jsonify({"value": state["value"]})
+
+    @app.route("/big")
+    @cache_policy(max_age=60)
+    def big():
+        return jsonify(BIG)
+
+    @app.route("/fetched")
+    @cache_policy(max_age=3600, swr=86_400)
+    def fetched():
+        return last_modified(jsonify({"last_fetched_at": FETCHED_AT}), FETCHED_AT)
+
+    @app.route("/sequenced")
+    @cache_policy(max_age=1, swr=10)
+    def sequenced():
+        resp = Response(b'{"seq": 7}', mimetype="application/json")
+        resp.set_etag("7-1", weak=True)
+        return resp
+
+    @app.route("/dynamic")
+    @cache_policy(lambda: CachePolicy(int(flask.request.args.get("age", 5))))
+    def dynamic():
+        return jsonify({})
+
+    @app.route("/plain")
+    def plain():
+        return jsonify({})
+
+    @app.route("/missing")
+    @cache_policy(max_age=60)
+    def missing():
+        return jsonify({"error": "not found"}), 404
+
+    app.after_request(compress_response)
+    app.after_request(conditional_response)
+    app.state = state
+    return app
+
+
+def test_etag_and_not_modified():
+    client = make_app().test_client()
+    first = client.get("/data")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag.startswith('W/"'), first.headers
+    assert first.headers["Cache-Control"] == "public, max-age=60, stale-while-revalidate=120", first.headers
+
+    again = client.get("/data", headers={"If-None-Match": etag})
+    assert again.status_code == 304, again.status_code
+    assert again.data == b"", again.data
+    assert again.headers["ETag"] == etag
+    assert again.headers["Cache-Control"] == first.headers["Cache-Control"]
+    assert "Accept-Encoding" in again.headers.get("Vary", ""), again.headers
+
+
+def test_etag_follows_content():
+    app = make_app()
+    client = app.test_client()
+    etag = client.get("/data").headers["ETag"]
+    app.state["value"] = 2
+    changed = client.get("/data", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.get_json() == {"value": 2}, changed.status_code
+    assert changed.headers["ETag"] != etag
+
+
+def test_same_etag_for_every_encoding():
+    client = make_app().test_client()
+    identity = client.get("/big")
+    gzipped = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers.get("Content-Encoding") == "gzip", gzipped.headers
+    assert gzipped.headers["ETag"] == identity.headers["ETag"]
+
+    revalidated = client.get("/big", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["ETag"]})
+    assert revalidated.status_code == 304 and "Content-Encoding" not in revalidated.headers, revalidated.headers
+
+
+def test_last_modified():
+    client = make_app().test_client()
+    first = client.get("/fetched")
+    assert first.headers["Last-Modified"] == "Mon, 19 Oct 2026 08:00:00 GMT", first.headers
+    assert client.get("/fetched", headers={"If-Modified-Since": first.headers["Last-Modified"]}).status_code == 304
+    assert client.get("/fetched", headers={"If-Modified-Since": "Sun, 18 Oct 2026 08:00:00 GMT"}).status_code == 200
+
+
+def test_route_etag_kept():
+    client = make_app().test_client()
+    first = client.get("/sequenced")
+    assert first.headers["ETag"] == 'W/"7-1"', first.headers
+    assert client.get("/sequenced", headers={"If-None-Match": 'W/"7-1"'}).status_code == 304
+    assert client.get("/sequenced", headers={"If-None-Match": 'W/"6-1"'}).status_code == 200
+
+
+def test_policies():
+    client = make_app().test_client()
+    assert client.get("/dynamic?age=42").headers["Cache-Control"] == "public, max-age=42"
+    assert client.get("/dynamic?age=0").headers["Cache-Control"] == "no-cache"
+    assert client.get("/plain").headers["Cache-Control"] == "no-cache"
+    missing = client.get("/missing")
+    assert missing.headers["Cache-Control"] == "no-store" and "ETag" not in missing.headers, missing.headers
+
+
+def test_candles_policy():
+    from unittest import mock
+
+    from routes import candles
+
+    app = make_app()
+    midnight = 1_792_368_000  # 2026-10-19 00:00 UTC
+
+    def policy(query, now):
+        with app.test_request_context(f"/?{query}"), mock.patch("time.time", return_value=now):
+            return candles._cache_policy()
+
+    # The previous hour is final once the CandleWriter has written it
+    assert policy(f"resolution=1h&to={midnight - 7200}", midnight + 30) == candles.CLOSED_RANGE
+    assert policy(f"resolution=1h&to={midnight - 1}", midnight + 30) == candles.LIVE_CANDLE
+    assert policy(f"resolution=1h&before={midnight}", midnight + 600) == candles.CLOSED_RANGE
+    # Yesterday's 1d row waits for the aggregator's next run
+    assert policy(f"resolution=1d&to={midnight - 1}", midnight + 600) == candles.LIVE_CANDLE
+    assert policy(f"resolution=1d&to={midnight - 1}", midnight + candles.ROLLUP_SETTLE_S) == candles.CLOSED_RANGE
+    assert policy(f"resolution=1d&to={midnight - 2 * 86_400}", midnight + 600) == candles.CLOSED_RANGE
+    assert policy("resolution=1d", midnight + 600) == candles.LIVE_CANDLE
+    # 1m/5m are written by backfills only
+    assert policy(f"resolution=1m&to={midnight - 60}", midnight + 1) == candles.CLOSED_RANGE
+    assert policy("resolution=1m", midnight + 1) == candles.BACKFILL_ONLY
+    assert policy("resolution=3m", midnight).header == "no-cache"
+
+
+def test_candles_range_error_not_cached():
+    from routes.candles import candles_bp
+    from services.candles.main import sql
+
+    app = Flask(__name__)
+    app.register_blueprint(candles_bp, url_prefix="/api")
+    app.after_request(compress_response)
+    app.after_request(conditional_response)
+
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("database unavailable")
+
+    fetch_range, sql.fetch_range = sql.fetch_range, unavailable
+    try:
+        resp = app.test_client().get("/api/candles/bitcoin?resolution=1h&to=1700000000")
+    finally:
+        sql.fetch_range = fetch_range
+    assert resp.status_code == 503, resp.status_code
+    assert resp.headers["Cache-Control"] == "no-store", resp.headers
+    assert app.test_client().get("/api/candles/bitcoin?resolution=3m&to=1700000000").status_code == 400
+
+
+def main() -> None:
+    if flask is None:
+        print("ERROR: install the backend's requirements (flask) to run these tests")
+        sys.exit(1)
+    failed = 0
+    for test in (test_etag_and_not_modified, test_etag_follows_content, test_same_etag_for_every_encoding,
+                 test_last_modified, test_route_etag_kept, test_policies, test_candles_policy,
+                 test_candles_range_error_not_cached):
+        try:
+            test()
+            print(f"   ✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"   ✗ {test.__name__}: {e}")
+
+    if failed:
+        print(f"\n{failed} test(s) failed")
+        sys.exit(1)
+    print("\n✅ All HTTP caching tests passed!")
+
+
+if __name__ == "__main__":
+    main()
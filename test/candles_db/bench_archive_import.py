@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Archive import throughput (rows/s) for tools/populate_candle_db/archives.py.
+
+Generates synthetic monthly 1m archives (default 8 symbols × 30 days ≈ 346k
+1m rows, plus 5m/1h/1d roll-ups) in a temp directory, then times:
+
+  parse        chunked CSV parse + local roll-ups only (no DB), 1 vs N workers
+  import       full COPY + merge into scratch tables, 1 vs N workers
+  legacy       the REST tool's per-row execute_values upsert (common.upsert_candles)
+               for the same 1m rows, single process — for comparison
+
+The import/legacy rows need --dsn (local Postgres only).
+
+Usage:
+    python test/candles_db/bench_archive_import.py
+    python test/candles_db/bench_archive_import.py --symbols 16 --days 31 --workers 8
+    python test/candles_db/bench_archive_import.py --dsn "$DATABASE_URL"
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "tools" / "populate_candle_db"))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent / "fixtures"))
+
+import archives  # noqa: E402
+from common import upsert_candles  # noqa: E402
+from make_archives import write_archive  # noqa: E402
+
+TABLE_FOR = {res: f"bench_archive_candles_{res}" for res in ("1m", "5m", "1h", "1d")}
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _generate(directory: str, symbols: int, days: int):
+    files = []
+    start_ms = int(START.timestamp() * 1000)
+    for i in range(symbols):
+        path = write_archive(directory, f"BENCH{i}USDT", "1m", "2024-01", start_ms, days * 1440)
+        files.append(archives.ArchiveFile(path, f"BENCH{i}USDT", "1m", coin_id=f"bench-{i}"))
+    return files
+
+
+def _create_tables(conn) -> None:
+    cols = """
+        id BIGSERIAL, coin_id TEXT NOT NULL, bucket {bucket} NOT NULL,
+        open NUMERIC(24, 8) NOT NULL, high NUMERIC(24, 8) NOT NULL,
+        low NUMERIC(24, 8) NOT NULL, close NUMERIC(24, 8) NOT NULL,
+        volume NUMERIC(24, 8) NOT NULL DEFAULT 0, exchange_count SMALLINT NOT NULL DEFAULT 0,
+        tick_count INT NOT NULL DEFAULT 0, created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (coin_id, bucket)
+    """
+    with conn.cursor() as cur:
+        for res, table in TABLE_FOR.items():
+            cur.execute(f"DROP TABLE IF EXISTS {table}")
+            cur.execute(f"CREATE TABLE {table} ({cols.format(bucket='DATE' if res == '1d' else 'TIMESTAMPTZ')})")
+    conn.commit()
+
+
+def _truncate(conn) -> None:
+    with conn.cursor() as cur:
+        cur.execute(f"TRUNCATE {', '.join(TABLE_FOR.values())}")
+    conn.commit()
+
+
+def _report(label: str, rows: int, elapsed: float) -> None:
+    print(f"  {label:<22} {rows:9d} rows  {elapsed:7.2f}s  {rows / elapsed:10,.0f} rows/s")
+
+
+def _timed_import(files, dsn, workers):
+    t0 = time.perf_counter()
+    results = archives.run_import(files, dsn, archives.DEFAULT_DERIVE, workers, table_for=TABLE_FOR)
+    elapsed = time.perf_counter() - t0
+    errors = [r.error for r in results if r.error]
+    if errors:
+        raise SystemExit(f"import failed: {errors[0]}")
+    return sum(sum(r.rows.values()) for r in results), elapsed
+
+
+def _legacy(conn, files) -> tuple:
+    rows = 0
+    t0 = time.perf_counter()
+    for a in files:
+        for chunk in archives.iter_chunks(a.path):
+            candles = [
+                {"bucket": archives._dt(t), "open": o, "high": h, "low": l, "close": c, "volume": v, "tick_count": 1}
+                for t, o, h, l, c, v in chunk
+            ]
+            rows += upsert_candles(conn, TABLE_FOR["1m"], a.coin_id, candles, is_daily=False)
+    return rows, time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the kline archive importer.")
+    parser.add_argument("--symbols", type=int, default=8)
+    parser.add_argument("--days", type=int, default=30, help="Days of 1m per archive. Default: 30")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--dsn", default=None, help="Also benchmark COPY + merge into scratch tables.")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_archives_")
+    files = _generate(tmp, args.symbols, args.days)
+    size_mb = sum(os.path.getsize(a.path) for a in files) / 1e6
+    print(f"{len(files)} archives × {args.days * 1440} 1m rows ({size_mb:.1f} MB zipped) in {tmp}\n")
+
+    for workers in sorted({1, args.workers}):
+        _report(f"parse ×{workers}", *_timed_import(files, None, workers))
+
+    if args.dsn:
+        import psycopg2
+
+        conn = psycopg2.connect(args.dsn)
+        _create_tables(conn)
+        try:
+            for workers in sorted({1, args.workers}):
+                _truncate(conn)
+                _report(f"import ×{workers}", *_timed_import(files, args.dsn, workers))
+            _report("re-import (no-op)", *_timed_import(files, args.dsn, args.workers))
+            _truncate(conn)
+            _report("legacy upsert (1m only)", *_legacy(conn, files))
+        finally:
+            with conn.cursor() as cur:
+                for table in TABLE_FOR.values():
+                    cur.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.commit()
+            conn.close()
+
+    for a in files:
+        os.remove(a.path)
+    os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    main()
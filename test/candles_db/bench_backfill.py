@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Backfill fetch throughput: sequential loop vs. the async pipeline.
+
+Runs tools/populate_candle_db/fake_kline_server.py in-process with a fixed
+per-request latency (a stand-in for the round trip to Binance.US), then
+fetches the same (coin, resolution) set two ways:
+
+  sequential  the old main.py loop — BinanceKlineSource.fetch() one coin
+              and resolution at a time, REQUEST_DELAY_S between pages
+  pipeline    pipeline.run_pipeline() with N concurrent fetchers sharing
+              one AsyncWeightLimiter
+
+Both are dry runs unless --dsn is given, in which case the pipeline also
+writes (COPY + merge) into a scratch table so the writer stage is included.
+
+The default weight budget is Binance.US's real 1200/min, which caps any
+client at 10 klines pages/s — raise --weight-per-minute to see how far
+concurrency alone goes.
+
+Usage:
+    python test/candles_db/bench_backfill.py
+    python test/candles_db/bench_backfill.py --coins 40 --days 30 --latency-ms 120 --concurrency 16
+    python test/candles_db/bench_backfill.py --weight-per-minute 100000
+    DATABASE_URL=... python test/candles_db/bench_backfill.py --dsn "$DATABASE_URL"
+"""
+
+import argparse
+import asyncio
+import pathlib
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "tools" / "populate_candle_db"))
+
+from fake_kline_server import FakeKlineServer  # noqa: E402
+from pipeline import Job, run_pipeline  # noqa: E402
+from ratelimit import AsyncWeightLimiter  # noqa: E402
+from sources.binance import BinanceKlineSource  # noqa: E402
+from state import CheckpointStore  # noqa: E402
+
+TABLE = "bench_backfill_candles_1h"
+
+
+def _sequential(url: str, jobs) -> tuple:
+    source = BinanceKlineSource(base_url=url)
+    candles = 0
+    t0 = time.perf_counter()
+    for job in jobs:
+        candles += len(source.fetch(job.symbol, job.resolution, job.start_ms, job.end_ms))
+    return candles, time.perf_counter() - t0
+
+
+def _create_table(dsn: str):
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cur.execute(f"""
+            CREATE TABLE {TABLE} (
+                id BIGSERIAL, coin_id TEXT NOT NULL, bucket TIMESTAMPTZ NOT NULL,
+                open NUMERIC(24, 8) NOT NULL, high NUMERIC(24, 8) NOT NULL,
+                low NUMERIC(24, 8) NOT NULL, close NUMERIC(24, 8) NOT NULL,
+                volume NUMERIC(24, 8) NOT NULL DEFAULT 0, exchange_count SMALLINT NOT NULL DEFAULT 0,
+                tick_count INT NOT NULL DEFAULT 0, created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (coin_id, bucket)
+            )
+        """)
+    conn.commit()
+    return conn
+
+
+async def run(args) -> None:
+    server = FakeKlineServer(latency_ms=args.latency_ms, weight_per_minute=args.weight_per_minute)
+    await server.start()
+
+    end = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(days=1)
+    start_ms = int((end - timedelta(days=args.days)).timestamp() * 1000)
+    end_ms = int(end.timestamp() * 1000)
+    jobs = [Job(f"coin-{i}", f"COIN{i}USDT", "1h", start_ms, end_ms) for i in range(args.coins)]
+    pages_per_job = -(-args.days * 24 // 1000)
+    print(f"{len(jobs)} jobs × ~{pages_per_job} pages of 1h, {args.latency_ms:.0f}ms latency, "
+          f"{args.weight_per_minute} weight/min\n")
+
+    if not args.skip_sequential:
+        before = len(server.log)
+        candles, elapsed = await asyncio.to_thread(_sequential, server.url, jobs)
+        pages = len(server.log) - before
+        print(f"  sequential            {pages:5d} pages {candles:8d} candles  {elapsed:7.2f}s  "
+              f"{pages / elapsed:6.1f} pages/s  {candles / elapsed:9.0f} candles/s")
+
+    conn = _create_table(args.dsn) if args.dsn else None
+    store = None
+    if conn is not None:
+        store = CheckpointStore(":memory:")
+        for job in jobs:
+            store.begin(job.coin_id, job.resolution, job.start_ms, job.end_ms)
+
+    limiter = AsyncWeightLimiter(args.weight_per_minute)
+    before = len(server.log)
+    stats = await run_pipeline(
+        jobs, BinanceKlineSource(base_url=server.url), limiter, conn=conn, store=store,
+        concurrency=args.concurrency, batch_rows=args.batch_rows, dry_run=conn is None,
+        table_for={"1h": TABLE},
+    )
+    pages = len(server.log) - before
+    label = f"pipeline ×{args.concurrency}{' +write' if conn else ''}"
+    print(f"  {label:<21} {pages:5d} pages {stats.candles:8d} candles  {stats.elapsed_s:7.2f}s  "
+          f"{pages / stats.elapsed_s:6.1f} pages/s  {stats.candles / stats.elapsed_s:9.0f} candles/s")
+    print(f"\n  limiter waited {limiter.waited_s:.1f}s, server returned {server.rejected} × 429")
+
+    if conn is not None:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        conn.commit()
+        conn.close()
+        store.close()
+    await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs pipelined kline backfill.")
+    parser.add_argument("--coins", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365, help="1h history per coin. Default: 365 (9 pages)")
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--weight-per-minute", type=int, default=1200)
+    parser.add_argument("--batch-rows", type=int, default=20000)
+    parser.add_argument("--skip-sequential", action="store_true")
+    parser.add_argument("--dsn", default=None, help="Also write through COPY + merge into a scratch table.")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Generate Binance-style kline archive files (data.binance.vision layout).
+
+Writes the small fixtures under fixtures/archives/ used by
+test_archive_import.py, and is imported by bench_archive_import.py to build
+larger synthetic datasets.  Prices are a deterministic function of
+(symbol, open time), so the same file is produced every run.
+
+Usage:
+    python test/candles_db/fixtures/make_archives.py      # rewrite fixtures/archives/
+"""
+
+import io
+import math
+import os
+import pathlib
+import zipfile
+import zlib
+from datetime import datetime, timezone
+
+HERE = pathlib.Path(__file__).resolve().parent
+HEADER = [
+    "open_time", "open", "high", "low", "close", "volume", "close_time",
+    "quote_volume", "count", "taker_buy_volume", "taker_buy_quote_volume", "ignore",
+]
+STEP_MS = {"1m": 60_000, "5m": 300_000, "1h": 3_600_000, "1d": 86_400_000}
+
+
+def kline_row(symbol: str, interval: str, open_ms: int) -> list:
+    base = 10.0 + zlib.crc32(symbol.encode()) % 40_000
+    phase = open_ms / 3_600_000
+    open_ = base * (1 + 0.02 * math.sin(phase))
+    close = base * (1 + 0.02 * math.sin(phase + 0.05))
+    high = max(open_, close) * 1.001
+    low = min(open_, close) * 0.999
+    volume = 1 + (open_ms // STEP_MS[interval]) % 13
+    return [open_ms, open_, high, low, close, volume, open_ms + STEP_MS[interval] - 1]
+
+
+def archive_csv(symbol: str, interval: str, start_ms: int, count: int,
+                micros: bool = False, header: bool = False) -> str:
+    """CSV text in the archive column layout (µs timestamps like 2025+ spot files)."""
+    scale = 1000 if micros else 1
+    out = io.StringIO()
+    if header:
+        out.write(",".join(HEADER) + "\n")
+    for i in range(count):
+        t, o, h, l, c, v, ct = kline_row(symbol, interval, start_ms + i * STEP_MS[interval])
+        out.write(f"{t * scale},{o:.8f},{h:.8f},{l:.8f},{c:.8f},{v:.8f},{ct * scale},0,1,0,0,0\n")
+    return out.getvalue()
+
+
+def write_archive(directory, symbol: str, interval: str, period: str, start_ms: int, count: int,
+                  zipped: bool = True, micros: bool = False, header: bool = False) -> str:
+    """Write <SYMBOL>-<interval>-<period>.zip (or .csv); returns the path."""
+    name = f"{symbol}-{interval}-{period}"
+    text = archive_csv(symbol, interval, start_ms, count, micros, header)
+    os.makedirs(directory, exist_ok=True)
+    if zipped:
+        path = os.path.join(directory, f"{name}.zip")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(f"{name}.csv", text)
+    else:
+        path = os.path.join(directory, f"{name}.csv")
+        with open(path, "w") as f:
+            f.write(text)
+    return path
+
+
+def _ms(y: int, m: int, d: int) -> int:
+    return int(datetime(y, m, d, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def main() -> None:
+    out = HERE / "archives"
+    # Two consecutive days of BTC 1m; the second in the 2025+ spot format
+    # (microsecond timestamps, header line)
+    write_archive(out, "BTCUSDT", "1m", "2024-01-01", _ms(2024, 1, 1), 1440)
+    write_archive(out, "BTCUSDT", "1m", "2024-01-02", _ms(2024, 1, 2), 1440, micros=True, header=True)
+    # An already-extracted 5m file
+    write_archive(out, "ETHUSDT", "5m", "2024-01-01", _ms(2024, 1, 1), 288, zipped=False)
+    # Symbol that is not in coin_aliases.json
+    write_archive(out, "NOTACOINUSDT", "1m", "2024-01-01", _ms(2024, 1, 1), 60)
+    print(f"Fixtures written to {out}")
+
+
+if __name__ == "__main__":
+    main()
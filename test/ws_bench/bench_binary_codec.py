@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Bytes per update and server CPU: JSON text frames vs prices.v1.msgpack.
+
+Connects --clients bare-socket sinks (child processes).  Each subscribes
+to between --min-subs and --max-subs coins drawn with Zipf-like
+popularity (a few coins are on every watchlist, the long tail on few),
+then every coin is published --rate-hz times a second through
+PriceChannel.route().  One run per codec, each against a fresh server:
+
+  bytes/update   wire bytes the sinks received (websocket headers
+                 included) per price update delivered
+  CPU            server time.process_time over the publish phase
+
+Before the runs, the reference Decoder is checked against the JSON
+frames for the same updates.
+
+Usage:
+    python test/ws_bench/bench_binary_codec.py
+    python test/ws_bench/bench_binary_codec.py --compression deflate
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import harness  # also puts ws/ on sys.path
+
+import codec
+from channels.prices import PriceChannel
+from server import connected_clients
+
+
+def watchlists(coins: list, clients: int, min_subs: int, max_subs: int, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(coins))]
+    lists = []
+    for _ in range(clients):
+        picked = set()
+        want = rnd.randint(min_subs, max_subs)
+        while len(picked) < want:
+            picked.update(rnd.choices(coins, weights, k=want - len(picked)))
+        lists.append(sorted(picked))
+    return lists
+
+
+def check_decoder(coins: list) -> None:
+    """Encode a run of updates and decode them back; must match the JSON payloads."""
+    channel = PriceChannel()
+    decoder = codec.Decoder()
+    names = channel.codec.names
+    updates = [(seq, coin) for seq in (1, 2, 3) for coin in coins[:20]]
+    for seq, coin in updates:
+        data = json.loads(harness.make_aggregate(coin, 100.0 + seq))
+        start = len(names)
+        full, delta = channel.codec.encode(coin, seq, data)
+        if start < len(names):
+            decoder.feed(names.frame(start))
+        decoded = decoder.feed(delta or full)[0]["data"]
+        assert decoded == data, (decoded, data)
+
+
+# ── Sinks (child processes) ─────────────────────────────────────────────────
+
+async def _sinks(host, port, lists, subprotocol, deflate):
+    loop = asyncio.get_running_loop()
+    received = 0
+
+    async def sink(coins):
+        nonlocal received
+        sock = await harness.raw_connect(host, port, coins, deflate=deflate, subprotocol=subprotocol)
+        try:
+            while chunk := await loop.sock_recv(sock, 65536):
+                received += len(chunk)
+        except OSError:
+            pass
+        sock.close()
+
+    await asyncio.gather(*(sink(coins) for coins in lists), return_exceptions=True)
+    return received
+
+
+def sink_proc(host, port, lists, subprotocol, deflate, queue):
+    queue.put(asyncio.run(_sinks(host, port, lists, subprotocol, deflate)))
+
+
+# ── Server side ─────────────────────────────────────────────────────────────
+
+async def run_codec(args, name: str, coins: list, lists: list) -> None:
+    channel = PriceChannel()
+    compression = None if args.compression == "none" else args.compression
+    server, port = await harness.start_server({"prices": channel}, compression=compression)
+    subprotocol = codec.SUBPROTOCOL if name == "msgpack" else None
+
+    children, queue = harness.run_in_processes(
+        sink_proc, args.procs,
+        lambda i: ("127.0.0.1", port, lists[i::args.procs], subprotocol, compression is not None),
+    )
+    target = sum(len(w) for w in lists)
+    t0 = time.monotonic()
+    while channel.stats["total_subscriptions"] < target and time.monotonic() - t0 < 60:
+        await asyncio.sleep(0.2)
+    await asyncio.sleep(0.5)                # acks flushed
+
+    sent0 = sum(c.sent for c in connected_clients)
+    cpu0 = time.process_time()
+    await harness.publish_loop(channel, coins, args.rate_hz, args.duration)
+    while any(c.queue_depth for c in connected_clients):
+        await asyncio.sleep(0.01)
+    cpu = time.process_time() - cpu0
+    updates = sum(c.sent for c in connected_clients) - sent0
+
+    server.close()
+    await server.wait_closed()
+    received = sum(await asyncio.to_thread(harness.collect, children, queue, 60))
+    print(f"  {name:<8} updates {updates:9d}   bytes/update {received / max(updates, 1):7.1f}"
+          f"   MB {received / 1e6:7.2f}   CPU {cpu / args.duration * 100:5.1f}%"
+          f"   ({cpu / max(updates, 1) * 1e6:.1f} µs/update)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JSON vs msgpack price frames: bytes and CPU.")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--procs", type=int, default=2)
+    parser.add_argument("--coins", type=int, default=500)
+    parser.add_argument("--min-subs", type=int, default=5)
+    parser.add_argument("--max-subs", type=int, default=50)
+    parser.add_argument("--rate-hz", type=float, default=1.0, help="Updates per coin per second")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--compression", default="none", choices=["none", "deflate"])
+    parser.add_argument("--codecs", default="json,msgpack")
+    args = parser.parse_args()
+
+    coins = harness.coin_ids(args.coins)
+    check_decoder(coins)
+    lists = watchlists(coins, args.clients, args.min_subs, args.max_subs)
+    print(f"{args.clients} clients, {sum(map(len, lists)) / len(lists):.1f} coins each (Zipf), "
+          f"{args.coins} coins × {args.rate_hz} Hz, compression={args.compression}")
+    for name in args.codecs.split(","):
+        asyncio.run(run_codec(args, name, coins, lists))
+
+
+if __name__ == "__main__":
+    main()
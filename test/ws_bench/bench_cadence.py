@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Frames, write syscalls and CPU under different client cadences.
+
+Connects --clients bare-socket sinks (child processes), each subscribed
+to --subs coins with the same throttle_ms / batch options, and publishes
+every coin --rate-hz times a second through PriceChannel.route().  One
+run per cadence, each against a fresh server, reporting the server
+process's:
+
+  frames/s      websocket frames handed to clients
+  syscalls/s    write-family syscalls (/proc/self/io syscw; reads 0 on
+                kernels without per-task I/O accounting)
+  CPU           time.process_time over the run
+
+Usage:
+    python test/ws_bench/bench_cadence.py
+    python test/ws_bench/bench_cadence.py --cadences none,250,1000,batch:250,batch:1000
+"""
+
+import argparse
+import asyncio
+import time
+
+import harness  # also puts ws/ on sys.path
+
+from channels.prices import PriceChannel
+from server import connected_clients
+
+
+def parse_cadence(spec: str) -> dict:
+    """'none' | '<ms>' | 'batch:<ms>' → subscribe options."""
+    if spec == "none":
+        return {}
+    if spec.startswith("batch:"):
+        return {"batch": True, "throttle_ms": int(spec.split(":", 1)[1])}
+    return {"throttle_ms": int(spec)}
+
+
+# ── Sinks (child processes) ─────────────────────────────────────────────────
+
+async def _sinks(host, port, n, coins, options):
+    loop = asyncio.get_running_loop()
+
+    async def sink():
+        sock = await harness.raw_connect(host, port, coins, options=options)
+        try:
+            while await loop.sock_recv(sock, 65536):
+                pass
+        except OSError:
+            pass
+        sock.close()
+
+    await asyncio.gather(*(sink() for _ in range(n)), return_exceptions=True)
+    return 0
+
+
+def sink_proc(host, port, n, coins, options, queue):
+    queue.put(asyncio.run(_sinks(host, port, n, coins, options)))
+
+
+# ── Server side ─────────────────────────────────────────────────────────────
+
+async def run_cadence(args, spec: str) -> None:
+    channel = PriceChannel()
+    server, port = await harness.start_server({"prices": channel})
+    coins = harness.coin_ids(args.subs)
+    options = parse_cadence(spec)
+
+    per_proc = args.clients // args.procs
+    children, queue = harness.run_in_processes(
+        sink_proc, args.procs, lambda i: ("127.0.0.1", port, per_proc, coins, options),
+    )
+    target = per_proc * args.procs * args.subs
+    t0 = time.monotonic()
+    while channel.stats["total_subscriptions"] < target and time.monotonic() - t0 < 60:
+        await asyncio.sleep(0.2)
+
+    sent0 = sum(c.sent for c in connected_clients)
+    sys0, cpu0 = harness.write_syscalls(), time.process_time()
+    await harness.publish_loop(channel, coins, args.rate_hz, args.duration)
+    cpu = time.process_time() - cpu0
+    syscalls = harness.write_syscalls() - sys0
+    frames = sum(c.sent for c in connected_clients) - sent0
+
+    print(f"  {spec:<12} frames/s {frames / args.duration:10.0f}   syscalls/s {syscalls / args.duration:10.0f}"
+          f"   CPU {cpu / args.duration * 100:5.1f}%")
+
+    server.close()
+    await server.wait_closed()
+    await asyncio.to_thread(harness.collect, children, queue, 30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Server cost under client-negotiated cadences.")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--procs", type=int, default=2)
+    parser.add_argument("--subs", type=int, default=50, help="Coins per client (all clients watch the same set)")
+    parser.add_argument("--rate-hz", type=float, default=1.0, help="Updates per coin per second")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--cadences", default="none,250,1000,batch:250,batch:1000")
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients × {args.subs} coins, {args.rate_hz} updates/coin/s")
+    for spec in args.cadences.split(","):
+        asyncio.run(run_cadence(args, spec))
+
+
+if __name__ == "__main__":
+    main()
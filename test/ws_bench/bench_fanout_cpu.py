@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+CPU cost per published message at high fan-out.
+
+Connects --subscribers bare-socket sinks (child processes) to the real
+ws server, all subscribed to one coin, then publishes --messages
+aggregates through PriceChannel.route().  After each publish it waits
+until every client's queue is empty, so the measured server CPU
+(time.process_time — client processes are not counted) covers the whole
+fan-out: routing, framing, compression and socket writes.
+
+  --legacy        decode + re-encode per message and a queued str send
+                  per subscriber (the fan-out before frames were shared)
+  --compression   deflate | none — negotiate permessage-deflate
+
+Usage:
+    python test/ws_bench/bench_fanout_cpu.py
+    python test/ws_bench/bench_fanout_cpu.py --legacy
+    python test/ws_bench/bench_fanout_cpu.py --compression deflate
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import harness  # also puts ws/ on sys.path
+
+from channels.prices import PriceChannel
+from server import connected_clients
+
+COIN = "bitcoin"
+
+
+class LegacyPriceChannel(PriceChannel):
+    """json.loads → json.dumps per message, one queued str send per subscriber."""
+
+    async def route(self, message: str) -> None:
+        data = json.loads(message)
+        coin_id = data.get("coin_id")
+        outgoing = json.dumps({"channel": self.name, "data": data})
+        for client in self._subscriptions.get(coin_id, ()):
+            client.enqueue(coin_id, outgoing)
+
+
+# ── Sinks (child processes) ─────────────────────────────────────────────────
+
+async def _sinks(host, port, n, deflate):
+    loop = asyncio.get_running_loop()
+    received = 0
+
+    async def sink():
+        nonlocal received
+        sock = await harness.raw_connect(host, port, [COIN], deflate=deflate)
+        try:
+            while chunk := await loop.sock_recv(sock, 65536):
+                received += len(chunk)
+        except OSError:
+            pass
+        sock.close()
+
+    # Connect in waves so the server's accept backlog is not overrun
+    tasks = []
+    for i in range(0, n, 500):
+        tasks += [asyncio.create_task(sink()) for _ in range(min(500, n - i))]
+        await asyncio.sleep(0.5)
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return received
+
+
+def sink_proc(host, port, n, deflate, queue):
+    queue.put(asyncio.run(_sinks(host, port, n, deflate)))
+
+
+# ── Server side ─────────────────────────────────────────────────────────────
+
+async def _drained() -> None:
+    while any(c.queue_depth for c in connected_clients):
+        await asyncio.sleep(0)
+
+
+async def run(args) -> None:
+    channel = LegacyPriceChannel() if args.legacy else PriceChannel()
+    compression = None if args.compression == "none" else args.compression
+    server, port = await harness.start_server({"prices": channel}, compression=compression)
+
+    per_proc = args.subscribers // args.procs
+    children, queue = harness.run_in_processes(
+        sink_proc, args.procs, lambda i: ("127.0.0.1", port, per_proc, compression is not None),
+    )
+    target = per_proc * args.procs
+    t0 = time.monotonic()
+    while channel.stats["total_subscriptions"] < target and time.monotonic() - t0 < args.connect_timeout:
+        await asyncio.sleep(0.5)
+    subscribers = channel.stats["total_subscriptions"]
+    print(f"{subscribers} subscribers on one coin, compression={args.compression}, "
+          f"mode={'legacy' if args.legacy else 'shared-frame'}")
+
+    messages = [harness.make_aggregate(COIN, 60000 + i, args.pad_bytes) for i in range(args.messages)]
+    route_ms = []
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for msg in messages:
+        t = time.perf_counter()
+        await channel.route(msg)
+        route_ms.append((time.perf_counter() - t) * 1000)
+        await _drained()
+    cpu = time.process_time() - cpu0
+    wall = time.perf_counter() - wall0
+
+    per_msg_ms = cpu / args.messages * 1000
+    print(f"\n  {args.messages} messages in {wall:.2f}s wall, {cpu:.2f}s server CPU")
+    print(f"  CPU per message:   {per_msg_ms:8.2f} ms")
+    print(f"  CPU per delivery:  {per_msg_ms * 1000 / max(subscribers, 1):8.2f} µs")
+    print(harness.fmt_pct("route() call", route_ms))
+
+    server.close()
+    await server.wait_closed()
+    received = await asyncio.to_thread(harness.collect, children, queue, 60)
+    print(f"\n  sinks received {sum(received) / 1e6:.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Server CPU per message at high fan-out.")
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--procs", type=int, default=2, help="Sink processes")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--pad-bytes", type=int, default=0)
+    parser.add_argument("--compression", choices=["none", "deflate"], default="none")
+    parser.add_argument("--connect-timeout", type=float, default=120.0)
+    parser.add_argument("--legacy", action="store_true", help="Decode/re-encode + per-client send")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Redis egress and per-instance CPU with several ws instances.
+
+Runs --instances ws "instances" as child processes.  Each one is the real
+RedisSubscriber + PriceChannel, with local interest in --interest random
+coins.  Interest comes from a counting stand-in client, so no sockets are
+involved.  The parent publishes an aggregate for each of --coins coins
+--rate-hz times a second, the way RedisWriter does.
+
+For each pub/sub mode it reports:
+  - Redis egress: total_net_output_bytes from INFO, before vs after
+  - per-instance CPU (time.process_time) and messages received vs routed
+
+Needs a local Redis (pub/sub is not tied to a database number):
+    docker run --rm -p 6379:6379 redis:7
+    REDIS_URL=redis://localhost:6379 python test/ws_bench/bench_redis_egress.py
+    REDIS_URL=... python test/ws_bench/bench_redis_egress.py --instances 8 --coins 2000 --interest 100
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import harness  # also puts ws/ on sys.path
+import redis.asyncio as aioredis
+
+import config
+from channels.prices import PriceChannel
+from redis_sub import RedisSubscriber
+
+PRICE_CHANNEL = "rt:stream:prices"
+
+
+class CountingClient:
+    """Stands in for outbound.Client: counts the frames it is handed."""
+
+    writable = False
+    ws = None
+    sent = 0
+
+    def __init__(self):
+        self.frames = 0
+
+    def enqueue(self, key, frame) -> None:
+        self.frames += 1
+
+
+# ── Instances (child processes) ─────────────────────────────────────────────
+
+async def _instance(mode, coins, run_s, queue):
+    channel = PriceChannel()
+    routed = 0
+    inner_route = channel.route
+
+    async def counting_route(message):
+        nonlocal routed
+        routed += 1
+        await inner_route(message)
+
+    channel.route = counting_route
+    sub = RedisSubscriber([channel], mode=mode, unsubscribe_debounce_s=5)
+    await sub.connect()
+    listener = asyncio.create_task(sub.listen())
+
+    client = CountingClient()
+    channel.subscribe(client, coins)
+    await asyncio.sleep(1.0)                 # let the SUBSCRIBEs land
+    queue.put(("ready", None))
+
+    cpu0 = time.process_time()
+    await asyncio.sleep(run_s)
+    cpu = time.process_time() - cpu0
+
+    listener.cancel()
+    await sub.close()
+    queue.put(("done", {"cpu_s": cpu, "received": routed, "delivered": client.frames,
+                        "redis_channels": sub.stats["redis_channels"]}))
+
+
+def instance_proc(redis_url, mode, coins, run_s, queue):
+    config.REDIS_URL = redis_url
+    asyncio.run(_instance(mode, coins, run_s, queue))
+
+
+# ── Publisher / driver ──────────────────────────────────────────────────────
+
+async def _net_output_bytes(client) -> int:
+    return int((await client.info("stats"))["total_net_output_bytes"])
+
+
+async def publish(client, mode, coins, rate_hz, duration_s) -> int:
+    """Publish one aggregate per coin every 1/rate_hz s in *mode*; returns PUBLISH count."""
+    published = 0
+    tick = 1.0 / rate_hz
+    next_tick = time.monotonic()
+    end = next_tick + duration_s
+    while time.monotonic() < end:
+        pipe = client.pipeline(transaction=False)
+        for i, coin in enumerate(coins):
+            msg = harness.make_aggregate(coin, 100.0 + i * (1 + random.uniform(-1e-3, 1e-3)))
+            channels = (PRICE_CHANNEL,) if mode == "shared" else (f"{PRICE_CHANNEL}:{coin}",)
+            for name in channels:
+                pipe.publish(name, msg)
+                published += 1
+        await pipe.execute()
+        next_tick += tick
+        await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+    return published
+
+
+async def run_mode(args, mode, redis_url) -> None:
+    coins = harness.coin_ids(args.coins)
+    run_s = args.duration + 2
+    rnd = random.Random(42)
+    interest = [rnd.sample(coins, args.interest) for _ in range(args.instances)]
+    children, queue = harness.run_in_processes(
+        instance_proc, args.instances, lambda i: (redis_url, mode, interest[i], run_s),
+    )
+    for _ in children:
+        kind, _ = await asyncio.to_thread(queue.get, True, 60)
+        assert kind == "ready"
+
+    client = aioredis.from_url(redis_url)
+    before = await _net_output_bytes(client)
+    published = await publish(client, mode, coins, args.rate_hz, args.duration)
+    await asyncio.sleep(1.0)
+    egress = await _net_output_bytes(client) - before
+    await client.aclose()
+
+    results = [r for _, r in await asyncio.to_thread(harness.collect, children, queue, run_s + 30)]
+    cpu = [r["cpu_s"] for r in results]
+    received = sum(r["received"] for r in results)
+    delivered = sum(r["delivered"] for r in results)
+    print(f"\n── mode={mode}: {args.instances} instances × {args.interest} watched coins, "
+          f"{args.coins} coins × {args.rate_hz} Hz")
+    print(f"  PUBLISH commands:        {published}")
+    print(f"  Redis egress:            {egress / 1e6:8.2f} MB  ({egress / args.duration / 1e3:.1f} kB/s)")
+    print(f"  messages received:       {received}  (routed to a local client: {delivered}, "
+          f"{100 * delivered / max(received, 1):.0f}%)")
+    print(f"  CPU per instance:        mean {sum(cpu) / len(cpu) / run_s * 100:5.1f}%  "
+          f"max {max(cpu) / run_s * 100:5.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Redis egress / instance CPU: shared vs per-coin pub/sub.")
+    parser.add_argument("--instances", type=int, default=4)
+    parser.add_argument("--coins", type=int, default=500)
+    parser.add_argument("--interest", type=int, default=50, help="Coins watched per instance")
+    parser.add_argument("--rate-hz", type=float, default=1.0, help="Updates per coin per second")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--modes", default="shared,per_coin")
+    args = parser.parse_args()
+
+    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+    for mode in args.modes.split(","):
+        asyncio.run(run_mode(args, mode, redis_url))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Chaos test for resumable feeds: gap-free delivery across dropped connections.
+
+A publisher updates --coins coins --rate-hz times a second; each update
+carries a per-coin counter (as avg_price), so clients can tell exactly
+which updates they missed.  Clients (child processes) subscribe to
+--subs coins, then keep dropping their connection at random, waiting a
+moment and reconnecting with "resume_from": <last seq seen>.
+
+  --source redis    the real path: the publisher XADDs to rt:log:prices
+                    and the server reads it with RedisSubscriber in stream
+                    mode.  Every --redis-kill-every seconds the server's
+                    Redis connection is killed (CLIENT KILL by name), so
+                    the reader has to reconnect and carry on from its last
+                    entry id.  Needs a local Redis.
+  --source direct   no Redis: updates go straight into route() with
+                    synthetic tokens (client-side chaos only)
+  --no-resume       reconnect without resume_from (the old behaviour)
+
+Reports, over all clients: updates received, updates missed (gaps in a
+coin's counter, including the tail at the end of the run), duplicates,
+and how many resumes the server could serve from its buffer.
+
+Usage:
+    python test/ws_bench/bench_resume_chaos.py --source direct
+    python test/ws_bench/bench_resume_chaos.py --source direct --no-resume
+    docker run --rm -p 6379:6379 redis:7
+    REDIS_URL=redis://localhost:6379/15 python test/ws_bench/bench_resume_chaos.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+import harness  # also puts ws/ on sys.path
+import websockets
+
+import config
+
+STREAM = "rt:log:prices"
+
+
+# ── Clients (child processes) ───────────────────────────────────────────────
+
+async def _clients(host, port, n, coins, subs, run_s, drop_every, resume, seed):
+    rnd = random.Random(seed)
+    totals = {"received": 0, "missed": 0, "duplicates": 0, "resumed": 0, "not_resumed": 0, "connects": 0}
+    finals = []
+
+    async def one():
+        picked = rnd.sample(coins, subs)
+        last = {}              # coin → last counter seen
+        seq = None
+        deadline = time.monotonic() + run_s
+        while time.monotonic() < deadline:
+            msg = {"action": "subscribe", "channel": "prices", "coins": picked}
+            if resume and seq is not None:
+                msg["resume_from"] = seq
+            try:
+                async with websockets.connect(f"ws://{host}:{port}", ping_interval=None) as ws:
+                    totals["connects"] += 1
+                    await ws.send(json.dumps(msg))
+                    drop_at = min(deadline, time.monotonic() + rnd.uniform(0.5, 1.5) * drop_every)
+                    while (remaining := drop_at - time.monotonic()) > 0:
+                        try:
+                            frame = json.loads(await asyncio.wait_for(ws.recv(), timeout=remaining))
+                        except asyncio.TimeoutError:
+                            break
+                        if frame.get("type") == "subscribed" and "resumed" in frame:
+                            totals["resumed" if frame["resumed"] else "not_resumed"] += 1
+                        data = frame.get("data")
+                        if not data:
+                            continue
+                        coin, counter = data["coin_id"], int(data["avg_price"])
+                        seq = data.get("seq", seq)
+                        totals["received"] += 1
+                        prev = last.get(coin)
+                        if prev is not None:
+                            if counter <= prev:
+                                totals["duplicates"] += 1
+                                continue
+                            totals["missed"] += counter - prev - 1
+                        last[coin] = counter
+            except (OSError, websockets.WebSocketException):
+                pass
+            await asyncio.sleep(rnd.uniform(0.05, 0.5))
+        finals.append(last)
+
+    await asyncio.gather(*(one() for _ in range(n)))
+    return totals, finals
+
+
+def client_proc(host, port, n, coins, subs, run_s, drop_every, resume, seed, queue):
+    queue.put(asyncio.run(_clients(host, port, n, coins, subs, run_s, drop_every, resume, seed)))
+
+
+# ── Publisher ───────────────────────────────────────────────────────────────
+
+async def publish(coins, rate_hz, duration_s, emit) -> dict:
+    """Every coin rate_hz times a second; avg_price is the coin's update counter."""
+    counters = dict.fromkeys(coins, 0)
+    step = 1.0 / (rate_hz * len(coins))
+    start = time.monotonic()
+    for k in range(int(duration_s * rate_hz) * len(coins)):
+        delay = start + k * step - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        coin = coins[k % len(coins)]
+        counters[coin] += 1
+        await emit(harness.make_aggregate(coin, float(counters[coin])))
+    return counters
+
+
+async def redis_killer(client, every_s) -> int:
+    kills = 0
+    while True:
+        await asyncio.sleep(every_s)
+        for conn in await client.client_list():
+            if conn.get("name") == "ws-sub":
+                await client.client_kill_filter(_id=conn["id"])
+                kills += 1
+        print(f"  killed the server's Redis connection ({kills} so far)")
+
+
+# ── Driver ──────────────────────────────────────────────────────────────────
+
+async def run(args) -> None:
+    from channels.prices import PriceChannel
+    channel = PriceChannel()
+    coins = harness.coin_ids(args.coins)
+    tasks = []
+
+    if args.source == "redis":
+        import redis.asyncio as aioredis
+        from redis_sub import RedisSubscriber
+
+        config.REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/15")
+        admin = aioredis.from_url(config.REDIS_URL, decode_responses=True)
+        await admin.delete(STREAM)
+        sub = RedisSubscriber([channel], mode="stream")
+        await sub.connect()
+        tasks.append(asyncio.create_task(sub.listen()))
+        if args.redis_kill_every:
+            tasks.append(asyncio.create_task(redis_killer(admin, args.redis_kill_every)))
+
+        async def emit(msg):
+            await admin.xadd(STREAM, {"data": msg}, maxlen=100_000, approximate=True)
+    else:
+        n = 0
+
+        async def emit(msg):
+            nonlocal n
+            n += 1
+            await channel.route(msg, token=f"{int(time.time() * 1000)}-{n}")
+
+    server, port = await harness.start_server({"prices": channel})
+    run_s = args.duration + 1
+    per_proc = args.clients // args.procs
+    children, queue = harness.run_in_processes(
+        client_proc, args.procs,
+        lambda i: ("127.0.0.1", port, per_proc, coins, args.subs, run_s,
+                   args.drop_every, not args.no_resume, i),
+    )
+    await asyncio.sleep(1.0)            # first subscribes land
+    counters = await publish(coins, args.rate_hz, args.duration, emit)
+    results = await asyncio.to_thread(harness.collect, children, queue, run_s + 60)
+
+    totals = {k: sum(t[k] for t, _ in results) for k in results[0][0]}
+    tail = sum(counters[c] - v for _, finals in results for last in finals for c, v in last.items())
+    missed = totals["missed"] + tail
+    print(f"\n{per_proc * args.procs} clients × {args.subs} coins, {args.coins} coins × {args.rate_hz} Hz, "
+          f"source={args.source}, resume={'off' if args.no_resume else 'on'}")
+    print(f"  connections:         {totals['connects']}  (resumed {totals['resumed']}, "
+          f"not resumable {totals['not_resumed']})")
+    print(f"  updates received:    {totals['received']}")
+    print(f"  updates missed:      {missed}  ({100 * missed / max(totals['received'] + missed, 1):.2f}%)")
+    print(f"  duplicates:          {totals['duplicates']}")
+    print(f"  resume buffer:       {len(channel.resume_buffer)} entries")
+
+    for task in tasks:
+        task.cancel()
+    server.close()
+    await server.wait_closed()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gap-free delivery under Redis and client connection drops.")
+    parser.add_argument("--source", default="redis", choices=["redis", "direct"])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--procs", type=int, default=2)
+    parser.add_argument("--coins", type=int, default=50)
+    parser.add_argument("--subs", type=int, default=10, help="Coins per client")
+    parser.add_argument("--rate-hz", type=float, default=2.0, help="Updates per coin per second")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--drop-every", type=float, default=3.0, help="Mean seconds between client drops")
+    parser.add_argument("--redis-kill-every", type=float, default=5.0)
+    parser.add_argument("--no-resume", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
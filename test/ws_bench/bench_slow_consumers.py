@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Slow-consumer isolation benchmark for the ws server.
+
+Starts the real ConnectionHandler + PriceChannel on localhost, connects a
+swarm of clients from child processes — a fraction of them "slow" (tiny
+receive buffer, subscribed to every coin, never read: a stalled mobile
+link) — and publishes aggregates straight into PriceChannel.route() as
+RedisSubscriber would.
+
+A further --lag-frac of the clients are "lagging": subscribed to every
+coin, they read one frame every --lag-ms, so their send queues back up
+and conflate.
+
+Reports, for the healthy clients only, the delivery latency
+(receive time − scheduled publish time), plus how long each route() call
+took — that is how long the Redis reader would have been blocked.  Then
+checks that every healthy and lagging client ended up with each of its
+coins' final published price: conflation may skip intermediate updates,
+never the last one.
+
+  --legacy   swaps in the old behaviour (route awaits ws.send for each
+             subscriber in turn) for comparison
+
+Usage:
+    python test/ws_bench/bench_slow_consumers.py
+    python test/ws_bench/bench_slow_consumers.py --legacy
+    python test/ws_bench/bench_slow_consumers.py --clients 4000 --slow-frac 0.1 --procs 4
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import harness  # also puts ws/ on sys.path
+import websockets
+
+from channels.prices import PriceChannel
+from server import connected_clients
+
+
+class LegacyPriceChannel(PriceChannel):
+    """The pre-queue fan-out: await every subscriber's send in turn."""
+
+    async def route(self, message: str) -> None:
+        data = json.loads(message)
+        coin_id = data.get("coin_id")
+        outgoing = json.dumps({"channel": self.name, "data": data})
+        for client in list(self._subscriptions.get(coin_id, ())):
+            try:
+                await client.ws.send(outgoing)
+            except websockets.ConnectionClosed:
+                pass
+
+
+# ── Client swarm (runs in child processes) ──────────────────────────────────
+
+async def _stalled(host, port, coins, deadline, counts):
+    """Raw-socket client: subscribe to every coin, then never read again."""
+    loop = asyncio.get_running_loop()
+    sock = await harness.raw_connect(host, port, coins, rcvbuf=4096)
+    counts["connected"] += 1
+    await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+
+    # Drain the backlog: a server-side 1013 close is at the end of it, if any
+    try:
+        while chunk := await asyncio.wait_for(loop.sock_recv(sock, 1 << 20), timeout=2):
+            if b"slow consumer" in chunk:
+                counts["slow_closed"] += 1
+                break
+    except (OSError, asyncio.TimeoutError):
+        pass
+    sock.close()
+
+
+async def _healthy(host, port, coins, deadline, counts, latencies, finals, lag_s=0.0):
+    """Read every frame (every *lag_s*, if set), keeping each coin's last price."""
+    last = dict.fromkeys(coins)
+    finals.append(last)
+    try:
+        async with websockets.connect(f"ws://{host}:{port}", ping_interval=None,
+                                      max_queue=1 if lag_s else 16) as ws:
+            counts["connected"] += 1
+            await ws.send(json.dumps({"action": "subscribe", "channel": "prices", "coins": coins}))
+            while (remaining := deadline - time.monotonic()) > 0:
+                msg = json.loads(await asyncio.wait_for(ws.recv(), timeout=remaining))
+                if "data" in msg:
+                    last[msg["data"]["coin_id"]] = msg["data"]["avg_price"]
+                    if lag_s:
+                        counts["lagging_received"] += 1
+                        await asyncio.sleep(lag_s)
+                    else:
+                        counts["received"] += 1
+                        latencies.append(time.time() * 1000 - msg["data"]["published_at"])
+    except websockets.ConnectionClosed:
+        counts["healthy_closed"] += 1
+    except asyncio.TimeoutError:
+        pass
+
+
+async def _swarm(host, port, n, slow_frac, lag_frac, lag_s, coins, subs, run_s, seed):
+    rnd = random.Random(seed)
+    latencies, finals = [], []
+    counts = {"received": 0, "lagging_received": 0, "slow_closed": 0, "healthy_closed": 0, "connected": 0}
+    deadline = time.monotonic() + run_s
+    n_slow, n_lag = int(n * slow_frac), int(n * lag_frac)
+    tasks = [_stalled(host, port, coins, deadline, counts) for _ in range(n_slow)]
+    tasks += [_healthy(host, port, coins, deadline, counts, latencies, finals, lag_s) for _ in range(n_lag)]
+    tasks += [_healthy(host, port, rnd.sample(coins, subs), deadline, counts, latencies, finals)
+              for _ in range(n - n_slow - n_lag)]
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return latencies, counts, finals
+
+
+def client_proc(host, port, n, slow_frac, lag_frac, lag_s, coins, subs, run_s, seed, queue):
+    queue.put(asyncio.run(_swarm(host, port, n, slow_frac, lag_frac, lag_s, coins, subs, run_s, seed)))
+
+
+# ── Server side ─────────────────────────────────────────────────────────────
+
+async def run(args) -> None:
+    channel = LegacyPriceChannel() if args.legacy else PriceChannel()
+    server, port = await harness.start_server({"prices": channel})
+    coins = harness.coin_ids(args.coins)
+
+    per_proc = args.clients // args.procs
+    run_s = args.connect_timeout + args.duration + 5
+    children, queue = harness.run_in_processes(
+        client_proc, args.procs,
+        lambda i: ("127.0.0.1", port, per_proc, args.slow_frac, args.lag_frac, args.lag_ms / 1000,
+                   coins, args.subs, run_s, i),
+    )
+
+    t0 = time.monotonic()
+    while len(connected_clients) < per_proc * args.procs and time.monotonic() - t0 < args.connect_timeout:
+        await asyncio.sleep(0.2)
+    print(f"{len(connected_clients)} clients connected "
+          f"({int(args.slow_frac * 100)}% slow, {int(args.lag_frac * 100)}% lagging), "
+          f"{args.coins} coins × {args.rate_hz} Hz, "
+          f"{args.subs} subs/client, mode={'legacy' if args.legacy else 'queued'}")
+
+    route_times: list = []
+    final: dict = {}
+    published = await harness.publish_loop(channel, coins, args.rate_hz, args.duration,
+                                           args.pad_bytes, route_times, final)
+    conflated = sum(c.conflated for c in connected_clients)
+    dropped = sum(c.dropped for c in connected_clients)
+
+    results = await asyncio.to_thread(harness.collect, children, queue, run_s + 30)
+    latencies = [x for lat, _, _ in results for x in lat]
+    totals = {k: sum(c[k] for _, c, _ in results) for k in results[0][1]}
+    finals = [last for _, _, client_finals in results for last in client_finals]
+    stale = [last for last in finals if any(price != final[coin] for coin, price in last.items())]
+
+    healthy = args.procs * (per_proc - int(per_proc * args.slow_frac) - int(per_proc * args.lag_frac))
+    expected = healthy * args.subs * int(args.duration * args.rate_hz)
+    print(f"\n  published {published} aggregates, healthy clients received "
+          f"{totals['received']} of {expected} expected")
+    print(harness.fmt_pct("healthy delivery latency", latencies))
+    print(harness.fmt_pct("route() time (reader stall)", route_times))
+    print(f"\n  slow clients disconnected by server: {totals['slow_closed']}"
+          f"   healthy clients disconnected: {totals['healthy_closed']}")
+    print(f"  lagging clients received {totals['lagging_received']} frames; "
+          f"{conflated} updates conflated, {dropped} evicted (all clients)")
+    print(f"  {'PASS' if not stale else 'FAIL'}: {len(finals) - len(stale)} of {len(finals)} "
+          f"healthy/lagging clients hold every coin's final price")
+
+    server.close()
+    await server.wait_closed()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure healthy-client latency with slow consumers present.")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--slow-frac", type=float, default=0.05)
+    parser.add_argument("--procs", type=int, default=2, help="Client processes")
+    parser.add_argument("--coins", type=int, default=20)
+    parser.add_argument("--subs", type=int, default=3, help="Coins per healthy client")
+    parser.add_argument("--lag-frac", type=float, default=0.05,
+                        help="Clients subscribed to every coin that read slowly")
+    parser.add_argument("--lag-ms", type=float, default=50.0, help="Lagging clients' pause per frame")
+    parser.add_argument("--rate-hz", type=float, default=2.0, help="Publishes per coin per second")
+    parser.add_argument("--pad-bytes", type=int, default=16000,
+                        help="Padding per message (fills the slow clients' kernel buffers within seconds)")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--connect-timeout", type=float, default=30.0)
+    parser.add_argument("--legacy", action="store_true", help="Old await-each-send fan-out")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
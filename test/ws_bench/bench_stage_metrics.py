@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Where the time goes: server stage histograms next to client end-to-end latency.
+
+Runs ConnectionHandler + PriceChannel in-process with the metrics sampler
+(metrics.py) and a synthetic publisher, drives it with ws/loadtest.py
+(Zipf subscriptions, latency measured from published_at), then prints:
+
+  - the load tool's delivered updates/s and end-to-end latency percentiles
+  - each server histogram's count and approximate p50 / p99 (the upper
+    bound of the bucket the percentile falls in).  The publisher calls
+    route() directly, so ws_receive_to_route_seconds (recorded by
+    RedisSubscriber) stays empty here
+  - the Prometheus text the health port would serve, if --prometheus
+
+With more updates than the loop can push, end-to-end latency climbs
+while ws_route_to_send_seconds stays small: the backlog is ahead of the
+fan-out (in production, in the Redis socket), which ws_event_loop_lag
+shows.
+
+Usage:
+    python test/ws_bench/bench_stage_metrics.py
+    python test/ws_bench/bench_stage_metrics.py --clients 3000 --rate-hz 4 --prometheus
+"""
+
+import argparse
+import asyncio
+
+import harness  # also puts ws/ on sys.path
+
+import loadtest
+import metrics
+from channels.prices import PriceChannel
+from server import connected_clients
+
+
+def bucket_quantile(h: metrics.Histogram, q: float) -> str:
+    if not h.count:
+        return "-"
+    target, cumulative = q * h.count, 0
+    for bound, n in zip(h.buckets, h.counts):
+        cumulative += n
+        if cumulative >= target:
+            return f"≤{bound:g}"
+    return f">{h.buckets[-1]:g}"
+
+
+async def run(args) -> None:
+    channel = PriceChannel()
+    coins = loadtest.load_coins(args.coins)
+    server, port = await harness.start_server({"prices": channel})
+    sampler = asyncio.create_task(metrics.sample_loop(lambda: connected_clients))
+    summary_task = asyncio.create_task(asyncio.to_thread(
+        loadtest.run, f"ws://127.0.0.1:{port}", args.clients, args.procs, coins, args.subs,
+        args.ramp, args.duration, args.dist, 1.1, args.latency_sample,
+    ))
+    publisher = asyncio.create_task(harness.publish_loop(
+        channel, coins, args.rate_hz, args.ramp + args.duration + 30))
+    summary = await summary_task
+    publisher.cancel()
+    sampler.cancel()
+
+    expected = summary["connected"] * args.subs * args.rate_hz
+    print(f"\n{summary['connected']}/{args.clients} clients × {args.subs} coins ({args.dist}), "
+          f"{args.coins} coins × {args.rate_hz} Hz")
+    print(f"  delivered/s:  {summary['updates_per_s']:.0f}  (all delivered: {expected:.0f})")
+    print("  end-to-end:   " + "  ".join(f"{k}={v:.1f}ms" for k, v in summary["latency_ms"].items()))
+    print("\n  server histograms (cumulative):")
+    for h in metrics.HISTOGRAMS:
+        print(f"    {h.name:<30} n={h.count:<9} p50 {bucket_quantile(h, 0.5):>8}  "
+              f"p99 {bucket_quantile(h, 0.99):>8}")
+    if args.prometheus:
+        print()
+        print(metrics.render(clients=len(connected_clients)))
+
+    server.close()
+    await server.wait_closed()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Server stage histograms vs. end-to-end latency.")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--procs", type=int, default=2)
+    parser.add_argument("--coins", type=int, default=200)
+    parser.add_argument("--subs", type=int, default=10, help="Coins per client")
+    parser.add_argument("--dist", default="zipf", choices=["zipf", "uniform"])
+    parser.add_argument("--rate-hz", type=float, default=2.0, help="Updates per coin per second")
+    parser.add_argument("--latency-sample", type=float, default=0.2)
+    parser.add_argument("--ramp", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--prometheus", action="store_true", help="Also print the /metrics text")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Connect / disconnect storms against the channel subscription index.
+
+Drives PriceChannel's subscribe / remove_client directly with --clients
+stand-in clients (no sockets, so 50k clients fit inside one process's fd
+limit and the numbers isolate the index).  Each client subscribes to
+--min-subs..--max-subs of --coins coins with Zipf-like popularity, then
+all of them disconnect in random order — what follows a deploy.
+
+  indexed   the channel as shipped: client → keys reverse index
+  legacy    remove_client scans every coin bucket (the old behaviour)
+
+A second section compares "all markets" clients: one "*" subscription
+each vs. subscribing to every coin (were the limit lifted) — subscribe
+time, memory, and the cost of one fan-out per coin.
+
+Usage:
+    python test/ws_bench/bench_subscription_storm.py
+    python test/ws_bench/bench_subscription_storm.py --clients 50000 --coins 5000
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+import harness  # also puts ws/ on sys.path
+
+from channels.base import WILDCARD
+from channels.prices import PriceChannel
+
+
+class StubClient:
+    """Just enough of outbound.Client for subscribe / remove / fan-out."""
+
+    binary = False
+    cadence = None
+    writable = False
+
+    def __init__(self):
+        self.binary_seq = {}
+        self.frames = 0
+
+    def enqueue(self, key, frame) -> None:
+        self.frames += 1
+
+
+class LegacyPriceChannel(PriceChannel):
+    """remove_client walks every coin's subscriber set."""
+
+    def remove_client(self, client) -> None:
+        empty_keys = []
+        for coin_id, subs in self._subscriptions.items():
+            subs.discard(client)
+            if not subs:
+                empty_keys.append(coin_id)
+        for key in empty_keys:
+            del self._subscriptions[key]
+            self._interest_changed(key, False)
+        self._client_keys.pop(client, None)
+
+
+def watchlists(coins: list, clients: int, min_subs: int, max_subs: int, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(coins))]
+    lists = []
+    for _ in range(clients):
+        picked = set()
+        want = rnd.randint(min_subs, max_subs)
+        while len(picked) < want:
+            picked.update(rnd.choices(coins, weights, k=want - len(picked)))
+        lists.append(list(picked))
+    return lists
+
+
+def storm(channel_cls, lists: list) -> None:
+    channel = channel_cls()
+    clients = [StubClient() for _ in lists]
+
+    t0 = time.perf_counter()
+    for client, coins in zip(clients, lists):
+        channel.subscribe(client, coins)
+    connect_s = time.perf_counter() - t0
+    subs = channel.stats["total_subscriptions"]
+
+    random.Random(2).shuffle(clients)
+    per_remove = []
+    t0 = time.perf_counter()
+    for client in clients:
+        t = time.perf_counter()
+        channel.remove_client(client)
+        per_remove.append((time.perf_counter() - t) * 1e6)
+    disconnect_s = time.perf_counter() - t0
+    assert not channel._subscriptions
+
+    name = "legacy" if channel_cls is LegacyPriceChannel else "indexed"
+    print(f"\n── {name}: {len(clients)} clients, {subs} subscriptions")
+    print(f"  connect storm:     {connect_s:7.2f}s  ({connect_s / len(clients) * 1e6:.1f} µs/client)")
+    print(f"  disconnect storm:  {disconnect_s:7.2f}s  ({disconnect_s / len(clients) * 1e6:.1f} µs/client)")
+    print(harness.fmt_pct("remove_client()", per_remove, unit="µs"))
+
+
+def all_markets(coins: list, clients: int) -> None:
+    print(f"\n── {clients} 'all markets' clients, {len(coins)} coins")
+    frame_msgs = [harness.make_aggregate(c, 100.0) for c in coins]
+    for label, keys in (("every coin", coins), ('"*"', [WILDCARD])):
+        channel = PriceChannel()
+        stubs = [StubClient() for _ in range(clients)]
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        for client in stubs:
+            channel.subscribe(client, keys)
+        subscribe_s = time.perf_counter() - t0
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        t0 = time.perf_counter()
+        for msg in frame_msgs:
+            start = msg.index('"coin_id": "') + 12
+            coin = msg[start:msg.index('"', start)]
+            channel._fan_out(coin, channel._frame(msg))
+        fan_out_s = time.perf_counter() - t0
+        assert all(c.frames == len(coins) for c in stubs)
+
+        t0 = time.perf_counter()
+        for client in stubs:
+            channel.remove_client(client)
+        remove_s = time.perf_counter() - t0
+        print(f"  {label:<11} subscribe {subscribe_s:6.2f}s   index memory {memory / 1e6:7.1f} MB   "
+              f"one update per coin {fan_out_s:6.2f}s   disconnect all {remove_s:6.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Subscription index under connect/disconnect storms.")
+    parser.add_argument("--clients", type=int, default=50000)
+    parser.add_argument("--coins", type=int, default=2000)
+    parser.add_argument("--min-subs", type=int, default=5)
+    parser.add_argument("--max-subs", type=int, default=50)
+    parser.add_argument("--modes", default="indexed,legacy")
+    parser.add_argument("--all-markets-clients", type=int, default=1000)
+    args = parser.parse_args()
+
+    coins = harness.coin_ids(args.coins)
+    lists = watchlists(coins, args.clients, args.min_subs, args.max_subs)
+    for mode in args.modes.split(","):
+        storm(LegacyPriceChannel if mode == "legacy" else PriceChannel, lists)
+    if args.all_markets_clients:
+        all_markets(coins, args.all_markets_clients)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Time-to-first-price: subscribe → first data frame for each coin.
+
+Seeds rt:coin:<coin_id> in a local Redis the way RedisWriter does, serves
+the real ConnectionHandler + PriceChannel with a SnapshotStore, and feeds
+live aggregates into route() once per --publish-interval (the ingestor's
+BATCH_INTERVAL_MS).  A client swarm in child processes connects at random
+times, subscribes to --subs random coins, and records, per coin, how long
+it waited for the first frame.
+
+  --no-snapshot   the old behaviour: wait for the next live publish
+
+Needs a local Redis (except with --no-snapshot):
+    docker run --rm -p 6379:6379 redis:7
+    REDIS_URL=redis://localhost:6379/15 python test/ws_bench/bench_time_to_first_price.py
+    REDIS_URL=... python test/ws_bench/bench_time_to_first_price.py --no-snapshot
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+import harness  # also puts ws/ on sys.path
+import redis.asyncio as aioredis
+import websockets
+
+from channels.prices import PriceChannel
+from snapshot import SnapshotStore
+
+
+def coin_entry(coin_id: str, price: float) -> str:
+    """An rt:coin:<coin_id> value shaped like RedisWriter's."""
+    now = time.time()
+    return json.dumps({
+        "coin_id": coin_id,
+        "avg_price": price,
+        "highest": {"exchange": "kraken", "price": price * 1.001, "bid": None, "ask": None, "timestamp": now},
+        "lowest": {"exchange": "coinbase", "price": price * 0.999, "bid": None, "ask": None, "timestamp": now},
+        "exchange_count": 5,
+        "exchanges": ["binance", "coinbase", "kraken", "kucoin", "okx"],
+        "timestamp": now,
+    })
+
+
+# ── Client swarm (child processes) ──────────────────────────────────────────
+
+async def _swarm(host, port, n, coins, subs, spread_s, seed):
+    rnd = random.Random(seed)
+    waits = []
+    missing = 0
+
+    async def one():
+        nonlocal missing
+        await asyncio.sleep(rnd.uniform(0, spread_s))
+        picked = rnd.sample(coins, subs)
+        async with websockets.connect(f"ws://{host}:{port}", ping_interval=None) as ws:
+            t0 = time.perf_counter()
+            await ws.send(json.dumps({"action": "subscribe", "channel": "prices", "coins": picked}))
+            pending = set(picked)
+            try:
+                while pending:
+                    msg = json.loads(await asyncio.wait_for(ws.recv(), timeout=30))
+                    coin = (msg.get("data") or {}).get("coin_id")
+                    if coin in pending:
+                        pending.discard(coin)
+                        waits.append((time.perf_counter() - t0) * 1000)
+            except asyncio.TimeoutError:
+                missing += len(pending)
+
+    await asyncio.gather(*(one() for _ in range(n)), return_exceptions=True)
+    return waits, missing
+
+
+def client_proc(host, port, n, coins, subs, spread_s, seed, queue):
+    queue.put(asyncio.run(_swarm(host, port, n, coins, subs, spread_s, seed)))
+
+
+# ── Server side ─────────────────────────────────────────────────────────────
+
+async def live_publisher(channel, coins, interval_s) -> None:
+    """Every coin updates once per interval, each at its own phase."""
+    phase = {c: random.uniform(0, interval_s) for c in coins}
+    start = time.monotonic()
+    while True:
+        now = time.monotonic() - start
+        for coin in coins:
+            if now >= phase[coin]:
+                await channel.route(harness.make_aggregate(coin, 100.0))
+                phase[coin] += interval_s
+        await asyncio.sleep(0.01)
+
+
+async def run(args) -> None:
+    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/15")
+    coins = harness.coin_ids(args.coins)
+    snapshots = client = None
+    if not args.no_snapshot:
+        client = aioredis.from_url(redis_url, decode_responses=True)
+        pipe = client.pipeline(transaction=False)
+        for i, coin in enumerate(coins):
+            pipe.setex(f"rt:coin:{coin}", 300, coin_entry(coin, 100.0 + i))
+        await pipe.execute()
+        snapshots = SnapshotStore(client=client)
+    channel = PriceChannel()
+    server, port = await harness.start_server({"prices": channel}, snapshots=snapshots)
+    publisher = asyncio.create_task(live_publisher(channel, coins, args.publish_interval))
+
+    per_proc = args.clients // args.procs
+    children, queue = harness.run_in_processes(
+        client_proc, args.procs,
+        lambda i: ("127.0.0.1", port, per_proc, coins, args.subs, args.spread, i),
+    )
+    results = await asyncio.to_thread(harness.collect, children, queue, args.spread + 120)
+    waits = [w for ws, _ in results for w in ws]
+    missing = sum(m for _, m in results)
+
+    print(f"{per_proc * args.procs} clients × {args.subs} coins, live publish every "
+          f"{args.publish_interval}s, snapshots={'off' if args.no_snapshot else 'on'}")
+    print(harness.fmt_pct("time to first price", waits))
+    print(f"  coins never priced within 30s: {missing}")
+    if snapshots is not None:
+        print(f"  snapshot store: {snapshots.stats}")
+
+    publisher.cancel()
+    server.close()
+    await server.wait_closed()
+    if client is not None:
+        await client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure subscribe → first price latency.")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--procs", type=int, default=2)
+    parser.add_argument("--coins", type=int, default=200)
+    parser.add_argument("--subs", type=int, default=10, help="Coins per client")
+    parser.add_argument("--spread", type=float, default=10.0, help="Connect times spread over this many seconds")
+    parser.add_argument("--publish-interval", type=float, default=10.0)
+    parser.add_argument("--no-snapshot", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Delivered throughput vs. number of SO_REUSEPORT worker processes.
+
+For each worker count, runs the real workers.Supervisor with bench
+workers.  Each worker is the ConnectionHandler + PriceChannel on one
+shared port (reuse_port) fed by its own synthetic publisher — standing in
+for each worker's own RedisSubscriber receiving the same stream.  Then
+ws/loadtest.py opens --clients connections (each --subs random coins out
+of --coins), and the bench reports:
+
+  delivered/s   updates the load tool received per second
+  expected/s    clients × subs × rate — what a server keeping up delivers
+  clients       per worker, from the supervisor's aggregated health
+  CPU           per worker (process_time reported through the supervisor)
+
+Scaling needs spare cores: with W workers plus the load tool's processes
+on fewer than W + procs cores, the workers compete with the clients.
+
+Usage:
+    python test/ws_bench/bench_workers.py
+    python test/ws_bench/bench_workers.py --workers 1,2,4,8 --clients 8000 --rate-hz 4
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import socket
+import time
+
+import harness  # also puts ws/ on sys.path
+
+import loadtest
+from workers import Supervisor, report_stats
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ── Bench worker (one per supervised process) ───────────────────────────────
+
+async def _bench_worker(worker_id, stats_queue, port, coins, rate_hz):
+    from channels.prices import PriceChannel
+    from server import connected_clients
+
+    channel = PriceChannel()
+    await harness.start_server({"prices": channel}, port=port, reuse_port=True)
+    stats_task = asyncio.create_task(report_stats(worker_id, stats_queue, lambda: {
+        "clients": len(connected_clients),
+        "cpu_s": time.process_time(),
+    }, interval_s=0.5))
+    while not stats_task.done():
+        await harness.publish_loop(channel, coins, rate_hz, 3600)
+
+
+def bench_worker(worker_id, stats_queue, port, coins, rate_hz):
+    asyncio.run(_bench_worker(worker_id, stats_queue, port, coins, rate_hz))
+
+
+# ── Driver ──────────────────────────────────────────────────────────────────
+
+async def health(port: int) -> dict:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET / HTTP/1.1\r\n\r\n")
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b"\r\n\r\n", 1)[1])
+
+
+async def run_workers(args, workers: int, coins: list) -> None:
+    port, health_port = free_port(), free_port()
+    target = functools.partial(bench_worker, port=port, coins=coins, rate_hz=args.rate_hz)
+    supervisor = Supervisor(workers, target=target, health_port=health_port)
+    stop = asyncio.Event()
+    supervising = asyncio.create_task(supervisor.run(stop))
+    while True:
+        await asyncio.sleep(0.5)
+        try:
+            if len([w for w in (await health(health_port))["per_worker"] if "cpu_s" in w]) == workers:
+                break
+        except OSError:
+            pass
+
+    async def cpu_by_worker() -> dict:
+        return {w["worker"]: w.get("cpu_s", 0.0) for w in (await health(health_port))["per_worker"]}
+
+    measure = asyncio.create_task(asyncio.sleep(args.ramp))
+    summary_task = asyncio.create_task(asyncio.to_thread(
+        loadtest.run, f"ws://127.0.0.1:{port}", args.clients, args.procs, coins, args.subs,
+        args.ramp, args.duration,
+    ))
+    await measure
+    await asyncio.sleep(1.0)
+    cpu0, t0 = await cpu_by_worker(), time.monotonic()
+    await asyncio.sleep(args.duration - 2.0)
+    state = await health(health_port)
+    cpu1 = {w["worker"]: w.get("cpu_s", 0.0) for w in state["per_worker"]}
+    elapsed = time.monotonic() - t0
+    summary = await summary_task
+
+    expected = summary["connected"] * args.subs * args.rate_hz
+    cpu = [100 * (cpu1[w] - cpu0.get(w, 0.0)) / elapsed for w in sorted(cpu1)]
+    print(f"\n── {workers} worker(s)")
+    print(f"  clients:      {summary['connected']}/{args.clients} "
+          f"(per worker {[w.get('clients', 0) for w in state['per_worker']]}), failed {summary['failed']}")
+    print(f"  delivered/s:  {summary['updates_per_s']:10.0f}   expected/s {expected:10.0f}   "
+          f"({100 * summary['updates_per_s'] / max(expected, 1):.0f}%)")
+    print(f"  worker CPU:   {', '.join(f'{c:.0f}%' for c in cpu)}")
+
+    stop.set()
+    await supervising
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput scaling with SO_REUSEPORT workers.")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--procs", type=int, default=2, help="Load tool processes")
+    parser.add_argument("--coins", type=int, default=200)
+    parser.add_argument("--subs", type=int, default=20, help="Coins per client")
+    parser.add_argument("--rate-hz", type=float, default=2.0, help="Updates per coin per second")
+    parser.add_argument("--ramp", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args()
+
+    coins = loadtest.load_coins(args.coins)
+    print(f"{args.clients} clients × {args.subs} coins, {args.coins} coins × {args.rate_hz} Hz, "
+          f"{os.cpu_count()} CPU(s)")
+    for workers in (int(w) for w in args.workers.split(",")):
+        asyncio.run(run_workers(args, workers, coins))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Shared helpers for the ws server benchmarks in test/ws_bench/.
+
+Runs the real ws/ ConnectionHandler + PriceChannel in-process (no Redis:
+aggregates are fed straight into channel.route(), exactly as
+RedisSubscriber would) and drives client swarms from child processes so
+client-side work does not share the server's event loop.
+"""
+
+import asyncio
+import json
+import multiprocessing as mp
+import pathlib
+import random
+import socket
+import statistics
+import sys
+import time
+
+WS_DIR = pathlib.Path(__file__).resolve().parents[2] / "ws"
+sys.path.insert(0, str(WS_DIR))
+
+import websockets  # noqa: E402
+
+import codec  # noqa: E402
+from server import ConnectionHandler  # noqa: E402
+
+
+def coin_ids(n: int) -> list:
+    return [f"coin-{i}" for i in range(n)]
+
+
+def make_aggregate(coin_id: str, price: float, pad_bytes: int = 0, published_at: float = None) -> str:
+    """An aggregate message shaped like RedisWriter's, with a float-ms published_at."""
+    msg = {
+        "type": "aggregate",
+        "coin_id": coin_id,
+        "avg_price": price,
+        "highest_exchange": "kraken",
+        "highest_price": price * 1.001,
+        "lowest_exchange": "coinbase",
+        "lowest_price": price * 0.999,
+        "exchange_count": 5,
+        "timestamp": time.time(),
+        "published_at": published_at if published_at is not None else time.time() * 1000,
+    }
+    if pad_bytes:
+        msg["pad"] = "x" * pad_bytes
+    return json.dumps(msg)
+
+
+async def start_server(channels: dict, host: str = "127.0.0.1", port: int = 0,
+                       snapshots=None, **kwargs):
+    """Serve ConnectionHandler on *host*; returns (server, port)."""
+    async def on_connect(ws):
+        await ConnectionHandler(channels, snapshots).handle(ws)
+
+    kwargs.setdefault("select_subprotocol", codec.select_subprotocol)
+    server = await websockets.serve(on_connect, host, port, ping_interval=None, **kwargs)
+    port = next(iter(server.sockets)).getsockname()[1]
+    return server, port
+
+
+async def publish_loop(channel, coins: list, rate_hz: float, duration_s: float,
+                       pad_bytes: int = 0, route_times: list = None, final: dict = None) -> int:
+    """
+    Publish each coin rate_hz times a second, spread evenly over the interval.
+
+    published_at is the *scheduled* publish time, so when route() falls
+    behind, the backlog (which in production would sit in the Redis socket)
+    shows up in the clients' measured latency.  Records route() time (ms),
+    and each coin's last published avg_price in *final*.
+    """
+    prices = {c: 100.0 + i for i, c in enumerate(coins)}
+    step = 1.0 / (rate_hz * len(coins))
+    wall0, mono0 = time.time(), time.monotonic()
+    total = int(duration_s * rate_hz) * len(coins)
+    for k in range(total):
+        due = k * step
+        delay = mono0 + due - time.monotonic()
+        # Yield even when behind, like a real Redis reader between messages
+        await asyncio.sleep(max(delay, 0))
+        coin = coins[k % len(coins)]
+        prices[coin] *= 1 + random.uniform(-0.001, 0.001)
+        msg = make_aggregate(coin, prices[coin], pad_bytes, published_at=(wall0 + due) * 1000)
+        t0 = time.perf_counter()
+        await channel.route(msg)
+        if route_times is not None:
+            route_times.append((time.perf_counter() - t0) * 1000)
+    if final is not None:
+        final.update(prices)
+    return total
+
+
+async def raw_connect(host: str, port: int, coins: list, rcvbuf: int = None,
+                      deflate: bool = False, options: dict = None,
+                      subprotocol: str = None) -> socket.socket:
+    """
+    Open a bare-socket websocket client: handshake, subscribe, return the socket.
+
+    Used where a websockets client would get in the way — stalled readers
+    (it would keep draining the socket into its own buffers) and cheap
+    sinks (thousands of connections that only need to swallow bytes).
+    """
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.setblocking(False)
+    await loop.sock_connect(sock, (host, port))
+    extensions = "Sec-WebSocket-Extensions: permessage-deflate\r\n" if deflate else ""
+    if subprotocol:
+        extensions += f"Sec-WebSocket-Protocol: {subprotocol}\r\n"
+    await loop.sock_sendall(sock, (
+        f"GET / HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n{extensions}\r\n"
+    ).encode())
+    response = b""
+    while b"\r\n\r\n" not in response:
+        chunk = await loop.sock_recv(sock, 4096)
+        if not chunk:
+            raise ConnectionError("server closed during handshake")
+        response += chunk
+
+    payload = json.dumps({"action": "subscribe", "channel": "prices", "coins": coins,
+                          **(options or {})}).encode()
+    header = bytes([0x81, 0x80 | 126]) + len(payload).to_bytes(2, "big") + b"\0\0\0\0"  # zero mask
+    await loop.sock_sendall(sock, header + payload)
+    return sock
+
+
+def write_syscalls() -> int:
+    """write-family syscalls made by this process so far (Linux /proc)."""
+    with open("/proc/self/io") as f:
+        for line in f:
+            if line.startswith("syscw:"):
+                return int(line.split()[1])
+    return 0
+
+
+def percentiles(samples: list, points=(50, 90, 99)) -> dict:
+    if not samples:
+        return {f"p{p}": float("nan") for p in points} | {"max": float("nan")}
+    s = sorted(samples)
+    out = {f"p{p}": s[min(len(s) - 1, int(len(s) * p / 100))] for p in points}
+    out["max"] = s[-1]
+    out["mean"] = statistics.fmean(s)
+    return out
+
+
+def fmt_pct(label: str, samples: list, unit: str = "ms") -> str:
+    p = percentiles(samples)
+    return (f"  {label:<26} n={len(samples):<8} p50={p['p50']:8.2f}{unit}  p90={p['p90']:8.2f}{unit}  "
+            f"p99={p['p99']:8.2f}{unit}  max={p['max']:8.2f}{unit}")
+
+
+def run_in_processes(target, procs: int, args_for) -> list:
+    """Run target(*args_for(i), queue) in *procs* child processes; collect one result each."""
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    children = [ctx.Process(target=target, args=(*args_for(i), queue), daemon=True) for i in range(procs)]
+    for c in children:
+        c.start()
+    return children, queue
+
+
+def collect(children, queue, timeout_s: float) -> list:
+    results = [queue.get(timeout=timeout_s) for _ in children]
+    for c in children:
+        c.join(timeout=5)
+    return results
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Per-coin interest tracking in RedisSubscriber (ws/redis_sub.py).
+
+Drives _apply_interest() against a stand-in pub/sub connection whose
+UNSUBSCRIBE can be held open, and checks that a coin subscribed again
+while its debounced UNSUBSCRIBE is in flight keeps its dispatch entry and
+is subscribed again on the next pass.  No Redis needed.
+
+Usage:
+    python test/ws_bench/test_redis_sub.py
+"""
+
+import asyncio
+import pathlib
+import sys
+
+# Not harness: backend_bench has a module of that name too, and pytest
+# collects both directories in one process
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "ws"))
+
+from channels.prices import PriceChannel  # noqa: E402
+from redis_sub import RedisSubscriber  # noqa: E402
+
+
+class StubClient:
+    """Just enough of outbound.Client for subscribe / remove."""
+
+    binary = False
+    cadence = None
+    writable = False
+
+    def __init__(self):
+        self.binary_seq = {}
+
+    def enqueue(self, key, frame) -> None:
+        pass
+
+
+class HeldPubSub:
+    """Records (UN)SUBSCRIBEs; UNSUBSCRIBE waits until released."""
+
+    def __init__(self):
+        self.calls = []
+        self.unsubscribing = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def subscribe(self, *names):
+        self.calls.append(("subscribe", sorted(names)))
+
+    async def psubscribe(self, *names):
+        self.calls.append(("psubscribe", sorted(names)))
+
+    async def unsubscribe(self, *names):
+        self.calls.append(("unsubscribe", sorted(names)))
+        self.unsubscribing.set()
+        await self.release.wait()
+
+    async def punsubscribe(self, *names):
+        self.calls.append(("punsubscribe", sorted(names)))
+
+
+async def _resubscribe_during_unsubscribe():
+    channel = PriceChannel()
+    sub = RedisSubscriber([channel], mode="per_coin", unsubscribe_debounce_s=0)
+    pubsub = sub._pubsub = HeldPubSub()
+    name = channel.redis_channel_for("bitcoin")
+
+    first = StubClient()
+    channel.subscribe(first, ["bitcoin"])
+    await sub._apply_interest()
+    assert name in sub._subscribed, sub._subscribed
+
+    channel.remove_client(first)             # debounce 0: the UNSUBSCRIBE is due now
+    applying = asyncio.create_task(sub._apply_interest())
+    await pubsub.unsubscribing.wait()
+    channel.subscribe(StubClient(), ["bitcoin"])
+    pubsub.release.set()
+    await applying
+
+    assert sub._dispatch.get(name) is channel, "dispatch entry dropped for a coin wanted again"
+    assert sub._interest_dirty.is_set(), "re-wanted coin not flagged for the next pass"
+    await sub._apply_interest()
+    assert name in sub._subscribed, sub._subscribed
+    assert pubsub.calls[-1] == ("subscribe", [name]), pubsub.calls
+    assert sub._dispatch.get(name) is channel
+
+
+async def _unsubscribe_drops_dispatch():
+    channel = PriceChannel()
+    sub = RedisSubscriber([channel], mode="per_coin", unsubscribe_debounce_s=0)
+    pubsub = sub._pubsub = HeldPubSub()
+    pubsub.release.set()
+    name = channel.redis_channel_for("bitcoin")
+
+    client = StubClient()
+    channel.subscribe(client, ["bitcoin"])
+    await sub._apply_interest()
+    channel.remove_client(client)
+    await sub._apply_interest()
+    assert name not in sub._subscribed and name not in sub._dispatch, (sub._subscribed, sub._dispatch)
+
+
+def test_resubscribe_during_unsubscribe():
+    asyncio.run(_resubscribe_during_unsubscribe())
+
+
+def test_unsubscribe_drops_dispatch():
+    asyncio.run(_unsubscribe_drops_dispatch())
+
+
+def main() -> None:
+    failed = 0
+    for test in (test_resubscribe_during_unsubscribe, test_unsubscribe_drops_dispatch):
+        try:
+            test()
+            print(f"   ✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"   ✗ {test.__name__}: {e}")
+
+    if failed:
+        print(f"\n{failed} test(s) failed")
+        sys.exit(1)
+    print("\n✅ All Redis subscriber tests passed!")
+
+
+if __name__ == "__main__":
+    main()
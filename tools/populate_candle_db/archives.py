@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Offline bulk import of Binance kline archive files.
+
+Binance publishes the klines its REST API serves as zipped CSV archives
+(https://data.binance.vision — spot/{daily,monthly}/klines/<SYMBOL>/<interval>/).
+Loading years of 1m history from those is far faster than paging it through
+the rate-limited API:
+
+  - files (.zip or extracted .csv) are streamed through a chunked CSV
+    parser, so a month of 1m candles never sits in memory as one list
+  - <SYMBOL> is mapped to a coin_id with data/coin_aliases.json, the same
+    way the REST source resolves symbols
+  - higher resolutions (5m / 1h / 1d by default) are rolled up locally from
+    the file's own candles, so one 1m download fills several tables
+  - rows go through COPY into a staging table + one merge per table
+    (common.copy_merge_candles), one transaction per file
+  - files are spread over a process pool, one DB connection per worker
+  - candles outside a partitioned table's partitions (1m/5m older than
+    their retention window, common.covered_range) are not written — they
+    would fail the file's transaction — but still feed the roll-ups, so
+    an old 1m file fills 1h/1d
+
+Re-imports are idempotent: the merge is an upsert that skips identical
+rows, and files already recorded in the state file (same name, size and
+mtime) are skipped unless --force is given.
+
+Only resolutions that fit inside a single archive file (≤ 1d) are derived;
+weekly/monthly candles span several files — fetch those with main.py.
+
+Usage:
+    python archives.py ~/binance/data/spot/monthly/klines
+    python archives.py BTCUSDT-1m-2024-01.zip ETHUSDT-1m-2024-01.zip --derive 1h 1d
+    python archives.py ~/binance --workers 8 --chunk-rows 100000
+    python archives.py ~/binance --dry-run
+"""
+
+import argparse
+import csv
+import io
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import psycopg2
+
+from common import ALIAS_PATH, DATABASE_URL, RESOLUTION_MAP, copy_merge_candles, covered_range, load_coin_aliases
+from sources.binance import BinanceKlineSource
+from state import DEFAULT_STATE_PATH, ImportManifest
+
+# BTCUSDT-1m-2024-01.zip (monthly) / BTCUSDT-1m-2024-01-15.zip (daily)
+ARCHIVE_NAME_RE = re.compile(
+    r"^(?P<symbol>[A-Z0-9]+)-(?P<interval>\d+[smhdwM])-(?P<period>\d{4}-\d{2}(?:-\d{2})?)\.(?:zip|csv)$"
+)
+
+DEFAULT_DERIVE = ["5m", "1h", "1d"]
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Largest bucket that still lies entirely inside one daily/monthly file
+_MAX_DERIVED_SECONDS = 86400
+
+# Spot archives switched from millisecond to microsecond open times in 2025
+_MICROSECOND_THRESHOLD = 10 ** 14
+
+
+@dataclass
+class ArchiveFile:
+    path: str
+    symbol: str
+    interval: str
+    coin_id: Optional[str] = None
+
+
+@dataclass
+class ImportResult:
+    path: str
+    coin_id: str
+    rows: Dict[str, int] = field(default_factory=dict)   # resolution → rows parsed
+    written: int = 0
+    skipped: int = 0                                      # outside the tables' partitions
+    elapsed_s: float = 0.0
+    error: Optional[str] = None
+
+
+# ---------------------------------------------------------------------------
+# Discovery + symbol mapping
+# ---------------------------------------------------------------------------
+
+def discover(paths: List[str]) -> List[ArchiveFile]:
+    """Expand files/directories into archive files with a parseable name."""
+    found = []
+    for root in paths:
+        if os.path.isdir(root):
+            candidates = [
+                os.path.join(d, f) for d, _, files in os.walk(root) for f in files
+            ]
+        else:
+            candidates = [root]
+        for path in sorted(candidates):
+            m = ARCHIVE_NAME_RE.match(os.path.basename(path))
+            if m:
+                found.append(ArchiveFile(path, m.group("symbol"), m.group("interval")))
+    return found
+
+
+def symbol_index(assets: dict) -> Dict[str, str]:
+    """
+    Map Binance symbols (e.g. 'BTCUSDT') to coin ids, using the same rules
+    as BinanceKlineSource.symbol_for().  Explicit exchange_symbols entries
+    win over the generic symbol fallback when two coins collide.
+    """
+    source = BinanceKlineSource()
+    explicit, generic = {}, {}
+    for coin_id in sorted(assets):
+        sym = source.symbol_for(coin_id, assets)
+        if not sym:
+            continue
+        target = explicit if assets[coin_id].get("exchange_symbols", {}).get("binance") else generic
+        target.setdefault(sym, coin_id)
+    return {**generic, **explicit}
+
+
+def derivable(base: str, derive: List[str]) -> List[str]:
+    """Resolutions in *derive* that can be rolled up from *base* inside one file."""
+    base_s = RESOLUTION_MAP[base]["seconds"]
+    out = []
+    for res in derive:
+        s = RESOLUTION_MAP[res]["seconds"]
+        if base_s < s <= _MAX_DERIVED_SECONDS and s % base_s == 0:
+            out.append(res)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Chunked parser
+# ---------------------------------------------------------------------------
+
+def _csv_rows(path: str) -> Iterator[List[str]]:
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as zf:
+            for name in zf.namelist():
+                if not name.endswith(".csv"):
+                    continue
+                with zf.open(name) as raw:
+                    yield from csv.reader(io.TextIOWrapper(raw, encoding="utf-8", newline=""))
+    else:
+        with open(path, newline="") as f:
+            yield from csv.reader(f)
+
+
+def iter_chunks(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[List[tuple]]:
+    """
+    Yield lists of at most *chunk_rows* (open_ms, open, high, low, close, volume).
+
+    Archive columns: open_time, open, high, low, close, volume, close_time,
+    quote_volume, trades, taker_buy_base, taker_buy_quote, ignore.  Header
+    lines (present in some newer files) are skipped.
+    """
+    chunk = []
+    for row in _csv_rows(path):
+        if not row or not row[0].isdigit():
+            continue
+        open_ms = int(row[0])
+        if open_ms > _MICROSECOND_THRESHOLD:
+            open_ms //= 1000
+        chunk.append((open_ms, float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5])))
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Rollup:
+    """
+    Aggregates base candles into one coarser resolution.
+
+    Keeps first/last open times per bucket, so rows may arrive in any order.
+    tick_count is the number of base candles in the bucket.
+    """
+
+    def __init__(self, resolution: str):
+        self.resolution = resolution
+        self._ms = RESOLUTION_MAP[resolution]["seconds"] * 1000
+        # bucket_ms → [open, high, low, close, volume, count, first_ms, last_ms]
+        self._buckets: Dict[int, list] = {}
+
+    def add(self, chunk: List[tuple]) -> None:
+        ms = self._ms
+        buckets = self._buckets
+        for t, o, h, l, c, v in chunk:
+            b = t - t % ms
+            agg = buckets.get(b)
+            if agg is None:
+                buckets[b] = [o, h, l, c, v, 1, t, t]
+                continue
+            if h > agg[1]:
+                agg[1] = h
+            if l < agg[2]:
+                agg[2] = l
+            agg[4] += v
+            agg[5] += 1
+            if t < agg[6]:
+                agg[0], agg[6] = o, t
+            if t > agg[7]:
+                agg[3], agg[7] = c, t
+
+    def rows(self, coin_id: str) -> List[tuple]:
+        return [
+            (coin_id, _dt(b), o, h, l, c, v, n)
+            for b, (o, h, l, c, v, n, _, _) in sorted(self._buckets.items())
+        ]
+
+
+def _dt(ms: int) -> datetime:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+def _clip(rows: List[tuple], bounds: Optional[Tuple[datetime, datetime]]) -> List[tuple]:
+    """*rows* whose bucket lies in *bounds* (a covered_range(); None keeps all)."""
+    if bounds is None:
+        return rows
+    lo, hi = bounds
+    return [row for row in rows if lo <= row[1] < hi]
+
+
+# ---------------------------------------------------------------------------
+# Import (runs inside pool workers)
+# ---------------------------------------------------------------------------
+
+_worker_conn = None
+
+
+def _init_worker(dsn: Optional[str]) -> None:
+    global _worker_conn
+    if dsn:
+        _worker_conn = psycopg2.connect(dsn)
+
+
+def import_file(
+    archive: ArchiveFile,
+    conn,
+    derive: List[str],
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    table_for: Optional[Dict[str, str]] = None,
+) -> ImportResult:
+    """
+    Parse one archive and load it (plus derived resolutions) in a single
+    transaction.  With conn=None the file is only parsed and rolled up.
+    """
+    t0 = time.time()
+    table_for = table_for or {}
+    base = archive.interval
+    result = ImportResult(archive.path, archive.coin_id, rows={base: 0})
+    rollups = [Rollup(res) for res in derivable(base, derive)]
+
+    def table(res: str) -> str:
+        return table_for.get(res) or RESOLUTION_MAP[res]["table"]
+
+    def write(res: str, rows: List[tuple]) -> None:
+        kept = _clip(rows, covered[res])
+        result.skipped += len(rows) - len(kept)
+        result.written += copy_merge_candles(conn, table(res), kept, res == "1d")
+
+    try:
+        if conn is not None:
+            covered = {res: covered_range(conn, table(res)) for res in [base] + [r.resolution for r in rollups]}
+        for chunk in iter_chunks(archive.path, chunk_rows):
+            for r in rollups:
+                r.add(chunk)
+            result.rows[base] += len(chunk)
+            if conn is not None:
+                write(base, [(archive.coin_id, _dt(t), o, h, l, c, v, 1) for t, o, h, l, c, v in chunk])
+
+        for r in rollups:
+            rows = r.rows(archive.coin_id)
+            result.rows[r.resolution] = len(rows)
+            if conn is not None:
+                write(r.resolution, rows)
+
+        if conn is not None:
+            conn.commit()
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        result.error = f"{type(e).__name__}: {e}"
+
+    result.elapsed_s = time.time() - t0
+    return result
+
+
+def _import_task(archive: ArchiveFile, derive: List[str], chunk_rows: int,
+                 table_for: Optional[Dict[str, str]]) -> ImportResult:
+    return import_file(archive, _worker_conn, derive, chunk_rows, table_for)
+
+
+def run_import(
+    archives: List[ArchiveFile],
+    dsn: Optional[str],
+    derive: List[str],
+    workers: int,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    table_for: Optional[Dict[str, str]] = None,
+    on_result=None,
+) -> List[ImportResult]:
+    """
+    Import *archives* (coin_id already resolved) across a process pool.
+    dsn=None parses only.  *on_result* is called in the parent as each
+    file finishes.
+    """
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(dsn,)) as pool:
+        futures = [
+            pool.submit(_import_task, a, derive, chunk_rows, table_for)
+            for a in archives
+        ]
+        for fut in as_completed(futures):
+            res = fut.result()
+            results.append(res)
+            if on_result is not None:
+                on_result(res)
+    return results
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _describe(res: ImportResult) -> str:
+    return " + ".join(f"{n} {r}" for r, n in res.rows.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import Binance kline archive files into Postgres.")
+    parser.add_argument("paths", nargs="+", help="Archive files (.zip/.csv) or directories to scan.")
+    parser.add_argument(
+        "--derive", nargs="*", default=DEFAULT_DERIVE, choices=list(RESOLUTION_MAP.keys()),
+        help="Resolutions to roll up locally from each file (≤ 1d). Default: 5m 1h 1d. "
+             "Pass --derive with no values to load only the file's own interval."
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4,
+                        help="Parallel import processes. Default: CPU count")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f"CSV rows per parse/COPY chunk. Default: {DEFAULT_CHUNK_ROWS}")
+    parser.add_argument("--state-file", default=DEFAULT_STATE_PATH,
+                        help="SQLite file recording imported files. Default: backfill_state.db")
+    parser.add_argument("--force", action="store_true", help="Re-import files already recorded as imported.")
+    parser.add_argument("--dry-run", action="store_true", help="Parse and roll up only; no DB writes.")
+    args = parser.parse_args()
+
+    if not os.path.exists(ALIAS_PATH):
+        print(f"ERROR: coin_aliases.json not found at {ALIAS_PATH}")
+        sys.exit(1)
+    if not args.dry_run and not DATABASE_URL:
+        print("ERROR: DATABASE_URL is not set. Add it to your .env file.")
+        sys.exit(1)
+
+    index = symbol_index(load_coin_aliases(ALIAS_PATH))
+    manifest = None if args.dry_run else ImportManifest(args.state_file)
+
+    todo, unknown, unsupported, current = [], set(), set(), 0
+    for a in discover(args.paths):
+        if a.interval not in RESOLUTION_MAP:
+            unsupported.add(a.interval)
+            continue
+        a.coin_id = index.get(a.symbol)
+        if a.coin_id is None:
+            unknown.add(a.symbol)
+            continue
+        st = os.stat(a.path)
+        if manifest and not args.force and manifest.is_current(os.path.basename(a.path), st.st_size, st.st_mtime_ns):
+            current += 1
+            continue
+        todo.append(a)
+
+    print(f"Archive files:     {len(todo)} to import, {current} already imported")
+    if unknown:
+        print(f"Unknown symbols:   {', '.join(sorted(unknown))} (not in coin_aliases.json — skipped)")
+    if unsupported:
+        print(f"Unsupported:       intervals {', '.join(sorted(unsupported))} (skipped)")
+    print(f"Derive:            {args.derive or 'nothing'}")
+    print(f"Workers:           {args.workers}")
+    print(f"Dry run:           {args.dry_run}")
+    print()
+    if not todo:
+        return
+
+    failed = 0
+
+    def report(res: ImportResult) -> None:
+        nonlocal failed
+        name = os.path.basename(res.path)
+        if res.error:
+            failed += 1
+            print(f"  [{res.coin_id}] {name}  FAILED: {res.error}")
+            return
+        skipped = f", {res.skipped} outside the retention window" if res.skipped else ""
+        print(f"  [{res.coin_id}] {name}  {_describe(res)}  ({res.elapsed_s:.1f}s{skipped})")
+        if manifest is not None:
+            st = os.stat(res.path)
+            manifest.record(name, st.st_size, st.st_mtime_ns, sum(res.rows.values()))
+
+    t0 = time.time()
+    results = run_import(
+        todo, None if args.dry_run else DATABASE_URL, args.derive,
+        args.workers, args.chunk_rows, on_result=report,
+    )
+    elapsed = time.time() - t0
+    if manifest is not None:
+        manifest.close()
+
+    parsed = sum(sum(r.rows.values()) for r in results if not r.error)
+    written = sum(r.written for r in results)
+    print()
+    print(
+        f"Done. {parsed} rows from {len(results) - failed} files in {elapsed:.1f}s "
+        f"({parsed / elapsed:,.0f} rows/s)"
+        + ("" if args.dry_run else f", {written} rows inserted or changed")
+    )
+    if failed:
+        print(f"{failed} files failed — fix and re-run (imported files are skipped).")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Shared helpers for the candle backfill tools (main.py, gaps.py, archives.py).
+
+Holds the resolution → table mapping, alias loading and the idempotent
+candle writes (row upsert and COPY + merge) so every entry point writes
+rows the same way.
+
+price_candles_1m / _5m are range-partitioned on bucket with no DEFAULT
+partition (sql/price_candles.sql): only the retention window has
+partitions, and a row outside it fails the whole transaction with "no
+partition of relation found for row".  covered_range() tells writers
+which buckets a table can hold.
+"""
+
+import csv
+import io
+import json
+import os
+import re
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+import psycopg2
+import psycopg2.extras
+from dotenv import load_dotenv
+
+# ---------------------------------------------------------------------------
+# Path setup
+# ---------------------------------------------------------------------------
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.abspath(os.path.join(_SCRIPT_DIR, "..", ".."))
+ALIAS_PATH = os.path.join(_PROJECT_ROOT, "data", "coin_aliases.json")
+_ENV_PATH = os.path.join(_PROJECT_ROOT, ".env")
+
+load_dotenv(_ENV_PATH)
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+# Use IPv4 pooler URL if available (required on some networks/macOS where
+# the direct Supabase hostname fails DNS resolution).
+DATABASE_URL = os.getenv("DATABASE_URL_IPV4") or os.getenv("DATABASE_URL")
+
+# Binance interval string → our table name + seconds per candle
+# (1M is calendar-aligned; its "seconds" is only a nominal 30 days)
+RESOLUTION_MAP = {
+    "1m":  {"table": "price_candles_1m",     "seconds": 60},
+    "5m":  {"table": "price_candles_5m",     "seconds": 300},
+    "1h":  {"table": "price_candles_1h",     "seconds": 3600},
+    "1d":  {"table": "price_candles_1d",     "seconds": 86400},
+    "1w":  {"table": "price_candles_1w",     "seconds": 604800},
+    "1M":  {"table": "price_candles_1month", "seconds": 2592000},
+}
+
+
+def load_coin_aliases(path: str = ALIAS_PATH) -> dict:
+    with open(path) as f:
+        data = json.load(f)
+    return data.get("assets", {})
+
+
+def upsert_candles(conn, table: str, coin_id: str, candles: list, is_daily: bool) -> int:
+    """Upsert candles into the given table. Uses ON CONFLICT DO UPDATE."""
+    if not candles:
+        return 0
+
+    # 1d table uses DATE type for bucket; others use TIMESTAMPTZ
+    if is_daily:
+        rows = [
+            (coin_id, c["bucket"].date(), c["open"], c["high"], c["low"],
+             c["close"], c["volume"], 0, c["tick_count"])
+            for c in candles
+        ]
+    else:
+        rows = [
+            (coin_id, c["bucket"], c["open"], c["high"], c["low"],
+             c["close"], c["volume"], 0, c["tick_count"])
+            for c in candles
+        ]
+
+    sql = f"""
+        INSERT INTO {table}
+            (coin_id, bucket, open, high, low, close, volume, exchange_count, tick_count)
+        VALUES %s
+        ON CONFLICT (coin_id, bucket) DO UPDATE SET
+            open           = EXCLUDED.open,
+            high           = EXCLUDED.high,
+            low            = EXCLUDED.low,
+            close          = EXCLUDED.close,
+            volume         = EXCLUDED.volume,
+            tick_count     = EXCLUDED.tick_count
+    """
+
+    with conn.cursor() as cur:
+        psycopg2.extras.execute_values(cur, sql, rows, page_size=500)
+    conn.commit()
+    return len(rows)
+
+
+# Staging table for COPY-based loads.  ON COMMIT DELETE ROWS keeps it empty
+# between transactions; it is also truncated before each table's merge so
+# several tables can be loaded in one transaction.
+_STAGE_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS candle_stage (
+        coin_id     TEXT,
+        bucket      TIMESTAMPTZ,
+        open        DOUBLE PRECISION,
+        high        DOUBLE PRECISION,
+        low         DOUBLE PRECISION,
+        close       DOUBLE PRECISION,
+        volume      DOUBLE PRECISION,
+        tick_count  INT
+    ) ON COMMIT DELETE ROWS
+"""
+
+
+def copy_merge_candles(conn, table: str, rows: list, is_daily: bool) -> int:
+    """
+    Bulk-load candles with COPY into a temp staging table, then merge them
+    into *table* with one INSERT … ON CONFLICT DO UPDATE.
+
+    *rows* are tuples (coin_id, bucket, open, high, low, close, volume,
+    tick_count) with a UTC datetime bucket.  Does NOT commit — callers
+    commit once per batch.  Rows identical to what is already stored are
+    left untouched, so re-loading the same data writes nothing.  Returns
+    the number of rows inserted or changed.
+    """
+    if not rows:
+        return 0
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for coin_id, bucket, o, h, l, c, v, ticks in rows:
+        writer.writerow((coin_id, bucket.isoformat(), o, h, l, c, v, ticks))
+    buf.seek(0)
+
+    # 1d table uses DATE type for bucket; others use TIMESTAMPTZ
+    bucket_expr = "(bucket AT TIME ZONE 'UTC')::date" if is_daily else "bucket"
+
+    with conn.cursor() as cur:
+        cur.execute(_STAGE_DDL)
+        cur.execute("TRUNCATE candle_stage")
+        cur.copy_expert("COPY candle_stage FROM STDIN WITH (FORMAT csv)", buf)
+        cur.execute(
+            f"""
+            INSERT INTO {table}
+                (coin_id, bucket, open, high, low, close, volume, exchange_count, tick_count)
+            SELECT DISTINCT ON (coin_id, {bucket_expr})
+                coin_id, {bucket_expr}, open, high, low, close, volume, 0, tick_count
+            FROM candle_stage
+            ORDER BY coin_id, {bucket_expr}
+            ON CONFLICT (coin_id, bucket) DO UPDATE SET
+                open           = EXCLUDED.open,
+                high           = EXCLUDED.high,
+                low            = EXCLUDED.low,
+                close          = EXCLUDED.close,
+                volume         = EXCLUDED.volume,
+                tick_count     = EXCLUDED.tick_count
+            WHERE ({table}.open, {table}.high, {table}.low, {table}.close,
+                   {table}.volume, {table}.tick_count)
+                IS DISTINCT FROM
+                  (EXCLUDED.open, EXCLUDED.high, EXCLUDED.low, EXCLUDED.close,
+                   EXCLUDED.volume, EXCLUDED.tick_count)
+            """
+        )
+        return cur.rowcount
+
+
+# FOR VALUES FROM ('2026-01-05 00:00:00+00') TO ('2026-01-12 00:00:00+00')
+_BOUND_RE = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+
+def _parse_bound(raw: str, unbounded: datetime) -> datetime:
+    raw = raw.strip().strip("'")
+    if raw in ("MINVALUE", "MAXVALUE"):
+        return unbounded
+    dt = datetime.fromisoformat(raw)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def covered_range(conn, table: str) -> Optional[Tuple[datetime, datetime]]:
+    """
+    [oldest lower bound, newest upper bound) of *table*'s partitions, or
+    None if every bucket fits (not partitioned, or a DEFAULT partition).
+    Partitions are assumed contiguous, as the candle-aggregator's
+    PartitionManager creates them.  A partitioned table with no partitions
+    gives an empty range.  Reads the catalog in the caller's transaction;
+    does not commit.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_partitioned_table pt
+            JOIN pg_inherits i ON i.inhparent = pt.partrelid
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE pt.partrelid = to_regclass(%s)
+            """,
+            (table,),
+        )
+        bounds = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", (table,))
+        partitioned = cur.fetchone() is not None
+    if not partitioned or any(b == "DEFAULT" for b in bounds):
+        return None
+    lowest = datetime.max.replace(tzinfo=timezone.utc)
+    highest = datetime.min.replace(tzinfo=timezone.utc)
+    for bound in bounds:
+        m = _BOUND_RE.search(bound or "")
+        if not m:
+            continue
+        lowest = min(lowest, _parse_bound(m.group(1), datetime.min.replace(tzinfo=timezone.utc)))
+        highest = max(highest, _parse_bound(m.group(2), datetime.max.replace(tzinfo=timezone.utc)))
+    if lowest >= highest:
+        return lowest, lowest  # no partitions: nothing fits
+    return lowest, highest
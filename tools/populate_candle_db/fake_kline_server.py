@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Binance.US klines endpoint.
+
+Serves GET /api/v3/klines with deterministic synthetic candles, so the
+backfill pipeline's benchmark and resume tests run offline and repeatably:
+
+  - every symbol ending in USDT is "listed" from 2020-01-01 onwards,
+    except those passed with --unknown (→ HTTP 400, like Binance)
+  - candles are a pure function of (symbol, open_time): re-fetching a
+    range returns identical rows
+  - request weight is metered per wall-clock minute like Binance
+    (klines = 2); every response carries X-MBX-USED-WEIGHT-1M and
+    exceeding --weight-per-minute returns 429 with Retry-After
+  - --latency-ms adds a fixed delay per request to mimic a remote API
+
+GET /stats returns request / 429 counters as JSON.
+
+Usage:
+    python fake_kline_server.py --port 8901 --latency-ms 80
+    python main.py --base-url http://127.0.0.1:8901/api/v3/klines --coins bitcoin
+
+Tests start it in-process with FakeKlineServer (see
+test/candles_db/test_backfill_resume.py).
+"""
+
+import argparse
+import asyncio
+import math
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from aiohttp import web
+
+from sources.binance import BINANCE_MAX_LIMIT, KLINES_WEIGHT
+
+# Fixed-width intervals only; 1M (calendar months) is not simulated
+INTERVAL_MS = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "1h": 3_600_000,
+    "1d": 86_400_000,
+    "1w": 604_800_000,
+}
+# Binance weekly candles open on Monday; the Unix epoch was a Thursday
+_INTERVAL_OFFSET_MS = {"1w": 4 * 86_400_000}
+
+DEFAULT_LISTED_SINCE = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def synthetic_kline(symbol: str, interval: str, open_ms: int) -> list:
+    """One Binance-format kline row, derived only from its inputs."""
+    base = 1.0 + zlib.crc32(symbol.encode()) % 50_000
+    phase = open_ms / 86_400_000
+    close = base * (1 + 0.05 * math.sin(phase))
+    open_ = base * (1 + 0.05 * math.sin(phase - 0.01))
+    high = max(open_, close) * 1.002
+    low = min(open_, close) * 0.998
+    volume = 10 + (open_ms // INTERVAL_MS[interval]) % 97
+    return [
+        open_ms, f"{open_:.8f}", f"{high:.8f}", f"{low:.8f}", f"{close:.8f}", f"{volume:.8f}",
+        open_ms + INTERVAL_MS[interval] - 1, "0", 1, "0", "0", "0",
+    ]
+
+
+class FakeKlineServer:
+    """In-process aiohttp server; ``await start()`` then use ``.url``."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        weight_per_minute: int = 1200,
+        listed_since: datetime = DEFAULT_LISTED_SINCE,
+        unknown: Tuple[str, ...] = (),
+    ):
+        self.host = host
+        self.port = port
+        self.latency_s = latency_ms / 1000.0
+        self.weight_per_minute = weight_per_minute
+        self.listed_since_ms = int(listed_since.timestamp() * 1000)
+        self.unknown = set(unknown)
+        self.requests = 0
+        self.rejected = 0
+        # (symbol, interval, startTime) of every served page, for tests
+        self.log: List[Tuple[str, str, int]] = []
+        self._minute = 0
+        self._used = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/v3/klines"
+
+    def _charge(self, weight: int) -> Tuple[bool, int]:
+        minute = int(time.time() // 60)
+        if minute != self._minute:
+            self._minute, self._used = minute, 0
+        if self._used + weight > self.weight_per_minute:
+            return False, self._used
+        self._used += weight
+        return True, self._used
+
+    async def _klines(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        ok, used = self._charge(KLINES_WEIGHT)
+        headers = {"X-MBX-USED-WEIGHT-1M": str(used)}
+        if not ok:
+            self.rejected += 1
+            retry_after = max(1, math.ceil(60 - time.time() % 60))
+            headers["Retry-After"] = str(retry_after)
+            return web.json_response({"code": -1003, "msg": "Too much request weight used"},
+                                     status=429, headers=headers)
+
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+
+        q = request.query
+        symbol = q.get("symbol", "")
+        interval = q.get("interval", "")
+        if not symbol.endswith("USDT") or symbol in self.unknown:
+            return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400, headers=headers)
+        if interval not in INTERVAL_MS:
+            return web.json_response({"code": -1120, "msg": "Invalid interval."}, status=400, headers=headers)
+
+        step = INTERVAL_MS[interval]
+        offset = _INTERVAL_OFFSET_MS.get(interval, 0)
+        limit = min(int(q.get("limit", 500)), BINANCE_MAX_LIMIT)
+        start = max(int(q.get("startTime", 0)), self.listed_since_ms)
+        end = min(int(q.get("endTime", time.time() * 1000)), int(time.time() * 1000))
+
+        # First open time >= start on the interval grid
+        t = offset + -(-(start - offset) // step) * step
+        rows = []
+        while t <= end and len(rows) < limit:
+            rows.append(synthetic_kline(symbol, interval, t))
+            t += step
+
+        self.log.append((symbol, interval, int(q.get("startTime", 0))))
+        return web.json_response(rows, headers=headers)
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"requests": self.requests, "rejected": self.rejected, "pages": len(self.log)})
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/api/v3/klines", self._klines)
+        app.router.add_get("/stats", self._stats)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if self.port == 0:
+            self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def _serve(args) -> None:
+    server = FakeKlineServer(
+        host=args.host, port=args.port, latency_ms=args.latency_ms,
+        weight_per_minute=args.weight_per_minute, unknown=tuple(args.unknown),
+    )
+    await server.start()
+    print(f"Fake klines on {server.url}  (stats: http://{server.host}:{server.port}/stats)")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic Binance-style klines locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every request.")
+    parser.add_argument("--weight-per-minute", type=int, default=1200, help="429 once exceeded. Default: 1200")
+    parser.add_argument("--unknown", nargs="*", default=[], metavar="SYMBOL",
+                        help="Symbols that return HTTP 400 (e.g. FOOUSDT).")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
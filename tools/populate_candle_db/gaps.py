@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Candle Gap Scanner + Targeted Backfill
+======================================
+
+Finds holes in the price_candles_* tables (ingestor downtime, lost windows,
+interrupted backfills) and fetches ONLY the missing ranges, instead of
+re-running main.py over the whole history.
+
+How gaps are found
+  For every (coin, resolution) the expected bucket grid is generated with
+  generate_series() and anti-joined against the table, one time chunk at a
+  time so a single query never materialises years of 1m buckets.  Missing
+  buckets are collapsed into contiguous ranges (gaps-and-islands), and
+  ranges touching across chunk boundaries are merged.
+
+  The scan for a coin starts at its first stored bucket (or --days ago,
+  whichever is later) and ends at the last *completed* bucket.  Coins with
+  no rows at all are reported but not backfilled — use main.py for a first
+  fill.
+
+Usage:
+    # Report only — list missing ranges
+    python gaps.py --report
+    python gaps.py --report --resolutions 1h --coins bitcoin ethereum --json
+
+    # Backfill the missing ranges (4 parallel fetchers, shared rate limit)
+    python gaps.py --backfill
+    python gaps.py --backfill --workers 8 --weight-per-minute 900
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import psycopg2
+
+from common import ALIAS_PATH, DATABASE_URL, RESOLUTION_MAP, load_coin_aliases, upsert_candles
+from ratelimit import TokenBucket
+from sources import SOURCE_REGISTRY, BaseKlineSource
+from sources.binance import BINANCE_WEIGHT_PER_MINUTE
+
+# Resolution → Postgres interval literal for generate_series
+STEP_INTERVAL = {
+    "1m": "1 minute",
+    "5m": "5 minutes",
+    "1h": "1 hour",
+    "1d": "1 day",
+    "1w": "1 week",
+    "1M": "1 month",
+}
+
+# Buckets scanned per query — keeps each generate_series small
+CHUNK_BUCKETS = 20_000
+
+
+@dataclass
+class Gap:
+    """A contiguous run of missing buckets: [start, end)."""
+    coin_id: str
+    resolution: str
+    start: datetime
+    end: datetime
+    missing: int
+
+    def to_dict(self) -> dict:
+        d = asdict(self)
+        d["start"] = self.start.isoformat()
+        d["end"] = self.end.isoformat()
+        return d
+
+
+# ---------------------------------------------------------------------------
+# Bucket alignment
+# ---------------------------------------------------------------------------
+
+def align(dt: datetime, resolution: str) -> datetime:
+    """Round *dt* down to the start of its bucket at *resolution* (UTC)."""
+    dt = dt.astimezone(timezone.utc)
+    if resolution == "1M":
+        return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if resolution == "1w":
+        day = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+        return day - timedelta(days=day.weekday())
+    seconds = RESOLUTION_MAP[resolution]["seconds"]
+    epoch = int(dt.timestamp()) // seconds * seconds
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+
+def advance(dt: datetime, resolution: str, n: int = 1) -> datetime:
+    """Move *dt* forward by *n* buckets."""
+    if resolution == "1M":
+        month = dt.month - 1 + n
+        return dt.replace(year=dt.year + month // 12, month=month % 12 + 1)
+    return dt + timedelta(seconds=RESOLUTION_MAP[resolution]["seconds"] * n)
+
+
+# ---------------------------------------------------------------------------
+# Scanning
+# ---------------------------------------------------------------------------
+
+def _gap_sql(table: str, resolution: str) -> str:
+    step = STEP_INTERVAL[resolution]
+    # 1d stores a DATE bucket; everything else is TIMESTAMPTZ
+    match = (
+        "t.bucket = (e.bucket AT TIME ZONE 'UTC')::date"
+        if resolution == "1d" else "t.bucket = e.bucket"
+    )
+    return f"""
+        WITH expected AS (
+            SELECT generate_series(%(lo)s::timestamptz,
+                                   %(hi)s::timestamptz - interval '{step}',
+                                   interval '{step}') AS bucket
+        ),
+        missing AS (
+            SELECT e.bucket
+            FROM expected e
+            LEFT JOIN {table} t ON t.coin_id = %(coin)s AND {match}
+            WHERE t.coin_id IS NULL
+        ),
+        islands AS (
+            SELECT bucket,
+                   bucket - (ROW_NUMBER() OVER (ORDER BY bucket)) * interval '{step}' AS grp
+            FROM missing
+        )
+        SELECT MIN(bucket), MAX(bucket) + interval '{step}', COUNT(*)
+        FROM islands
+        GROUP BY grp
+        ORDER BY 1
+    """
+
+
+def first_bucket(conn, table: str, coin_id: str) -> Optional[datetime]:
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT MIN(bucket) FROM {table} WHERE coin_id = %s", (coin_id,))
+        value = cur.fetchone()[0]
+    if value is None:
+        return None
+    if not isinstance(value, datetime):  # DATE bucket (1d)
+        value = datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+    return value
+
+
+def scan_coin(
+    conn,
+    coin_id: str,
+    resolution: str,
+    start: datetime,
+    end: datetime,
+    table: Optional[str] = None,
+    chunk_buckets: int = CHUNK_BUCKETS,
+) -> List[Gap]:
+    """Return the merged list of missing ranges for one coin in [start, end)."""
+    table = table or RESOLUTION_MAP[resolution]["table"]
+    sql = _gap_sql(table, resolution)
+    gaps: List[Gap] = []
+
+    lo = align(start, resolution)
+    end = align(end, resolution)
+    with conn.cursor() as cur:
+        while lo < end:
+            hi = min(advance(lo, resolution, chunk_buckets), end)
+            cur.execute(sql, {"lo": lo, "hi": hi, "coin": coin_id})
+            for g_start, g_end, missing in cur.fetchall():
+                # Merge with the previous range if it ran up to this chunk's edge
+                if gaps and gaps[-1].end == g_start:
+                    gaps[-1].end = g_end
+                    gaps[-1].missing += missing
+                else:
+                    gaps.append(Gap(coin_id, resolution, g_start, g_end, missing))
+            lo = hi
+    return gaps
+
+
+def scan(
+    conn,
+    coin_ids: List[str],
+    resolutions: List[str],
+    days: int,
+    now: Optional[datetime] = None,
+    table_for: Optional[dict] = None,
+) -> tuple:
+    """
+    Scan every (coin, resolution).  Returns (gaps, empty) where *empty* lists
+    the (coin_id, resolution) pairs with no stored rows at all.
+    """
+    now = now or datetime.now(timezone.utc)
+    gaps: List[Gap] = []
+    empty = []
+    for resolution in resolutions:
+        table = (table_for or {}).get(resolution) or RESOLUTION_MAP[resolution]["table"]
+        # The current bucket is still forming — only scan completed buckets
+        end = align(now, resolution)
+        window_start = now - timedelta(days=days)
+        for coin_id in coin_ids:
+            first = first_bucket(conn, table, coin_id)
+            if first is None:
+                empty.append((coin_id, resolution))
+                continue
+            gaps.extend(scan_coin(conn, coin_id, resolution, max(first, window_start), end, table))
+    return gaps, empty
+
+
+# ---------------------------------------------------------------------------
+# Backfill
+# ---------------------------------------------------------------------------
+
+def backfill(
+    conn,
+    gaps: List[Gap],
+    source: BaseKlineSource,
+    assets: dict,
+    workers: int = 4,
+    table_for: Optional[dict] = None,
+) -> dict:
+    """
+    Fetch each gap's range from *source* in parallel and upsert the result.
+
+    Fetching runs on a thread pool (rate limiting lives in the source's
+    shared TokenBucket); all writes happen on the calling thread over the
+    single *conn*.  Returns a summary dict.
+    """
+    summary = {"gaps": len(gaps), "rows": 0, "unfilled": 0, "errors": 0, "no_symbol": 0}
+
+    def _fetch(gap: Gap):
+        symbol = source.symbol_for(gap.coin_id, assets)
+        if not symbol:
+            return gap, None
+        start_ms = int(gap.start.timestamp() * 1000)
+        end_ms = int(gap.end.timestamp() * 1000)
+        return gap, source.fetch(symbol, gap.resolution, start_ms, end_ms)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_fetch, gap) for gap in gaps]
+        for fut in as_completed(futures):
+            try:
+                gap, candles = fut.result()
+            except Exception as e:
+                summary["errors"] += 1
+                print(f"  fetch failed: {e}")
+                continue
+
+            label = f"[{gap.coin_id}] {gap.resolution} {gap.start:%Y-%m-%d %H:%M} → {gap.end:%Y-%m-%d %H:%M}"
+            if candles is None:
+                summary["no_symbol"] += 1
+                print(f"  {label}: no {source.SOURCE_NAME} symbol — skipped")
+                continue
+
+            # Keep only candles inside the gap — never rewrite surrounding data
+            candles = [c for c in candles if gap.start <= c["bucket"] < gap.end]
+            table = (table_for or {}).get(gap.resolution) or RESOLUTION_MAP[gap.resolution]["table"]
+            written = upsert_candles(conn, table, gap.coin_id, candles, gap.resolution == "1d")
+            summary["rows"] += written
+            if written < gap.missing:
+                summary["unfilled"] += gap.missing - written
+            print(f"  {label}: {written}/{gap.missing} buckets filled")
+
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _print_report(gaps: List[Gap], empty: list) -> None:
+    if not gaps:
+        print("No gaps found.")
+    by_key = {}
+    for g in gaps:
+        by_key.setdefault((g.coin_id, g.resolution), []).append(g)
+    for (coin_id, resolution), items in sorted(by_key.items()):
+        total = sum(g.missing for g in items)
+        print(f"  [{coin_id}] {resolution}: {len(items)} gaps, {total} missing buckets")
+        for g in items:
+            print(f"      {g.start:%Y-%m-%d %H:%M} → {g.end:%Y-%m-%d %H:%M}  ({g.missing})")
+    if empty:
+        print(f"\n  {len(empty)} coin/resolution pairs have no rows (run main.py first):")
+        for coin_id, resolution in empty:
+            print(f"      {coin_id} {resolution}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect and backfill gaps in price_candles_* tables.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--report", action="store_true", help="List missing ranges without fetching.")
+    mode.add_argument("--backfill", action="store_true", help="Fetch and upsert only the missing ranges.")
+    parser.add_argument("--coins", nargs="+", metavar="COIN_ID",
+                        help="Coin IDs to scan. Defaults to all coins in coin_aliases.json.")
+    parser.add_argument("--resolutions", nargs="+", default=["1h", "1d"], choices=list(RESOLUTION_MAP.keys()))
+    parser.add_argument("--days", type=int, default=365, help="How far back to scan. Default: 365")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    parser.add_argument("--source", default="binance", choices=list(SOURCE_REGISTRY.keys()))
+    parser.add_argument("--workers", type=int, default=4, help="Parallel fetchers. Default: 4")
+    parser.add_argument("--weight-per-minute", type=int, default=BINANCE_WEIGHT_PER_MINUTE * 3 // 4,
+                        help="Shared request-weight budget across all workers. Default: 900")
+    args = parser.parse_args()
+
+    if not DATABASE_URL:
+        print("ERROR: DATABASE_URL is not set. Add it to your .env file.")
+        sys.exit(1)
+    if not os.path.exists(ALIAS_PATH):
+        print(f"ERROR: coin_aliases.json not found at {ALIAS_PATH}")
+        sys.exit(1)
+
+    assets = load_coin_aliases(ALIAS_PATH)
+    coin_ids = args.coins if args.coins else sorted(assets.keys())
+    conn = psycopg2.connect(DATABASE_URL)
+
+    gaps, empty = scan(conn, coin_ids, args.resolutions, args.days)
+
+    if args.json:
+        print(json.dumps({"gaps": [g.to_dict() for g in gaps],
+                          "empty": [list(e) for e in empty]}, indent=2))
+    else:
+        print(f"Scanned {len(coin_ids)} coins × {args.resolutions} over {args.days} days\n")
+        _print_report(gaps, empty)
+
+    if args.backfill and gaps:
+        limiter = TokenBucket.per_minute(args.weight_per_minute)
+        source = SOURCE_REGISTRY[args.source](limiter=limiter)
+        print(f"\nBackfilling {len(gaps)} gaps with {args.workers} workers "
+              f"({args.weight_per_minute} weight/min)…\n")
+        summary = backfill(conn, gaps, source, assets, workers=args.workers)
+        print()
+        print(f"Done. Rows upserted: {summary['rows']}  |  still missing: {summary['unfilled']}  |  "
+              f"errors: {summary['errors']}  |  no symbol: {summary['no_symbol']}")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
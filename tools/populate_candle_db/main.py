@@ -7,6 +7,12 @@ Fetches historical OHLCV candles from Binance.US public REST API
 (no API key required) and populates the price_candles_* tables in
 your Postgres database (Supabase or any other Postgres).
 
+Every (coin, resolution) is paginated concurrently through an async
+pipeline (pipeline.py) that shares one weight-aware rate limiter, and a
+single writer loads the pages with batched COPY + merge.  Progress is
+checkpointed per (coin, resolution) in a local SQLite file, so an
+interrupted run resumes where it stopped.
+
 Usage:
     # Backfill 1h and 1d candles for all coins in coin_aliases.json (1 year)
     python main.py
@@ -20,6 +26,12 @@ Usage:
     # Custom lookback
     python main.py --days 90
 
+    # More parallel fetchers / a smaller share of the rate budget
+    python main.py --concurrency 16 --weight-per-minute 900
+
+    # Ignore saved checkpoints and start over
+    python main.py --fresh
+
     # Dry run (print what would be inserted, no DB writes)
     python main.py --dry-run
 
@@ -32,173 +44,82 @@ Environment:
 """
 
 import argparse
-import json
+import asyncio
 import os
 import sys
 import time
 from datetime import datetime, timezone, timedelta
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
-import requests
 import psycopg2
-import psycopg2.extras
-from dotenv import load_dotenv
-
-# ---------------------------------------------------------------------------
-# Path setup
-# ---------------------------------------------------------------------------
-_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-_PROJECT_ROOT = os.path.abspath(os.path.join(_SCRIPT_DIR, "..", ".."))
-_ALIAS_PATH = os.path.join(_PROJECT_ROOT, "data", "coin_aliases.json")
-_ENV_PATH = os.path.join(_PROJECT_ROOT, ".env")
-
-load_dotenv(_ENV_PATH)
-
-# ---------------------------------------------------------------------------
-# Config
-# ---------------------------------------------------------------------------
-# Use IPv4 pooler URL if available (required on some networks/macOS where
-# the direct Supabase hostname fails DNS resolution).
-DATABASE_URL = os.getenv("DATABASE_URL_IPV4") or os.getenv("DATABASE_URL")
-
-BINANCE_BASE = "https://api.binance.us/api/v3/klines"
-
-# Binance interval string → our table name + seconds per candle
-RESOLUTION_MAP = {
-    "1m":  {"table": "price_candles_1m",     "seconds": 60},
-    "5m":  {"table": "price_candles_5m",     "seconds": 300},
-    "1h":  {"table": "price_candles_1h",     "seconds": 3600},
-    "1d":  {"table": "price_candles_1d",     "seconds": 86400},
-    "1w":  {"table": "price_candles_1w",     "seconds": 604800},
-    "1M":  {"table": "price_candles_1month", "seconds": 2592000},
-}
-
-# Max candles Binance returns per request
-BINANCE_MAX_LIMIT = 1000
-
-# Rate limit — free Binance.US allows 1200 weight/min; each klines call = 2 weight
-# 100ms sleep between requests is very conservative and safe
-REQUEST_DELAY_S = 0.15
-
-
-# ---------------------------------------------------------------------------
-# Helpers
-# ---------------------------------------------------------------------------
-
-def load_coin_aliases(path: str) -> dict:
-    with open(path) as f:
-        data = json.load(f)
-    return data.get("assets", {})
 
-
-def get_binance_symbol(coin_id: str, assets: dict) -> Optional[str]:
-    """Return the Binance symbol for a coin id (e.g. 'bitcoin' → 'BTCUSDT')."""
-    entry = assets.get(coin_id, {})
-    sym = entry.get("exchange_symbols", {}).get("binance")
-    if sym:
-        return f"{sym}USDT"
-    # Fallback: use the generic symbol field
-    generic = entry.get("symbol", "")
-    if generic:
-        return f"{generic}USDT"
-    return None
-
-
-def fetch_candles(symbol: str, interval: str, start_ms: int, end_ms: int) -> list:
+from common import ALIAS_PATH, DATABASE_URL, RESOLUTION_MAP, covered_range, load_coin_aliases
+from pipeline import Job, run_pipeline
+from ratelimit import AsyncWeightLimiter
+from sources import SOURCE_REGISTRY
+from sources.binance import BINANCE_BASE, BINANCE_WEIGHT_PER_MINUTE
+from state import DEFAULT_STATE_PATH, CheckpointStore
+
+
+def build_jobs(
+    coin_ids: List[str],
+    resolutions: List[str],
+    assets: dict,
+    source,
+    start_ms: int,
+    end_ms: int,
+    store: Optional[CheckpointStore],
+    covered: Optional[Dict[str, Optional[Tuple[datetime, datetime]]]] = None,
+) -> List[Job]:
     """
-    Fetch OHLCV candles from Binance.US for a time range.
-    Paginates automatically if the range spans more than 1000 candles.
-    Returns a list of dicts: {bucket, open, high, low, close, volume, tick_count}
-    """
-    candles = []
-    current_start = start_ms
-
-    while current_start < end_ms:
-        params = {
-            "symbol": symbol,
-            "interval": interval,
-            "startTime": current_start,
-            "endTime": end_ms,
-            "limit": BINANCE_MAX_LIMIT,
-        }
-
-        resp = requests.get(BINANCE_BASE, params=params, timeout=15)
-
-        if resp.status_code == 400:
-            # Symbol not found on Binance.US — skip silently
-            return []
-
-        resp.raise_for_status()
-        rows = resp.json()
-
-        if not rows:
-            break
-
-        for row in rows:
-            # Binance klines format:
-            # [open_time, open, high, low, close, volume, close_time, ...]
-            open_time_ms = row[0]
-            bucket_dt = datetime.fromtimestamp(open_time_ms / 1000, tz=timezone.utc)
+    One Job per (coin, resolution) the source lists, resuming from saved
+    checkpoints where they cover the requested start.
 
-            candles.append({
-                "bucket": bucket_dt,
-                "open":   float(row[1]),
-                "high":   float(row[2]),
-                "low":    float(row[3]),
-                "close":  float(row[4]),
-                "volume": float(row[5]),
-                "tick_count": 1,  # each Binance candle = 1 aggregated tick
-            })
-
-        # Advance past the last candle's open time
-        last_open_ms = rows[-1][0]
-        seconds = RESOLUTION_MAP[interval]["seconds"]
-        current_start = last_open_ms + (seconds * 1000)
-
-        if len(rows) < BINANCE_MAX_LIMIT:
-            break
-
-        time.sleep(REQUEST_DELAY_S)
-
-    return candles
-
-
-def upsert_candles(conn, table: str, coin_id: str, candles: list, is_daily: bool):
-    """Upsert candles into the given table. Uses ON CONFLICT DO UPDATE."""
-    if not candles:
-        return 0
-
-    # 1d table uses DATE type for bucket; others use TIMESTAMPTZ
-    if is_daily:
-        rows = [
-            (coin_id, c["bucket"].date(), c["open"], c["high"], c["low"],
-             c["close"], c["volume"], 0, c["tick_count"])
-            for c in candles
-        ]
-    else:
-        rows = [
-            (coin_id, c["bucket"], c["open"], c["high"], c["low"],
-             c["close"], c["volume"], 0, c["tick_count"])
-            for c in candles
-        ]
-
-    sql = f"""
-        INSERT INTO {table}
-            (coin_id, bucket, open, high, low, close, volume, exchange_count, tick_count)
-        VALUES %s
-        ON CONFLICT (coin_id, bucket) DO UPDATE SET
-            open           = EXCLUDED.open,
-            high           = EXCLUDED.high,
-            low            = EXCLUDED.low,
-            close          = EXCLUDED.close,
-            volume         = EXCLUDED.volume,
-            tick_count     = EXCLUDED.tick_count
+    *covered* (resolution → common.covered_range() of its table) moves
+    the start of 1m/5m jobs up to the oldest partition: older pages could
+    not be written, and would only cost rate-limit budget.
     """
-
-    with conn.cursor() as cur:
-        psycopg2.extras.execute_values(cur, sql, rows, page_size=500)
-    conn.commit()
-    return len(rows)
+    starts = {}
+    for resolution in resolutions:
+        starts[resolution] = start_ms
+        bounds = (covered or {}).get(resolution)
+        if bounds is not None:
+            floor_ms = int(bounds[0].timestamp() * 1000)
+            if floor_ms >= end_ms or bounds[0] >= bounds[1]:
+                print(f"  {resolution}: table has no partitions in range — skipping")
+                starts[resolution] = None
+            elif floor_ms > start_ms:
+                print(f"  {resolution}: starting at {bounds[0]:%Y-%m-%d}, the oldest partition (retention window)")
+                starts[resolution] = floor_ms
+
+    jobs = []
+    resumed = skipped = 0
+    for coin_id in coin_ids:
+        symbol = source.symbol_for(coin_id, assets)
+        if not symbol:
+            print(f"  [{coin_id}] No {source.SOURCE_NAME} symbol — skipping")
+            skipped += 1
+            continue
+        for resolution in resolutions:
+            res_start = starts[resolution]
+            if res_start is None:
+                continue
+            job_start = res_start
+            if store is not None:
+                ck = store.get(coin_id, resolution)
+                # Resume only if the saved range reaches back to our start
+                # and there is no hole between it and where it stopped
+                if ck and ck.range_start_ms <= res_start <= ck.next_ms:
+                    if ck.next_ms >= end_ms:
+                        continue
+                    job_start = ck.next_ms
+                    store.extend(coin_id, resolution, end_ms)
+                    resumed += 1
+                else:
+                    store.begin(coin_id, resolution, res_start, end_ms)
+            jobs.append(Job(coin_id, symbol, resolution, job_start, end_ms))
+    print(f"Jobs:              {len(jobs)} ({resumed} resumed from checkpoints, {skipped} coins unlisted)")
+    return jobs
 
 
 # ---------------------------------------------------------------------------
@@ -227,80 +148,103 @@ def main():
         "--dry-run", action="store_true",
         help="Fetch data but don't write to DB."
     )
+    parser.add_argument(
+        "--source", default="binance", choices=list(SOURCE_REGISTRY.keys()),
+        help="Kline source to fetch from. Default: binance"
+    )
+    parser.add_argument(
+        "--base-url", default=BINANCE_BASE,
+        help="Klines endpoint (point at fake_kline_server.py for offline runs)."
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8,
+        help="Parallel page fetchers. Default: 8"
+    )
+    parser.add_argument(
+        "--weight-per-minute", type=int, default=BINANCE_WEIGHT_PER_MINUTE,
+        help=f"Request-weight budget shared by all fetchers. Default: {BINANCE_WEIGHT_PER_MINUTE}"
+    )
+    parser.add_argument(
+        "--batch-rows", type=int, default=20000,
+        help="Candles per COPY batch. Default: 20000"
+    )
+    parser.add_argument(
+        "--state-file", default=DEFAULT_STATE_PATH,
+        help="SQLite file holding resume checkpoints. Default: backfill_state.db"
+    )
+    parser.add_argument(
+        "--fresh", action="store_true",
+        help="Discard saved checkpoints and fetch the whole range again."
+    )
     args = parser.parse_args()
 
     # -- Load aliases --------------------------------------------------------
-    if not os.path.exists(_ALIAS_PATH):
-        print(f"ERROR: coin_aliases.json not found at {_ALIAS_PATH}")
+    if not os.path.exists(ALIAS_PATH):
+        print(f"ERROR: coin_aliases.json not found at {ALIAS_PATH}")
         sys.exit(1)
 
-    assets = load_coin_aliases(_ALIAS_PATH)
+    assets = load_coin_aliases(ALIAS_PATH)
+    source = SOURCE_REGISTRY[args.source](base_url=args.base_url)
     coin_ids = args.coins if args.coins else sorted(assets.keys())
     print(f"Coins to backfill: {len(coin_ids)}")
     print(f"Resolutions:       {args.resolutions}")
     print(f"Lookback:          {args.days} days")
+    print(f"Concurrency:       {args.concurrency} fetchers, {args.weight_per_minute} weight/min")
     print(f"Dry run:           {args.dry_run}")
-    print()
 
-    # -- DB connection -------------------------------------------------------
+    # -- DB connection + checkpoints -----------------------------------------
     conn = None
+    store = None
     if not args.dry_run:
         if not DATABASE_URL:
             print("ERROR: DATABASE_URL is not set. Add it to your .env file.")
             sys.exit(1)
         conn = psycopg2.connect(DATABASE_URL)
-        print("Connected to database.\n")
+        store = CheckpointStore(args.state_file)
+        if args.fresh:
+            store.reset()
 
     # -- Time range ----------------------------------------------------------
     now_ms = int(time.time() * 1000)
     start_ms = int((datetime.now(tz=timezone.utc) - timedelta(days=args.days)).timestamp() * 1000)
 
-    # -- Backfill loop -------------------------------------------------------
-    total_inserted = 0
-    skipped = 0
-
-    for coin_id in coin_ids:
-        binance_symbol = get_binance_symbol(coin_id, assets)
-        if not binance_symbol:
-            print(f"  [{coin_id}] No Binance symbol — skipping")
-            skipped += 1
-            continue
-
-        for resolution in args.resolutions:
-            cfg = RESOLUTION_MAP[resolution]
-            table = cfg["table"]
-            is_daily = (resolution == "1d")  # only 1d table uses DATE; 1w/1M use TIMESTAMPTZ
-
-            print(f"  [{coin_id}] {resolution} ({binance_symbol}) ...", end=" ", flush=True)
-
-            try:
-                candles = fetch_candles(binance_symbol, resolution, start_ms, now_ms)
-            except requests.HTTPError as e:
-                print(f"HTTP error: {e}")
-                continue
-            except Exception as e:
-                print(f"Error: {e}")
-                continue
-
-            if not candles:
-                print("no data (symbol not on Binance.US)")
-                continue
-
-            if args.dry_run:
-                print(f"{len(candles)} candles (dry run — not written)")
-                continue
-
-            inserted = upsert_candles(conn, table, coin_id, candles, is_daily)
-            total_inserted += inserted
-            print(f"{inserted} candles upserted")
-
-            time.sleep(REQUEST_DELAY_S)
+    covered = None
+    if conn is not None:
+        covered = {res: covered_range(conn, RESOLUTION_MAP[res]["table"]) for res in args.resolutions}
+    jobs = build_jobs(coin_ids, args.resolutions, assets, source, start_ms, now_ms, store, covered)
+    print()
 
-    if conn:
-        conn.close()
+    # -- Fetch + write -------------------------------------------------------
+    limiter = AsyncWeightLimiter(args.weight_per_minute)
+    try:
+        stats = asyncio.run(run_pipeline(
+            jobs, source, limiter, conn=conn, store=store,
+            concurrency=args.concurrency, batch_rows=args.batch_rows, dry_run=args.dry_run,
+        ))
+    except KeyboardInterrupt:
+        print("\nInterrupted — committed batches are checkpointed; re-run to resume.")
+        sys.exit(130)
+    finally:
+        if conn:
+            conn.close()
+        if store:
+            store.close()
 
     print()
-    print(f"Done. Total rows upserted: {total_inserted}  |  Coins skipped: {skipped}")
+    for job in stats.empty:
+        print(f"  [{job.coin_id}] {job.resolution}: no data (symbol not on {source.SOURCE_NAME})")
+    rate = stats.pages / stats.elapsed_s if stats.elapsed_s else 0.0
+    print(
+        f"Done. {stats.pages} pages, {stats.candles} candles fetched, "
+        f"{stats.rows_written} rows upserted ({stats.rows_skipped} outside the retention window) "
+        f"in {stats.elapsed_s:.1f}s "
+        f"({rate:.1f} pages/s, {limiter.waited_s:.1f}s rate-limited)"
+    )
+    if stats.failed:
+        print(f"{len(stats.failed)} jobs failed — re-run to resume them:")
+        for job, err in stats.failed:
+            print(f"  [{job.coin_id}] {job.resolution}: {err}")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
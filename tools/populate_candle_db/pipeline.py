@@ -0,0 +1,264 @@
+"""
+Async fetch → write pipeline for main.py.
+
+                 ┌─ fetcher ─┐
+  job queue ───▶ ├─ fetcher ─┤ ──▶ page queue (bounded) ──▶ writer ──▶ Postgres
+                 └─ fetcher ─┘                                 │
+                                                               └──▶ checkpoints
+
+  - Each job is one (coin, resolution, range).  ``concurrency`` fetchers pull
+    jobs and paginate them through BaseKlineSource.fetch_page() on one shared
+    aiohttp session, all paying into one AsyncWeightLimiter.
+  - Pages of a job are fetched in order by a single fetcher, so they reach
+    the writer in order too.
+  - The writer batches pages until ``batch_rows`` candles are pending (or the
+    queue goes idle), loads them with COPY + merge (common.copy_merge_candles)
+    in one transaction per batch, commits, and only then advances the
+    checkpoints of every job in the batch.
+  - The page queue is bounded, so a slow database applies back-pressure to
+    the fetchers instead of buffering the whole backfill in memory.
+  - Candles outside a partitioned table's partitions (1m/5m older than
+    their retention window, common.covered_range) are dropped with a
+    warning rather than failing the batch: main.py clamps jobs to that
+    range, but a maintenance run may drop a partition mid-backfill.
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from common import RESOLUTION_MAP, copy_merge_candles, covered_range
+
+# Flush a partial batch when no page has arrived for this long
+FLUSH_IDLE_S = 0.5
+
+_IDLE = object()
+
+
+@dataclass
+class Job:
+    coin_id: str
+    symbol: str
+    resolution: str
+    start_ms: int
+    end_ms: int
+
+
+@dataclass
+class Page:
+    job: Job
+    candles: list
+    # Checkpoint position once this page is written: every candle before
+    # it is in Postgres
+    next_ms: int
+
+
+@dataclass
+class PipelineStats:
+    pages: int = 0
+    candles: int = 0
+    rows_written: int = 0
+    rows_skipped: int = 0  # outside the table's partitions
+    batches: int = 0
+    failed: List[Tuple[Job, str]] = field(default_factory=list)
+    empty: List[Job] = field(default_factory=list)
+    elapsed_s: float = 0.0
+
+
+def _to_ms(dt) -> int:
+    return int(dt.timestamp() * 1000)
+
+
+async def _fetcher(jobs: asyncio.Queue, pages: asyncio.Queue, session, source, limiter, stats: PipelineStats) -> None:
+    while True:
+        try:
+            job = jobs.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+        cursor: Optional[int] = job.start_ms
+        got_any = False
+        try:
+            while cursor is not None and cursor < job.end_ms:
+                candles, nxt = await source.fetch_page(
+                    session, limiter, job.symbol, job.resolution, cursor, job.end_ms
+                )
+                stats.pages += 1
+                stats.candles += len(candles)
+                got_any = got_any or bool(candles)
+                if nxt is not None:
+                    done_to = nxt
+                elif candles:
+                    # Range exhausted — the newest candle may still be forming,
+                    # so the next run starts from it again
+                    done_to = _to_ms(candles[-1]["bucket"])
+                else:
+                    # Nothing here (or unknown symbol) — leave the checkpoint
+                    # alone so the next run asks again
+                    break
+                await pages.put(Page(job, candles, done_to))
+                cursor = nxt
+        except Exception as e:
+            stats.failed.append((job, str(e)))
+            print(f"  [{job.coin_id}] {job.resolution} failed at {cursor}: {e}")
+            continue
+
+        if not got_any:
+            stats.empty.append(job)
+
+
+def _table(res: str, table_for: Dict[str, str]) -> str:
+    return table_for.get(res) or RESOLUTION_MAP[res]["table"]
+
+
+def _write_batch(
+    conn, batch: List[Page], table_for: Dict[str, str],
+    covered: Dict[str, Optional[Tuple[datetime, datetime]]],
+) -> Tuple[int, int]:
+    """
+    COPY + merge one batch (grouped by table) and commit. Runs in a worker
+    thread.  Returns (rows written, rows skipped as outside *covered*).
+    """
+    by_table: Dict[Tuple[str, bool], list] = defaultdict(list)
+    skipped = 0
+    for page in batch:
+        res = page.job.resolution
+        rows = by_table[(_table(res, table_for), res == "1d")]
+        bounds = covered.get(res)
+        for c in page.candles:
+            if bounds is not None and not bounds[0] <= c["bucket"] < bounds[1]:
+                skipped += 1
+                continue
+            rows.append((
+                page.job.coin_id, c["bucket"], c["open"], c["high"], c["low"],
+                c["close"], c["volume"], c.get("tick_count", 1),
+            ))
+    written = 0
+    try:
+        for (table, is_daily), rows in by_table.items():
+            written += copy_merge_candles(conn, table, rows, is_daily)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return written, skipped
+
+
+def _progress(batch: List[Page]) -> Dict[Tuple[str, str], Tuple[int, int]]:
+    progress: Dict[Tuple[str, str], Tuple[int, int]] = {}
+    for p in batch:
+        key = (p.job.coin_id, p.job.resolution)
+        prev_next, prev_rows = progress.get(key, (0, 0))
+        progress[key] = (max(prev_next, p.next_ms), prev_rows + len(p.candles))
+    return progress
+
+
+async def _writer(
+    pages: asyncio.Queue, conn, store, table_for: Dict[str, str],
+    covered: Dict[str, Optional[Tuple[datetime, datetime]]],
+    batch_rows: int, dry_run: bool, stats: PipelineStats,
+) -> None:
+    batch: List[Page] = []
+    pending = 0
+    finished = False
+
+    while not finished:
+        try:
+            page = await asyncio.wait_for(pages.get(), timeout=FLUSH_IDLE_S)
+        except asyncio.TimeoutError:
+            page = _IDLE
+        if page is None:
+            finished = True
+        elif page is not _IDLE:
+            batch.append(page)
+            pending += len(page.candles)
+            if pending < batch_rows:
+                continue
+        if not batch:
+            continue
+
+        if not dry_run:
+            write = asyncio.ensure_future(asyncio.to_thread(_write_batch, conn, batch, table_for, covered))
+            try:
+                written, skipped = await asyncio.shield(write)
+            except asyncio.CancelledError:
+                # Interrupted mid-batch: let the commit land and checkpoint
+                # it, so the resumed run does not refetch these pages
+                written, skipped = await write
+                stats.rows_written += written
+                stats.rows_skipped += skipped
+                store.advance_many(_progress(batch))
+                raise
+            stats.rows_written += written
+            stats.rows_skipped += skipped
+            store.advance_many(_progress(batch))
+            if skipped:
+                print(f"  WARNING: skipped {skipped} candles outside the tables' partitions (retention window)")
+        stats.batches += 1
+        print(
+            f"  batch {stats.batches}: {pending} candles from {len(batch)} pages "
+            f"({stats.candles} fetched, {stats.rows_written} written)"
+        )
+        batch = []
+        pending = 0
+
+
+async def run_pipeline(
+    jobs: List[Job],
+    source,
+    limiter,
+    conn=None,
+    store=None,
+    concurrency: int = 8,
+    batch_rows: int = 20000,
+    dry_run: bool = False,
+    table_for: Optional[Dict[str, str]] = None,
+) -> PipelineStats:
+    """
+    Fetch every job concurrently and write through one batching writer.
+
+    *conn* (psycopg2) and *store* (state.CheckpointStore) may be None only
+    when *dry_run* is set.  *table_for* overrides the target table per
+    resolution (tests point it at scratch tables).
+    """
+    stats = PipelineStats()
+    t0 = time.time()
+    table_for = table_for or {}
+    covered = {}
+    if not dry_run:
+        for res in {job.resolution for job in jobs}:
+            covered[res] = covered_range(conn, _table(res, table_for))
+
+    job_q: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        job_q.put_nowait(job)
+    page_q: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 4)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        writer = asyncio.create_task(_writer(page_q, conn, store, table_for, covered, batch_rows, dry_run, stats))
+        fetchers = [
+            asyncio.create_task(_fetcher(job_q, page_q, session, source, limiter, stats))
+            for _ in range(min(concurrency, len(jobs)) or 1)
+        ]
+        try:
+            fetch_all = asyncio.gather(*fetchers)
+            await asyncio.wait({fetch_all, writer}, return_when=asyncio.FIRST_COMPLETED)
+            if writer.done():
+                writer.result()  # the writer only stops early on a DB error — raise it
+            await fetch_all
+            await page_q.put(None)
+            await writer
+        finally:
+            for task in (*fetchers, writer):
+                task.cancel()
+            # Let an in-flight batch commit and checkpoint before returning
+            await asyncio.gather(*fetchers, writer, return_exceptions=True)
+
+    stats.elapsed_s = time.time() - t0
+    return stats
@@ -0,0 +1,120 @@
+"""
+Token-bucket rate limiters shared by the backfill tools.
+
+Exchanges meter REST usage as "weight" per time window rather than raw
+request counts (Binance: 1200 weight / minute, klines cost 2 each).  The
+bucket refills continuously at ``rate`` weight per second up to
+``capacity``; ``acquire(weight)`` blocks until that much is available.
+
+One instance is shared by every worker, so N parallel fetchers together
+stay under the exchange limit instead of each sleeping blindly.
+
+  TokenBucket          thread-safe; used by gaps.py's thread pool
+  AsyncWeightLimiter   asyncio; used by the main.py fetch pipeline, and
+                       also reacts to the exchange's own weight headers
+"""
+
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket."""
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, weight_per_minute: float, burst_s: float = 5.0) -> "TokenBucket":
+        """Build a bucket from an exchange-style 'N weight per minute' budget."""
+        rate = weight_per_minute / 60.0
+        return cls(rate=rate, capacity=max(1.0, rate * burst_s))
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, weight: float = 1.0) -> None:
+        """Block until *weight* tokens are available, then consume them."""
+        weight = min(weight, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= weight:
+                    self._tokens -= weight
+                    return
+                wait = (weight - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AsyncWeightLimiter:
+    """
+    Asyncio rate limiter that follows Binance's request-weight model.
+
+      - every endpoint call costs a weight (klines: 2)
+      - the budget is N weight per minute (1200 on Binance.US), refilled
+        continuously here so concurrent fetchers are paced smoothly
+      - every response reports ``X-MBX-USED-WEIGHT-1M``; ``observe()``
+        trusts the server's count over our own estimate, which keeps us
+        honest when other clients share the same IP
+      - a 429/418 carries ``Retry-After``; ``pause()`` stops *every*
+        fetcher until then instead of letting each one retry on its own
+    """
+
+    def __init__(self, weight_per_minute: int, burst_s: float = 5.0):
+        self.weight_per_minute = weight_per_minute
+        self.rate = weight_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_s)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = None  # created lazily inside the running loop
+        self.waited_s = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, weight: float) -> None:
+        """Wait until *weight* is available (FIFO across callers), then consume it."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        weight = min(weight, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                else:
+                    self._refill()
+                    if self._tokens >= weight:
+                        self._tokens -= weight
+                        return
+                    wait = (weight - self._tokens) / self.rate
+                self.waited_s += wait
+                await asyncio.sleep(wait)
+
+    def observe(self, used_weight_1m) -> None:
+        """Clamp the local budget to what the server says is left this minute."""
+        if used_weight_1m is None:
+            return
+        try:
+            remaining = self.weight_per_minute - int(used_weight_1m)
+        except (TypeError, ValueError):
+            return
+        self._refill()
+        self._tokens = max(0.0, min(self._tokens, float(remaining)))
+
+    def pause(self, seconds: float) -> None:
+        """Block all callers for *seconds* (429 / 418 Retry-After)."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0.0
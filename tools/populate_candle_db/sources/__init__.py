@@ -0,0 +1,9 @@
+from .base import BaseKlineSource, Candle
+from .binance import BinanceKlineSource
+
+# Source registry — add new kline sources here
+SOURCE_REGISTRY = {
+    "binance": BinanceKlineSource,
+}
+
+__all__ = ["BaseKlineSource", "Candle", "BinanceKlineSource", "SOURCE_REGISTRY"]
@@ -0,0 +1,76 @@
+"""
+Abstract base class for kline (OHLCV candle) sources.
+
+A kline source turns (coin, resolution, time range) into candle dicts.
+The backfill tools (main.py, gaps.py) only talk to this interface, so a
+different exchange — or a local stand-in for tests — can be swapped in
+without touching the fetch/write logic.
+
+To add a new source:
+  1. Create tools/populate_candle_db/sources/<exchange>.py
+  2. Subclass BaseKlineSource and implement symbol_for() and fetch()
+  3. Accept an optional ``limiter`` (ratelimit.TokenBucket) keyword in
+     __init__ and acquire from it before every request, so parallel
+     callers share one rate budget
+  4. Optionally implement fetch_page() so main.py's async pipeline can
+     paginate it concurrently
+  5. Register it in SOURCE_REGISTRY in sources/__init__.py
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+
+# Candle dict shape returned by every source:
+# {
+#     "bucket":     datetime (UTC, start of the candle),
+#     "open":       float,
+#     "high":       float,
+#     "low":        float,
+#     "close":      float,
+#     "volume":     float,
+#     "tick_count": int,
+# }
+Candle = Dict[str, object]
+
+
+class BaseKlineSource(ABC):
+    """Base class for all kline sources."""
+
+    # Subclasses set this so the CLI can reference them by name
+    SOURCE_NAME: str = ""
+
+    @abstractmethod
+    def symbol_for(self, coin_id: str, assets: dict) -> Optional[str]:
+        """
+        Return the source-native symbol for *coin_id* (e.g. 'BTCUSDT'),
+        or None if the source does not list the coin.
+
+        Args:
+            coin_id: Canonical coin id (e.g. "bitcoin").
+            assets:  The "assets" dict from data/coin_aliases.json.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def fetch(self, symbol: str, resolution: str, start_ms: int, end_ms: int) -> List[Candle]:
+        """
+        Fetch every candle with open time in [start_ms, end_ms).
+        Paginates internally.  Returns [] if the symbol is unknown.
+        """
+        raise NotImplementedError
+
+    async def fetch_page(
+        self, session, limiter, symbol: str, resolution: str, start_ms: int, end_ms: int
+    ) -> Tuple[List[Candle], Optional[int]]:
+        """
+        Fetch ONE page of candles starting at *start_ms* (async pipeline API).
+
+        Args:
+            session: aiohttp.ClientSession shared by all fetchers.
+            limiter: ratelimit.AsyncWeightLimiter shared by all fetchers.
+
+        Returns (candles, next_start_ms).  next_start_ms is None once the
+        range is exhausted or the symbol is unknown.
+        """
+        raise NotImplementedError(f"{type(self).__name__} has no async page API")
@@ -0,0 +1,185 @@
+"""
+Binance.US kline source.
+
+Public REST endpoint, no API key required:
+  GET https://api.binance.us/api/v3/klines?symbol=BTCUSDT&interval=1h&startTime=…&endTime=…&limit=1000
+
+Symbols come from exchange_symbols["binance"] in data/coin_aliases.json,
+quoted in USDT.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+import aiohttp
+import requests
+
+from common import RESOLUTION_MAP
+from ratelimit import TokenBucket
+from .base import BaseKlineSource, Candle
+
+BINANCE_BASE = "https://api.binance.us/api/v3/klines"
+
+# Max candles Binance returns per request
+BINANCE_MAX_LIMIT = 1000
+
+# Rate limit — free Binance.US allows 1200 weight/min; each klines call = 2 weight
+# 150ms sleep between pages is very conservative and safe
+REQUEST_DELAY_S = 0.15
+BINANCE_WEIGHT_PER_MINUTE = 1200
+KLINES_WEIGHT = 2
+
+# Transient failures (5xx, timeouts) retried per page before giving up
+MAX_PAGE_ATTEMPTS = 5
+_PAGE_TIMEOUT = aiohttp.ClientTimeout(total=15)
+
+
+class BinanceKlineSource(BaseKlineSource):
+    """
+    Fetches klines from Binance.US, paginating 1000 candles at a time.
+
+    Pass a shared TokenBucket as *limiter* when several threads fetch in
+    parallel; without one, pages are spaced by a fixed REQUEST_DELAY_S.
+    """
+
+    SOURCE_NAME = "binance"
+
+    def __init__(
+        self,
+        base_url: str = BINANCE_BASE,
+        request_delay_s: float = REQUEST_DELAY_S,
+        limiter: Optional[TokenBucket] = None,
+    ):
+        self._base_url = base_url
+        self._request_delay_s = request_delay_s
+        self._limiter = limiter
+        self._session = requests.Session()
+
+    def symbol_for(self, coin_id: str, assets: dict) -> Optional[str]:
+        """Return the Binance symbol for a coin id (e.g. 'bitcoin' → 'BTCUSDT')."""
+        entry = assets.get(coin_id, {})
+        sym = entry.get("exchange_symbols", {}).get("binance")
+        if sym:
+            return f"{sym}USDT"
+        # Fallback: use the generic symbol field
+        generic = entry.get("symbol", "")
+        if generic:
+            return f"{generic}USDT"
+        return None
+
+    def fetch(self, symbol: str, resolution: str, start_ms: int, end_ms: int) -> List[Candle]:
+        """
+        Fetch OHLCV candles from Binance.US for a time range.
+        Paginates automatically if the range spans more than 1000 candles.
+        """
+        candles = []
+        current_start = start_ms
+        seconds = RESOLUTION_MAP[resolution]["seconds"]
+
+        while current_start < end_ms:
+            params = {
+                "symbol": symbol,
+                "interval": resolution,
+                "startTime": current_start,
+                "endTime": end_ms - 1,
+                "limit": BINANCE_MAX_LIMIT,
+            }
+
+            if self._limiter is not None:
+                self._limiter.acquire(KLINES_WEIGHT)
+            resp = self._session.get(self._base_url, params=params, timeout=15)
+
+            if resp.status_code == 400:
+                # Symbol not found on Binance.US — skip silently
+                return []
+
+            resp.raise_for_status()
+            rows = resp.json()
+
+            if not rows:
+                break
+
+            candles.extend(parse_klines(rows))
+
+            # Advance past the last candle's open time
+            current_start = rows[-1][0] + (seconds * 1000)
+
+            if len(rows) < BINANCE_MAX_LIMIT:
+                break
+
+            if self._limiter is None:
+                time.sleep(self._request_delay_s)
+
+        return candles
+
+    async def fetch_page(
+        self, session, limiter, symbol: str, resolution: str, start_ms: int, end_ms: int
+    ) -> Tuple[List[Candle], Optional[int]]:
+        """
+        Fetch one page (≤1000 klines) with aiohttp.
+
+        Pays KLINES_WEIGHT to the shared limiter before each attempt, feeds
+        the X-MBX-USED-WEIGHT-1M header back into it, and honours
+        Retry-After on 429/418 by pausing every fetcher.
+        """
+        params = {
+            "symbol": symbol,
+            "interval": resolution,
+            "startTime": start_ms,
+            "endTime": end_ms - 1,
+            "limit": BINANCE_MAX_LIMIT,
+        }
+        seconds = RESOLUTION_MAP[resolution]["seconds"]
+
+        for attempt in range(1, MAX_PAGE_ATTEMPTS + 1):
+            await limiter.acquire(KLINES_WEIGHT)
+            try:
+                async with session.get(self._base_url, params=params, timeout=_PAGE_TIMEOUT) as resp:
+                    limiter.observe(resp.headers.get("X-MBX-USED-WEIGHT-1M"))
+                    if resp.status in (418, 429):
+                        limiter.pause(float(resp.headers.get("Retry-After", "60")))
+                        continue
+                    if resp.status == 400:
+                        # Symbol not found on Binance.US
+                        return [], None
+                    if resp.status >= 500:
+                        raise RuntimeError(f"HTTP {resp.status}")
+                    resp.raise_for_status()
+                    rows = await resp.json()
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError, RuntimeError):
+                if attempt == MAX_PAGE_ATTEMPTS:
+                    raise
+                await asyncio.sleep(min(30, 2 ** attempt))
+                continue
+
+            if not rows:
+                return [], None
+            next_start = rows[-1][0] + seconds * 1000
+            if len(rows) < BINANCE_MAX_LIMIT or next_start >= end_ms:
+                next_start = None
+            return parse_klines(rows), next_start
+
+        raise RuntimeError(f"{symbol} {resolution}: still rate limited after {MAX_PAGE_ATTEMPTS} attempts")
+
+
+def parse_klines(rows: list) -> List[Candle]:
+    """
+    Convert raw Binance kline rows into candle dicts.
+
+    Binance klines format:
+      [open_time, open, high, low, close, volume, close_time, ...]
+    """
+    return [
+        {
+            "bucket": datetime.fromtimestamp(row[0] / 1000, tz=timezone.utc),
+            "open":   float(row[1]),
+            "high":   float(row[2]),
+            "low":    float(row[3]),
+            "close":  float(row[4]),
+            "volume": float(row[5]),
+            "tick_count": 1,  # each Binance candle = 1 aggregated tick
+        }
+        for row in rows
+    ]
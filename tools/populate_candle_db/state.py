@@ -0,0 +1,135 @@
+"""
+Local progress state for the backfill tools.
+
+Kept in a small SQLite file (default: backfill_state.db next to this
+script) rather than in the candle database:
+
+  CheckpointStore   per-(coin_id, resolution) resume checkpoints for the
+                    main.py fetch pipeline, so a crashed or interrupted run
+                    picks up where it stopped instead of refetching
+  ImportManifest    archive files already loaded by archives.py, so
+                    re-running an import over the same directory only
+                    loads new or changed files
+
+A checkpoint means: every candle in [range_start_ms, next_ms) has been
+written to Postgres.  The writer stage advances next_ms only *after* the
+batch containing those candles has committed, so a crash between the two
+at worst refetches one batch — the upsert makes that harmless.
+"""
+
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backfill_state.db")
+
+
+@dataclass
+class Checkpoint:
+    coin_id: str
+    resolution: str
+    range_start_ms: int
+    next_ms: int
+    end_ms: int
+    rows: int
+
+
+class CheckpointStore:
+    """SQLite-backed per-(coin, resolution) progress table."""
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                coin_id        TEXT    NOT NULL,
+                resolution     TEXT    NOT NULL,
+                range_start_ms INTEGER NOT NULL,
+                next_ms        INTEGER NOT NULL,
+                end_ms         INTEGER NOT NULL,
+                rows           INTEGER NOT NULL DEFAULT 0,
+                updated_at     REAL    NOT NULL,
+                PRIMARY KEY (coin_id, resolution)
+            )
+            """
+        )
+        self._db.commit()
+
+    def get(self, coin_id: str, resolution: str) -> Optional[Checkpoint]:
+        row = self._db.execute(
+            "SELECT coin_id, resolution, range_start_ms, next_ms, end_ms, rows "
+            "FROM checkpoints WHERE coin_id = ? AND resolution = ?",
+            (coin_id, resolution),
+        ).fetchone()
+        return Checkpoint(*row) if row else None
+
+    def begin(self, coin_id: str, resolution: str, start_ms: int, end_ms: int) -> None:
+        """Start (or restart) tracking a range from scratch."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, 0, ?)",
+            (coin_id, resolution, start_ms, start_ms, end_ms, time.time()),
+        )
+        self._db.commit()
+
+    def extend(self, coin_id: str, resolution: str, end_ms: int) -> None:
+        """Move the target end forward for an incremental re-run."""
+        self._db.execute(
+            "UPDATE checkpoints SET end_ms = ?, updated_at = ? WHERE coin_id = ? AND resolution = ?",
+            (end_ms, time.time(), coin_id, resolution),
+        )
+        self._db.commit()
+
+    def advance_many(self, progress: Dict[Tuple[str, str], Tuple[int, int]]) -> None:
+        """Record {(coin_id, resolution): (next_ms, rows_written)} in one transaction."""
+        now = time.time()
+        self._db.executemany(
+            "UPDATE checkpoints SET next_ms = MAX(next_ms, ?), rows = rows + ?, updated_at = ? "
+            "WHERE coin_id = ? AND resolution = ?",
+            [(nxt, rows, now, coin, res) for (coin, res), (nxt, rows) in progress.items()],
+        )
+        self._db.commit()
+
+    def reset(self) -> None:
+        self._db.execute("DELETE FROM checkpoints")
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class ImportManifest:
+    """SQLite-backed record of imported archive files, keyed by file name."""
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS imported_files (
+                name        TEXT    PRIMARY KEY,
+                size        INTEGER NOT NULL,
+                mtime_ns    INTEGER NOT NULL,
+                rows        INTEGER NOT NULL,
+                imported_at REAL    NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+    def is_current(self, name: str, size: int, mtime_ns: int) -> bool:
+        """True if *name* was imported before and has not changed since."""
+        row = self._db.execute(
+            "SELECT size, mtime_ns FROM imported_files WHERE name = ?", (name,)
+        ).fetchone()
+        return row is not None and tuple(row) == (size, mtime_ns)
+
+    def record(self, name: str, size: int, mtime_ns: int, rows: int) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO imported_files VALUES (?, ?, ?, ?, ?)",
+            (name, size, mtime_ns, rows, time.time()),
+        )
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,154 @@
+"""
+Client-negotiated update cadence.
+
+A subscribe message may carry "throttle_ms" and/or "batch":
+
+    { "action": "subscribe", "channel": "prices", "coins": [...],
+      "throttle_ms": 1000, "batch": true }
+
+A client with a cadence no longer gets one frame per published aggregate.
+Its Cadence keeps only the latest frame per coin and flushes them once per
+interval, either as individual frames or (batch) as one combined frame:
+
+    { "channel": "prices", "batch": [ {...}, {...} ] }
+
+Flushes are driven by one shared TimerWheel rather than a task or timer
+per client.  A cadence is only on the wheel while it has something
+pending, so idle clients cost nothing.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: a single task fires every due item.
+
+    Items are anything with a fire() method.  schedule() is O(1); each tick
+    touches only the items in one slot.
+    """
+
+    def __init__(self, tick_s: float = config.CADENCE_TICK_MS / 1000, slots: int = 512):
+        self._tick_s = tick_s
+        # slot → {item: full turns of the wheel still to wait}
+        self._slots: list[dict] = [{} for _ in range(slots)]
+        self._where: dict = {}          # item → slot index
+        self._cursor = 0
+        self._task: Optional[asyncio.Task] = None
+
+        # Stats
+        self.fired = 0
+        self.ticks = 0
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def schedule(self, item, delay_s: float) -> None:
+        """Fire *item* once, about *delay_s* from now (at least one tick)."""
+        self.cancel(item)
+        ticks = max(1, math.ceil(delay_s / self._tick_s))
+        slot = (self._cursor + ticks) % len(self._slots)
+        self._slots[slot][item] = (ticks - 1) // len(self._slots)
+        self._where[item] = slot
+        if self._task is None or self._task.done() or self._task.get_loop() is not asyncio.get_running_loop():
+            self._task = asyncio.create_task(self._run())
+
+    def cancel(self, item) -> None:
+        slot = self._where.pop(item, None)
+        if slot is not None:
+            del self._slots[slot][item]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        # Stop when empty; schedule() restarts the task
+        while self._where:
+            next_tick += self._tick_s
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._advance()
+
+    def _advance(self) -> None:
+        self.ticks += 1
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        bucket = self._slots[self._cursor]
+        if not bucket:
+            return
+        due = []
+        for item, turns in bucket.items():
+            if turns:
+                bucket[item] = turns - 1
+            else:
+                due.append(item)
+        for item in due:
+            del bucket[item]
+            del self._where[item]
+            try:
+                item.fire()
+            except Exception as e:
+                logger.error(f"Timer wheel callback failed: {e}")
+        self.fired += len(due)
+
+
+_shared_wheel: Optional[TimerWheel] = None
+
+
+def shared_wheel() -> TimerWheel:
+    """The process-wide wheel every Cadence uses by default."""
+    global _shared_wheel
+    if _shared_wheel is None:
+        _shared_wheel = TimerWheel()
+    return _shared_wheel
+
+
+class Cadence:
+    """Latest-value-per-coin buffer for one client, flushed every interval."""
+
+    def __init__(self, client, interval_s: float, batch: bool, wheel: Optional[TimerWheel] = None):
+        self._client = client
+        self.interval_s = interval_s
+        self.batch = batch
+        self._wheel = wheel or shared_wheel()
+        # Channel → {key: newest frame}
+        self._latest: dict = {}
+        self._scheduled = False
+        self._last_flush = 0.0
+
+    def offer(self, channel, key: str, frame: bytes) -> None:
+        """Take an update; it (or a newer one for the same key) goes out at the next flush."""
+        pending = self._latest.get(channel)
+        if pending is None:
+            pending = self._latest[channel] = {}
+        pending[key] = frame
+        if not self._scheduled:
+            self._scheduled = True
+            self._wheel.schedule(self, self._last_flush + self.interval_s - time.monotonic())
+
+    def fire(self) -> None:
+        """Flush everything pending into the client's send queue."""
+        self._scheduled = False
+        self._last_flush = time.monotonic()
+        latest, self._latest = self._latest, {}
+        if self._client.closed:
+            return
+        for channel, pending in latest.items():
+            if self.batch:
+                self._client.enqueue(f"{channel.name}:batch", channel.batch_frame(list(pending.values()), binary=self._client.binary),
+                                     conflate=False)
+            else:
+                for key, frame in pending.items():
+                    self._client.enqueue(key, frame)
+
+    def cancel(self) -> None:
+        self._wheel.cancel(self)
+        self._scheduled = False
+        self._latest = {}
@@ -12,23 +12,76 @@ To add a new channel:
 
 Each channel owns its own subscription routing dict so channels
 are fully independent and don't interfere with each other.
+
+Subscribers are outbound.Client objects.  Routing never awaits a socket
+write, so a slow client cannot stall other subscribers or the Redis reader.
+
+Each message is framed once: the {"channel": ..., "data": ...} envelope is
+spliced around the raw Redis payload (no re-encode) and encoded to UTF-8
+once.  That one bytes object is written directly to every idle subscriber
+with websockets.broadcast and queued for the rest.  Clients that asked for
+a throttle_ms / batch cadence get it via their Cadence instead (cadence.py).
+
+Subscriptions are indexed both ways — key → clients for fan-out and
+client → keys for removal — so a disconnect costs O(that client's
+subscriptions), not O(every key on the channel).  A subscription to "*"
+(WILDCARD) puts the client in one separate broadcast set that every
+fan-out also walks, instead of copying it into each key's bucket.
+
+Updates read from a Redis stream carry a sequence token; they are kept in
+the channel's ResumeBuffer so reconnecting clients can replay the gap
+(resume.py).
+
+Channels with a codec also serve binary clients (codec.py).  The binary
+frame is built only when a key has binary subscribers, once per update,
+plus a DELTA variant for clients known to hold the previous update.
 """
 
 from abc import ABC, abstractmethod
-from typing import Set
-import websockets
+from itertools import chain
+from typing import Callable, Optional, Set
 import json
 import logging
+import time
+
+import websockets
+
+import config
+import metrics
+from codec import PriceCodec
+from outbound import Client
+from resume import ResumeBuffer
 
 logger = logging.getLogger(__name__)
 
+# Subscribe to every key on a channel
+WILDCARD = "*"
+
 
 class Channel(ABC):
     """Base class for a subscribable data channel."""
 
+    # Binary encoding of this channel's payloads; None = JSON clients only
+    codec: Optional[PriceCodec] = None
+
     def __init__(self):
-        # coin_id → set of websocket connections subscribed to that coin
-        self._subscriptions: dict[str, Set[websockets.WebSocketServerProtocol]] = {}
+        # coin_id → set of clients subscribed to that coin
+        self._subscriptions: dict[str, Set[Client]] = {}
+        # client → keys it is subscribed to (reverse index, for remove_client)
+        self._client_keys: dict[Client, Set[str]] = {}
+        # Clients subscribed to WILDCARD; they are not in any key's bucket
+        self._wildcard: Set[Client] = set()
+        # '{"channel": "<name>", "data": ' — same bytes json.dumps would emit
+        self._envelope_head = f'{{"channel": {json.dumps(self.name)}, "data": '
+        self._envelope_head_len = len(self._envelope_head.encode())
+        self._batch_head = f'{{"channel": {json.dumps(self.name)}, "batch": ['.encode()
+        # Called as listener(channel, key, active) when a key gains its first
+        # local subscriber (active=True) or loses its last one (active=False)
+        self._interest_listener: Optional[Callable[["Channel", str, bool], None]] = None
+        # key → count of live fan-outs (orders snapshots against live updates)
+        self._update_seq: dict[str, int] = {}
+        # Recent tokened updates, for resume_from (stream mode only)
+        self.resume_buffer = ResumeBuffer(config.RESUME_BUFFER_SIZE)
 
     # ------------------------------------------------------------------
     # Identity
@@ -46,62 +99,146 @@ class Channel(ABC):
         """Redis pub/sub channel to listen on, e.g. 'rt:stream:prices'."""
         ...
 
+    @property
+    def redis_stream(self) -> str | None:
+        """Redis stream holding every update, for stream mode (None: not supported)."""
+        return None
+
+    def redis_channel_for(self, key: str) -> str:
+        """Per-key pub/sub channel, e.g. 'rt:stream:prices:bitcoin'."""
+        return f"{self.redis_channel}:{key}"
+
+    def set_interest_listener(self, listener: Callable[["Channel", str, bool], None]) -> None:
+        """
+        Register a callback for keys gaining / losing all local subscribers.
+
+        The key is WILDCARD while at least one client watches every key.
+        """
+        self._interest_listener = listener
+        for key in self._subscriptions:
+            listener(self, key, True)
+        if self._wildcard:
+            listener(self, WILDCARD, True)
+
+    def _interest_changed(self, key: str, active: bool) -> None:
+        if self._interest_listener is not None:
+            self._interest_listener(self, key, active)
+
     # ------------------------------------------------------------------
     # Subscription management
     # ------------------------------------------------------------------
 
-    def subscribe(self, ws: websockets.WebSocketServerProtocol, coins: list[str]) -> list[str]:
+    def subscribe(self, client: Client, coins: list[str]) -> list[str]:
         """
         Subscribe a client to a list of coins on this channel.
         Returns the list of coins actually subscribed.
+
+        WILDCARD replaces the client's per-coin subscriptions; while it
+        holds one, further coins are acknowledged but already covered.
         """
         subscribed = []
+        keys = self._client_keys.get(client)
         for coin_id in coins:
             coin_id = coin_id.strip().lower()
             if not coin_id:
                 continue
+            subscribed.append(coin_id)
+            if coin_id == WILDCARD:
+                self._subscribe_wildcard(client)
+                keys = None
+                continue
+            if client in self._wildcard:
+                continue
+            if keys is None:
+                keys = self._client_keys[client] = set()
             if coin_id not in self._subscriptions:
                 self._subscriptions[coin_id] = set()
-            self._subscriptions[coin_id].add(ws)
-            subscribed.append(coin_id)
+                self._interest_changed(coin_id, True)
+            self._subscriptions[coin_id].add(client)
+            keys.add(coin_id)
+        if client.binary and self.codec is not None:
+            # Names up front, so live frames rarely need a NAMES frame first
+            for coin_id in subscribed:
+                if coin_id != WILDCARD:
+                    self.codec.names.intern(coin_id)
+            self._sync_names(client)
         return subscribed
 
-    def unsubscribe(self, ws: websockets.WebSocketServerProtocol, coins: list[str]) -> list[str]:
+    def _subscribe_wildcard(self, client: Client) -> None:
+        if client in self._wildcard:
+            return
+        self._drop_keys(client)
+        self._wildcard.add(client)
+        if len(self._wildcard) == 1:
+            self._interest_changed(WILDCARD, True)
+
+    def unsubscribe(self, client: Client, coins: list[str]) -> list[str]:
         """
         Unsubscribe a client from a list of coins on this channel.
         Returns the list of coins actually unsubscribed.
         """
         unsubscribed = []
+        keys = self._client_keys.get(client, ())
         for coin_id in coins:
             coin_id = coin_id.strip().lower()
-            subs = self._subscriptions.get(coin_id)
-            if subs and ws in subs:
-                subs.discard(ws)
-                if not subs:
-                    del self._subscriptions[coin_id]
+            if coin_id == WILDCARD:
+                if client in self._wildcard:
+                    self._unsubscribe_wildcard(client)
+                    unsubscribed.append(coin_id)
+                continue
+            if coin_id in keys:
+                keys.discard(coin_id)
+                self._discard(coin_id, client)
+                client.binary_seq.pop(coin_id, None)
                 unsubscribed.append(coin_id)
+        if not keys:
+            self._client_keys.pop(client, None)
         return unsubscribed
 
-    def remove_client(self, ws: websockets.WebSocketServerProtocol) -> None:
+    def _unsubscribe_wildcard(self, client: Client) -> None:
+        self._wildcard.discard(client)
+        if not self._wildcard:
+            self._interest_changed(WILDCARD, False)
+
+    def remove_client(self, client: Client) -> None:
         """Remove a client from ALL subscriptions on this channel (on disconnect)."""
-        empty_keys = []
-        for coin_id, subs in self._subscriptions.items():
-            subs.discard(ws)
-            if not subs:
-                empty_keys.append(coin_id)
-        for key in empty_keys:
+        self._drop_keys(client)
+        if client in self._wildcard:
+            self._unsubscribe_wildcard(client)
+
+    def _drop_keys(self, client: Client) -> None:
+        """Remove *client* from every per-key bucket it is in (via the reverse index)."""
+        for key in self._client_keys.pop(client, ()):
+            self._discard(key, client)
+
+    def _discard(self, key: str, client: Client) -> None:
+        subs = self._subscriptions.get(key)
+        if subs is None:
+            return
+        subs.discard(client)
+        if not subs:
             del self._subscriptions[key]
+            self._interest_changed(key, False)
+
+    def subscription_count(self, client: Client) -> int:
+        """Subscriptions *client* holds on this channel (WILDCARD counts as one)."""
+        return len(self._client_keys.get(client, ())) + (client in self._wildcard)
+
+    def has_subscribers(self, key: str) -> bool:
+        """True if a fan-out for *key* would reach anyone."""
+        return bool(self._wildcard) or key in self._subscriptions
 
     # ------------------------------------------------------------------
     # Message routing
     # ------------------------------------------------------------------
 
-    async def route(self, message: str) -> None:
+    async def route(self, message: str, token: str | None = None) -> None:
         """
         Route a Redis pub/sub message to the correct subscribers.
 
         The message is a JSON string. We extract the routing key
         (e.g. coin_id) and send only to clients subscribed to that key.
+        *token* is the update's sequence token (stream mode), if any.
         """
         try:
             data = json.loads(message)
@@ -113,24 +250,120 @@ class Channel(ABC):
         if not routing_key:
             return
 
-        subscribers = self._subscriptions.get(routing_key, set())
-        if not subscribers:
+        # Wrap with channel name so client knows what type of message this is
+        if token is not None or self.has_subscribers(routing_key):
+            self._publish(routing_key, self._frame(message, token), token)
+
+    def _frame(self, payload: str, token: str | None = None) -> bytes:
+        """Wrap an already-serialised JSON payload in the channel envelope."""
+        if token is not None:
+            # Splice "seq" into the payload object itself, so the envelope
+            # (and batch_frame's slicing) stays the same
+            return (self._envelope_head + payload[:-1] + f', "seq": "{token}"}}}}').encode()
+        return (self._envelope_head + payload + "}").encode()
+
+    def _publish(self, routing_key: str, frame: bytes, token: str | None = None) -> None:
+        """Record a tokened update for resumes, then fan it out."""
+        if token is not None:
+            self.resume_buffer.append(token, routing_key, frame)
+        if self.has_subscribers(routing_key):
+            self._fan_out(routing_key, frame)
+
+    def batch_frame(self, frames: list[bytes], binary: bool = False) -> bytes:
+        """Combine single-update frames into one {"channel": ..., "batch": [...]} frame."""
+        if binary:
+            return self.codec.batch_frame(frames)
+        head = self._envelope_head_len
+        return self._batch_head + b", ".join(f[head:-1] for f in frames) + b"]}"
+
+    def _fan_out(self, routing_key: str, frame: bytes) -> None:
+        """Send *frame* to every subscriber of *routing_key* (non-blocking)."""
+        subscribers = self._subscriptions.get(routing_key)
+        if self._wildcard:
+            subscribers = chain(subscribers, self._wildcard) if subscribers else self._wildcard
+        elif not subscribers:
             return
+        seq = self._update_seq[routing_key] = self._update_seq.get(routing_key, 0) + 1
+        routed_at = time.perf_counter()
+        direct = []
+        binary = []
+        for client in subscribers:
+            if client.binary:
+                binary.append(client)
+            elif client.cadence is not None:
+                client.cadence.offer(self, routing_key, frame)
+            elif client.writable:
+                direct.append(client.ws)
+                client.sent += 1
+            else:
+                client.enqueue(routing_key, frame, routed_at)
+        if direct:
+            websockets.broadcast(direct, frame, text=True)
+            metrics.ROUTE_TO_SEND.observe(time.perf_counter() - routed_at, len(direct))
+        if binary:
+            self._fan_out_binary(routing_key, seq, frame, binary, routed_at)
 
-        # Wrap with channel name so client knows what type of message this is
-        outgoing = json.dumps({"channel": self.name, "data": data})
+    def _fan_out_binary(self, routing_key: str, seq: int, frame: bytes, clients: list[Client],
+                        routed_at: float) -> None:
+        """_fan_out for binary clients: one full frame, plus a delta where the client can use it."""
+        full, delta = self.codec.encode(routing_key, seq, self._payload(frame))
+        direct_full, direct_delta = [], []
+        n_names = len(self.codec.names)
+        for client in clients:
+            if client.names_known < n_names:
+                self._sync_names(client)
+            if client.cadence is not None:
+                client.cadence.offer(self, routing_key, full)
+            elif client.writable:
+                if delta is not None and client.binary_seq.get(routing_key) == seq - 1:
+                    direct_delta.append(client.ws)
+                else:
+                    direct_full.append(client.ws)
+                client.binary_seq[routing_key] = seq
+                client.sent += 1
+            else:
+                client.enqueue(routing_key, full, routed_at)
+        if direct_full:
+            websockets.broadcast(direct_full, full)
+        if direct_delta:
+            websockets.broadcast(direct_delta, delta)
+        if direct_full or direct_delta:
+            metrics.ROUTE_TO_SEND.observe(time.perf_counter() - routed_at, len(direct_full) + len(direct_delta))
+
+    def _payload(self, frame: bytes) -> dict:
+        """The decoded "data" object of a JSON frame built by _frame()."""
+        return json.loads(frame[self._envelope_head_len:-1])
+
+    def _sync_names(self, client: Client) -> None:
+        """Queue a NAMES frame if the codec has interned strings this client hasn't seen."""
+        names = self.codec.names
+        if client.names_known < len(names):
+            client.send_control(names.frame(client.names_known))
+            client.names_known = len(names)
+
+    def client_frame(self, client: Client, key: str, frame: bytes) -> bytes:
+        """Re-encode a one-off JSON frame (snapshot, replay) for *client*'s protocol."""
+        if not client.binary:
+            return frame
+        out = self.codec.encode_one(key, self._payload(frame))
+        self._sync_names(client)
+        return out
+
+    def update_seq(self, key: str) -> int:
+        """Number of live updates fanned out for *key* so far."""
+        return self._update_seq.get(key, 0)
+
+    # ------------------------------------------------------------------
+    # Snapshots (see snapshot.py) — channels opt in by overriding both
+    # ------------------------------------------------------------------
 
-        # Fan out — send to all subscribers concurrently
-        disconnected = set()
-        for ws in subscribers:
-            try:
-                await ws.send(outgoing)
-            except websockets.ConnectionClosed:
-                disconnected.add(ws)
+    def snapshot_key(self, key: str) -> str | None:
+        """Redis key holding the latest value for *key*, or None for no snapshots."""
+        return None
 
-        # Clean up any connections that died mid-send
-        for ws in disconnected:
-            self.remove_client(ws)
+    def snapshot_frame(self, key: str, raw: str) -> bytes | None:
+        """Turn the stored value for *key* into a client frame (None to skip)."""
+        return None
 
     @abstractmethod
     def _extract_routing_key(self, data: dict) -> str | None:
@@ -147,9 +380,10 @@ class Channel(ABC):
 
     @property
     def stats(self) -> dict:
-        total_subs = sum(len(s) for s in self._subscriptions.values())
+        total_subs = sum(len(keys) for keys in self._client_keys.values()) + len(self._wildcard)
         return {
             "channel": self.name,
             "coins_tracked": len(self._subscriptions),
             "total_subscriptions": total_subs,
+            "wildcard_subscribers": len(self._wildcard),
         }
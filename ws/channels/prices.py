@@ -6,11 +6,17 @@ Multi-exchange support:
   - Calculates average price across all exchanges
   - Identifies best/worst priced exchanges for each coin
 
-Redis pub/sub channel: rt:stream:prices
+Redis pub/sub channel: rt:stream:prices:<coin_id> (per_coin mode, one per
+                       locally watched coin) or rt:stream:prices (shared)
+                       or the rt:log:prices stream (stream mode)
 Routing key:           data["coin_id"]
 
+Binary clients (subprotocol prices.v1.msgpack) get the same fields as
+compact msgpack frames with interned names and deltas; see codec.py.
+
 Client subscribe message:
     { "action": "subscribe", "channel": "prices", "coins": ["bitcoin", "ethereum"] }
+    { "action": "subscribe", "channel": "prices", "coins": ["*"] }      (every coin)
 
 Outgoing message to client (enriched with multi-exchange data):
     {
@@ -46,17 +52,19 @@ Outgoing message to client (enriched with multi-exchange data):
 import json
 import logging
 import time
-from typing import Set
-
-import websockets
 
 from channels.base import Channel
+from codec import PriceCodec
 
 logger = logging.getLogger(__name__)
 
 # How long to keep exchange data before considering it stale (seconds)
 EXCHANGE_DATA_TTL = 30.0
 
+# RedisWriter serialises every aggregate with these two keys first, so the
+# coin id can be sliced out of the raw message without decoding it
+AGGREGATE_HEAD = '{"type": "aggregate", "coin_id": "'
+
 
 class ExchangePriceTracker:
     """
@@ -173,6 +181,7 @@ class PriceChannel(Channel):
         super().__init__()
         # coin_id → ExchangePriceTracker
         self._trackers: dict[str, ExchangePriceTracker] = {}
+        self.codec = PriceCodec()
 
     @property
     def name(self) -> str:
@@ -182,16 +191,45 @@ class PriceChannel(Channel):
     def redis_channel(self) -> str:
         return "rt:stream:prices"
 
+    @property
+    def redis_stream(self) -> str | None:
+        return "rt:log:prices"
+
     def _extract_routing_key(self, data: dict) -> str | None:
         return data.get("coin_id")
     
+    def snapshot_key(self, key: str) -> str | None:
+        return f"rt:coin:{key}"
+
+    def snapshot_frame(self, key: str, raw: str) -> bytes | None:
+        """
+        Reshape an rt:coin:<coin_id> cache entry into an aggregate message.
+
+        Sent right after the subscribe ack with type="snapshot" (and no
+        published_at, which would skew client-side latency numbers).
+        """
+        entry = json.loads(raw)
+        highest = entry.get("highest") or {}
+        lowest = entry.get("lowest") or {}
+        return self._frame(json.dumps({
+            "type": "snapshot",
+            "coin_id": key,
+            "avg_price": entry.get("avg_price"),
+            "highest_exchange": highest.get("exchange"),
+            "highest_price": highest.get("price"),
+            "lowest_exchange": lowest.get("exchange"),
+            "lowest_price": lowest.get("price"),
+            "exchange_count": entry.get("exchange_count"),
+            "timestamp": entry.get("timestamp"),
+        }))
+
     def _get_or_create_tracker(self, coin_id: str) -> ExchangePriceTracker:
         """Get or create a price tracker for a coin."""
         if coin_id not in self._trackers:
             self._trackers[coin_id] = ExchangePriceTracker(coin_id)
         return self._trackers[coin_id]
 
-    async def route(self, message: str) -> None:
+    async def route(self, message: str, token: str | None = None) -> None:
         """
         Route a Redis pub/sub message to the correct subscribers.
         
@@ -203,7 +241,22 @@ class PriceChannel(Channel):
           2. Individual tick messages (exchange-specific) — fed into the
              local ExchangePriceTracker for per-ws-instance aggregation.
              Only sent when ENABLE_DEBUG_KEYS is True in the realtime service.
+
+        Aggregates take a fast path: the coin id is sliced from the raw
+        string and the payload is spliced into the frame as-is, so the hot
+        path never parses JSON.
+
+        Aggregates read from the stream (stream mode) carry a *token*;
+        they are framed with it and kept for resume_from even when nobody
+        here is subscribed yet.
         """
+        if message.startswith(AGGREGATE_HEAD):
+            start = len(AGGREGATE_HEAD)
+            coin_id = message[start:message.find('"', start)]
+            if token is not None or self.has_subscribers(coin_id):
+                self._publish(coin_id, self._frame(message, token), token)
+            return
+
         try:
             data = json.loads(message)
         except json.JSONDecodeError:
@@ -216,22 +269,10 @@ class PriceChannel(Channel):
 
         # ── Aggregate messages from realtime service ──────────────
         # These are already computed (avg, highest, lowest) — just forward.
+        # (Only reached if a producer serialised keys in another order.)
         if data.get("type") == "aggregate":
-            subscribers = self._subscriptions.get(coin_id, set())
-            if not subscribers:
-                return
-
-            outgoing = json.dumps({"channel": self.name, "data": data})
-
-            disconnected: Set[websockets.WebSocketServerProtocol] = set()
-            for ws in subscribers:
-                try:
-                    await ws.send(outgoing)
-                except websockets.ConnectionClosed:
-                    disconnected.add(ws)
-
-            for ws in disconnected:
-                self.remove_client(ws)
+            if token is not None or self.has_subscribers(coin_id):
+                self._publish(coin_id, self._frame(message, token), token)
             return
 
         # ── Individual tick messages (debug mode only) ────────────
@@ -246,25 +287,9 @@ class PriceChannel(Channel):
         if not aggregated:
             return
 
-        # Check if anyone is subscribed to this coin
-        subscribers = self._subscriptions.get(coin_id, set())
-        if not subscribers:
-            return
-
-        # Wrap with channel name
-        outgoing = json.dumps({"channel": self.name, "data": aggregated})
-
-        # Fan out to all subscribers
-        disconnected: Set[websockets.WebSocketServerProtocol] = set()
-        for ws in subscribers:
-            try:
-                await ws.send(outgoing)
-            except websockets.ConnectionClosed:
-                disconnected.add(ws)
-
-        # Clean up dead connections
-        for ws in disconnected:
-            self.remove_client(ws)
+        # Wrap with channel name and fan out to all subscribers
+        if self.has_subscribers(coin_id):
+            self._fan_out(coin_id, self._frame(json.dumps(aggregated)))
 
     @property
     def stats(self) -> dict:
@@ -0,0 +1,218 @@
+"""
+Binary price frames: the "prices.v1.msgpack" websocket subprotocol.
+
+JSON stays the default.  A client that offers the subprotocol at handshake
+(Sec-WebSocket-Protocol: prices.v1.msgpack) gets price updates as binary
+msgpack frames instead; acks and errors stay JSON text frames.
+
+Every binary frame is a msgpack array whose first element is its type:
+
+    [NAMES,    start, [name, ...]]                string table entries start..
+    [UPDATE,   coin, floats, ints, seq?]          a full aggregate
+    [DELTA,    coin, mask, floats, ints, seq?]    only the fields that changed
+    [SNAPSHOT, coin, floats, ints]                latest stored value (subscribe)
+    [BATCH,    frame, frame, ...]                 batch: true cadence
+
+  coin    index into the string table (coin ids and exchange names are
+          interned; a NAMES frame always precedes the first use of a name)
+  floats  bin: little-endian float64 array, FLOAT_FIELDS order (NaN = null)
+  ints    array, INT_FIELDS order (-1 = null; exchanges are table indexes)
+  mask    bit i set → field i of FLOAT_FIELDS + INT_FIELDS is present, in
+          that order, in floats / ints
+  seq     the update's sequence token (stream mode only, see resume.py)
+
+A DELTA applies to the previous update for that coin on this connection.
+The server only sends one when the client is known to hold that update
+(it went straight to the socket); after a queued, conflated or throttled
+delivery the next frame is a full UPDATE.
+
+Decoder is the reference client: it turns binary frames back into the
+same {"channel": "prices", "data": {...}} dicts the JSON protocol sends.
+"""
+
+import json
+import math
+import struct
+from typing import Optional
+
+import msgpack
+
+SUBPROTOCOL = "prices.v1.msgpack"
+
+NAMES, UPDATE, DELTA, SNAPSHOT, BATCH = 0, 1, 2, 3, 4
+
+FLOAT_FIELDS = ("avg_price", "highest_price", "lowest_price", "timestamp", "published_at")
+INT_FIELDS = ("highest_exchange", "lowest_exchange", "exchange_count")
+# INT_FIELDS that hold interned strings
+NAME_FIELDS = ("highest_exchange", "lowest_exchange")
+
+_N_FLOATS = len(FLOAT_FIELDS)
+_FULL_FLOATS = struct.Struct(f"<{_N_FLOATS}d")
+_NAN = float("nan")
+
+
+def select_subprotocol(connection, subprotocols) -> Optional[str]:
+    """websockets.serve hook: binary if offered, otherwise plain JSON."""
+    return SUBPROTOCOL if SUBPROTOCOL in subprotocols else None
+
+
+class NameTable:
+    """Append-only string table shared by every binary connection."""
+
+    def __init__(self):
+        self.names: list[str] = []
+        self._index: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, name: Optional[str]) -> int:
+        if name is None:
+            return -1
+        index = self._index.get(name)
+        if index is None:
+            index = self._index[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def frame(self, start: int) -> bytes:
+        """NAMES frame carrying every entry from *start* on."""
+        return msgpack.packb([NAMES, start, self.names[start:]])
+
+
+class PriceCodec:
+    """Encodes aggregate payloads; remembers each coin's last published values for deltas."""
+
+    def __init__(self, names: Optional[NameTable] = None):
+        self.names = names or NameTable()
+        # coin_id → (update seq, floats, ints) of the last encoded update
+        self._last: dict[str, tuple[int, tuple, tuple]] = {}
+
+    def _values(self, data: dict) -> tuple[tuple, tuple]:
+        floats = tuple(_NAN if data.get(f) is None else float(data[f]) for f in FLOAT_FIELDS)
+        ints = tuple(
+            self.names.intern(data.get(f)) if f in NAME_FIELDS
+            else (-1 if data.get(f) is None else int(data[f]))
+            for f in INT_FIELDS
+        )
+        return floats, ints
+
+    def encode(self, key: str, seq: int, data: dict) -> tuple[bytes, Optional[bytes]]:
+        """
+        Encode live update number *seq* for *key*.
+
+        Returns (full, delta); delta is None unless update seq - 1 was
+        also encoded, and is relative to that one.
+        """
+        coin = self.names.intern(key)
+        floats, ints = self._values(data)
+        seq_token = data.get("seq")
+        full = [UPDATE, coin, _FULL_FLOATS.pack(*floats), list(ints)]
+        if seq_token is not None:
+            full.append(seq_token)
+        full = msgpack.packb(full)
+
+        delta = None
+        last = self._last.get(key)
+        if last is not None and last[0] == seq - 1:
+            mask = 0
+            changed_floats, changed_ints = [], []
+            for i, (old, new) in enumerate(zip(last[1], floats)):
+                # NaN != NaN: treat null → null as unchanged
+                if old != new and not (math.isnan(old) and math.isnan(new)):
+                    mask |= 1 << i
+                    changed_floats.append(new)
+            for i, (old, new) in enumerate(zip(last[2], ints)):
+                if old != new:
+                    mask |= 1 << (_N_FLOATS + i)
+                    changed_ints.append(new)
+            delta = [DELTA, coin, mask, struct.pack(f"<{len(changed_floats)}d", *changed_floats), changed_ints]
+            if seq_token is not None:
+                delta.append(seq_token)
+            delta = msgpack.packb(delta)
+        self._last[key] = (seq, floats, ints)
+        return full, delta
+
+    def encode_one(self, key: str, data: dict) -> bytes:
+        """Full frame for a one-off send (snapshot, replay); does not affect deltas."""
+        floats, ints = self._values(data)
+        kind = SNAPSHOT if data.get("type") == "snapshot" else UPDATE
+        msg = [kind, self.names.intern(key), _FULL_FLOATS.pack(*floats), list(ints)]
+        if data.get("seq") is not None:
+            msg.append(data["seq"])
+        return msgpack.packb(msg)
+
+    @staticmethod
+    def batch_frame(frames: list[bytes]) -> bytes:
+        """[BATCH, frame, ...] — msgpack arrays concatenate without re-encoding."""
+        packer = msgpack.Packer()
+        return packer.pack_array_header(len(frames) + 1) + packer.pack(BATCH) + b"".join(frames)
+
+
+class Decoder:
+    """
+    Reference client decoder for prices.v1.msgpack.
+
+    feed() takes any frame received on the connection (binary, or the JSON
+    text acks/errors) and returns the messages it holds in JSON-protocol
+    form.  Keep one Decoder per connection.
+    """
+
+    def __init__(self, channel: str = "prices"):
+        self.channel = channel
+        self.names: list[str] = []
+        # coin index → (floats, ints) last received
+        self._last: dict[int, tuple[list, list]] = {}
+
+    def feed(self, frame) -> list[dict]:
+        if isinstance(frame, str):
+            return [json.loads(frame)]
+        return self._decode(msgpack.unpackb(frame))
+
+    def _decode(self, msg: list) -> list[dict]:
+        kind = msg[0]
+        if kind == NAMES:
+            start, names = msg[1], msg[2]
+            del self.names[start:]
+            self.names.extend(names)
+            return []
+        if kind == BATCH:
+            out = []
+            for inner in msg[1:]:
+                out.extend(self._decode(inner))
+            return out
+        if kind in (UPDATE, SNAPSHOT):
+            coin, floats, ints = msg[1], list(_FULL_FLOATS.unpack(msg[2])), list(msg[3])
+            if kind == UPDATE:
+                self._last[coin] = (floats, ints)
+            seq = msg[4] if len(msg) > 4 else None
+            return [self._message("snapshot" if kind == SNAPSHOT else "aggregate", coin, floats, ints, seq)]
+        if kind == DELTA:
+            coin, mask = msg[1], msg[2]
+            floats, ints = (list(v) for v in self._last[coin])
+            changed = iter(struct.unpack(f"<{len(msg[3]) // 8}d", msg[3]))
+            for i in range(_N_FLOATS):
+                if mask & (1 << i):
+                    floats[i] = next(changed)
+            changed = iter(msg[4])
+            for i in range(len(INT_FIELDS)):
+                if mask & (1 << (_N_FLOATS + i)):
+                    ints[i] = next(changed)
+            self._last[coin] = (floats, ints)
+            return [self._message("aggregate", coin, floats, ints, msg[5] if len(msg) > 5 else None)]
+        raise ValueError(f"Unknown frame type {kind}")
+
+    def _message(self, kind: str, coin: int, floats: list, ints: list, seq: Optional[str] = None) -> dict:
+        data = {"type": kind, "coin_id": self.names[coin]}
+        for name, value in zip(FLOAT_FIELDS, floats):
+            data[name] = None if math.isnan(value) else value
+        for name, value in zip(INT_FIELDS, ints):
+            if value == -1:
+                data[name] = None
+            else:
+                data[name] = self.names[value] if name in NAME_FIELDS else value
+        if kind == "snapshot":
+            data.pop("published_at")
+        if seq is not None:
+            data["seq"] = seq
+        return {"channel": self.channel, "data": data}
@@ -14,6 +14,20 @@ load_dotenv()
 # ---------------------------------------------------------------------------
 REDIS_URL = os.getenv("REDIS_URL")
 
+# How this instance listens for updates:
+#   per_coin  SUBSCRIBE rt:stream:prices:<coin_id> only for coins that local
+#             clients watch, so Redis egress scales with interest rather
+#             than with instance count (needs the ingestor to publish with
+#             PRICE_CHANNEL_MODE=per_coin or both)
+#   shared    SUBSCRIBE rt:stream:prices and receive every coin
+#   stream    XREAD the rt:log:prices stream (ingestor PRICE_STREAM_ENABLED):
+#             nothing is lost across Redis reconnects and clients can send
+#             "resume_from" to replay a gap (see resume.py)
+REDIS_PUBSUB_MODE = os.getenv("REDIS_PUBSUB_MODE", "per_coin").lower()
+# Keep a coin's channel subscribed this long after its last local client
+# leaves, so clients flapping between coins don't churn SUBSCRIBE/UNSUBSCRIBE
+REDIS_UNSUBSCRIBE_DEBOUNCE_S = float(os.getenv("REDIS_UNSUBSCRIBE_DEBOUNCE_S", "30"))
+
 # ---------------------------------------------------------------------------
 # WebSocket server
 # ---------------------------------------------------------------------------
@@ -28,6 +42,49 @@ MAX_SUBSCRIPTIONS_PER_CLIENT = int(
     os.getenv("MAX_SUBSCRIPTIONS_PER_CLIENT", "50")
 )
 
+# Allow "coins": ["*"] — every coin on the channel over one subscription,
+# for "all markets" pages.  In per_coin mode it PSUBSCRIBEs to
+# rt:stream:prices:* while any local client holds one.
+WILDCARD_SUBSCRIPTIONS = os.getenv("WILDCARD_SUBSCRIPTIONS", "true").lower() in ("1", "true", "yes")
+
+# Per-client outbound queue (see outbound.py).  Newer updates replace queued
+# ones for the same coin; when the queue is full, the oldest update makes
+# room.  A client whose queue stays full longer than SLOW_CLIENT_TIMEOUT_S
+# is disconnected.
+CLIENT_QUEUE_MAX = int(os.getenv("CLIENT_QUEUE_MAX", "256"))
+SLOW_CLIENT_TIMEOUT_S = float(os.getenv("SLOW_CLIENT_TIMEOUT_S", "10"))
+
+# permessage-deflate runs once per subscriber per frame (each connection
+# has its own compression context), so it is the largest per-client cost of
+# a fan-out.  Price frames are small; set to "none" to trade a little
+# bandwidth for a lot of CPU on busy instances.
+WS_COMPRESSION = os.getenv("WS_COMPRESSION", "deflate").lower()
+
+# Client-negotiated cadence (see cadence.py).  throttle_ms values below
+# MIN_THROTTLE_MS are raised to it; "batch" without throttle_ms flushes every
+# DEFAULT_BATCH_MS.  The shared timer wheel ticks every CADENCE_TICK_MS.
+MIN_THROTTLE_MS = int(os.getenv("MIN_THROTTLE_MS", "100"))
+MAX_THROTTLE_MS = int(os.getenv("MAX_THROTTLE_MS", "60000"))
+DEFAULT_BATCH_MS = int(os.getenv("DEFAULT_BATCH_MS", "250"))
+CADENCE_TICK_MS = int(os.getenv("CADENCE_TICK_MS", "50"))
+
+# Stream mode: updates kept per channel for "resume_from" replays
+RESUME_BUFFER_SIZE = int(os.getenv("RESUME_BUFFER_SIZE", "10000"))
+
+# Send each coin's latest value (from rt:coin:<coin_id>) right after a
+# subscribe ack.  Reads are cached briefly and shared across subscribers.
+SNAPSHOT_ON_SUBSCRIBE = os.getenv("SNAPSHOT_ON_SUBSCRIBE", "true").lower() in ("1", "true", "yes")
+SNAPSHOT_CACHE_TTL_S = float(os.getenv("SNAPSHOT_CACHE_TTL_S", "1.0"))
+
+# Pre-fork mode (see workers.py): >1 runs that many worker processes sharing
+# WS_PORT via SO_REUSEPORT under a supervisor that owns HEALTH_PORT
+WS_WORKERS = int(os.getenv("WS_WORKERS", "1"))
+WORKER_STATS_INTERVAL_S = float(os.getenv("WORKER_STATS_INTERVAL_S", "2"))
+
+# Fan-out histograms (see metrics.py): event-loop lag and client queue
+# depths are sampled this often
+METRICS_SAMPLE_INTERVAL_S = float(os.getenv("METRICS_SAMPLE_INTERVAL_S", "0.5"))
+
 # ---------------------------------------------------------------------------
 # Health check (for container orchestration / load balancer probes)
 # ---------------------------------------------------------------------------
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Connection-swarm load tool for the WS broadcast server.
+
+test_client.py opens one connection and prints a few ticks; this opens
+thousands, spread over several processes so the client side is not the
+bottleneck, and reports what the server delivered:
+
+  - connections established / failed, and how long the ramp took
+  - price updates received in total and per second (the server's
+    delivered fan-out throughput)
+  - end-to-end latency: receive time minus the aggregate's published_at
+    (set by the ingestor when it publishes).  Only --latency-sample of the
+    clients parse their frames for it, so the rest stay cheap; across
+    hosts the number includes the clocks' offset
+
+Subscriptions follow --dist: "zipf" (default) picks each client's coins
+with probability ~ 1 / rank^--zipf-s, so a few coins have most of the
+subscribers, as in production; "uniform" picks them at random.
+
+Tens of thousands of connections need the fd limit raised (each process
+lifts its soft RLIMIT_NOFILE to the hard limit) and, from one client host,
+enough ephemeral ports (net.ipv4.ip_local_port_range) — or several hosts.
+
+Usage:
+    python loadtest.py --clients 5000 --subs 10 --duration 30
+    python loadtest.py --url ws://10.0.0.5:8765 --clients 40000 --procs 8 --ramp 60
+    python loadtest.py --coins 200 ...    # synthetic coin-0..coin-199 instead
+                                          # of data/coin_aliases.json
+
+Each process keeps its share of clients open for --duration seconds after
+its ramp, then they all close.  --json prints one machine-readable summary
+line instead of the report (used by test/ws_bench/bench_workers.py).
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing as mp
+import os
+import pathlib
+import random
+import resource
+import sys
+import time
+
+import websockets
+
+COIN_ALIASES_PATH = pathlib.Path(__file__).resolve().parents[1] / "data" / "coin_aliases.json"
+
+# Latency samples kept per process (reservoir), for the percentiles
+MAX_LATENCY_SAMPLES = 200_000
+
+# (number of coins, exponent) → cumulative Zipf weights
+_ZIPF_WEIGHTS: dict[tuple, list[float]] = {}
+
+
+def load_coins(synthetic: int = 0) -> list[str]:
+    if synthetic:
+        return [f"coin-{i}" for i in range(synthetic)]
+    with open(COIN_ALIASES_PATH, "r", encoding="utf-8") as f:
+        coins = list(json.load(f).get("assets", {}).keys())
+    if not coins:
+        raise RuntimeError("No coins found in data/coin_aliases.json")
+    return coins
+
+
+def pick_coins(rnd: random.Random, coins: list[str], subs: int, dist: str = "zipf",
+               zipf_s: float = 1.1) -> list[str]:
+    """*subs* distinct coins; under "zipf" coins earlier in the list are more popular."""
+    subs = min(subs, len(coins))
+    if dist == "uniform":
+        return rnd.sample(coins, subs)
+    key = (len(coins), zipf_s)
+    if key not in _ZIPF_WEIGHTS:
+        _ZIPF_WEIGHTS[key] = list(itertools.accumulate(1 / rank ** zipf_s for rank in range(1, len(coins) + 1)))
+    picked: set[str] = set()
+    while len(picked) < subs:
+        picked.update(rnd.choices(coins, cum_weights=_ZIPF_WEIGHTS[key], k=subs - len(picked)))
+    return list(picked)
+
+
+def raise_fd_limit() -> int:
+    """Lift the soft open-files limit to the hard one; returns the new limit."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def _latencies_ms(frame: str, now_ms: float) -> list[float]:
+    msg = json.loads(frame)
+    updates = msg.get("batch") or [msg.get("data") or {}]
+    return [now_ms - u["published_at"] for u in updates if u.get("published_at") is not None]
+
+
+# ── One process's share of the swarm ────────────────────────────────────────
+
+async def _swarm(url: str, n: int, coins: list[str], subs: int, ramp_s: float,
+                 duration_s: float, seed: int, dist: str = "zipf", zipf_s: float = 1.1,
+                 latency_sample: float = 0.1) -> dict:
+    rnd = random.Random(seed)
+    result = {"connected": 0, "failed": 0, "received": 0, "ramp_s": 0.0, "latency_ms": []}
+    latencies = result["latency_ms"]
+    seen = 0
+    t0 = time.monotonic()
+    stop_at = t0 + ramp_s + duration_s
+    measure_from = t0 + ramp_s
+
+    def record(samples: list[float]) -> None:
+        nonlocal seen
+        for sample in samples:
+            seen += 1
+            if len(latencies) < MAX_LATENCY_SAMPLES:
+                latencies.append(sample)
+            elif (i := rnd.randrange(seen)) < MAX_LATENCY_SAMPLES:
+                latencies[i] = sample
+
+    async def client(delay: float) -> None:
+        await asyncio.sleep(delay)
+        picked = pick_coins(rnd, coins, subs, dist, zipf_s)
+        measure_latency = rnd.random() < latency_sample
+        try:
+            async with websockets.connect(url, ping_interval=None, open_timeout=30,
+                                          max_queue=None) as ws:
+                await ws.send(json.dumps({"action": "subscribe", "channel": "prices", "coins": picked}))
+                result["connected"] += 1
+                result["ramp_s"] = max(result["ramp_s"], time.monotonic() - t0)
+                while (remaining := stop_at - time.monotonic()) > 0:
+                    try:
+                        frame = await asyncio.wait_for(ws.recv(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    # Only updates count; acks and errors start with '{"type"'
+                    if time.monotonic() >= measure_from and frame.startswith('{"channel"'):
+                        result["received"] += 1
+                        if measure_latency:
+                            record(_latencies_ms(frame, time.time() * 1000))
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException):
+            result["failed"] += 1
+
+    await asyncio.gather(*(client(ramp_s * i / max(n, 1)) for i in range(n)))
+    result["measured_s"] = duration_s
+    return result
+
+
+def _swarm_proc(url, n, coins, subs, ramp_s, duration_s, seed, options, queue) -> None:
+    raise_fd_limit()
+    queue.put(asyncio.run(_swarm(url, n, coins, subs, ramp_s, duration_s, seed, **options)))
+
+
+def _percentiles(samples: list[float], points=(50, 90, 99, 99.9)) -> dict:
+    if not samples:
+        return {}
+    s = sorted(samples)
+    out = {f"p{p:g}": round(s[min(len(s) - 1, int(len(s) * p / 100))], 2) for p in points}
+    out["max"] = round(s[-1], 2)
+    return out
+
+
+def run(url: str, clients: int, procs: int, coins: list[str], subs: int,
+        ramp_s: float, duration_s: float, dist: str = "zipf", zipf_s: float = 1.1,
+        latency_sample: float = 0.1) -> dict:
+    """Run the swarm across *procs* processes; returns the combined summary."""
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    options = {"dist": dist, "zipf_s": zipf_s, "latency_sample": latency_sample}
+    shares = [clients // procs + (1 if i < clients % procs else 0) for i in range(procs)]
+    children = [
+        ctx.Process(target=_swarm_proc, args=(url, share, coins, subs, ramp_s, duration_s, i, options, queue),
+                    daemon=True)
+        for i, share in enumerate(shares) if share
+    ]
+    for c in children:
+        c.start()
+    results = [queue.get(timeout=ramp_s + duration_s + 120) for _ in children]
+    for c in children:
+        c.join(timeout=5)
+    received = sum(r["received"] for r in results)
+    return {
+        "clients": clients,
+        "connected": sum(r["connected"] for r in results),
+        "failed": sum(r["failed"] for r in results),
+        "ramp_s": round(max(r["ramp_s"] for r in results), 2),
+        "received": received,
+        "updates_per_s": round(received / duration_s, 1),
+        # Each process's reservoir is a uniform sample of its own deliveries
+        "latency_ms": _percentiles([ms for r in results for ms in r["latency_ms"]]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Open many WS connections and measure delivered updates.")
+    parser.add_argument("--url", default="ws://localhost:8765")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--procs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--subs", type=int, default=10, help="Coins per client")
+    parser.add_argument("--coins", type=int, default=0, help="Use N synthetic coin ids (coin-0..)")
+    parser.add_argument("--dist", default="zipf", choices=["zipf", "uniform"], help="Coin popularity")
+    parser.add_argument("--zipf-s", type=float, default=1.1, help="Zipf exponent")
+    parser.add_argument("--latency-sample", type=float, default=0.1,
+                        help="Fraction of clients that measure end-to-end latency")
+    parser.add_argument("--ramp", type=float, default=10.0, help="Seconds over which to open connections")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to measure after the ramp")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    summary = run(args.url, args.clients, args.procs, load_coins(args.coins), args.subs,
+                  args.ramp, args.duration, args.dist, args.zipf_s, args.latency_sample)
+    if args.json:
+        print(json.dumps(summary))
+        return
+    print(f"Clients:     {summary['connected']}/{summary['clients']} connected "
+          f"({summary['failed']} failed), ramp {summary['ramp_s']}s")
+    print(f"Updates:     {summary['received']} in {args.duration:.0f}s "
+          f"→ {summary['updates_per_s']:.0f}/s delivered")
+    latency = summary["latency_ms"]
+    if latency:
+        print("Latency:     " + "  ".join(f"{k}={v:.1f}ms" for k, v in latency.items())
+              + "  (published_at → received)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,7 +12,10 @@ Usage:
 Environment:
     REDIS_URL       Redis connection string (required)
     WS_PORT         WebSocket port (default: 8765)
-    HEALTH_PORT     Health check HTTP port (default: 8080)
+    HEALTH_PORT     Health check HTTP port (default: 8080); GET /metrics
+                    serves Prometheus fan-out histograms (metrics.py)
+    WS_COMPRESSION  "deflate" (default) or "none"
+    WS_WORKERS      worker processes sharing WS_PORT (default: 1; see workers.py)
     LOG_LEVEL       Logging level (default: INFO)
 """
 
@@ -49,10 +52,14 @@ load_env_files()
 
 import websockets
 
+import codec
 import config
+import metrics
 from channels.prices import PriceChannel
 from redis_sub import RedisSubscriber
 from server import ConnectionHandler, connected_clients
+from snapshot import SnapshotStore
+from workers import Supervisor, report_stats
 
 # ---------------------------------------------------------------------------
 # Logging
@@ -69,16 +76,20 @@ logger = logging.getLogger("ws")
 # Health check (simple HTTP for load balancer / container probes)
 # ---------------------------------------------------------------------------
 async def health_handler(reader, writer):
-    """Respond to any TCP connection with a 200 OK."""
+    """Respond to any TCP connection with a 200 OK (GET /metrics: Prometheus text)."""
     request = await reader.read(1024)
-    body = f'{{"status":"ok","clients":{len(connected_clients)}}}'
+    if request.startswith(b"GET /metrics"):
+        body, content_type = metrics.render(clients=len(connected_clients)), metrics.CONTENT_TYPE
+    else:
+        body, content_type = f'{{"status":"ok","clients":{len(connected_clients)}}}', "application/json"
+    body = body.encode()
     response = (
         f"HTTP/1.1 200 OK\r\n"
-        f"Content-Type: application/json\r\n"
+        f"Content-Type: {content_type}\r\n"
         f"Content-Length: {len(body)}\r\n"
-        f"\r\n{body}"
+        f"\r\n"
     )
-    writer.write(response.encode())
+    writer.write(response.encode() + body)
     await writer.drain()
     writer.close()
 
@@ -94,20 +105,32 @@ async def process_request(connection, request):
 
     Cloud Run (and other container platforms) probe the single exposed port
     with a plain HTTP GET.  We respond to /health and /healthz so startup
-    probes pass; all other paths (including /) fall through to WebSocket handshake.
+    probes pass, and /metrics for scrapers; all other paths (including /) fall
+    through to WebSocket handshake.
     """
     if request.path in ("/health", "/healthz"):
         body = f'{{"status":"ok","clients":{len(connected_clients)}}}'
         return connection.respond(HTTPStatus.OK, body)
+    if request.path == "/metrics":
+        response = connection.respond(HTTPStatus.OK, metrics.render(clients=len(connected_clients)))
+        del response.headers["Content-Type"]
+        response.headers["Content-Type"] = metrics.CONTENT_TYPE
+        return response
     return None
 
 
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
-async def main():
+async def main(worker_id: int | None = None, stats_queue=None):
+    """
+    Run the server.  As a pre-fork worker (*worker_id* set) it binds WS_PORT
+    with SO_REUSEPORT, leaves HEALTH_PORT to the supervisor and reports its
+    stats on *stats_queue* instead.
+    """
     logger.info("=" * 60)
-    logger.info("  WebSocket Broadcast Server")
+    logger.info("  WebSocket Broadcast Server" + (f" — worker {worker_id} (pid {os.getpid()})"
+                                                  if worker_id is not None else ""))
     logger.info("=" * 60)
 
     # -- 1. Register channels -----------------------------------------------
@@ -122,10 +145,15 @@ async def main():
     redis_sub = RedisSubscriber(all_channels)
     await redis_sub.connect()
 
+    snapshots = None
+    if config.SNAPSHOT_ON_SUBSCRIBE:
+        snapshots = SnapshotStore()
+        await snapshots.connect()
+
     # -- 3. Start WebSocket server -------------------------------------------
     # Each new connection gets its own ConnectionHandler instance
     async def on_connect(ws):
-        handler = ConnectionHandler(channel_map)
+        handler = ConnectionHandler(channel_map, snapshots)
         await handler.handle(ws)
 
     ws_server = await websockets.serve(
@@ -135,13 +163,28 @@ async def main():
         ping_interval=20,
         ping_timeout=10,
         process_request=process_request,
+        select_subprotocol=codec.select_subprotocol,
+        compression=None if config.WS_COMPRESSION == "none" else config.WS_COMPRESSION,
+        reuse_port=worker_id is not None,
     )
     logger.info(f"WebSocket server listening on ws://{config.WS_HOST}:{config.WS_PORT}")
 
     # -- 4. Start health check (extra TCP port for VM/bare-metal deployments) --
     # On Cloud Run only one port is exposed (WS_PORT), so this may be
     # unreachable externally — that's fine, health checks hit / on WS_PORT.
-    health_server = await start_health_server()
+    # Workers report to the supervisor, which serves HEALTH_PORT instead.
+    health_server = None
+    stats_task = None
+    if worker_id is None:
+        health_server = await start_health_server()
+    else:
+        stats_task = asyncio.create_task(report_stats(worker_id, stats_queue, lambda: {
+            "clients": len(connected_clients),
+            "channels": [ch.stats for ch in all_channels],
+            "redis": redis_sub.stats,
+            "metrics": metrics.snapshot(),
+        }))
+    metrics_task = asyncio.create_task(metrics.sample_loop(lambda: connected_clients))
 
     # -- 5. Start Redis listener (runs forever) ------------------------------
     redis_task = asyncio.create_task(redis_sub.listen())
@@ -163,16 +206,25 @@ async def main():
     # Cleanup
     logger.info("Shutting down...")
     redis_task.cancel()
+    metrics_task.cancel()
+    if stats_task is not None:
+        stats_task.cancel()
     ws_server.close()
     await ws_server.wait_closed()
-    health_server.close()
-    await health_server.wait_closed()
+    if health_server is not None:
+        health_server.close()
+        await health_server.wait_closed()
     await redis_sub.close()
+    if snapshots is not None:
+        await snapshots.close()
     logger.info("Goodbye.")
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if config.WS_WORKERS > 1:
+            asyncio.run(Supervisor().run())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         pass
@@ -0,0 +1,129 @@
+"""
+Per-stage fan-out histograms, served in Prometheus text format.
+
+channel.stats says how many subscriptions there are, not where an update
+spends its time on the way through the server.  These say that:
+
+  ws_receive_to_route_seconds   Redis read returned → route() done
+                                (parse + fan-out; in stream mode the
+                                whole XREAD batch shares the read time)
+  ws_route_to_send_seconds      fan-out → the frame's socket write
+                                completed, once per client delivery.
+                                Direct writes finish inside the fan-out;
+                                queued frames finish in the client's writer
+                                (throttled / batched deliveries count from
+                                their cadence flush)
+  ws_client_queue_depth         every client's outbound queue length,
+                                sampled every METRICS_SAMPLE_INTERVAL_S
+  ws_event_loop_lag_seconds     how late the sampler's sleep wakes up
+
+The health port serves them at GET /metrics (and so does WS_PORT, for
+single-port deployments).  In pre-fork mode (workers.py) each worker sends
+snapshot() with its stats and the supervisor serves the merged totals.
+
+Histograms are cumulative from process start, like Prometheus expects;
+observe() is a bisect and two additions, cheap enough for the hot path.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+import config
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds, in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+DEPTH_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class Histogram:
+    """A Prometheus-style cumulative histogram (no labels)."""
+
+    def __init__(self, name: str, help: str, buckets: tuple):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # counts[i] = observations in (buckets[i-1], buckets[i]]; last is +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float, n: int = 1) -> None:
+        """Record *value* (*n* times — e.g. once per client of a broadcast)."""
+        self.counts[bisect_left(self.buckets, value)] += n
+        self.sum += value * n
+        self.count += n
+
+    def snapshot(self) -> dict:
+        return {"counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+    def merge(self, snapshot: dict) -> None:
+        """Add another process's snapshot() of the same histogram."""
+        for i, n in enumerate(snapshot["counts"]):
+            self.counts[i] += n
+        self.sum += snapshot["sum"]
+        self.count += snapshot["count"]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {self.sum:.9g}")
+        lines.append(f"{self.name}_count {self.count}")
+        return "\n".join(lines)
+
+
+RECEIVE_TO_ROUTE = Histogram(
+    "ws_receive_to_route_seconds", "Redis read returned to route() done.", LATENCY_BUCKETS)
+ROUTE_TO_SEND = Histogram(
+    "ws_route_to_send_seconds", "Fan-out to socket write complete, per client delivery.", LATENCY_BUCKETS)
+QUEUE_DEPTH = Histogram(
+    "ws_client_queue_depth", "Outbound queue length per client, sampled.", DEPTH_BUCKETS)
+LOOP_LAG = Histogram(
+    "ws_event_loop_lag_seconds", "Event loop wake-up delay of the metrics sampler.", LATENCY_BUCKETS)
+
+HISTOGRAMS = (RECEIVE_TO_ROUTE, ROUTE_TO_SEND, QUEUE_DEPTH, LOOP_LAG)
+
+
+def snapshot() -> dict:
+    """name → snapshot of every histogram (picklable; for the worker stats queue)."""
+    return {h.name: h.snapshot() for h in HISTOGRAMS}
+
+
+def merged(snapshots: Iterable[dict]) -> list[Histogram]:
+    """Fresh histograms holding the sum of several snapshot() results."""
+    out = [Histogram(h.name, h.help, h.buckets) for h in HISTOGRAMS]
+    for snap in snapshots:
+        for h in out:
+            if h.name in snap:
+                h.merge(snap[h.name])
+    return out
+
+
+def render(histograms: Iterable[Histogram] = HISTOGRAMS, clients: int | None = None) -> str:
+    """Prometheus text exposition of *histograms* (plus a connected-clients gauge)."""
+    parts = []
+    if clients is not None:
+        parts.append("# HELP ws_connected_clients Connected websocket clients.\n"
+                     "# TYPE ws_connected_clients gauge\n"
+                     f"ws_connected_clients {clients}")
+    parts.extend(h.render() for h in histograms)
+    return "\n".join(parts) + "\n"
+
+
+async def sample_loop(clients: Callable[[], Iterable],
+                      interval_s: float = config.METRICS_SAMPLE_INTERVAL_S) -> None:
+    """Record event-loop lag and every client's queue depth every *interval_s*."""
+    while True:
+        due = time.perf_counter() + interval_s
+        await asyncio.sleep(interval_s)
+        LOOP_LAG.observe(max(0.0, time.perf_counter() - due))
+        for client in clients():
+            QUEUE_DEPTH.observe(client.queue_depth)
@@ -0,0 +1,234 @@
+"""
+Per-connection outbound queue and writer task.
+
+Channel.route() used to await ws.send() for every subscriber in turn, so a
+single client on a congested link delayed every other subscriber of that
+coin — and, since RedisSubscriber awaits route() before reading the next
+pub/sub message, the Redis reader as well.
+
+Every connection is now wrapped in a Client:
+
+  - route() only *enqueues* a frame; it never awaits a socket write
+  - one writer task per connection drains its queue in order
+  - an update for a coin that already has a frame waiting replaces that
+    frame in place (latest value wins), so a coin holds at most one entry
+    and a hot coin cannot crowd out the others
+  - the queue is bounded (CLIENT_QUEUE_MAX frames).  When it is full, an
+    update for a coin with nothing waiting evicts the oldest queued update
+    rather than being dropped itself: the newest value of a coin that
+    rarely updates may be its last for a long time
+  - a client whose queue has stayed full for SLOW_CLIENT_TIMEOUT_S is
+    disconnected with close code 1013 ("try again later")
+
+Control frames (acks, errors) bypass the bound and are never conflated.
+Queued updates carry the time they were routed, so the writer can record
+route-to-send latency (metrics.py) when the write completes.
+
+Channel fan-out first checks Client.writable: a client with nothing queued
+and no backpressure gets the shared frame written straight to its socket
+(websockets.broadcast), skipping the queue and the writer-task wakeup.
+Only clients that are already behind go through the queue.
+
+Clients that negotiated the binary subprotocol (codec.py) get bytes frames
+as binary websocket frames; everyone else gets the UTF-8 JSON bytes as
+text frames.  str frames (acks, errors) are always text.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+import websockets
+
+import config
+import metrics
+from cadence import Cadence
+
+logger = logging.getLogger(__name__)
+
+
+class Client:
+    """A connected websocket plus its bounded, conflating send queue."""
+
+    def __init__(
+        self,
+        ws: websockets.WebSocketServerProtocol,
+        max_queue: int = config.CLIENT_QUEUE_MAX,
+        slow_timeout_s: float = config.SLOW_CLIENT_TIMEOUT_S,
+        binary: bool = False,
+    ):
+        self.ws = ws
+        self.binary = binary
+        self._max_queue = max_queue
+        self._slow_timeout_s = slow_timeout_s
+        # Entries are [key, frame, routed_at] lists so a queued frame can be
+        # replaced in place; key and routed_at are None for control frames
+        self._queue: deque[list] = deque()
+        # key → newest queued entry for that key (conflation target)
+        self._pending: dict[str, list] = {}
+        self._wakeup = asyncio.Event()
+        self._full_since: Optional[float] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._sending = False
+        self.closed = False
+        # Set when the client asked for throttle_ms / batch (see cadence.py)
+        self.cadence: Optional[Cadence] = None
+        # Binary clients only: entries of codec.NameTable already sent, and
+        # key → update seq the client is known to hold (DELTA base)
+        self.names_known = 0
+        self.binary_seq: dict[str, int] = {}
+
+        # Stats
+        self.sent = 0
+        self.conflated = 0
+        self.dropped = 0
+
+    @property
+    def remote_address(self):
+        return self.ws.remote_address
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    @property
+    def writable(self) -> bool:
+        """True if a frame can go straight to the socket without reordering or blocking."""
+        return not self._queue and not self._sending and not self.closed and not self.ws.paused
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def set_cadence(self, interval_s: Optional[float], batch: bool = False) -> None:
+        """Switch to flushing every *interval_s* (None: every update, as it arrives)."""
+        if self.cadence is not None:
+            self.cadence.fire()         # don't lose what is pending under the old cadence
+            self.cadence.cancel()
+        self.cadence = Cadence(self, interval_s, batch) if interval_s else None
+
+    def start(self) -> None:
+        """Start the writer task (call from inside the running loop)."""
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def close(self) -> None:
+        """Stop the writer and drop anything still queued."""
+        self.closed = True
+        if self.cadence is not None:
+            self.cadence.cancel()
+        self._queue.clear()
+        self._pending.clear()
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._writer = None
+
+    # ------------------------------------------------------------------
+    # Enqueue (never blocks)
+    # ------------------------------------------------------------------
+
+    def send_control(self, frame: str | bytes) -> None:
+        """Queue an ack/error (or codec NAMES) frame. Never conflated or dropped."""
+        if self.closed:
+            return
+        self._queue.append([None, frame, None])
+        self._wakeup.set()
+
+    def enqueue(self, key: str, frame: bytes, routed_at: Optional[float] = None,
+                conflate: bool = True) -> None:
+        """
+        Queue an update for *key* (e.g. a coin id), replacing one still queued.
+
+        *routed_at* is the perf_counter() time of its fan-out (default: now).
+        conflate=False queues it after any frame for *key* instead (cadence
+        batches: each holds different coins).
+        """
+        if self.closed:
+            return
+        if self.binary_seq:
+            # May be conflated or dropped: next direct frame must be a full one
+            self.binary_seq.pop(key, None)
+
+        if routed_at is None:
+            routed_at = time.perf_counter()
+        full = len(self._queue) >= self._max_queue
+        if full:
+            now = time.monotonic()
+            if self._full_since is None:
+                self._full_since = now
+            elif now - self._full_since > self._slow_timeout_s:
+                self._disconnect_slow()
+                return
+
+        entry = self._pending.get(key) if conflate else None
+        if entry is not None:
+            entry[1] = frame
+            entry[2] = routed_at
+            self.conflated += 1
+            return
+        if full:
+            self._evict_oldest()
+        entry = [key, frame, routed_at]
+        self._queue.append(entry)
+        if conflate:
+            self._pending[key] = entry
+        self._wakeup.set()
+
+    def _evict_oldest(self) -> None:
+        """Drop the oldest queued update (control frames stay)."""
+        for i, entry in enumerate(self._queue):
+            key = entry[0]
+            if key is not None:
+                del self._queue[i]
+                if self._pending.get(key) is entry:
+                    del self._pending[key]
+                self.dropped += 1
+                return
+
+    def _disconnect_slow(self) -> None:
+        logger.warning(
+            f"Disconnecting slow client {self.remote_address}: queue full for "
+            f">{self._slow_timeout_s:.0f}s ({self.conflated} conflated, {self.dropped} dropped)"
+        )
+        self.closed = True
+        self._queue.clear()
+        self._pending.clear()
+        asyncio.create_task(self.ws.close(code=1013, reason="slow consumer"))
+
+    # ------------------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------------------
+
+    async def _write_loop(self) -> None:
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                entry = self._queue.popleft()
+                key = entry[0]
+                if key is not None and self._pending.get(key) is entry:
+                    del self._pending[key]
+                if self._full_since is not None and len(self._queue) <= self._max_queue // 2:
+                    self._full_since = None
+
+                # JSON frames are pre-encoded UTF-8 bytes; still text frames
+                self._sending = True
+                try:
+                    await self.ws.send(entry[1], text=None if self.binary else True)
+                finally:
+                    self._sending = False
+                self.sent += 1
+                if entry[2] is not None:
+                    metrics.ROUTE_TO_SEND.observe(time.perf_counter() - entry[2])
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.closed = True
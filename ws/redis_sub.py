@@ -4,6 +4,26 @@ Redis pub/sub listener with automatic reconnection.
 Subscribes to one or more Redis channels and routes incoming
 messages to the appropriate Channel handler.  Reconnects with
 exponential backoff if the connection drops.
+
+In per_coin mode (config.REDIS_PUBSUB_MODE) the set of Redis channels
+follows local interest: when a coin gains its first local subscriber the
+instance SUBSCRIBEs to rt:stream:prices:<coin_id>, and when it loses its
+last one the UNSUBSCRIBE is deferred by REDIS_UNSUBSCRIBE_DEBOUNCE_S (and
+cancelled if someone subscribes again in the meantime).  The Channel's own
+subscriber sets are the reference counts.
+
+A wildcard subscription ("*") maps to the pattern rt:stream:prices:*,
+which is PSUBSCRIBEd instead.  While it is active, plain messages on that
+channel's per-coin channels are skipped: the pattern delivers them too.
+
+In stream mode there is no pub/sub at all.  Each channel's Redis stream
+(rt:log:prices) is read with XREAD BLOCK from the last entry id seen, so a
+reconnect picks up where it left off instead of losing whatever was
+published meanwhile, and every update is routed with its entry id as the
+sequence token (resume.py).  On first connect the newest
+RESUME_BUFFER_SIZE entries are loaded so clients can resume across a
+restart.  If the stream was trimmed past the last id while disconnected,
+the channel's resume buffer is reset: that gap can't be replayed.
 """
 
 import asyncio
@@ -13,7 +33,9 @@ import time
 import redis.asyncio as aioredis
 
 import config
-from channels.base import Channel
+import metrics
+from channels.base import WILDCARD, Channel
+from resume import parse_token
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +43,17 @@ logger = logging.getLogger(__name__)
 STALENESS_TIMEOUT = int(getattr(config, "PUBSUB_STALENESS_TIMEOUT", 60))
 # Max reconnect backoff in seconds
 MAX_BACKOFF = 60
+# Stream mode: entries per XREAD and how long it blocks (ms)
+STREAM_READ_COUNT = 500
+STREAM_BLOCK_MS = 5000
+
+
+def _split_patterns(names: set[str]) -> tuple[list[str], list[str]]:
+    """(plain channels, glob patterns) — patterns need PSUBSCRIBE."""
+    channels, patterns = [], []
+    for name in names:
+        (patterns if name.endswith("*") else channels).append(name)
+    return channels, patterns
 
 
 class RedisSubscriber:
@@ -28,22 +61,52 @@ class RedisSubscriber:
     Listens on Redis pub/sub and dispatches messages to Channel objects.
 
     Each Channel declares its own redis_channel name (e.g. "rt:stream:prices").
-    This class subscribes to all of them and routes accordingly.
+    In shared mode this class subscribes to all of them; in per_coin mode it
+    subscribes to per-coin channels as local clients come and go; in stream
+    mode it reads each Channel's redis_stream instead.
     Automatically reconnects on connection loss.
     """
 
-    def __init__(self, channels: list[Channel]):
+    def __init__(self, channels: list[Channel], mode: str = config.REDIS_PUBSUB_MODE,
+                 unsubscribe_debounce_s: float = config.REDIS_UNSUBSCRIBE_DEBOUNCE_S):
         self._channels = channels
+        self._mode = mode
+        self._debounce_s = unsubscribe_debounce_s
         # redis_channel_name → Channel instance for fast dispatch
-        self._dispatch: dict[str, Channel] = {
-            ch.redis_channel: ch for ch in channels
-        }
+        self._dispatch: dict[str, Channel] = {}
         self._client: aioredis.Redis = None
         self._pubsub: aioredis.client.PubSub = None
         self._last_message_time: float = 0.0
 
+        # Redis channels we want / are subscribed to on the current connection
+        self._wanted: set[str] = set()
+        self._subscribed: set[str] = set()
+        # redis channel → monotonic time its debounced UNSUBSCRIBE is due
+        self._unsubscribe_at: dict[str, float] = {}
+        self._interest_dirty = asyncio.Event()
+        self._interest_task: asyncio.Task = None
+
+        # Stream mode: stream name → Channel, and the last entry id read
+        self._streams: dict[str, Channel] = {}
+        self._last_ids: dict[str, str] = {}
+
+        # Stats
+        self.subscribe_calls = 0
+        self.unsubscribe_calls = 0
+        self.stream_entries = 0
+
+        if mode == "stream":
+            self._streams = {ch.redis_stream: ch for ch in channels if ch.redis_stream}
+        elif mode == "per_coin":
+            for ch in channels:
+                ch.set_interest_listener(self._on_interest)
+        else:
+            for ch in channels:
+                self._dispatch[ch.redis_channel] = ch
+                self._wanted.add(ch.redis_channel)
+
     async def connect(self) -> None:
-        """Connect to Redis and subscribe to all channel topics."""
+        """Connect to Redis and subscribe to every channel currently wanted."""
         if not config.REDIS_URL:
             raise ValueError(
                 "REDIS_URL is not set. "
@@ -53,17 +116,104 @@ class RedisSubscriber:
         self._client = aioredis.from_url(
             config.REDIS_URL,
             decode_responses=True,
+            client_name="ws-sub",
         )
         await self._client.ping()
 
+        if self._mode == "stream":
+            await self._prepare_streams()
+            self._last_message_time = time.time()
+            logger.info(f"Redis stream reader connected — streams: {sorted(self._streams)}")
+            return
+
         self._pubsub = self._client.pubsub()
-        channel_names = list(self._dispatch.keys())
-        await self._pubsub.subscribe(*channel_names)
+        self._subscribed = set()
+        await self._apply_interest()
         self._last_message_time = time.time()
 
-        logger.info(
-            f"Redis pub/sub connected — listening on: {channel_names}"
-        )
+        if self._mode == "per_coin":
+            logger.info(
+                f"Redis pub/sub connected — per-coin mode, "
+                f"{len(self._subscribed)} coin channel(s) subscribed"
+            )
+        else:
+            logger.info(
+                f"Redis pub/sub connected — listening on: {sorted(self._subscribed)}"
+            )
+
+    # ------------------------------------------------------------------
+    # Interest tracking (per_coin mode)
+    # ------------------------------------------------------------------
+
+    def _on_interest(self, channel: Channel, key: str, active: bool) -> None:
+        """Channel callback: *key* gained its first / lost its last local subscriber."""
+        name = channel.redis_channel_for(key)
+        if active:
+            self._dispatch[name] = channel
+            self._unsubscribe_at.pop(name, None)
+            if name not in self._wanted:
+                self._wanted.add(name)
+                self._interest_dirty.set()
+        elif name in self._wanted:
+            self._unsubscribe_at[name] = time.monotonic() + self._debounce_s
+            self._interest_dirty.set()
+
+    async def _apply_interest(self) -> None:
+        """Bring the pub/sub connection's subscriptions in line with _wanted."""
+        now = time.monotonic()
+        for name, due in list(self._unsubscribe_at.items()):
+            if due <= now:
+                del self._unsubscribe_at[name]
+                self._wanted.discard(name)
+
+        if self._pubsub is None:
+            return
+        to_subscribe = self._wanted - self._subscribed
+        to_unsubscribe = self._subscribed - self._wanted
+        if to_subscribe:
+            channels, patterns = _split_patterns(to_subscribe)
+            if channels:
+                await self._pubsub.subscribe(*channels)
+            if patterns:
+                await self._pubsub.psubscribe(*patterns)
+            self._subscribed |= to_subscribe
+            self.subscribe_calls += 1
+        if to_unsubscribe:
+            channels, patterns = _split_patterns(to_unsubscribe)
+            if channels:
+                await self._pubsub.unsubscribe(*channels)
+            if patterns:
+                await self._pubsub.punsubscribe(*patterns)
+            self._subscribed -= to_unsubscribe
+            self.unsubscribe_calls += 1
+            for name in to_unsubscribe:
+                # Wanted again while the UNSUBSCRIBE was in flight: keep its
+                # dispatch entry; the next pass subscribes it again
+                if name not in self._wanted:
+                    self._dispatch.pop(name, None)
+
+    async def _interest_loop(self) -> None:
+        """Apply interest changes as they happen and debounced unsubscribes when due."""
+        while True:
+            timeout = None
+            if self._unsubscribe_at:
+                timeout = max(0.0, min(self._unsubscribe_at.values()) - time.monotonic())
+            try:
+                await asyncio.wait_for(self._interest_dirty.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._interest_dirty.clear()
+            try:
+                await self._apply_interest()
+            except Exception as e:
+                # The listen loop notices the broken connection and reconnects;
+                # connect() re-applies everything in _wanted
+                logger.warning(f"Redis pub/sub (un)subscribe failed: {e}")
+                await asyncio.sleep(1)
+
+    # ------------------------------------------------------------------
+    # Listen loop
+    # ------------------------------------------------------------------
 
     async def listen(self) -> None:
         """
@@ -73,6 +223,8 @@ class RedisSubscriber:
         Logs a warning if no messages arrive for STALENESS_TIMEOUT seconds.
         """
         backoff = 1
+        if self._mode == "per_coin" and self._interest_task is None:
+            self._interest_task = asyncio.create_task(self._interest_loop())
 
         while True:
             try:
@@ -96,9 +248,18 @@ class RedisSubscriber:
 
     async def _listen_inner(self) -> None:
         """Core listen loop — raises on connection errors."""
+        if self._mode == "stream":
+            return await self._listen_streams()
+
         staleness_logged = False
 
         while True:
+            if not self._subscribed:
+                # Nothing to listen to (no local interest yet) — not stale
+                self._last_message_time = time.time()
+                await asyncio.sleep(0.1)
+                continue
+
             # Check for staleness
             elapsed = time.time() - self._last_message_time
             if elapsed > STALENESS_TIMEOUT and not staleness_logged:
@@ -120,23 +281,91 @@ class RedisSubscriber:
 
             if message is None:
                 continue
+            received = time.perf_counter()
 
-            if message["type"] != "message":
+            if message["type"] == "pmessage":
+                handler = self._dispatch.get(message["pattern"])
+            elif message["type"] == "message":
+                handler = self._dispatch.get(message["channel"])
+                # Also delivered through the channel's wildcard pattern
+                if handler is not None and self._wildcard_active(handler):
+                    handler = None
+            else:
                 continue
 
             self._last_message_time = time.time()
             staleness_logged = False
 
-            redis_channel = message["channel"]
-            handler = self._dispatch.get(redis_channel)
             if handler:
                 await handler.route(message["data"])
+                metrics.RECEIVE_TO_ROUTE.observe(time.perf_counter() - received)
+
+    # ------------------------------------------------------------------
+    # Stream mode
+    # ------------------------------------------------------------------
+
+    async def _prepare_streams(self) -> None:
+        """Backfill resume buffers on first connect; detect trimmed gaps on reconnect."""
+        for stream, channel in self._streams.items():
+            last_id = self._last_ids.get(stream)
+            if last_id is None:
+                entries = await self._client.xrevrange(stream, count=config.RESUME_BUFFER_SIZE)
+                for entry_id, fields in reversed(entries):
+                    if fields.get("data"):
+                        await channel.route(fields["data"], token=entry_id)
+                self._last_ids[stream] = entries[0][0] if entries else "0-0"
+                logger.info(f"[{stream}] loaded {len(entries)} entries for resume")
+                continue
+
+            first = await self._client.xrange(stream, count=1)
+            if first and parse_token(first[0][0]) > parse_token(last_id):
+                logger.warning(
+                    f"[{stream}] trimmed past last read id {last_id} while disconnected — "
+                    f"updates lost, resume buffer reset"
+                )
+                channel.resume_buffer.reset()
+
+    async def _listen_streams(self) -> None:
+        """XREAD BLOCK loop over every channel's stream — raises on connection errors."""
+        staleness_logged = False
+
+        while True:
+            elapsed = time.time() - self._last_message_time
+            if elapsed > STALENESS_TIMEOUT and not staleness_logged:
+                logger.warning(
+                    f"No stream entries received for {elapsed:.0f}s — "
+                    f"possible stale connection"
+                )
+                staleness_logged = True
+
+            response = await self._client.xread(
+                self._last_ids, count=STREAM_READ_COUNT, block=STREAM_BLOCK_MS,
+            )
+            if not response:
+                continue
+            received = time.perf_counter()
+
+            self._last_message_time = time.time()
+            staleness_logged = False
+
+            for stream, entries in response:
+                channel = self._streams[stream]
+                for entry_id, fields in entries:
+                    self._last_ids[stream] = entry_id
+                    self.stream_entries += 1
+                    if fields.get("data"):
+                        await channel.route(fields["data"], token=entry_id)
+                        metrics.RECEIVE_TO_ROUTE.observe(time.perf_counter() - received)
+
+    def _wildcard_active(self, channel: Channel) -> bool:
+        return self._mode == "per_coin" and channel.redis_channel_for(WILDCARD) in self._subscribed
 
     async def _safe_close(self) -> None:
         """Close existing connections without raising."""
         try:
             if self._pubsub:
                 await self._pubsub.unsubscribe()
+                await self._pubsub.punsubscribe()
                 await self._pubsub.aclose()
         except Exception:
             pass
@@ -147,8 +376,23 @@ class RedisSubscriber:
             pass
         self._pubsub = None
         self._client = None
+        self._subscribed = set()
 
     async def close(self) -> None:
         """Unsubscribe and close Redis connection."""
+        if self._interest_task is not None:
+            self._interest_task.cancel()
+            self._interest_task = None
         await self._safe_close()
         logger.info("Redis pub/sub connection closed")
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "mode": self._mode,
+            "redis_channels": len(self._subscribed),
+            "stream_entries": self.stream_entries,
+            "pending_unsubscribes": len(self._unsubscribe_at),
+            "subscribe_calls": self.subscribe_calls,
+            "unsubscribe_calls": self.unsubscribe_calls,
+        }
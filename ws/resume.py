@@ -0,0 +1,71 @@
+"""
+Resumable feeds: sequence tokens and the replay ring buffer.
+
+In stream mode (REDIS_PUBSUB_MODE=stream) every update is read from the
+rt:log:prices Redis stream, and its stream entry id ("1774632035120-0") is
+the update's sequence token.  Ids are assigned by Redis, so a token means
+the same thing on every ws instance.  It is added to the data object:
+
+    { "channel": "prices", "data": { ..., "seq": "1774632035120-0" } }
+
+A client that reconnects sends the last token it saw:
+
+    { "action": "subscribe", "channel": "prices", "coins": [...],
+      "resume_from": "1774632035120-0" }
+
+and the instance replays every later update for those coins from a
+ResumeBuffer of the last RESUME_BUFFER_SIZE updates.  If the gap reaches
+further back than the buffer, the ack says "resumed": false and the
+client gets the usual snapshots instead.
+"""
+
+from collections import deque
+from typing import Iterable, Optional
+
+
+def parse_token(token) -> Optional[tuple[int, int]]:
+    """Stream id "<ms>-<n>" → (ms, n), or None if malformed."""
+    if not isinstance(token, str):
+        return None
+    ms, sep, n = token.partition("-")
+    if not sep or not ms.isdigit() or not n.isdigit():
+        return None
+    return int(ms), int(n)
+
+
+class ResumeBuffer:
+    """The last *maxlen* (token, key, frame) updates, oldest first, without gaps."""
+
+    def __init__(self, maxlen: int):
+        self._entries: deque[tuple[tuple[int, int], str, bytes]] = deque(maxlen=maxlen)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def append(self, token: str, key: str, frame: bytes) -> None:
+        self._entries.append((parse_token(token), key, frame))
+
+    def reset(self) -> None:
+        """Forget everything (the source had a gap, so older tokens can't be resumed)."""
+        self._entries.clear()
+
+    def since(self, token: str, keys: Optional[Iterable[str]] = None) -> Optional[list[tuple[str, bytes]]]:
+        """
+        Updates after *token*, oldest first, as (key, frame).
+
+        Only keys in *keys* (None: every key).  Returns None if the buffer
+        does not reach back to *token*, so the gap can't be replayed.
+        """
+        after = parse_token(token)
+        if after is None or not self._entries or self._entries[0][0] > after:
+            return None
+        wanted = None if keys is None else set(keys)
+        replay = []
+        # Scan back from the newest entry: cost is the size of the gap
+        for entry_id, key, frame in reversed(self._entries):
+            if entry_id <= after:
+                break
+            if wanted is None or key in wanted:
+                replay.append((key, frame))
+        replay.reverse()
+        return replay
@@ -4,28 +4,49 @@ WebSocket connection handler.
 Manages client connections, parses subscribe/unsubscribe messages,
 and delegates to the appropriate Channel.
 
+Every connection is wrapped in an outbound.Client: acks, errors and price
+updates all go through its bounded queue and single writer task, so they
+reach the client in order and nothing here awaits a socket write.
+
 Client protocol:
     → { "action": "subscribe",   "channel": "prices", "coins": ["bitcoin", "ethereum"] }
     → { "action": "unsubscribe", "channel": "prices", "coins": ["bitcoin"] }
+    → "coins": ["*"] subscribes to every coin on the channel (counts as one
+      subscription; no snapshots)
+    → subscribe may also carry "throttle_ms": <int> and/or "batch": true
+      (at most one update per coin per interval; see cadence.py)
+    → and "resume_from": "<seq>" — the last data.seq seen before a
+      reconnect; missed updates are replayed (stream mode; see resume.py)
     ← { "channel": "prices", "data": { ... } }              (price tick)
+    ← { "channel": "prices", "data": { "type": "snapshot", ... } }
+                                    (latest value, right after a subscribe ack)
+    ← { "channel": "prices", "batch": [ { ... }, ... ] }    (batch: true)
     ← { "type": "subscribed",   "channel": "prices", "coins": [...] }  (ack)
+      (+ "resumed": true / false and "replayed": <n> if resume_from was sent)
     ← { "type": "unsubscribed", "channel": "prices", "coins": [...] }  (ack)
     ← { "type": "error", "message": "..." }                            (error)
+
+Clients that negotiate the prices.v1.msgpack subprotocol get price updates
+as binary frames instead (codec.py); acks and errors are still JSON text.
 """
 
 import json
 import logging
-from typing import Dict
+from typing import Dict, Optional
 
 import websockets
 
+import codec
 import config
-from channels.base import Channel
+from channels.base import WILDCARD, Channel
+from outbound import Client
+from resume import parse_token
+from snapshot import SnapshotStore
 
 logger = logging.getLogger(__name__)
 
 # Track all connected clients for stats / broadcasting
-connected_clients: set[websockets.WebSocketServerProtocol] = set()
+connected_clients: set[Client] = set()
 
 
 class ConnectionHandler:
@@ -37,40 +58,45 @@ class ConnectionHandler:
     correct Channel.
     """
 
-    def __init__(self, channels: Dict[str, Channel]):
+    def __init__(self, channels: Dict[str, Channel], snapshots: Optional[SnapshotStore] = None):
         # channel_name → Channel instance
         self._channels = channels
+        # Shared across connections; None disables snapshot-on-subscribe
+        self._snapshots = snapshots
         # Track what this specific client is subscribed to (for limit enforcement)
         self._client_sub_count: int = 0
 
     async def handle(self, ws: websockets.WebSocketServerProtocol) -> None:
         """Main handler — called once per client connection."""
-        connected_clients.add(ws)
+        client = Client(ws, binary=ws.subprotocol == codec.SUBPROTOCOL)
+        client.start()
+        connected_clients.add(client)
         remote = ws.remote_address
         logger.info(f"Client connected: {remote} ({len(connected_clients)} total)")
 
         try:
             async for raw_message in ws:
-                await self._process_message(ws, raw_message)
+                await self._process_message(client, raw_message)
         except websockets.ConnectionClosed:
             pass
         finally:
             # Clean up subscriptions across ALL channels
             for channel in self._channels.values():
-                channel.remove_client(ws)
-            connected_clients.discard(ws)
+                channel.remove_client(client)
+            connected_clients.discard(client)
+            await client.close()
             logger.info(f"Client disconnected: {remote} ({len(connected_clients)} total)")
 
     async def _process_message(
         self,
-        ws: websockets.WebSocketServerProtocol,
+        client: Client,
         raw: str,
     ) -> None:
         """Parse and dispatch a single client message."""
         try:
             msg = json.loads(raw)
         except json.JSONDecodeError:
-            await self._send_error(ws, "Invalid JSON")
+            await self._send_error(client, "Invalid JSON")
             return
 
         action = msg.get("action")
@@ -78,52 +104,121 @@ class ConnectionHandler:
         coins = msg.get("coins", [])
 
         if not action or not channel_name:
-            await self._send_error(ws, "Missing 'action' or 'channel' field")
+            await self._send_error(client, "Missing 'action' or 'channel' field")
             return
 
         channel = self._channels.get(channel_name)
         if not channel:
             available = list(self._channels.keys())
-            await self._send_error(ws, f"Unknown channel '{channel_name}'. Available: {available}")
+            await self._send_error(client, f"Unknown channel '{channel_name}'. Available: {available}")
             return
 
         if not isinstance(coins, list) or not coins:
-            await self._send_error(ws, "'coins' must be a non-empty list of canonical IDs")
+            await self._send_error(client, "'coins' must be a non-empty list of canonical IDs")
             return
 
         if action == "subscribe":
+            if client.binary and channel.codec is None:
+                await self._send_error(client, f"Channel '{channel_name}' has no {codec.SUBPROTOCOL} encoding")
+                return
+
+            if WILDCARD in coins and not config.WILDCARD_SUBSCRIPTIONS:
+                await self._send_error(client, "Wildcard subscriptions are disabled on this server")
+                return
+
             # Enforce per-client subscription limit
             new_count = self._client_sub_count + len(coins)
             if new_count > config.MAX_SUBSCRIPTIONS_PER_CLIENT:
                 await self._send_error(
-                    ws,
+                    client,
                     f"Subscription limit exceeded. Max {config.MAX_SUBSCRIPTIONS_PER_CLIENT} "
                     f"(current: {self._client_sub_count}, requested: {len(coins)})"
                 )
                 return
 
-            subscribed = channel.subscribe(ws, coins)
-            self._client_sub_count += len(subscribed)
-            await ws.send(json.dumps({
+            resume_from = msg.get("resume_from")
+            if resume_from is not None and parse_token(resume_from) is None:
+                await self._send_error(client, "'resume_from' must be a sequence token like \"1774632035120-0\"")
+                return
+
+            cadence_opts = "throttle_ms" in msg or "batch" in msg
+            if cadence_opts:
+                error = self._apply_cadence(client, msg.get("throttle_ms"), msg.get("batch", False))
+                if error:
+                    await self._send_error(client, error)
+                    return
+
+            subscribed = channel.subscribe(client, coins)
+            self._client_sub_count = self._count_subscriptions(client)
+            ack = {
                 "type": "subscribed",
                 "channel": channel_name,
                 "coins": subscribed,
-            }))
-            logger.debug(f"[{ws.remote_address}] subscribed to {channel_name}: {subscribed}")
+            }
+            if cadence_opts:
+                ack["throttle_ms"] = round(client.cadence.interval_s * 1000) if client.cadence else 0
+                ack["batch"] = bool(client.cadence and client.cadence.batch)
+            replay = None
+            if resume_from is not None:
+                keys = None if WILDCARD in subscribed else subscribed
+                replay = channel.resume_buffer.since(resume_from, keys)
+                ack["resumed"] = replay is not None
+                ack["replayed"] = len(replay) if replay is not None else 0
+            client.send_control(json.dumps(ack))
+            logger.debug(f"[{client.remote_address}] subscribed to {channel_name}: {subscribed}")
+            if replay is not None:
+                # Replayed updates bring the client up to date; no snapshots.
+                # Queued synchronously, so they precede any live update.
+                for key, frame in replay:
+                    client.enqueue(key, channel.client_frame(client, key, frame))
+                return
+            snapshot_keys = [key for key in subscribed if key != WILDCARD]
+            if self._snapshots is not None and snapshot_keys:
+                await self._send_snapshots(client, channel, snapshot_keys)
 
         elif action == "unsubscribe":
-            unsubscribed = channel.unsubscribe(ws, coins)
-            self._client_sub_count = max(0, self._client_sub_count - len(unsubscribed))
-            await ws.send(json.dumps({
+            unsubscribed = channel.unsubscribe(client, coins)
+            self._client_sub_count = self._count_subscriptions(client)
+            client.send_control(json.dumps({
                 "type": "unsubscribed",
                 "channel": channel_name,
                 "coins": unsubscribed,
             }))
-            logger.debug(f"[{ws.remote_address}] unsubscribed from {channel_name}: {unsubscribed}")
+            logger.debug(f"[{client.remote_address}] unsubscribed from {channel_name}: {unsubscribed}")
 
         else:
-            await self._send_error(ws, f"Unknown action '{action}'. Use 'subscribe' or 'unsubscribe'")
+            await self._send_error(client, f"Unknown action '{action}'. Use 'subscribe' or 'unsubscribe'")
+
+    def _count_subscriptions(self, client: Client) -> int:
+        """Current total across channels (a "*" subscription counts once)."""
+        return sum(channel.subscription_count(client) for channel in self._channels.values())
+
+    @staticmethod
+    def _apply_cadence(client: Client, throttle_ms, batch) -> str | None:
+        """Validate and apply throttle_ms / batch; returns an error message or None."""
+        if throttle_ms is not None and (
+            isinstance(throttle_ms, bool) or not isinstance(throttle_ms, int)
+            or not 0 <= throttle_ms <= config.MAX_THROTTLE_MS
+        ):
+            return f"'throttle_ms' must be an integer from 0 to {config.MAX_THROTTLE_MS}"
+        if not isinstance(batch, bool):
+            return "'batch' must be true or false"
+
+        if not throttle_ms:
+            throttle_ms = config.DEFAULT_BATCH_MS if batch else 0
+        if throttle_ms:
+            throttle_ms = max(throttle_ms, config.MIN_THROTTLE_MS)
+        client.set_cadence(throttle_ms / 1000 if throttle_ms else None, batch)
+        return None
+
+    async def _send_snapshots(self, client: Client, channel: Channel, keys: list[str]) -> None:
+        """Queue the latest stored value for each newly subscribed key."""
+        frames = await self._snapshots.frames(channel, keys)
+        for key, (seq, frame) in frames.items():
+            # A live update queued since the subscribe is newer — skip
+            if channel.update_seq(key) == seq:
+                client.enqueue(key, channel.client_frame(client, key, frame))
 
     @staticmethod
-    async def _send_error(ws: websockets.WebSocketServerProtocol, message: str) -> None:
-        await ws.send(json.dumps({"type": "error", "message": message}))
+    async def _send_error(client: Client, message: str) -> None:
+        client.send_control(json.dumps({"type": "error", "message": message}))
@@ -0,0 +1,150 @@
+"""
+Snapshot-on-subscribe.
+
+A new subscriber used to get only an ack and then wait for the coin's next
+publish — up to BATCH_INTERVAL_MS, longer for quiet coins.  Now the
+latest value is sent straight away, read from the rt:coin:<coin_id> keys
+that RedisWriter refreshes on every flush.
+
+  - one MGET per subscribe request, however many coins it names
+  - frames are cached for SNAPSHOT_CACHE_TTL_S, and concurrent requests
+    for the same key share one in-flight read
+  - sequencing: Channel.update_seq(key) is bumped on every live fan-out.
+    A snapshot is sent only if no live update for that coin has been
+    queued since the client subscribed (the live one is newer), and a
+    cached or in-flight read is reused only if it started at the current
+    sequence number
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+import config
+from channels.base import Channel
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    """Short-lived, single-flight cache of snapshot frames."""
+
+    def __init__(self, client: Optional[aioredis.Redis] = None,
+                 ttl_s: float = config.SNAPSHOT_CACHE_TTL_S):
+        self._client = client
+        self._ttl_s = ttl_s
+        # redis key → (expires_at, seq, frame or None if the key was missing)
+        self._cache: dict[str, tuple[float, int, Optional[bytes]]] = {}
+        # redis key → (seq, future resolving to frame or None)
+        self._inflight: dict[str, tuple[int, asyncio.Future]] = {}
+
+        # Stats
+        self.hits = 0
+        self.joined = 0
+        self.fetched = 0
+        self.mget_calls = 0
+
+    async def connect(self) -> None:
+        if self._client is None:
+            self._client = aioredis.from_url(config.REDIS_URL, decode_responses=True)
+            await self._client.ping()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def frames(self, channel: Channel, keys: list[str]) -> dict[str, tuple[int, bytes]]:
+        """
+        Snapshot frames for *keys*, as key → (seq, frame).
+
+        seq is the channel's update sequence the frame is current for;
+        callers send a frame only while update_seq(key) still equals it.
+        Keys with no stored value are left out.
+        """
+        now = time.monotonic()
+        found: dict[str, tuple[int, Optional[bytes]]] = {}
+        waiting: dict[str, tuple[int, asyncio.Future]] = {}
+        to_fetch: dict[str, tuple[str, int]] = {}   # key → (redis key, seq)
+
+        for key in keys:
+            redis_key = channel.snapshot_key(key)
+            if redis_key is None:
+                continue
+            seq = channel.update_seq(key)
+            cached = self._cache.get(redis_key)
+            if cached is not None and cached[0] > now and cached[1] == seq:
+                found[key] = (seq, cached[2])
+                self.hits += 1
+                continue
+            inflight = self._inflight.get(redis_key)
+            if inflight is not None and inflight[0] == seq:
+                waiting[key] = inflight
+                self.joined += 1
+                continue
+            to_fetch[key] = (redis_key, seq)
+
+        if to_fetch:
+            await self._fetch(channel, to_fetch, found)
+
+        for key, (seq, future) in waiting.items():
+            found[key] = (seq, await asyncio.shield(future))
+
+        return {key: (seq, frame) for key, (seq, frame) in found.items() if frame is not None}
+
+    async def _fetch(self, channel: Channel, to_fetch: dict[str, tuple[str, int]],
+                     found: dict[str, tuple[int, Optional[bytes]]]) -> None:
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for key, (redis_key, seq) in to_fetch.items():
+            futures[key] = loop.create_future()
+            self._inflight[redis_key] = (seq, futures[key])
+
+        try:
+            values = [None] * len(to_fetch)
+            try:
+                values = await self._client.mget([redis_key for redis_key, _ in to_fetch.values()])
+                self.mget_calls += 1
+            except Exception as e:
+                logger.warning(f"Snapshot MGET failed for {len(to_fetch)} key(s): {e}")
+
+            expires_at = time.monotonic() + self._ttl_s
+            for (key, (redis_key, seq)), raw in zip(to_fetch.items(), values):
+                frame = None
+                if raw is not None:
+                    try:
+                        frame = channel.snapshot_frame(key, raw)
+                    except Exception as e:
+                        logger.warning(f"Bad snapshot value at {redis_key}: {e}")
+                    self._cache[redis_key] = (expires_at, seq, frame)
+                    self.fetched += 1
+                found[key] = (seq, frame)
+                futures[key].set_result(frame)
+        finally:
+            # Never leave joiners hanging, even if this request was cancelled
+            for key, (redis_key, _) in to_fetch.items():
+                if not futures[key].done():
+                    futures[key].set_result(None)
+                if self._inflight.get(redis_key, (None, None))[1] is futures[key]:
+                    del self._inflight[redis_key]
+
+        if len(self._cache) > 1024:
+            self._evict()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for redis_key in [k for k, v in self._cache.items() if v[0] <= now]:
+            del self._cache[redis_key]
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "joined": self.joined,
+            "fetched": self.fetched,
+            "mget_calls": self.mget_calls,
+        }
@@ -0,0 +1,214 @@
+"""
+Pre-fork multi-process mode (WS_WORKERS > 1).
+
+A single asyncio process tops out at one core, and per-connection framing
+and socket writes are CPU-bound, so one process caps how many clients and
+how much fan-out an instance can handle.
+
+With WS_WORKERS > 1, main.py runs a Supervisor instead of the server:
+
+  - it starts WS_WORKERS worker processes up front.  Each is a complete
+    server — its own RedisSubscriber, channels and snapshot store — bound
+    to WS_PORT with SO_REUSEPORT, so the kernel spreads new connections
+    across them
+  - workers push their stats to the supervisor every
+    WORKER_STATS_INTERVAL_S; the supervisor owns HEALTH_PORT and answers
+    with the totals plus a per-worker breakdown, or at GET /metrics with
+    the workers' fan-out histograms merged (metrics.py)
+  - a worker that exits is restarted (with backoff, reset once it has
+    stayed up for HEALTHY_AFTER_S), and health reports "degraded" until it
+    is back
+
+Each worker's /health on WS_PORT still answers for that worker alone.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from typing import Callable, Optional
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Max restart backoff for a crashing worker, in seconds
+MAX_RESTART_BACKOFF = 30
+# A restarted worker up this long (seconds) is healthy again: its backoff resets
+HEALTHY_AFTER_S = 60
+
+
+def _run_worker(worker_id: int, stats_queue) -> None:
+    """Default worker: the full server from main.py, on a shared port."""
+    import main
+    try:
+        asyncio.run(main.main(worker_id=worker_id, stats_queue=stats_queue))
+    except KeyboardInterrupt:
+        pass
+
+
+async def report_stats(worker_id: int, stats_queue, collect: Callable[[], dict],
+                       interval_s: float = config.WORKER_STATS_INTERVAL_S) -> None:
+    """Worker side: push collect() to the supervisor every *interval_s*."""
+    while True:
+        try:
+            stats_queue.put_nowait({"worker": worker_id, "pid": os.getpid(), "at": time.time(), **collect()})
+        except Exception as e:
+            logger.warning(f"Worker {worker_id}: stats report failed: {e}")
+        await asyncio.sleep(interval_s)
+
+
+class Supervisor:
+    """Starts, watches and restarts the worker processes; serves aggregated health."""
+
+    def __init__(self, workers: int = config.WS_WORKERS, target: Callable = _run_worker,
+                 health_port: int = config.HEALTH_PORT):
+        self._n = workers
+        self._target = target
+        self._health_port = health_port
+        self._ctx = mp.get_context("spawn")
+        self._stats_queue = self._ctx.Queue()
+        self._procs: dict[int, mp.Process] = {}
+        # worker id → monotonic time its current process started
+        self._started_at: dict[int, float] = {}
+        self._restart_at: dict[int, float] = {}
+        self._backoff: dict[int, float] = {}
+        # worker id → latest stats it reported
+        self._latest: dict[int, dict] = {}
+        self._stopping = False
+
+        # Stats
+        self.restarts = 0
+
+    # ------------------------------------------------------------------
+    # Processes
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        threading.Thread(target=self._read_stats, name="worker-stats", daemon=True).start()
+        for worker_id in range(self._n):
+            self._spawn(worker_id)
+
+    def _spawn(self, worker_id: int) -> None:
+        proc = self._ctx.Process(target=self._target, args=(worker_id, self._stats_queue),
+                                 name=f"ws-worker-{worker_id}", daemon=True)
+        proc.start()
+        self._procs[worker_id] = proc
+        self._started_at[worker_id] = time.monotonic()
+        logger.info(f"Worker {worker_id} started (pid {proc.pid})")
+
+    def _read_stats(self) -> None:
+        while True:
+            stats = self._stats_queue.get()
+            self._latest[stats["worker"]] = stats
+
+    def _check_workers(self) -> None:
+        """Schedule restarts for workers that exited; start those that are due."""
+        if self._stopping:
+            return
+        now = time.monotonic()
+        for worker_id, proc in list(self._procs.items()):
+            if proc.is_alive():
+                if worker_id in self._backoff and now - self._started_at[worker_id] >= HEALTHY_AFTER_S:
+                    del self._backoff[worker_id]
+                continue
+            if worker_id in self._restart_at:
+                continue
+            backoff = self._backoff.get(worker_id, 1)
+            logger.error(f"Worker {worker_id} (pid {proc.pid}) exited with {proc.exitcode} — "
+                         f"restarting in {backoff}s")
+            self._latest.pop(worker_id, None)
+            self._restart_at[worker_id] = now + backoff
+            self._backoff[worker_id] = min(backoff * 2, MAX_RESTART_BACKOFF)
+        for worker_id, due in list(self._restart_at.items()):
+            if due <= now:
+                del self._restart_at[worker_id]
+                self.restarts += 1
+                self._spawn(worker_id)
+
+    def stop(self, timeout_s: float = 10) -> None:
+        """SIGTERM every worker (graceful shutdown), then SIGKILL stragglers."""
+        self._stopping = True
+        for proc in self._procs.values():
+            if proc.is_alive():
+                proc.terminate()
+        deadline = time.monotonic() + timeout_s
+        for proc in self._procs.values():
+            proc.join(max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.kill()
+
+    # ------------------------------------------------------------------
+    # Health
+    # ------------------------------------------------------------------
+
+    @property
+    def stats(self) -> dict:
+        workers = []
+        for worker_id, proc in sorted(self._procs.items()):
+            entry = {"worker": worker_id, "pid": proc.pid, "alive": proc.is_alive()}
+            entry.update({k: v for k, v in self._latest.get(worker_id, {}).items()
+                          if k not in entry and k != "metrics"})
+            workers.append(entry)
+        alive = sum(w["alive"] for w in workers)
+        return {
+            "status": "ok" if alive == self._n else "degraded",
+            "workers": self._n,
+            "alive": alive,
+            "restarts": self.restarts,
+            "clients": sum(w.get("clients", 0) for w in workers),
+            "per_worker": workers,
+        }
+
+    def render_metrics(self) -> str:
+        """Prometheus text: every worker's latest histograms, summed."""
+        latest = list(self._latest.values())
+        return metrics.render(
+            metrics.merged(stats["metrics"] for stats in latest if "metrics" in stats),
+            clients=sum(stats.get("clients", 0) for stats in latest),
+        )
+
+    async def _health_handler(self, reader, writer) -> None:
+        request = await reader.read(1024)
+        if request.startswith(b"GET /metrics"):
+            body, content_type = self.render_metrics(), metrics.CONTENT_TYPE
+        else:
+            body, content_type = json.dumps(self.stats), "application/json"
+        body = body.encode()
+        writer.write((
+            f"HTTP/1.1 200 OK\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"\r\n"
+        ).encode() + body)
+        await writer.drain()
+        writer.close()
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Start the workers and supervise until *stop* is set (or SIGINT/SIGTERM)."""
+        if stop is None:
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, stop.set)
+
+        self.start()
+        health = await asyncio.start_server(self._health_handler, "0.0.0.0", self._health_port)
+        logger.info(f"Supervisor: {self._n} workers on :{config.WS_PORT}, health on :{self._health_port}")
+        try:
+            while not stop.is_set():
+                self._check_workers()
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            logger.info("Supervisor: stopping workers...")
+            health.close()
+            await health.wait_closed()
+            await asyncio.to_thread(self.stop)